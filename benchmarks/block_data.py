@@ -0,0 +1,159 @@
+"""
+Compare the peak memory of building a pack full of loot chests, with block data either
+frozen and shared between blocks, or kept as a separate copy for every block.
+
+The pack is generated up-front: several materials that each describe the same loot
+chest, and a structure file of chests that each carry their own copy of the same few
+sets of items (as structures saved by the game do). A blueprint fills rooms with the
+materials and includes the structure many times over.
+
+Usage: python benchmarks/block_data.py [VAULTS] [DATA_VERSION]
+"""
+
+import asyncio
+import gc
+import sys
+import tracemalloc
+from contextlib import ExitStack
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, List, Tuple
+from unittest.mock import patch
+
+from nbtlib import parse_nbt
+from pyckaxe import Block, BlockMap, BlockState, Position
+
+from mcblueprints.build import BlueprintsBuildContext
+from mcblueprints.build.blueprints_build_options import BlueprintsBuildOptions
+from mcblueprints.lib import FlattenedStructure, StructureNbtEncoder
+
+DEFAULT_VAULTS = 32
+DEFAULT_DATA_VERSION = 2586
+
+VAULT_SIZE = 16
+LOOT_MATERIALS = 8
+LOOT_VARIANTS = 4
+
+# Everywhere that block data is frozen, to switch off for comparison.
+FREEZE_TARGETS = (
+    "mcblueprints.lib.resource.material.material_deserializer.freeze_block_data",
+    "mcblueprints.lib.resource.structure.structure_nbt_decoder.freeze_block_data",
+    "mcblueprints.lib.resource.structure.flattened_structure.freeze_block_data",
+)
+
+
+def make_loot_snbt(variant: int) -> str:
+    items = ",".join(
+        f'{{Slot:{slot}b,id:"minecraft:{("gold_ingot", "bread", "bone")[slot % 3]}"'
+        + f",Count:{1 + (slot + variant) % 8}b"
+        + f",tag:{{display:{{Name:'\"Loot {variant}\"'}}}}}}"
+        for slot in range(27)
+    )
+    return f'{{LootTable:"minecraft:chests/simple_dungeon",Items:[{items}]}}'
+
+
+def make_vault(data_version: int) -> bytes:
+    # Parse the data once per block, the same way that the game would save them.
+    chest = Block("minecraft:chest", state=BlockState(facing="north"))
+    block_map = BlockMap(size=Position.from_xyz(VAULT_SIZE, 1, VAULT_SIZE))
+    for x in range(VAULT_SIZE):
+        for z in range(VAULT_SIZE):
+            data = parse_nbt(make_loot_snbt((x + z) % LOOT_VARIANTS))
+            block_map[x, 0, z] = Block(chest.name, state=chest.state, data=data)
+    encoder = StructureNbtEncoder(data_version=data_version)
+    return encoder(FlattenedStructure(block_map))
+
+
+def make_pack(root: Path, vaults: int, data_version: int):
+    (root / "pack.mcmeta").write_text('{"pack": {"pack_format": 6, "description": ""}}')
+    data = root / "data" / "chesty"
+    (data / "materials").mkdir(parents=True)
+    (data / "blueprints").mkdir(parents=True)
+    (data / "structures").mkdir(parents=True)
+
+    # The same loot chest, written out again in a number of different materials.
+    for i in range(LOOT_MATERIALS):
+        (data / "materials" / f"loot_{i}.yaml").write_text(
+            f"name: minecraft:chest\ndata: '{make_loot_snbt(0)}'\n"
+        )
+    (data / "structures" / "vault.nbt").write_bytes(make_vault(data_version))
+
+    # A room of loot chests from every material, and a hall of rooms and vaults.
+    symbols = "".join(chr(ord("A") + i) for i in range(LOOT_MATERIALS))
+    room_palette = "".join(
+        f"  {symbol}: chesty:loot_{i}\n" for i, symbol in enumerate(symbols)
+    )
+    room_row = (symbols * VAULT_SIZE)[:VAULT_SIZE]
+    room_layout = "".join(f"    - {room_row}\n" for _ in range(VAULT_SIZE))
+    (data / "blueprints" / "room.yaml").write_text(
+        f"size: [{VAULT_SIZE}, 1, {VAULT_SIZE}]\npalette:\n{room_palette}"
+        + f"layout:\n  -\n{room_layout}"
+    )
+    (data / "blueprints" / "hall.yaml").write_text(
+        f"size: [{VAULT_SIZE}, {2 * vaults}, {VAULT_SIZE}]\n"
+        + "palette:\n"
+        + "  V:\n    type: structure\n    structure: chesty:vault\n"
+        + "  R:\n    type: blueprint\n    blueprint: chesty:room\n"
+        + "layout:\n"
+        + "".join(f"  - - {'V' if y % 2 else 'R'}\n" for y in range(2 * vaults))
+    )
+
+
+def measure(
+    input_path: Path, output_path: Path, data_version: int
+) -> Tuple[float, int]:
+    options = BlueprintsBuildOptions(
+        input_path=input_path,
+        output_path=output_path,
+        data_versions=(data_version,),
+    )
+    gc.collect()
+    tracemalloc.start()
+    start = perf_counter()
+    context = BlueprintsBuildContext(options)
+    try:
+        asyncio.run(context.build())
+    finally:
+        context.close()
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def keep_block_data(data: Any) -> Any:
+    # As before block data was frozen: whatever was parsed, one compound per block.
+    return data
+
+
+def main(argv: List[str]):
+    vaults = int(argv[1]) if len(argv) > 1 else DEFAULT_VAULTS
+    data_version = int(argv[2]) if len(argv) > 2 else DEFAULT_DATA_VERSION
+    chests = 2 * vaults * VAULT_SIZE * VAULT_SIZE
+    print(f"Building a hall of {chests} loot chests")
+
+    with TemporaryDirectory() as temp:
+        input_path = Path(temp) / "input"
+        input_path.mkdir()
+        make_pack(input_path, vaults, data_version)
+
+        results = {}
+        for name, frozen in (("copied", False), ("shared", True)):
+            output_path = Path(temp) / f"output-{name}"
+            with ExitStack() as stack:
+                if not frozen:
+                    for target in FREEZE_TARGETS:
+                        stack.enter_context(patch(target, keep_block_data))
+                elapsed, peak = measure(input_path, output_path, data_version)
+            results[name] = sorted(
+                (path.relative_to(output_path), path.read_bytes())
+                for path in output_path.rglob("*.nbt")
+            )
+            print(f"{name:>8}: {elapsed:8.3f} s  {peak / 2 ** 20:8.1f} MiB peak")
+
+        print(f"   equal: {results['copied'] == results['shared']}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
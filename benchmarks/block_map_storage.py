@@ -0,0 +1,242 @@
+"""
+Compare building a pack that mixes solid terrain with sparse overlays, with blueprints
+always flattened into sparse block maps, always into dense ones, or into whichever one
+suits each blueprint.
+
+The pack is built in memory: a solid chunk of terrain, a hill made of chunks, a sparse
+overlay of lamps, a very sparse scattering of ores, and a world that puts the hill and
+the lamps together. Each storage is run in a fresh process. For each blueprint, the
+time to flatten it and the memory held by the result are reported.
+
+Usage: python benchmarks/block_map_storage.py [RUNS] [DATA_VERSION]
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+import tracemalloc
+from hashlib import sha256
+from random import Random
+from statistics import median
+from time import perf_counter
+from typing import Any, Dict, List, Tuple
+
+DEFAULT_RUNS = 3
+DEFAULT_DATA_VERSION = 2586
+
+STORAGES = ("sparse", "dense", "auto")
+
+# In the order they're built, so that each is flattened by itself first.
+BLUEPRINTS = (
+    "terrain/chunk",
+    "terrain/hill",
+    "overlay/lamps",
+    "overlay/scatter",
+    "world",
+)
+
+MATERIALS = {
+    "stone": "minecraft:stone",
+    "dirt": "minecraft:dirt",
+    "grass": "minecraft:grass_block",
+    "lamp": "minecraft:sea_lantern",
+    "ore": "minecraft:diamond_ore",
+}
+
+
+def fill(start: List[int], end: List[int], material: str) -> Dict[str, Any]:
+    return {"from": start, "to": end, "material": f"bench:{material}"}
+
+
+def make_blueprints() -> Dict[str, Dict[str, Any]]:
+    random = Random(0)
+
+    # Solid terrain, filled in layers with a few ores mixed in.
+    chunk = {
+        "size": [32, 16, 32],
+        "fill": [
+            fill([0, 0, 0], [31, 11, 31], "stone"),
+            fill([0, 12, 0], [31, 14, 31], "dirt"),
+            fill([0, 15, 0], [31, 15, 31], "grass"),
+        ],
+        "palette": {"O": "bench:ore"},
+        "compact_layout": True,
+        "layout": [
+            [
+                "".join(random.choice("O" + "." * 15) for _ in range(32))
+                for _ in range(32)
+            ]
+            for _ in range(8)
+        ],
+    }
+
+    # Four chunks side by side.
+    chunk_entry = {"type": "blueprint", "blueprint": "bench:terrain/chunk"}
+    hill = {
+        "size": [64, 16, 64],
+        "palette": {"C": chunk_entry},
+        "compact_layout": True,
+        "layout": [
+            [
+                "C.*31C",
+                {"row": ".", "repeat": 31},
+                "C.*31C",
+            ]
+        ],
+    }
+
+    # A lamp every few blocks, on a few layers.
+    lamp_layer = [{"row": "L.*7" * 8, "repeat": 1}, {"row": ".", "repeat": 7}] * 8
+    lamps = {
+        "size": [64, 32, 64],
+        "palette": {"L": "bench:lamp"},
+        "compact_layout": True,
+        "layout": [
+            {"layer": lamp_layer if y % 8 == 7 else ["."], "repeat": 1}
+            for y in range(32)
+        ],
+    }
+
+    # A handful of ores, scattered over a wide area.
+    ores: Dict[Tuple[int, int], List[int]] = {}
+    for _ in range(400):
+        y, x, z = random.randrange(64), random.randrange(128), random.randrange(128)
+        ores.setdefault((y, x), []).append(z)
+    scatter_layout: List[List[str]] = []
+    for y in range(64):
+        rows: List[str] = []
+        for x in range(128):
+            row, next_z = "", 0
+            for z in sorted(set(ores.get((y, x), ()))):
+                row += (f".*{z - next_z}" if z > next_z else "") + "O"
+                next_z = z + 1
+            rows.append(row or ".")
+        scatter_layout.append(rows)
+    scatter = {
+        "size": [128, 64, 128],
+        "palette": {"O": "bench:ore"},
+        "compact_layout": True,
+        "layout": scatter_layout,
+    }
+
+    # The hill, with the lamps above it.
+    world = {
+        "size": [64, 48, 64],
+        "palette": {
+            "H": {"type": "blueprint", "blueprint": "bench:terrain/hill"},
+            "L": {"type": "blueprint", "blueprint": "bench:overlay/lamps"},
+        },
+        "layout": [["H"]] + [["."]] * 15 + [["L"]],
+    }
+
+    return {
+        "terrain/chunk": chunk,
+        "terrain/hill": hill,
+        "overlay/lamps": lamps,
+        "overlay/scatter": scatter,
+        "world": world,
+    }
+
+
+def flatten_all(
+    storage: str, data_version: int, traced: bool
+) -> List[Tuple[float, int]]:
+    from mcblueprints.build.blueprints_memory_build import BlueprintsMemoryBuild
+    from mcblueprints.lib import BlueprintFlattenSettings
+
+    build = BlueprintsMemoryBuild(
+        data_version=data_version,
+        blueprints={f"bench:{name}": raw for name, raw in make_blueprints().items()},
+        materials={f"bench:{name}": block for name, block in MATERIALS.items()},
+        flatten_settings=BlueprintFlattenSettings(storage=storage),
+    )
+    # Keep every structure around, as a build would until it's written out.
+    structures: List[Any] = []
+    results: List[Tuple[float, int]] = []
+    for name in BLUEPRINTS:
+        if traced:
+            tracemalloc.start()
+        start = perf_counter()
+        built = asyncio.run(build.build_structures([f"bench:{name}"]))
+        elapsed = perf_counter() - start
+        retained = 0
+        if traced:
+            retained, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+        structures.extend(built.values())
+        results.append((elapsed, retained))
+    if traced:
+        return results
+    digest = sha256()
+    for structure in structures:
+        digest.update(build.to_nbt(structure))
+    print(digest.hexdigest(), file=sys.stderr)
+    return results
+
+
+def run(storage: str, data_version: int):
+    # NOTE Runs in its own process, so that nothing is shared between storages.
+    timed = flatten_all(storage, data_version, traced=False)
+    traced = flatten_all(storage, data_version, traced=True)
+    print(json.dumps([(t, m) for (t, _), (_, m) in zip(timed, traced)]))
+
+
+def measure(storage: str, data_version: int) -> Tuple[List[Tuple[float, int]], str]:
+    process = subprocess.run(
+        [sys.executable, __file__, "--run", storage, str(data_version)],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    digest = process.stderr.strip().splitlines()[-1]
+    return json.loads(process.stdout.splitlines()[-1]), digest
+
+
+def main(argv: List[str]):
+    if (len(argv) > 1) and (argv[1] == "--run"):
+        run(argv[2], int(argv[3]))
+        return
+
+    runs = int(argv[1]) if len(argv) > 1 else DEFAULT_RUNS
+    data_version = int(argv[2]) if len(argv) > 2 else DEFAULT_DATA_VERSION
+    print(f"Median of {runs} runs: time to flatten, and memory held by the result")
+    print(f"{'blueprint':>16}" + "".join(f"  {storage:>18}" for storage in STORAGES))
+
+    medians: Dict[str, List[Tuple[float, float]]] = {}
+    digests: Dict[str, str] = {}
+    for storage in STORAGES:
+        results = [measure(storage, data_version) for _ in range(runs)]
+        digests[storage] = results[-1][1]
+        medians[storage] = [
+            (
+                median(r[0][i][0] for r in results),
+                median(r[0][i][1] for r in results),
+            )
+            for i in range(len(BLUEPRINTS))
+        ]
+
+    def cell(elapsed: float, retained: float) -> str:
+        return f"{elapsed * 1000:7.1f}ms {retained / 2 ** 20:6.1f}MiB"
+
+    for i, name in enumerate(BLUEPRINTS):
+        print(
+            f"{name:>16}"
+            + "".join(f"  {cell(*medians[storage][i])}" for storage in STORAGES)
+        )
+    print(
+        f"{'total':>16}"
+        + "".join(
+            "  "
+            + cell(
+                sum(t for t, _ in medians[storage]),
+                sum(m for _, m in medians[storage]),
+            )
+            for storage in STORAGES
+        )
+    )
+    print(f"   equal: {len(set(digests.values())) == 1}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,127 @@
+"""
+Compare the size of structure files with their blocks ordered by position, or grouped by
+palette entry.
+
+The demo pack is scaled up with a town: a grid of the demo's own dungeon rooms, picked
+at random, all in one blueprint. The whole pack is built once for each block order, and
+the gzipped size of each structure file is reported either way, along with the total
+and the time taken.
+
+Usage: python benchmarks/block_order.py [SIDE] [DATA_VERSION]
+"""
+
+import asyncio
+import json
+import shutil
+import sys
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Dict, Tuple
+
+DEFAULT_SIDE = 24
+DEFAULT_DATA_VERSION = 2586
+
+DEMO_PACK = Path(__file__).parent.parent / "tests" / "datapacks" / "demo-datapack"
+
+BLOCK_ORDERS = ("position", "palette")
+
+# The rooms to build the town out of, each of which fits in a 9x9x9 cell.
+ROOMS = {
+    "B": "dank_dungeon:base",
+    "I": "dank_dungeon:overlay/infested",
+    "O": "dank_dungeon:overlay/overgrown",
+    "R": "dank_dungeon:overlay/ruined",
+    "T": "dank_dungeon:overlay/treasure",
+    "Z": "box_dungeon:zombie",
+}
+CELL = 9
+
+
+def make_pack(path: Path, side: int):
+    shutil.copytree(DEMO_PACK, path)
+    random = Random(0)
+    symbols = list(ROOMS)
+    town = {
+        "size": [side * CELL, CELL, side * CELL],
+        "palette": {
+            symbol: {"type": "blueprint", "blueprint": room}
+            for symbol, room in ROOMS.items()
+        },
+        "compact_layout": True,
+        # Each room is placed from its corner, at the bottom of the town.
+        "layout": [
+            {"layer": ["."], "repeat": CELL - 1},
+            [
+                (
+                    "".join(
+                        f"{random.choice(symbols)}.*{CELL - 1}" for _ in range(side)
+                    )
+                    if x % CELL == 0
+                    else "."
+                )
+                for x in range(side * CELL)
+            ],
+        ],
+    }
+    blueprints = path / "data" / "bench" / "blueprints"
+    blueprints.mkdir(parents=True)
+    (blueprints / "town.json").write_text(json.dumps(town))
+
+
+def build(
+    input_path: Path, output_path: Path, data_version: int, block_order: str
+) -> Tuple[float, Dict[str, int]]:
+    from mcblueprints.build.blueprints_build_context import BlueprintsBuildContext
+    from mcblueprints.build.blueprints_build_options import BlueprintsBuildOptions
+
+    options = BlueprintsBuildOptions(
+        input_path=input_path,
+        output_path=output_path,
+        data_versions=(data_version,),
+        block_order=block_order,
+    )
+    ctx = BlueprintsBuildContext(options)
+    try:
+        start = perf_counter()
+        asyncio.run(ctx.build())
+        elapsed = perf_counter() - start
+    finally:
+        ctx.close()
+    sizes = {
+        path.relative_to(output_path).as_posix(): path.stat().st_size
+        for path in sorted(output_path.rglob("*.nbt"))
+    }
+    return elapsed, sizes
+
+
+def main(argv):
+    side = int(argv[1]) if len(argv) > 1 else DEFAULT_SIDE
+    data_version = int(argv[2]) if len(argv) > 2 else DEFAULT_DATA_VERSION
+    print(f"Building the demo pack, plus a town of {side}x{side} rooms")
+
+    with TemporaryDirectory() as temp:
+        input_path = Path(temp) / "input"
+        make_pack(input_path, side)
+        results = {}
+        for block_order in BLOCK_ORDERS:
+            output_path = Path(temp) / f"output_{block_order}"
+            results[block_order] = build(
+                input_path, output_path, data_version, block_order
+            )
+
+    (_, before), (_, after) = results["position"], results["palette"]
+    print(f"{'structure':>50}  {'position':>10}  {'palette':>10}  {'change':>7}")
+    for name in before:
+        change = (after[name] - before[name]) / before[name] * 100
+        print(f"{name:>50}  {before[name]:10}  {after[name]:10}  {change:+6.1f}%")
+    total_before, total_after = sum(before.values()), sum(after.values())
+    change = (total_after - total_before) / total_before * 100
+    print(f"{'(total)':>50}  {total_before:10}  {total_after:10}  {change:+6.1f}%")
+    for block_order, (elapsed, _) in results.items():
+        print(f"{block_order:>10}: {elapsed:8.3f} s")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
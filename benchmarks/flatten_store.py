@@ -0,0 +1,201 @@
+"""
+Compare building a pack without a flatten store, and with one that starts out cold or
+warm.
+
+The pack is made of a few districts, each a grid of houses, and each house is made of
+a few rooms, themselves built out of props. Every district is built once without a
+store, and then again with a store: first with the store empty, then with it filled by
+the build before, and then once more after changing one district, as a change to one
+root blueprint would. Each build starts with fresh caches, the same as a new process (or
+a fresh CI machine, with only the store directory cached) would. For each build, the
+time taken is reported along with the size of the store afterwards. Every build before
+the change must give the same bytes.
+
+Usage: python benchmarks/flatten_store.py [DISTRICTS] [SIDE] [DATA_VERSION]
+"""
+
+import asyncio
+import json
+import sys
+from hashlib import sha256
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_DISTRICTS = 4
+DEFAULT_SIDE = 8
+DEFAULT_DATA_VERSION = 2586
+
+HOUSES = 6
+ROOMS = 4
+PROPS = ("stone", "oak_planks", "bricks", "glass", "oak_fence", "bookshelf")
+
+# Each room is a cube of this side, and each house a row of rooms.
+ROOM = 12
+HOUSE = (ROOM * ROOMS, ROOM, ROOM)
+
+# The name of each build, and whether it uses the store.
+RUNS = (
+    ("no store", False),
+    ("cold store", True),
+    ("warm store", True),
+    ("one changed", True),
+)
+
+
+def write(path: Path, raw: Dict[str, Any]):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(raw))
+
+
+def make_room(i: int) -> Dict[str, Any]:
+    # Hollow stone walls, with a prop on every cell of the floor and of the ceiling.
+    prop = PROPS[i % len(PROPS)]
+    inside = ["."] + ["." + "P" * (ROOM - 2)] * (ROOM - 2)
+    return {
+        "size": [ROOM, ROOM, ROOM],
+        "fill": [
+            {"from": [0, 0, 0], "to": [ROOM - 1, ROOM - 1, ROOM - 1], "block": "stone"},
+            {"from": [1, 1, 1], "to": [ROOM - 2, ROOM - 2, ROOM - 2], "void": True},
+        ],
+        "palette": {
+            "P": {"type": "blueprint", "blueprint": f"bench:props/{prop}"},
+        },
+        # Layers go from the top down, so the props stand on the floor.
+        "layout": [
+            {"layer": ["."], "repeat": 2},
+            inside,
+            {"layer": ["."], "repeat": ROOM - 5},
+            inside,
+            ["."],
+        ],
+    }
+
+
+def make_house(h: int) -> Dict[str, Any]:
+    # A row of rooms along x, all on the ground.
+    return {
+        "size": list(HOUSE),
+        "palette": {
+            str(r): {"type": "blueprint", "blueprint": f"bench:rooms/room_{h + r}"}
+            for r in range(ROOMS)
+        },
+        "layout": [
+            {"layer": ["."], "repeat": ROOM - 1},
+            [str(x // ROOM) if x % ROOM == 0 else "." for x in range(ROOM * ROOMS)],
+        ],
+    }
+
+
+def make_district(d: int, side: int, height: int = ROOM) -> Dict[str, Any]:
+    # A grid of houses, all on the ground.
+    size_x, _, size_z = HOUSE
+    symbols = "ABCDEFGH"[:HOUSES]
+    return {
+        "size": [side * size_x, height, side * size_z],
+        "palette": {
+            symbol: {"type": "blueprint", "blueprint": f"bench:houses/house_{h}"}
+            for h, symbol in enumerate(symbols)
+        },
+        "compact_layout": True,
+        "layout": [
+            {"layer": ["."], "repeat": height - 1},
+            [
+                (
+                    "".join(
+                        f"{symbols[(x // size_x + z + d) % HOUSES]}.*{size_z - 1}"
+                        for z in range(side)
+                    )
+                    if x % size_x == 0
+                    else "."
+                )
+                for x in range(side * size_x)
+            ],
+        ],
+    }
+
+
+def make_pack(path: Path, districts: int, side: int):
+    path.mkdir(parents=True)
+    (path / "pack.mcmeta").write_text(json.dumps({"pack": {"pack_format": 6}}))
+    blueprints = path / "data" / "bench" / "blueprints"
+    for prop in PROPS:
+        raw = {"size": [1, 2, 1], "palette": {"P": prop}, "layout": [["P"], ["P"]]}
+        write(blueprints / "props" / f"{prop}.json", raw)
+    for r in range(HOUSES + ROOMS):
+        write(blueprints / "rooms" / f"room_{r}.json", make_room(r))
+    for h in range(HOUSES):
+        write(blueprints / "houses" / f"house_{h}.json", make_house(h))
+    for d in range(districts):
+        write(blueprints / f"district_{d}.json", make_district(d, side))
+
+
+def build(
+    input_path: Path,
+    output_path: Path,
+    data_version: int,
+    store_path: Optional[Path],
+) -> Tuple[float, str]:
+    from mcblueprints.build.blueprints_build_context import BlueprintsBuildContext
+    from mcblueprints.build.blueprints_build_options import BlueprintsBuildOptions
+
+    options = BlueprintsBuildOptions(
+        input_path=input_path,
+        output_path=output_path,
+        data_versions=(data_version,),
+        target_patterns=("bench:district_*",),
+        skip_unchanged=False,
+        flatten_store_path=store_path,
+        flatten_store_size=-1,
+    )
+    ctx = BlueprintsBuildContext(options)
+    try:
+        start = perf_counter()
+        asyncio.run(ctx.build())
+        elapsed = perf_counter() - start
+    finally:
+        ctx.close()
+    digest = sha256()
+    for path in sorted(output_path.rglob("*.nbt")):
+        digest.update(path.read_bytes())
+    return elapsed, digest.hexdigest()
+
+
+def main(argv):
+    districts = int(argv[1]) if len(argv) > 1 else DEFAULT_DISTRICTS
+    side = int(argv[2]) if len(argv) > 2 else DEFAULT_SIDE
+    data_version = int(argv[3]) if len(argv) > 3 else DEFAULT_DATA_VERSION
+    print(f"Building {districts} districts of {side}x{side} houses")
+
+    from mcblueprints.lib import BlueprintFlattenStore
+
+    with TemporaryDirectory() as temp:
+        input_path = Path(temp) / "input"
+        store_path = Path(temp) / "store"
+        make_pack(input_path, districts, side)
+        store = BlueprintFlattenStore(path=store_path)
+
+        digests = {}
+        for i, (name, use_store) in enumerate(RUNS):
+            if name == "one changed":
+                # Make one district taller, without touching anything it includes.
+                district = make_district(0, side, height=ROOM + 1)
+                write(input_path / "data/bench/blueprints/district_0.json", district)
+            output_path = Path(temp) / f"output_{i}"
+            elapsed, digest = build(
+                input_path, output_path, data_version, store_path if use_store else None
+            )
+            digests[name] = digest
+            stats = store.stats()
+            print(
+                f"{name:>12}: {elapsed:8.3f} s, {stats.entries:4} entries in the store"
+                + f" ({stats.size} bytes)"
+            )
+
+    # The last build changed the pack, so it has different bytes.
+    print(f"       equal: {len(set(digests[name] for name, _ in RUNS[:3])) == 1}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
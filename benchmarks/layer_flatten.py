@@ -0,0 +1,169 @@
+"""
+Compare flattening one huge blueprint as usual, or a layer at a time, with its layers
+split between several threads or not.
+
+The blueprint is a cube of terrain, filled in layers, with veins of ore running through
+it and small trees dotted across its surface. Each run happens in a fresh process, which
+flattens the blueprint into a memory-mapped block map and reports the time taken. The
+flattened blueprint is then written out, to check that every run gives the same bytes.
+Most of the difference is between flattening as usual and a layer at a time: extra
+threads only help with cores to spare, and on a single core they all take about as
+long.
+
+Usage: python benchmarks/layer_flatten.py [SIDE] [HEIGHT] [DATA_VERSION]
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+from hashlib import sha256
+from random import Random
+from time import perf_counter
+from typing import Any, Dict, List
+
+DEFAULT_SIDE = 256
+DEFAULT_HEIGHT = 256
+DEFAULT_DATA_VERSION = 2586
+
+# No threads at all flattens blueprints as usual. A single thread flattens them layer by
+# layer, but without anything running in parallel.
+THREADS = (0, 1, 2, 4, 8)
+
+MATERIALS = {
+    "stone": "minecraft:stone",
+    "dirt": "minecraft:dirt",
+    "grass": "minecraft:grass_block",
+    "coal": "minecraft:coal_ore",
+    "iron": "minecraft:iron_ore",
+    "log": "minecraft:oak_log",
+    "leaves": "minecraft:oak_leaves",
+}
+
+
+def fill(start: List[int], end: List[int], material: str) -> Dict[str, Any]:
+    return {"from": start, "to": end, "material": f"bench:{material}"}
+
+
+def make_blueprints(side: int, height: int) -> Dict[str, Dict[str, Any]]:
+    random = Random(0)
+    ground = height - 8
+
+    # A trunk with a cube of leaves on top.
+    tree = {
+        "size": [5, 8, 5],
+        "fill": [
+            fill([0, 4, 0], [4, 7, 4], "leaves"),
+            fill([2, 0, 2], [2, 5, 2], "log"),
+        ],
+        "palette": {},
+    }
+
+    # Veins of ore, as runs of a few blocks along each row underground.
+    def vein_row() -> str:
+        row, next_z = "", 0
+        for z in range(0, side - 8, 16):
+            if random.random() < 0.25:
+                z += random.randrange(8)
+                row += (f".*{z - next_z}" if z > next_z else "") + random.choice("CI")
+                row += "*" + str(random.randrange(2, 6))
+                next_z = z + int(row.rsplit("*", 1)[1])
+        return row or "."
+
+    underground = [[vein_row() for _ in range(side)] for _ in range(ground - 4)]
+
+    # Trees go on the surface, spaced out so that they never overlap.
+    surface: List[str] = []
+    for x in range(side):
+        row, next_z = "", 0
+        for z in range(0, side - 5, 6):
+            if (x % 6 == 0) and (x <= side - 5) and (random.random() < 0.5):
+                row += (f".*{z - next_z}" if z > next_z else "") + "T"
+                next_z = z + 1
+        surface.append(row or ".")
+
+    world = {
+        "size": [side, height, side],
+        "fill": [
+            fill([0, 0, 0], [side - 1, ground - 4, side - 1], "stone"),
+            fill([0, ground - 3, 0], [side - 1, ground - 2, side - 1], "dirt"),
+            fill([0, ground - 1, 0], [side - 1, ground - 1, side - 1], "grass"),
+        ],
+        "palette": {
+            "C": {"type": "material", "material": "bench:coal"},
+            "I": {"type": "material", "material": "bench:iron"},
+            "T": {"type": "blueprint", "blueprint": "bench:tree"},
+        },
+        "compact_layout": True,
+        "layout": underground + [{"layer": ["."], "repeat": 4}, surface],
+    }
+
+    return {"tree": tree, "world": world}
+
+
+def run(threads: int, side: int, height: int, data_version: int):
+    # NOTE Runs in its own process, so that nothing is shared between runs.
+    from mcblueprints.build.blueprints_memory_build import BlueprintsMemoryBuild
+    from mcblueprints.lib import (
+        BlueprintFlattenSettings,
+        BlueprintLayerFlattener,
+        StructureNbtEncoder,
+    )
+
+    layer_flattener = None
+    if threads > 0:
+        layer_flattener = BlueprintLayerFlattener(
+            threads=threads, min_volume=side * height * side
+        )
+    build = BlueprintsMemoryBuild(
+        data_version=data_version,
+        blueprints={
+            f"bench:{name}": raw for name, raw in make_blueprints(side, height).items()
+        },
+        materials={f"bench:{name}": block for name, block in MATERIALS.items()},
+        # Flatten into the same kind of block map either way.
+        flatten_settings=BlueprintFlattenSettings(
+            storage="mapped", layer_flattener=layer_flattener
+        ),
+    )
+    encoder = StructureNbtEncoder(data_version=data_version)
+
+    start = perf_counter()
+    structures = asyncio.run(build.build_structures(["bench:world"]))
+    elapsed = perf_counter() - start
+
+    digest = sha256()
+    for structure in structures.values():
+        digest.update(encoder.encode(structure, gzipped=False))
+
+    print(json.dumps([elapsed, digest.hexdigest()]))
+
+
+def main(argv: List[str]):
+    if (len(argv) > 1) and (argv[1] == "--run"):
+        run(int(argv[2]), int(argv[3]), int(argv[4]), int(argv[5]))
+        return
+
+    side = int(argv[1]) if len(argv) > 1 else DEFAULT_SIDE
+    height = int(argv[2]) if len(argv) > 2 else DEFAULT_HEIGHT
+    data_version = int(argv[3]) if len(argv) > 3 else DEFAULT_DATA_VERSION
+    print(f"Flattening a {side}x{height}x{side} blueprint")
+
+    digests = {}
+    for threads in THREADS:
+        process = subprocess.run(
+            [sys.executable, __file__, "--run", str(threads)]
+            + [str(side), str(height), str(data_version)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        elapsed, digest = json.loads(process.stdout.splitlines()[-1])
+        digests[threads] = digest
+        print(f"{threads:>3} threads: {elapsed:8.3f} s")
+
+    print(f"      equal: {len(set(digests.values())) == 1}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
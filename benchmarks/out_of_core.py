@@ -0,0 +1,141 @@
+"""
+Compare flattening and writing out one large blueprint in memory, or out of memory in a
+memory-mapped temporary file.
+
+The blueprint is a square of terrain, filled in layers, with small trees dotted across
+its surface. Each run happens in a fresh process, which flattens the blueprint, writes
+it out to a file, and reports the time taken and the peak of memory allocated by Python
+along the way. Memory-mapped cells are paged in and out by the operating system, and
+aren't counted.
+
+Usage: python benchmarks/out_of_core.py [SIDE] [HEIGHT] [DATA_VERSION]
+"""
+
+import asyncio
+import json
+import subprocess
+import sys
+import tracemalloc
+from hashlib import sha256
+from pathlib import Path
+from random import Random
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Any, Dict, List
+
+DEFAULT_SIDE = 128
+DEFAULT_HEIGHT = 64
+DEFAULT_DATA_VERSION = 2586
+
+STORAGES = ("auto", "mapped")
+
+MATERIALS = {
+    "stone": "minecraft:stone",
+    "dirt": "minecraft:dirt",
+    "grass": "minecraft:grass_block",
+    "log": "minecraft:oak_log",
+    "leaves": "minecraft:oak_leaves",
+}
+
+
+def fill(start: List[int], end: List[int], material: str) -> Dict[str, Any]:
+    return {"from": start, "to": end, "material": f"bench:{material}"}
+
+
+def make_blueprints(side: int, height: int) -> Dict[str, Dict[str, Any]]:
+    random = Random(0)
+    ground = height // 2
+
+    # A trunk with a cube of leaves on top.
+    tree = {
+        "size": [5, 8, 5],
+        "fill": [
+            fill([0, 4, 0], [4, 7, 4], "leaves"),
+            fill([2, 0, 2], [2, 5, 2], "log"),
+        ],
+        "palette": {},
+    }
+
+    # Trees go on the surface, spaced out so that they never overlap.
+    rows: List[str] = []
+    for x in range(side):
+        row, next_z = "", 0
+        for z in range(0, side - 5, 6):
+            if (x % 6 == 0) and (x <= side - 5) and (random.random() < 0.5):
+                row += (f".*{z - next_z}" if z > next_z else "") + "T"
+                next_z = z + 1
+        rows.append(row or ".")
+    world = {
+        "size": [side, height, side],
+        "fill": [
+            fill([0, 0, 0], [side - 1, ground - 4, side - 1], "stone"),
+            fill([0, ground - 3, 0], [side - 1, ground - 2, side - 1], "dirt"),
+            fill([0, ground - 1, 0], [side - 1, ground - 1, side - 1], "grass"),
+        ],
+        "palette": {"T": {"type": "blueprint", "blueprint": "bench:tree"}},
+        "compact_layout": True,
+        "layout": [{"layer": ["."], "repeat": ground}, rows],
+    }
+
+    return {"tree": tree, "world": world}
+
+
+def run(storage: str, side: int, height: int, data_version: int):
+    # NOTE Runs in its own process, so that nothing is shared between storages.
+    from mcblueprints.build.blueprints_memory_build import BlueprintsMemoryBuild
+    from mcblueprints.lib import BlueprintFlattenSettings, StructureNbtEncoder
+
+    build = BlueprintsMemoryBuild(
+        data_version=data_version,
+        blueprints={
+            f"bench:{name}": raw for name, raw in make_blueprints(side, height).items()
+        },
+        materials={f"bench:{name}": block for name, block in MATERIALS.items()},
+        flatten_settings=BlueprintFlattenSettings(storage=storage),
+    )
+    encoder = StructureNbtEncoder(data_version=data_version)
+
+    with TemporaryDirectory() as temp:
+        path = Path(temp) / "world.nbt"
+        tracemalloc.start()
+        start = perf_counter()
+        structures = asyncio.run(build.build_structures(["bench:world"]))
+        (structure,) = structures.values()
+        with open(path, "wb") as stream:
+            encoder.write(structure, stream)
+        elapsed = perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        digest = sha256(path.read_bytes()).hexdigest()
+
+    print(json.dumps([elapsed, peak, digest]))
+
+
+def main(argv: List[str]):
+    if (len(argv) > 1) and (argv[1] == "--run"):
+        run(argv[2], int(argv[3]), int(argv[4]), int(argv[5]))
+        return
+
+    side = int(argv[1]) if len(argv) > 1 else DEFAULT_SIDE
+    height = int(argv[2]) if len(argv) > 2 else DEFAULT_HEIGHT
+    data_version = int(argv[3]) if len(argv) > 3 else DEFAULT_DATA_VERSION
+    print(f"Flattening and writing out a {side}x{height}x{side} blueprint")
+
+    digests = {}
+    for storage in STORAGES:
+        process = subprocess.run(
+            [sys.executable, __file__, "--run", storage]
+            + [str(side), str(height), str(data_version)],
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        elapsed, peak, digest = json.loads(process.stdout.splitlines()[-1])
+        digests[storage] = digest
+        print(f"{storage:>8}: {elapsed:8.3f} s  {peak / 2 ** 20:8.1f} MiB peak")
+
+    print(f"   equal: {len(set(digests.values())) == 1}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
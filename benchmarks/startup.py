@@ -0,0 +1,77 @@
+"""
+Measure how long the CLI takes to reach the point where a command starts running.
+
+Each command is run in a fresh interpreter with `python -X importtime`, and the median
+wall time and time spent importing modules is reported, along with the slowest
+top-level import. None of the commands do any real work: they either print help or
+stop at a usage error, right after the command has started.
+
+Usage: python benchmarks/startup.py [RUNS]
+"""
+
+import re
+import subprocess
+import sys
+from statistics import median
+from time import perf_counter
+from typing import List, Tuple
+
+DEFAULT_RUNS = 10
+
+COMMANDS = (
+    ("--version",),
+    ("--help",),
+    ("build", "--help"),
+    ("serve", "--help"),
+    ("import", "--help"),
+    # Stops at the check for missing options, inside of the command itself.
+    ("build",),
+)
+
+# import time: <self us> | <cumulative us> | <indented module name>
+IMPORT_TIME_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| ( *)(\S+)$")
+
+
+def parse_import_times(output: str) -> List[Tuple[str, int]]:
+    """Get the cumulative import time of each top-level import, in microseconds."""
+    times: List[Tuple[str, int]] = []
+    for line in output.splitlines():
+        if (match := IMPORT_TIME_LINE.match(line)) is None:
+            continue
+        _, cumulative, indent, name = match.groups()
+        # Nested imports are indented further, by two spaces per level.
+        if not indent:
+            times.append((name, int(cumulative)))
+    return times
+
+
+def measure(args: Tuple[str, ...]) -> Tuple[float, int, Tuple[str, int]]:
+    start = perf_counter()
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", "-m", "mcblueprints", *args],
+        capture_output=True,
+        text=True,
+    )
+    elapsed = perf_counter() - start
+    times = parse_import_times(process.stderr)
+    slowest = max(times, key=lambda t: t[1], default=("-", 0))
+    return elapsed, sum(t for _, t in times), slowest
+
+
+def main(argv: List[str]):
+    runs = int(argv[1]) if len(argv) > 1 else DEFAULT_RUNS
+    print(f"Median of {runs} runs per command")
+    print(f"{'command':>16}  {'wall':>8}  {'imports':>8}  slowest import")
+    for args in COMMANDS:
+        results = [measure(args) for _ in range(runs)]
+        wall = median(r[0] for r in results)
+        imports = median(r[1] for r in results)
+        slowest_name, slowest_time = results[-1][2]
+        print(
+            f"{' '.join(args):>16}  {wall * 1000:6.1f}ms  {imports / 1000:6.1f}ms"
+            + f"  {slowest_name} ({slowest_time / 1000:.1f}ms)"
+        )
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -0,0 +1,98 @@
+"""
+Compare the time and peak memory of encoding one large structure file, either through
+a tree of NBT tags or straight from the block map.
+
+Usage: python benchmarks/structure_nbt.py [SIZE] [DATA_VERSION]
+"""
+
+import sys
+import tracemalloc
+from random import Random
+from time import perf_counter
+from typing import Callable, List, Tuple
+
+from pyckaxe import (
+    Block,
+    BlockMap,
+    BlockState,
+    NbtCompound,
+    NbtString,
+    Position,
+    Structure,
+    StructureSerializer,
+)
+
+from mcblueprints.lib import FlattenedStructure, StructureNbtEncoder
+from mcblueprints.utils import dump_nbt_bytes
+
+DEFAULT_SIZE = 64
+DEFAULT_DATA_VERSION = 2586
+
+
+def make_block_map(size: int) -> BlockMap:
+    # A filled cube with a bit of variety, so that the palette isn't trivial.
+    random = Random(0)
+    blocks = [
+        Block("minecraft:stone"),
+        Block("minecraft:cobblestone"),
+        Block("minecraft:mossy_cobblestone"),
+        Block("minecraft:oak_stairs", state=BlockState(facing="east", half="top")),
+        Block("minecraft:oak_stairs", state=BlockState(facing="west", half="bottom")),
+        Block(
+            "minecraft:chest",
+            state=BlockState(facing="north"),
+            data=NbtCompound(LootTable=NbtString("minecraft:chests/simple_dungeon")),
+        ),
+    ]
+    weights = [50, 30, 10, 4, 4, 2]
+    block_map = BlockMap(size=Position.from_xyz(size, size, size))
+    for y in range(size):
+        for x in range(size):
+            for z in range(size):
+                block_map[x, y, z] = random.choices(blocks, weights)[0]
+    return block_map
+
+
+def encode_via_tree(block_map: BlockMap, data_version: int) -> bytes:
+    structure = Structure.from_block_map(block_map)
+    serializer = StructureSerializer(data_version=data_version)
+    return dump_nbt_bytes(serializer(structure), gzipped=True)
+
+
+def encode_directly(block_map: BlockMap, data_version: int) -> bytes:
+    encoder = StructureNbtEncoder(data_version=data_version)
+    return encoder(FlattenedStructure(block_map))
+
+
+def measure(
+    encode: Callable[[BlockMap, int], bytes], block_map: BlockMap, data_version: int
+) -> Tuple[float, int, bytes]:
+    tracemalloc.start()
+    start = perf_counter()
+    data = encode(block_map, data_version)
+    elapsed = perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak, data
+
+
+def main(argv: List[str]):
+    size = int(argv[1]) if len(argv) > 1 else DEFAULT_SIZE
+    data_version = int(argv[2]) if len(argv) > 2 else DEFAULT_DATA_VERSION
+    block_map = make_block_map(size)
+    print(f"Encoding {size}x{size}x{size} = {size ** 3} blocks")
+
+    results = {}
+    for name, encode in (("tree", encode_via_tree), ("direct", encode_directly)):
+        elapsed, peak, data = measure(encode, block_map, data_version)
+        results[name] = data
+        print(
+            f"{name:>8}: {elapsed:8.3f} s  {peak / 2 ** 20:8.1f} MiB peak"
+            f"  {len(data):10d} bytes"
+        )
+
+    print(f"   equal: {results['tree'] == results['direct']}")
+
+
+if __name__ == "__main__":
+    main(sys.argv)
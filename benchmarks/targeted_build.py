@@ -0,0 +1,110 @@
+"""
+Compare building a whole pack with building one targeted blueprint from it.
+
+The pack has many small rooms spread across a few wings, each of which includes a
+shared set of props. One room is built by itself, named exactly and by a glob, as well
+as the whole pack. For each build, the time taken is reported along with the number of
+structures written, and the time spent finding the targeted blueprints.
+
+Usage: python benchmarks/targeted_build.py [ROOMS] [DATA_VERSION]
+"""
+
+import asyncio
+import json
+import sys
+from pathlib import Path
+from tempfile import TemporaryDirectory
+from time import perf_counter
+from typing import Tuple
+
+DEFAULT_ROOMS = 3000
+DEFAULT_DATA_VERSION = 2586
+
+WINGS = 10
+PROPS = 20
+
+TARGETS = (
+    (),
+    ("bench:wing_3/room_42",),
+    ("bench:*/room_42",),
+)
+
+
+def make_pack(path: Path, rooms: int):
+    blueprints = path / "data" / "bench" / "blueprints"
+    (blueprints / "props").mkdir(parents=True)
+    materials = path / "data" / "bench" / "materials"
+    materials.mkdir(parents=True)
+    (materials / "stone.json").write_text(json.dumps({"name": "minecraft:stone"}))
+    (path / "pack.mcmeta").write_text(json.dumps({"pack": {"pack_format": 6}}))
+
+    for i in range(PROPS):
+        prop = {"size": [1, 2, 1], "palette": {"P": "minecraft:oak_fence"}}
+        prop["layout"] = [["P"], ["P"]]
+        (blueprints / "props" / f"prop_{i}.json").write_text(json.dumps(prop))
+
+    for i in range(rooms):
+        wing = blueprints / f"wing_{i % WINGS}"
+        wing.mkdir(exist_ok=True)
+        room = {
+            "size": [8, 4, 8],
+            "fill": [
+                {"from": [0, 0, 0], "to": [7, 3, 7], "material": "bench:stone"},
+            ],
+            "palette": {
+                "P": {"type": "blueprint", "blueprint": f"bench:props/prop_{i % PROPS}"}
+            },
+            "layout": [[".", ".", "..P"]],
+        }
+        (wing / f"room_{i // WINGS}.json").write_text(json.dumps(room))
+
+
+def build(
+    input_path: Path, output_path: Path, data_version: int, targets: Tuple[str, ...]
+) -> Tuple[float, float, int]:
+    from mcblueprints.build.blueprints_build_context import BlueprintsBuildContext
+    from mcblueprints.build.blueprints_build_options import BlueprintsBuildOptions
+
+    options = BlueprintsBuildOptions(
+        input_path=input_path,
+        output_path=output_path,
+        data_versions=(data_version,),
+        target_patterns=targets,
+    )
+    ctx = BlueprintsBuildContext(options)
+    try:
+        start = perf_counter()
+        selected = len(ctx.select_targets()) if targets else 0
+        selecting = perf_counter() - start
+        start = perf_counter()
+        asyncio.run(ctx.build())
+        elapsed = perf_counter() - start
+    finally:
+        ctx.close()
+    written = sum(1 for _ in output_path.rglob("*.nbt"))
+    assert (not targets) or (selected == written)
+    return elapsed, selecting, written
+
+
+def main(argv):
+    rooms = int(argv[1]) if len(argv) > 1 else DEFAULT_ROOMS
+    data_version = int(argv[2]) if len(argv) > 2 else DEFAULT_DATA_VERSION
+    print(f"Building from a pack of {rooms} rooms and {PROPS} props")
+
+    with TemporaryDirectory() as temp:
+        input_path = Path(temp) / "input"
+        make_pack(input_path, rooms)
+        for i, targets in enumerate(TARGETS):
+            output_path = Path(temp) / f"output_{i}"
+            elapsed, selecting, written = build(
+                input_path, output_path, data_version, targets
+            )
+            name = " ".join(targets) or "(everything)"
+            print(
+                f"{name:>24}: {elapsed * 1000:9.1f} ms, {written:5} structures,"
+                + f" {selecting * 1000:6.2f} ms selecting"
+            )
+
+
+if __name__ == "__main__":
+    main(sys.argv)
@@ -1,5 +1,23 @@
-from importlib.metadata import version
+from typing import TYPE_CHECKING, Any
 
-from .lib import *
+if TYPE_CHECKING:
+    from .lib import *
 
-__version__ = version("mcblueprints")
+
+# Subpackages, which are never looked up in `lib`.
+SUBPACKAGES = ("build", "cli", "importer", "lib", "serve", "utils")
+
+
+# NOTE Both the version and the exports of `lib` are resolved lazily, so that importing
+# the package (such as to run the CLI) doesn't also import everything in `lib`.
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        from importlib.metadata import version
+
+        globals()[name] = value = version("mcblueprints")
+        return value
+    if not (name.startswith("_") or (name in SUBPACKAGES)):
+        from . import lib
+
+        return getattr(lib, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
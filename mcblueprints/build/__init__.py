@@ -1,3 +1,36 @@
-from .blueprints_build_context import BlueprintsBuildContext
+# NOTE Exports are imported lazily, so that the CLI can import the options (and their
+# defaults) without also importing everything needed to run a build.
 
-__all__ = ("BlueprintsBuildContext",)
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .blueprints_batch_build_context import BlueprintsBatchBuildContext
+    from .blueprints_build_context import BlueprintsBuildContext
+    from .blueprints_build_manifest import BlueprintsBuildManifest
+    from .blueprints_build_target import BlueprintsBuildTarget
+    from .blueprints_memory_build import BlueprintsMemoryBuild
+
+__all__ = (
+    "BlueprintsBatchBuildContext",
+    "BlueprintsBuildContext",
+    "BlueprintsBuildManifest",
+    "BlueprintsBuildTarget",
+    "BlueprintsMemoryBuild",
+)
+
+
+# The module that defines each export.
+EXPORTS = {
+    "BlueprintsBatchBuildContext": ".blueprints_batch_build_context",
+    "BlueprintsBuildContext": ".blueprints_build_context",
+    "BlueprintsBuildManifest": ".blueprints_build_manifest",
+    "BlueprintsBuildTarget": ".blueprints_build_target",
+    "BlueprintsMemoryBuild": ".blueprints_memory_build",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if (module_name := EXPORTS.get(name)) is not None:
+        return getattr(import_module(module_name, __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,119 @@
+import asyncio
+from dataclasses import dataclass, field
+from logging import Logger, getLogger
+from typing import Any, Dict, Iterable, List, cast
+
+from pyckaxe import ResourceCacheSet, Structure
+
+from mcblueprints.build.blueprints_build_context import (
+    BlueprintsBuildContext,
+    make_resource_cache,
+)
+from mcblueprints.build.blueprints_build_manifest import BlueprintsBuildManifest
+from mcblueprints.build.blueprints_build_selector import MissingBuildTarget
+from mcblueprints.lib import Blueprint, Filter, Material, PendingResourceLoads
+
+__all__ = ("BlueprintsBatchBuildContext",)
+
+
+DEFAULT = cast(Any, ...)
+
+
+def _combine_cache_sizes(cache_sizes: Iterable[int]) -> int:
+    # A shared cache is as big as the biggest one asked for, where negative is
+    # unbounded.
+    combined = 0
+    for cache_size in cache_sizes:
+        if cache_size < 0:
+            return cache_size
+        combined = max(combined, cache_size)
+    return combined
+
+
+@dataclass
+class BlueprintsBatchBuildContext:
+    """
+    Builds every pack listed in a manifest, in one process.
+
+    Every build shares the same caches, which are keyed by the absolute path of each
+    source file. Resources that several packs load from the same place, such as a
+    common set of materials and filters, are only loaded (and blueprints only
+    flattened) once. A build that fails is logged and counted, without stopping the
+    others.
+
+    Attributes
+    ----------
+    manifest
+        The manifest listing what to build.
+    """
+
+    manifest: BlueprintsBuildManifest
+
+    log: Logger = field(init=False, default=DEFAULT)
+
+    caches: ResourceCacheSet = field(init=False, default=DEFAULT)
+    contexts: List[BlueprintsBuildContext] = field(init=False, default=DEFAULT)
+
+    built: int = field(init=False, default=0)
+    failed: int = field(init=False, default=0)
+
+    def __str__(self) -> str:
+        return self.manifest.path.name
+
+    def __post_init__(self):
+        # Create a logger.
+        self.log = getLogger(f"{self}")
+
+        # Create and register caches, big enough for every build.
+        builds = self.manifest.builds
+        self.caches = caches = ResourceCacheSet()
+        caches[Blueprint] = make_resource_cache(
+            _combine_cache_sizes(o.blueprint_cache_size for o in builds)
+        )
+        caches[Filter] = make_resource_cache(
+            _combine_cache_sizes(o.filter_cache_size for o in builds)
+        )
+        caches[Material] = make_resource_cache(
+            _combine_cache_sizes(o.material_cache_size for o in builds)
+        )
+        caches[Structure] = make_resource_cache(
+            _combine_cache_sizes(o.structure_cache_size for o in builds)
+        )
+
+        # Create a context for each build, all sharing the same caches. Builds that run
+        # at once also share any loads in progress, rather than racing to fill them.
+        pending_loads: Dict[Any, PendingResourceLoads] = {}
+        self.contexts = [
+            BlueprintsBuildContext(
+                options, shared_caches=caches, shared_pending_loads=pending_loads
+            )
+            for options in builds
+        ]
+
+    async def build(self):
+        """Build every pack, up to `jobs` at once."""
+        semaphore = asyncio.Semaphore(self.manifest.jobs)
+        await asyncio.gather(
+            *(self._build_one(context, semaphore) for context in self.contexts)
+        )
+        self.log.info(f"Built {self.built} packs, {self.failed} failed")
+
+    async def _build_one(
+        self, context: BlueprintsBuildContext, semaphore: asyncio.Semaphore
+    ):
+        async with semaphore:
+            try:
+                await context.build()
+            except MissingBuildTarget as ex:
+                self.failed += 1
+                self.log.error(f"Failed to build {context.options.output_path}: {ex}")
+            except Exception:
+                self.failed += 1
+                self.log.exception(f"Failed to build {context.options.output_path}")
+            else:
+                self.built += 1
+
+    def close(self):
+        """Release any resources held open by the builds."""
+        for context in self.contexts:
+            context.close()
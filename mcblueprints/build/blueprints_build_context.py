@@ -1,24 +1,39 @@
+from contextlib import AsyncExitStack, asynccontextmanager
 from dataclasses import dataclass, field
+from functools import partial
+from hashlib import sha256
 from logging import Logger, getLogger
 from pathlib import Path
-from typing import Any, cast
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    cast,
+)
 
 from pyckaxe import (
     CommonResourceLocationResolver,
-    CommonResourceResolver,
     JsonResourceLoader,
     LRUResourceCache,
-    NbtResourceDumper,
     ResourceCache,
     ResourceCacheSet,
+    ResourceDeserializer,
+    ResourceDumper,
     ResourceDumperSet,
+    ResourceLoader,
+    ResourceLocation,
     ResourceLocationResolverSet,
     ResourceProcessingPipeline,
     ResourceResolverSet,
     ResourceTransformerSet,
     StaticResourceCache,
     Structure,
-    StructureSerializer,
     UnboundedResourceCache,
 )
 from pyckaxe.lib.pack.common_resource_scanner import CommonResourceScanner
@@ -26,30 +41,137 @@ from pyckaxe.lib.pack.physical_pack import PhysicalPack
 from pyckaxe.lib.pack.writable_pack import WritablePack
 
 from mcblueprints.build.blueprints_build_options import BlueprintsBuildOptions
+from mcblueprints.build.blueprints_build_selector import BlueprintsBuildSelector
+from mcblueprints.build.blueprints_build_target import BlueprintsBuildTarget
 from mcblueprints.lib import (
     Blueprint,
     BlueprintDeserializer,
+    BlueprintFlattenProfiler,
+    BlueprintFlattenSettings,
+    BlueprintFlattenStore,
+    BlueprintLayerFlattener,
+    BlueprintPrefetcher,
+    BlueprintProcessingContext,
     BlueprintTransformer,
+    CoalescingResourceResolver,
     Filter,
     FilterDeserializer,
+    HashedNbtResourceDumper,
     Material,
     MaterialDeserializer,
+    MmapNbtResourceLoader,
+    OutputHashIndex,
+    PendingResourceLoads,
+    StreamingResourceDumper,
+    StructureNbtDecoder,
+    StructureNbtEncoder,
+    WritablePackGroup,
+    ZipArchive,
+    ZipArchiveWriter,
+    ZipJsonResourceLoader,
+    ZipNbtResourceDumper,
+    ZipNbtResourceLoader,
+    ZipPack,
+    ZipResourceScanner,
 )
 
-__all__ = ("BlueprintsBuildContext",)
+__all__ = (
+    "BlueprintsBuildContext",
+    "make_resource_cache",
+)
 
 
 DEFAULT = cast(Any, ...)
 
+# Dumps the structures built for a target into its output pack.
+StructureDumper = ResourceDumper[Structure]
+
+PACK_META_NAME = "pack.mcmeta"
+# The hash index of each output pack is named after it and a hash of its path, so that
+# packs with the same name don't share an index.
+HASH_INDEX_SUFFIX = ".json"
+
+# How many of the most wasteful blueprints to log, after counting flattens.
+FLATTEN_STATS_TABLE_ROWS = 20
+
+# The extensions that source files may have, in the order they're hashed.
+SOURCE_SUFFIXES = (".json", ".yaml", ".yml", ".nbt")
+
+# The extensions that the source file of a blueprint may have.
+BLUEPRINT_SUFFIXES = (".json", ".yaml", ".yml")
+
+
+def make_resource_cache(cache_size: int) -> ResourceCache[Any]:
+    """Make a cache holding up to `cache_size` resources, or any number if negative."""
+    if cache_size > 0:
+        return LRUResourceCache(size=cache_size)
+    elif cache_size == 0:
+        return StaticResourceCache()
+    return UnboundedResourceCache()
+
+
+def format_size_change(before: int, after: int) -> str:
+    """Describe how `after` compares with `before`, e.g. `down 12.5% from 800`."""
+    if after == before:
+        return f"unchanged from {before}"
+    if not before:
+        return f"up from {before}"
+    change = (after - before) / before * 100
+    direction = "down" if change < 0 else "up"
+    return f"{direction} {abs(change):.1f}% from {before}"
+
+
+def get_hash_index_path(hash_index_path: Path, output_path: Path) -> Path:
+    """Get the path to the hash index of `output_path`, under `hash_index_path`."""
+    path_hash = sha256(str(output_path).encode()).hexdigest()[:16]
+    return hash_index_path / f"{output_path.name}-{path_hash}{HASH_INDEX_SUFFIX}"
+
 
 @dataclass
 class BlueprintsBuildContext:
     options: BlueprintsBuildOptions
 
+    # Caches to use instead of making new ones, such as those of another build. They're
+    # keyed by the absolute path of each source file, so packs never mix them up. The
+    # loads in progress for each type of resource can be shared the same way.
+    shared_caches: Optional[ResourceCacheSet] = None
+    shared_pending_loads: Optional[Dict[Any, PendingResourceLoads]] = None
+
     log: Logger = field(init=False, default=DEFAULT)
 
+    caches: ResourceCacheSet = field(init=False, default=DEFAULT)
+    resolvers: ResourceResolverSet = field(init=False, default=DEFAULT)
+    transformers: ResourceTransformerSet = field(init=False, default=DEFAULT)
+    output_pack: WritablePackGroup = field(init=False, default=DEFAULT)
+
     pipeline: ResourceProcessingPipeline = field(init=False, default=DEFAULT)
 
+    flatten_settings: BlueprintFlattenSettings = field(init=False, default=DEFAULT)
+
+    profiler: Optional[BlueprintFlattenProfiler] = field(init=False, default=None)
+
+    flatten_store: Optional[BlueprintFlattenStore] = field(init=False, default=None)
+
+    input_archive: Optional[ZipArchive] = field(init=False, default=None)
+    output_archives: Dict[Path, ZipArchiveWriter] = field(
+        init=False, default_factory=dict
+    )
+    output_hash_indices: Dict[Path, OutputHashIndex] = field(
+        init=False, default_factory=dict
+    )
+
+    structure_dumpers: List[Tuple[BlueprintsBuildTarget, StructureDumper]] = field(
+        init=False, default_factory=list
+    )
+    structure_encoders: List[Tuple[BlueprintsBuildTarget, StructureNbtEncoder]] = field(
+        init=False, default_factory=list
+    )
+
+    # The size, modification time and hash of each source file hashed so far.
+    _source_digests: Dict[Path, Tuple[int, int, str]] = field(
+        init=False, default_factory=dict
+    )
+
     def __str__(self) -> str:
         return self.options.output_path.name
 
@@ -57,11 +179,65 @@ class BlueprintsBuildContext:
         # Create a logger.
         self.log = getLogger(f"{self}")
 
-        # Create and register caches.
-        caches = ResourceCacheSet()
-        caches[Blueprint] = self._make_cache(self.options.blueprint_cache_size)
-        caches[Filter] = self._make_cache(self.options.filter_cache_size)
-        caches[Material] = self._make_cache(self.options.material_cache_size)
+        # Index the input archive up-front, if reading from one.
+        if self.options.input_is_archive:
+            self.input_archive = ZipArchive(self.options.input_path)
+
+        # Targets may share an output pack (told apart by prefix), so key everything
+        # that belongs to the pack itself by its path.
+        for target in self.options.targets:
+            output_path = target.output_path
+            # Stream output into an archive instead of loose files, if requested.
+            if target.output_is_archive:
+                if output_path not in self.output_archives:
+                    self.output_archives[output_path] = ZipArchiveWriter(output_path)
+
+            # Keep an index of what's already been written, if asked to, so that files
+            # needn't be read back to tell whether they've changed.
+            elif self.options.skip_unchanged and self.options.hash_index_path:
+                if output_path not in self.output_hash_indices:
+                    self.output_hash_indices[output_path] = OutputHashIndex(
+                        get_hash_index_path(self.options.hash_index_path, output_path),
+                        root=output_path,
+                    )
+
+        # Create and register caches, unless they're shared.
+        if self.shared_caches is not None:
+            self.caches = caches = self.shared_caches
+        else:
+            self.caches = caches = ResourceCacheSet()
+            caches[Blueprint] = make_resource_cache(self.options.blueprint_cache_size)
+            caches[Filter] = make_resource_cache(self.options.filter_cache_size)
+            caches[Material] = make_resource_cache(self.options.material_cache_size)
+            caches[Structure] = make_resource_cache(self.options.structure_cache_size)
+
+        # Flatten the largest blueprints a layer at a time, if enabled.
+        layer_flattener = None
+        if self.options.flatten_threads > 0:
+            layer_flattener = BlueprintLayerFlattener(
+                threads=self.options.flatten_threads,
+                min_volume=self.options.parallel_flatten_volume,
+            )
+
+        # Count the cells touched while flattening, if asked to.
+        if self.options.flatten_stats_path is not None:
+            self.profiler = BlueprintFlattenProfiler()
+
+        # Keep included blueprints flattened between builds, if asked to.
+        if self.options.flatten_store_path is not None:
+            self.flatten_store = BlueprintFlattenStore(
+                path=self.options.flatten_store_path,
+                digest_source=self._digest_source,
+            )
+
+        # Blueprints may be shared with other builds, so everything above goes on the
+        # context they're flattened with, rather than on the blueprints themselves.
+        self.flatten_settings = BlueprintFlattenSettings(
+            out_of_core_volume=self.options.out_of_core_volume or None,
+            layer_flattener=layer_flattener,
+            profiler=self.profiler,
+            flatten_store=self.flatten_store,
+        )
 
         # Create serializers.
         material_deserializer = MaterialDeserializer()
@@ -73,85 +249,395 @@ class BlueprintsBuildContext:
             material_deserializer=material_deserializer,
         )
 
+        # Share loads in progress, if caches are shared too.
+        pending_loads = self.shared_pending_loads
+        if pending_loads is None:
+            pending_loads = {}
+        for resource_class in (Blueprint, Filter, Material, Structure):
+            pending_loads.setdefault(resource_class, {})
+
         # Create and register input resolvers.
-        resolvers = ResourceResolverSet()
-        resolvers[Blueprint] = CommonResourceResolver[Blueprint](
+        self.resolvers = resolvers = ResourceResolverSet()
+        resolvers[Blueprint] = CoalescingResourceResolver[Blueprint](
             location_resolver=CommonResourceLocationResolver(
                 path=Path(self.options.input_path / "data"),
                 parts=self.options.blueprints_registry_parts,
             ),
-            loader=JsonResourceLoader(blueprint_deserializer),
+            loader=self._make_loader(blueprint_deserializer),
             cache=caches[Blueprint],
+            pending=pending_loads[Blueprint],
         )
-        resolvers[Filter] = CommonResourceResolver[Filter](
+        resolvers[Filter] = CoalescingResourceResolver[Filter](
             location_resolver=CommonResourceLocationResolver(
                 path=Path(self.options.input_path / "data"),
                 parts=self.options.filters_registry_parts,
             ),
-            loader=JsonResourceLoader(filter_deserializer),
+            loader=self._make_loader(filter_deserializer),
             cache=caches[Filter],
+            pending=pending_loads[Filter],
         )
-        resolvers[Material] = CommonResourceResolver[Material](
+        resolvers[Material] = CoalescingResourceResolver[Material](
             location_resolver=CommonResourceLocationResolver(
                 path=Path(self.options.input_path / "data"),
                 parts=self.options.materials_registry_parts,
             ),
-            loader=JsonResourceLoader(material_deserializer),
+            loader=self._make_loader(material_deserializer),
             cache=caches[Material],
+            pending=pending_loads[Material],
+        )
+        resolvers[Structure] = CoalescingResourceResolver[Structure](
+            location_resolver=CommonResourceLocationResolver(
+                path=Path(self.options.input_path / "data"),
+                parts=self.options.structures_registry_parts,
+            ),
+            loader=self._make_structure_loader(),
+            cache=caches[Structure],
+            pending=pending_loads[Structure],
         )
 
-        # Create and register transformers.
-        transformers = ResourceTransformerSet()
+        # Create and register transformers. The generated prefix may differ between
+        # targets, so it's left to each output pack to apply.
+        self.transformers = transformers = ResourceTransformerSet()
         transformers[Blueprint] = BlueprintTransformer(
             generated_namespace=self.options.generated_namespace,
-            generated_prefix_parts=self.options.generated_prefix_parts,
-        )
-
-        # Create and register output location resolvers.
-        output_location_resolvers = ResourceLocationResolverSet()
-        output_location_resolvers[Structure] = CommonResourceLocationResolver(
-            path=Path(self.options.output_path / "data"),
-            parts=self.options.generated_structures_registry_parts,
-        )
-
-        # Create and register output dumpers.
-        output_dumpers = ResourceDumperSet()
-        output_dumpers[Structure] = NbtResourceDumper(
-            serializer=StructureSerializer(data_version=self.options.data_version),
-            options=dict(gzipped=True),
+            prefetcher=(
+                BlueprintPrefetcher(concurrency=self.options.prefetch_concurrency)
+                if self.options.prefetch_concurrency > 0
+                else None
+            ),
+            flatten_settings=self.flatten_settings,
+            blueprint_exists=self._blueprint_exists,
         )
 
         # Create a representation of the input pack.
-        input_pack = PhysicalPack(self.options.input_path)
+        input_pack = self._make_input_pack()
 
-        # Create a representation of the output pack.
-        output_pack = WritablePack(
-            path=self.options.output_path,
-            location_resolvers=output_location_resolvers,
-            dumpers=output_dumpers,
+        # Create a representation of the output pack for each target. Every structure
+        # is generated once, and then encoded separately for each of them.
+        self.output_pack = output_pack = WritablePackGroup(
+            packs=[self._make_output_pack(target) for target in self.options.targets]
         )
 
         # Create a pipeline to encapsulate everything.
         self.pipeline = ResourceProcessingPipeline(
             input_pack=input_pack,
-            output_pack=output_pack,
-            scanner_factory=CommonResourceScanner,
+            output_pack=cast(WritablePack, output_pack),
+            scanner_factory=self._make_scanner_factory(),
             caches=caches,
             resolvers=resolvers,
             transformers=transformers,
             match_files=self.options.match_files,
         )
 
-    def _make_cache(self, cache_size: int) -> ResourceCache[Any]:
-        if cache_size > 0:
-            return LRUResourceCache(size=cache_size)
-        elif cache_size == 0:
-            return StaticResourceCache()
-        return UnboundedResourceCache()
+    def _make_input_pack(self) -> PhysicalPack:
+        if self.input_archive is not None:
+            return ZipPack(self.options.input_path, archive=self.input_archive)
+        return PhysicalPack(self.options.input_path)
+
+    def _make_scanner_factory(self) -> Any:
+        if self.input_archive is not None:
+            return partial(ZipResourceScanner, archive=self.input_archive)
+        return CommonResourceScanner
+
+    def _make_loader(
+        self, deserializer: ResourceDeserializer[Any, Any]
+    ) -> ResourceLoader[Any]:
+        if self.input_archive is not None:
+            return ZipJsonResourceLoader(deserializer, archive=self.input_archive)
+        return JsonResourceLoader(deserializer)
+
+    def _make_structure_loader(self) -> ResourceLoader[Structure]:
+        decoder = StructureNbtDecoder(
+            out_of_core_volume=self.options.out_of_core_volume or None
+        )
+        if self.input_archive is not None:
+            return ZipNbtResourceLoader(decoder, archive=self.input_archive)
+        return MmapNbtResourceLoader(decoder)
+
+    def _make_output_pack(self, target: BlueprintsBuildTarget) -> WritablePack:
+        # Create and register output location resolvers. Applying the prefix here
+        # rather than to the location itself puts the file at the same path.
+        output_location_resolvers = ResourceLocationResolverSet()
+        output_location_resolvers[Structure] = CommonResourceLocationResolver(
+            path=Path(target.output_path / "data"),
+            parts=(
+                *self.options.generated_structures_registry_parts,
+                *(target.generated_prefix_parts or ()),
+            ),
+        )
+
+        # Create and register output dumpers.
+        output_dumpers = ResourceDumperSet()
+        structure_dumper = self._make_structure_dumper(target)
+        self.structure_dumpers.append((target, structure_dumper))
+        output_dumpers[Structure] = structure_dumper
+
+        return WritablePack(
+            path=target.output_path,
+            location_resolvers=output_location_resolvers,
+            dumpers=output_dumpers,
+        )
+
+    def _make_structure_dumper(self, target: BlueprintsBuildTarget) -> StructureDumper:
+        encoder = StructureNbtEncoder(
+            data_version=target.data_version,
+            structure_void=self.options.structure_void,
+            void_blocks=frozenset(self.options.structure_void_blocks),
+            block_order=self.options.block_order,
+            compare_block_orders=self.options.compare_block_orders,
+        )
+        self.structure_encoders.append((target, encoder))
+        if (archive := self.output_archives.get(target.output_path)) is not None:
+            return ZipNbtResourceDumper(encoder=encoder, archive=archive)
+        if self.options.skip_unchanged:
+            return HashedNbtResourceDumper(
+                encoder=encoder, index=self.output_hash_indices.get(target.output_path)
+            )
+        return StreamingResourceDumper(encoder=encoder)
+
+    def _read_input_pack_meta(self) -> Optional[bytes]:
+        if self.input_archive is not None:
+            if self.input_archive.is_file(PACK_META_NAME):
+                return self.input_archive.read(PACK_META_NAME)
+            return None
+        pack_meta_path = self.options.input_path / PACK_META_NAME
+        if pack_meta_path.is_file():
+            return pack_meta_path.read_bytes()
+        return None
 
     async def build(self):
+        """Build every blueprint in the input pack, or only those that are targeted."""
+        if self.options.target_patterns:
+            await self.build_blueprints(self.select_targets())
+            return
+        await self._run(self._process)
+
+    def select_targets(self) -> List[ResourceLocation]:
+        """Find the locations of the blueprints that are targeted."""
+        selector = BlueprintsBuildSelector(
+            data_path=Path(self.options.input_path / "data"),
+            registry_parts=self.options.blueprints_registry_parts,
+            match_files=self.options.match_files,
+            archive=self.input_archive,
+        )
+        locations: Dict[ResourceLocation, None] = {}
+        for pattern in self.options.target_patterns:
+            selected = selector.select_pattern(pattern)
+            if not selected:
+                self.log.warning(f"Target {pattern} didn't match any blueprints")
+            locations.update(dict.fromkeys(selected))
+        self.log.info(f"Selected {len(locations)} targeted blueprints")
+        return list(locations)
+
+    async def build_blueprints(self, locations: Iterable[ResourceLocation]):
+        """Build only the blueprints at `locations`."""
+        await self._run(partial(self._process_blueprints, locations))
+
+    async def _run(self, process: Callable[[], Awaitable[None]]):
+        # Source files may have changed since the last build.
+        if self.flatten_store is not None:
+            self.flatten_store.forget()
+        async with AsyncExitStack() as stack:
+            for index in self.output_hash_indices.values():
+                await stack.enter_async_context(self._open_hash_index(index))
+            for archive in self.output_archives.values():
+                await stack.enter_async_context(self._open_archive(archive))
+            await process()
+        self._log_skipped()
+        self._log_structure_void()
+        self._log_block_orders()
+        self._dump_flatten_stats()
+        self._prune_flatten_store()
+
+    def _dump_flatten_stats(self):
+        if (self.profiler is None) or (self.options.flatten_stats_path is None):
+            return
+        self.profiler.write_json(self.options.flatten_stats_path)
+        self.log.info(
+            f"Dumped flatten stats to {self.options.flatten_stats_path}, most wasteful"
+            + f" first:\n{self.profiler.format_table(limit=FLATTEN_STATS_TABLE_ROWS)}"
+        )
+
+    def _prune_flatten_store(self):
+        if (store := self.flatten_store) is None:
+            return
+        self.log.info(
+            f"Loaded {store.loaded} included blueprints from the flatten store,"
+            + f" flattened and saved {store.saved}"
+        )
+        store.loaded = store.saved = 0
+        if self.options.flatten_store_size < 0:
+            return
+        removed = store.prune(self.options.flatten_store_size)
+        if removed.entries:
+            self.log.info(
+                f"Pruned {removed.entries} least recently used entries"
+                + f" ({removed.size} bytes) from the flatten store"
+            )
+
+    def _digest_source(self, location: ResourceLocation) -> Optional[str]:
+        # Hash the source file (or files) that a resource would be loaded from.
+        resource_class = getattr(location, "resource_class", None)
+        try:
+            resolver = self.resolvers[resource_class]
+        except KeyError:
+            return None
+        path = resolver.location_resolver(location).path
+        digest = sha256()
+        found = False
+        for suffix in SOURCE_SUFFIXES:
+            if (file_digest := self._digest_file(path.with_suffix(suffix))) is not None:
+                digest.update(f"{suffix} {file_digest} ".encode())
+                found = True
+        return digest.hexdigest() if found else None
+
+    def _blueprint_exists(self, location: ResourceLocation) -> bool:
+        # Look for the source file of a blueprint, without loading it.
+        path = self.resolvers[Blueprint].location_resolver(Blueprint @ location).path
+        for suffix in BLUEPRINT_SUFFIXES:
+            source_path = path.with_suffix(suffix)
+            if self.input_archive is not None:
+                if self.input_archive.is_file(self.input_archive.to_name(source_path)):
+                    return True
+            elif source_path.is_file():
+                return True
+        return False
+
+    def _digest_file(self, path: Path) -> Optional[str]:
+        # Files in the input archive don't change, so they're only ever hashed once.
+        if self.input_archive is not None:
+            if (cached := self._source_digests.get(path)) is not None:
+                return cached[2]
+            name = self.input_archive.to_name(path)
+            if not self.input_archive.is_file(name):
+                return None
+            file_digest = sha256(self.input_archive.read(name)).hexdigest()
+            self._source_digests[path] = (0, 0, file_digest)
+            return file_digest
+        # Loose files are hashed again whenever their size or modification time changes.
+        try:
+            stat = path.stat()
+        except (FileNotFoundError, NotADirectoryError):
+            return None
+        cached = self._source_digests.get(path)
+        if (cached is not None) and (cached[:2] == (stat.st_size, stat.st_mtime_ns)):
+            return cached[2]
+        try:
+            file_digest = sha256(path.read_bytes()).hexdigest()
+        except OSError:
+            return None
+        self._source_digests[path] = (stat.st_size, stat.st_mtime_ns, file_digest)
+        return file_digest
+
+    @asynccontextmanager
+    async def _open_archive(self, archive: ZipArchiveWriter) -> AsyncIterator[None]:
+        # Carry the pack metadata over, so that the archive is a usable pack by itself.
+        archive.open()
+        try:
+            if (pack_meta := self._read_input_pack_meta()) is not None:
+                archive.write(PACK_META_NAME, pack_meta)
+            yield
+        except BaseException:
+            archive.discard()
+            raise
+        archive.close()
+
+    @asynccontextmanager
+    async def _open_hash_index(self, index: OutputHashIndex) -> AsyncIterator[None]:
+        index.load()
+        try:
+            yield
+        finally:
+            index.save()
+
+    def _log_skipped(self):
+        for target, dumper in self.structure_dumpers:
+            if isinstance(dumper, HashedNbtResourceDumper):
+                message = (
+                    f"Wrote {dumper.written} structures, skipped {dumper.skipped}"
+                    + " unchanged"
+                )
+                if len(self.structure_dumpers) > 1:
+                    message += f" for data version {target.data_version}"
+                self.log.info(message)
+                dumper.written = dumper.skipped = 0
+
+    def _log_structure_void(self):
+        for target, encoder in self.structure_encoders:
+            if encoder.voided:
+                message = f"Left out {encoder.voided} blocks as structure void"
+                if len(self.structure_encoders) > 1:
+                    message += f" for data version {target.data_version}"
+                self.log.info(message)
+                encoder.voided = 0
+
+    def _log_block_orders(self):
+        for target, encoder in self.structure_encoders:
+            if not encoder.block_order_sizes:
+                continue
+            suffix = ""
+            if len(self.structure_encoders) > 1:
+                suffix = f" for data version {target.data_version}"
+            total_before = total_after = 0
+            for name, before, after in sorted(encoder.block_order_sizes):
+                self.log.info(
+                    f"Encoded {name} in {after} bytes by {encoder.block_order},"
+                    + f" {format_size_change(before, after)} by insertion{suffix}"
+                )
+                total_before += before
+                total_after += after
+            self.log.info(
+                f"Encoded {len(encoder.block_order_sizes)} structures in {total_after}"
+                + f" bytes by {encoder.block_order},"
+                + f" {format_size_change(total_before, total_after)}"
+                + f" by insertion{suffix}"
+            )
+            encoder.block_order_sizes.clear()
+
+    async def _process(self):
         await self.pipeline.process(
             {
                 Blueprint: self.options.blueprints_registry_parts,
             }
         )
+
+    async def _process_blueprints(self, locations: Iterable[ResourceLocation]):
+        transformer = self.transformers[Blueprint]
+        for location in locations:
+            blueprint_location = Blueprint @ location
+            blueprint = await self.resolvers(blueprint_location)
+            ctx = BlueprintProcessingContext(
+                resolver_set=self.resolvers,
+                resource=blueprint,
+                location=blueprint_location,
+            )
+            async for resource, resource_location in transformer(ctx):
+                await self.output_pack.dump(resource, resource_location)
+
+    def invalidate(self, paths: Iterable[Path]) -> int:
+        """
+        Evict any cached resources that were loaded from `paths`.
+
+        Paths are compared without their file extension, the same way resources are
+        located. Returns the number of evicted resources.
+        """
+        stems = {path.with_suffix("") for path in paths}
+        evicted = 0
+        for resource_class in (Blueprint, Filter, Material, Structure):
+            cache = self.caches[resource_class]
+            for location in list(cache):
+                if location.path in stems:
+                    del cache[location]
+                    evicted += 1
+        # Blueprints that are still cached may have flattened the evicted resources.
+        if evicted:
+            blueprint_cache = self.caches[Blueprint]
+            for location in list(blueprint_cache):
+                if (blueprint := blueprint_cache.get(location)) is not None:
+                    blueprint.clear_child_cache()
+        return evicted
+
+    def close(self):
+        """Release any resources held open by the build."""
+        if self.input_archive is not None:
+            self.input_archive.close()
@@ -0,0 +1,223 @@
+from dataclasses import MISSING, dataclass, fields
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+import yaml
+from pyckaxe import Breadcrumb
+
+from mcblueprints.build.blueprints_build_options import (
+    DEFAULT_MANIFEST_JOBS,
+    BlueprintsBuildOptions,
+)
+
+__all__ = (
+    "MalformedBuildManifest",
+    "BlueprintsBuildManifest",
+)
+
+# Manifest keys that are named after a CLI option rather than an options field.
+RENAMED_KEYS = {
+    "input": "input_path",
+    "output": "output_path",
+    "data_version": "data_versions",
+    "target": "target_patterns",
+    "flatten_stats": "flatten_stats_path",
+    "flatten_store": "flatten_store_path",
+    "hash_index": "hash_index_path",
+    "structure_void_block": "structure_void_blocks",
+}
+
+# Manifest keys that every build needs, either directly or through the defaults.
+REQUIRED_KEYS = ("input", "output", "data_version")
+
+# Keys holding paths, which are relative to the manifest rather than the working dir.
+PATH_KEYS = (
+    "input_path",
+    "output_path",
+    "flatten_stats_path",
+    "flatten_store_path",
+    "hash_index_path",
+)
+
+# The options that may be given, by field name.
+OPTION_FIELDS = {f.name: f for f in fields(BlueprintsBuildOptions) if f.init}
+
+
+class MalformedBuildManifest(Exception):
+    def __init__(self, message: str, raw_manifest: Any, breadcrumb: Breadcrumb):
+        self.raw_manifest: Any = raw_manifest
+        self.breadcrumb: Breadcrumb = breadcrumb
+        super().__init__(message)
+
+
+@dataclass
+class BlueprintsBuildManifest:
+    """
+    A list of packs to build together, each with its own options.
+
+    The manifest is a YAML (or JSON) file with a list of `builds`, each of which takes
+    the same options as the `build` command, plus optional `defaults` that apply to
+    every build and a number of `jobs` to build at once. Relative paths are relative
+    to the manifest itself.
+
+    Attributes
+    ----------
+    path
+        The path to the manifest file.
+    builds
+        The options for each pack to build, in order.
+    jobs
+        The number of packs to build at once.
+    """
+
+    path: Path
+    builds: Tuple[BlueprintsBuildOptions, ...]
+    jobs: int = DEFAULT_MANIFEST_JOBS
+
+    def __post_init__(self):
+        if self.jobs < 1:
+            raise ValueError(f"Expected at least one job, but got: {self.jobs}")
+
+    @classmethod
+    def load(
+        cls,
+        path: Path,
+        defaults: Optional[Dict[str, Any]] = None,
+        jobs: Optional[int] = None,
+    ) -> "BlueprintsBuildManifest":
+        """
+        Load a manifest from `path`.
+
+        Options in `defaults` apply underneath those of the manifest, and `jobs`
+        overrides the manifest's own, if given.
+        """
+        with open(path) as fp:
+            raw_manifest = yaml.safe_load(fp)
+        breadcrumb = Breadcrumb()
+        if not isinstance(raw_manifest, dict):
+            raise MalformedBuildManifest(
+                f"Malformed manifest, at `{breadcrumb}`", raw_manifest, breadcrumb
+            )
+
+        unknown_keys = set(raw_manifest) - {"builds", "defaults", "jobs"}
+        if unknown_keys:
+            raise MalformedBuildManifest(
+                f"Unknown keys {sorted(unknown_keys)}, at `{breadcrumb}`",
+                raw_manifest,
+                breadcrumb,
+            )
+
+        raw_jobs = raw_manifest.get("jobs", DEFAULT_MANIFEST_JOBS)
+        if not (
+            isinstance(raw_jobs, int)
+            and not isinstance(raw_jobs, bool)
+            and (raw_jobs >= 1)
+        ):
+            raise MalformedBuildManifest(
+                f"Malformed `jobs`, at `{breadcrumb.jobs}`",
+                raw_manifest,
+                breadcrumb.jobs,
+            )
+
+        base_options = dict(defaults or {})
+        if (raw_defaults := raw_manifest.get("defaults")) is not None:
+            base_options.update(
+                cls._deserialize_options(
+                    path, raw_manifest, raw_defaults, breadcrumb.defaults
+                )
+            )
+
+        raw_builds = raw_manifest.get("builds")
+        breadcrumb_builds = breadcrumb.builds
+        if not (isinstance(raw_builds, list) and raw_builds):
+            raise MalformedBuildManifest(
+                f"Expected a non-empty list of `builds`, at `{breadcrumb_builds}`",
+                raw_manifest,
+                breadcrumb_builds,
+            )
+
+        builds = tuple(
+            cls._deserialize_build(
+                path, raw_manifest, raw_build, base_options, breadcrumb_builds[i]
+            )
+            for i, raw_build in enumerate(raw_builds)
+        )
+        return cls(path=path, builds=builds, jobs=jobs or raw_jobs)
+
+    @classmethod
+    def _deserialize_build(
+        cls,
+        path: Path,
+        raw_manifest: Any,
+        raw_build: Any,
+        base_options: Dict[str, Any],
+        breadcrumb: Breadcrumb,
+    ) -> BlueprintsBuildOptions:
+        options = {
+            **base_options,
+            **cls._deserialize_options(path, raw_manifest, raw_build, breadcrumb),
+        }
+        for raw_key in REQUIRED_KEYS:
+            if RENAMED_KEYS[raw_key] not in options:
+                raise MalformedBuildManifest(
+                    f"Missing `{raw_key}`, at `{breadcrumb}`", raw_manifest, breadcrumb
+                )
+        try:
+            return BlueprintsBuildOptions(**options)
+        except ValueError as ex:
+            raise MalformedBuildManifest(
+                f"{ex}, at `{breadcrumb}`", raw_manifest, breadcrumb
+            ) from ex
+
+    @classmethod
+    def _deserialize_options(
+        cls, path: Path, raw_manifest: Any, raw_options: Any, breadcrumb: Breadcrumb
+    ) -> Dict[str, Any]:
+        if not isinstance(raw_options, dict):
+            raise MalformedBuildManifest(
+                f"Malformed options, at `{breadcrumb}`", raw_manifest, breadcrumb
+            )
+        options: Dict[str, Any] = {}
+        for raw_key, raw_value in raw_options.items():
+            breadcrumb_value = breadcrumb[raw_key]
+            key = RENAMED_KEYS.get(raw_key, raw_key)
+            if key not in OPTION_FIELDS:
+                raise MalformedBuildManifest(
+                    f"Unknown option `{raw_key}`, at `{breadcrumb_value}`",
+                    raw_manifest,
+                    breadcrumb_value,
+                )
+            value = cls._deserialize_option(key, raw_value)
+            if value is None:
+                raise MalformedBuildManifest(
+                    f"Malformed option `{raw_key}`, at `{breadcrumb_value}`",
+                    raw_manifest,
+                    breadcrumb_value,
+                )
+            if key in PATH_KEYS:
+                value = (path.parent / value).resolve()
+            options[key] = value
+        return options
+
+    @classmethod
+    def _deserialize_option(cls, key: str, raw_value: Any) -> Any:
+        # A single data version is short for a list of one.
+        if key == "data_versions":
+            raw_values = raw_value if isinstance(raw_value, list) else [raw_value]
+            if all(isinstance(v, int) and not isinstance(v, bool) for v in raw_values):
+                return tuple(raw_values)
+            return None
+        # Likewise for a single target, or structure void block.
+        if key in ("target_patterns", "structure_void_blocks"):
+            raw_values = raw_value if isinstance(raw_value, list) else [raw_value]
+            if all(isinstance(v, str) for v in raw_values):
+                return tuple(raw_values)
+            return None
+        if key in PATH_KEYS:
+            return raw_value if isinstance(raw_value, str) else None
+        # Otherwise the value must have the same type as the default, if there is one.
+        default = OPTION_FIELDS[key].default
+        expected_type = str if default in (None, MISSING) else type(default)
+        if isinstance(raw_value, bool) != (expected_type is bool):
+            return None
+        return raw_value if isinstance(raw_value, expected_type) else None
@@ -1,6 +1,13 @@
+import warnings
 from dataclasses import dataclass, field
 from pathlib import Path
 from typing import Optional, Tuple
+from zipfile import is_zipfile
+
+from mcblueprints.build.blueprints_build_target import (
+    DATA_VERSION_PLACEHOLDER,
+    BlueprintsBuildTarget,
+)
 
 __all__ = ("BlueprintsBuildOptions",)
 
@@ -8,58 +15,211 @@ __all__ = ("BlueprintsBuildOptions",)
 DEFAULT_BLUEPRINTS_REGISTRY = "blueprints"
 DEFAULT_FILTERS_REGISTRY = "filters"
 DEFAULT_MATERIALS_REGISTRY = "materials"
+DEFAULT_STRUCTURES_REGISTRY = "structures"
 
 DEFAULT_BLUEPRINT_CACHE_SIZE = 1000
 DEFAULT_FILTER_CACHE_SIZE = 1000
 DEFAULT_MATERIAL_CACHE_SIZE = 1000
+DEFAULT_STRUCTURE_CACHE_SIZE = 1000
 
 DEFAULT_MATCH_FILES = "[!!]*"
 
 DEFAULT_GENERATED_STRUCTURES_REGISTRY = "structures"
 
+DEFAULT_SKIP_UNCHANGED = True
+
+DEFAULT_MANIFEST_JOBS = 1
+
+DEFAULT_PREFETCH_CONCURRENCY = 32
+
+DEFAULT_OUT_OF_CORE_VOLUME = 0
+
+DEFAULT_FLATTEN_THREADS = 0
+DEFAULT_PARALLEL_FLATTEN_VOLUME = 128 * 128 * 128
+
+# The most bytes the flatten store may take up, after pruning it at the end of a build.
+DEFAULT_FLATTEN_STORE_SIZE = 1024 * 1024 * 1024
+
+DEFAULT_STRUCTURE_VOID = False
+DEFAULT_STRUCTURE_VOID_BLOCKS = ("minecraft:air",)
+
+BLOCK_ORDERS = ("insertion", "position", "palette")
+DEFAULT_BLOCK_ORDER = "insertion"
+DEFAULT_COMPARE_BLOCK_ORDERS = False
+
 
 @dataclass
 class BlueprintsBuildOptions:
     input_path: Path
     output_path: Path
 
-    data_version: int
+    data_versions: Tuple[int, ...] = ()
 
     match_files: str = DEFAULT_MATCH_FILES
 
+    target_patterns: Tuple[str, ...] = ()
+
     generated_namespace: Optional[str] = None
     generated_prefix: Optional[str] = None
 
     blueprints_registry: str = DEFAULT_BLUEPRINTS_REGISTRY
     filters_registry: str = DEFAULT_FILTERS_REGISTRY
     materials_registry: str = DEFAULT_MATERIALS_REGISTRY
+    structures_registry: str = DEFAULT_STRUCTURES_REGISTRY
 
     blueprint_cache_size: int = DEFAULT_BLUEPRINT_CACHE_SIZE
     filter_cache_size: int = DEFAULT_FILTER_CACHE_SIZE
     material_cache_size: int = DEFAULT_MATERIAL_CACHE_SIZE
+    structure_cache_size: int = DEFAULT_STRUCTURE_CACHE_SIZE
 
     generated_structures_registry: str = DEFAULT_GENERATED_STRUCTURES_REGISTRY
 
-    generated_prefix_parts: Optional[Tuple[str, ...]] = field(init=False)
+    skip_unchanged: bool = DEFAULT_SKIP_UNCHANGED
+    hash_index_path: Optional[Path] = None
+
+    prefetch_concurrency: int = DEFAULT_PREFETCH_CONCURRENCY
+
+    out_of_core_volume: int = DEFAULT_OUT_OF_CORE_VOLUME
+
+    flatten_threads: int = DEFAULT_FLATTEN_THREADS
+    parallel_flatten_volume: int = DEFAULT_PARALLEL_FLATTEN_VOLUME
+
+    flatten_stats_path: Optional[Path] = None
+
+    flatten_store_path: Optional[Path] = None
+    flatten_store_size: int = DEFAULT_FLATTEN_STORE_SIZE
+
+    structure_void: bool = DEFAULT_STRUCTURE_VOID
+    structure_void_blocks: Tuple[str, ...] = DEFAULT_STRUCTURE_VOID_BLOCKS
+
+    block_order: str = DEFAULT_BLOCK_ORDER
+    compare_block_orders: bool = DEFAULT_COMPARE_BLOCK_ORDERS
+
+    # Deprecated: a single data version, short for `data_versions=(data_version,)`.
+    data_version: Optional[int] = None
+
+    targets: Tuple[BlueprintsBuildTarget, ...] = field(init=False)
+
+    input_is_archive: bool = field(init=False)
+    output_is_archive: bool = field(init=False)
 
     def __post_init__(self):
+        # Accept a single data version the way it used to be given, for now.
+        if isinstance(self.data_versions, int):
+            self.data_version, self.data_versions = self.data_versions, ()
+        if self.data_version is not None:
+            warnings.warn(
+                "`data_version` is deprecated, use `data_versions` instead",
+                DeprecationWarning,
+                stacklevel=3,
+            )
+            if self.data_versions not in ((), (self.data_version,)):
+                raise ValueError(
+                    f"Expected data versions to match data version {self.data_version},"
+                    + f" but got: {self.data_versions}"
+                )
+            self.data_versions = (self.data_version,)
+
+        # Determine whether the input pack is a zip archive rather than a directory.
+        self.input_is_archive = self.input_path.is_file() and is_zipfile(
+            self.input_path
+        )
+
+        # Determine whether to stream the output pack into a zip archive.
+        self.output_is_archive = self.output_path.suffix == ".zip"
+
         # Make sure the output path is absolute.
         if not self.output_path.is_absolute():
             raise ValueError(
                 f"Expected absolute output path, but got: {self.output_path}"
             )
 
-        # Split output prefix path into parts.
-        self.generated_prefix_parts = (
-            tuple(self.generated_prefix.split("/")) if self.generated_prefix else None
-        )
+        # Make sure every target names a blueprint, or a pattern of them, by location.
+        for pattern in self.target_patterns:
+            namespace, sep, path = pattern.partition(":")
+            if not (namespace and sep and path):
+                raise ValueError(
+                    f"Expected a target like `namespace:path`, but got: {pattern}"
+                )
+
+        # Make sure prefetching is either disabled or can make progress.
+        if self.prefetch_concurrency < 0:
+            raise ValueError(
+                "Expected a non-negative prefetch concurrency, but got:"
+                + f" {self.prefetch_concurrency}"
+            )
+
+        # Make sure the out-of-core volume is either disabled or a number of cells.
+        if self.out_of_core_volume < 0:
+            raise ValueError(
+                "Expected a non-negative out-of-core volume, but got:"
+                + f" {self.out_of_core_volume}"
+            )
+
+        # Make sure the number of flatten threads isn't negative.
+        if self.flatten_threads < 0:
+            raise ValueError(
+                "Expected a non-negative number of flatten threads, but got:"
+                + f" {self.flatten_threads}"
+            )
+
+        # Make sure the parallel flatten volume is a number of cells.
+        if self.parallel_flatten_volume < 0:
+            raise ValueError(
+                "Expected a non-negative parallel flatten volume, but got:"
+                + f" {self.parallel_flatten_volume}"
+            )
+
+        # Make sure there's something to leave out, when leaving blocks out.
+        if self.structure_void and not self.structure_void_blocks:
+            raise ValueError("Expected at least 1 structure void block")
+
+        # Make sure blocks are ordered in a known way.
+        if self.block_order not in BLOCK_ORDERS:
+            raise ValueError(
+                f"Expected a block order in {BLOCK_ORDERS}, but got: {self.block_order}"
+            )
+
+        # Flattening a layer at a time loses the order that blocks were set in, so it
+        # can't be used to write blocks in that order.
+        if self.flatten_threads and (self.block_order == "insertion"):
+            raise ValueError(
+                "Expected a block order other than insertion with flatten threads,"
+                + f" but got: {self.block_order}"
+            )
+
+        # Create a target for each data version, telling their outputs apart.
+        self.targets = self._make_targets()
 
         # Split input registry paths into parts.
         self.blueprints_registry_parts = tuple(self.blueprints_registry.split("/"))
         self.filters_registry_parts = tuple(self.filters_registry.split("/"))
         self.materials_registry_parts = tuple(self.materials_registry.split("/"))
+        self.structures_registry_parts = tuple(self.structures_registry.split("/"))
 
         # Split output registry paths into parts.
         self.generated_structures_registry_parts = tuple(
             self.generated_structures_registry.split("/")
         )
+
+    def _make_targets(self) -> Tuple[BlueprintsBuildTarget, ...]:
+        if not self.data_versions:
+            raise ValueError("Expected at least one data version")
+        if len(set(self.data_versions)) != len(self.data_versions):
+            raise ValueError(f"Duplicate data versions: {self.data_versions}")
+        if (len(self.data_versions) > 1) and not (
+            (DATA_VERSION_PLACEHOLDER in str(self.output_path))
+            or (DATA_VERSION_PLACEHOLDER in (self.generated_prefix or ""))
+        ):
+            raise ValueError(
+                "Building more than one data version requires the output path or"
+                + f" generated prefix to contain `{DATA_VERSION_PLACEHOLDER}`"
+            )
+        return tuple(
+            BlueprintsBuildTarget.from_template(
+                data_version=data_version,
+                output_path=self.output_path,
+                generated_prefix=self.generated_prefix,
+            )
+            for data_version in self.data_versions
+        )
@@ -0,0 +1,171 @@
+import os
+from dataclasses import dataclass
+from fnmatch import fnmatchcase
+from pathlib import Path, PurePosixPath
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from pyckaxe import ResourceLocation
+
+from mcblueprints.lib import ZipArchive
+
+__all__ = (
+    "MissingBuildTarget",
+    "BlueprintsBuildSelector",
+)
+
+
+# Characters that make a segment of a pattern a glob, rather than a plain name.
+GLOB_CHARS = "*?["
+
+# A whole segment of this matches any number of directories, including none.
+RECURSIVE_GLOB = "**"
+
+
+def is_glob(segment: str) -> bool:
+    return any(c in segment for c in GLOB_CHARS)
+
+
+class MissingBuildTarget(Exception):
+    def __init__(self, message: str, pattern: str):
+        self.pattern: str = pattern
+        super().__init__(message)
+
+
+@dataclass
+class BlueprintsBuildSelector:
+    """
+    Finds the blueprints to build, given patterns of resource locations.
+
+    Each pattern looks like `namespace:path/to/blueprint`, where any segment of the
+    namespace or path may be a glob. A `*` only matches within a single segment, while
+    a segment of `**` matches any number of directories. Patterns are matched one
+    segment at a time, so only the directories that a glob needs to look into are ever
+    listed: plain names are looked up directly, and so is a pattern without any globs
+    at all, which must name a blueprint in the pack.
+
+    Attributes
+    ----------
+    data_path
+        The path to the `data` directory of the input pack.
+    registry_parts
+        The parts of the path to the blueprints registry, within each namespace.
+    match_files
+        The glob pattern that blueprint files found by a glob must match.
+    archive
+        The archive containing the input pack, if it isn't a directory.
+    """
+
+    data_path: Path
+    registry_parts: Tuple[str, ...]
+    match_files: str = "*"
+    archive: Optional[ZipArchive] = None
+
+    def select(self, patterns: Iterable[str]) -> List[ResourceLocation]:
+        """Find every blueprint matching any of `patterns`, without duplicates."""
+        locations: Dict[ResourceLocation, None] = {}
+        for pattern in patterns:
+            locations.update(dict.fromkeys(self.select_pattern(pattern)))
+        return list(locations)
+
+    def select_pattern(self, pattern: str) -> List[ResourceLocation]:
+        """
+        Find every blueprint matching `pattern`.
+
+        A pattern without any globs raises `MissingBuildTarget` if there's no such
+        blueprint, whereas one with globs may match nothing at all.
+        """
+        return list(self._select_pattern(pattern))
+
+    def _select_pattern(self, pattern: str) -> Iterable[ResourceLocation]:
+        namespace_pattern, _, path_pattern = pattern.partition(":")
+        segments = tuple(path_pattern.split("/"))
+
+        # Without any globs, there's only the one blueprint to look for.
+        if not any(is_glob(s) for s in (namespace_pattern, *segments)):
+            if not self._exists(namespace_pattern, segments):
+                raise self._missing(pattern, namespace_pattern, segments)
+            yield ResourceLocation.from_string(pattern)
+            return
+
+        if is_glob(namespace_pattern):
+            namespaces = [
+                name
+                for name in self._list_dirs(self.data_path)
+                if fnmatchcase(name, namespace_pattern)
+            ]
+        else:
+            namespaces = [namespace_pattern]
+
+        for namespace in namespaces:
+            registry_path = self.data_path.joinpath(namespace, *self.registry_parts)
+            for parts in self._match(registry_path, segments):
+                yield ResourceLocation.from_string(f"{namespace}:{'/'.join(parts)}")
+
+    def _match(
+        self, path: Path, segments: Tuple[str, ...]
+    ) -> Iterable[Tuple[str, ...]]:
+        # Match the segments of a path pattern against the files underneath `path`,
+        # yielding the parts of each matching location.
+        segment, rest = segments[0], segments[1:]
+
+        if segment == RECURSIVE_GLOB:
+            # Match the rest here, or in any directory further down. Coming last, it
+            # matches every blueprint in every one of them.
+            yield from self._match(path, rest or ("*",))
+            for name in self._list_dirs(path):
+                for parts in self._match(path / name, segments):
+                    yield (name, *parts)
+            return
+
+        if rest:
+            if is_glob(segment):
+                names = [n for n in self._list_dirs(path) if fnmatchcase(n, segment)]
+            else:
+                names = [segment]
+            for name in names:
+                for parts in self._match(path / name, rest):
+                    yield (name, *parts)
+            return
+
+        # The last segment names the blueprint itself, without its file extension.
+        for file_name in self._list_files(path):
+            stem = PurePosixPath(file_name).stem
+            if fnmatchcase(stem, segment) and fnmatchcase(file_name, self.match_files):
+                yield (stem,)
+
+    def _exists(self, namespace: str, segments: Tuple[str, ...]) -> bool:
+        path = self.data_path.joinpath(namespace, *self.registry_parts, *segments[:-1])
+        return any(
+            (PurePosixPath(file_name).stem == segments[-1])
+            and fnmatchcase(file_name, self.match_files)
+            for file_name in self._list_files(path)
+        )
+
+    def _missing(
+        self, pattern: str, namespace: str, segments: Tuple[str, ...]
+    ) -> MissingBuildTarget:
+        message = f"No blueprint found for target: {pattern}"
+        # Variants aren't files of their own, so point to the blueprint they might be
+        # declared by.
+        if (len(segments) > 1) and self._exists(namespace, segments[:-1]):
+            parent = f"{namespace}:{'/'.join(segments[:-1])}"
+            message += f" (to build a variant of {parent}, target {parent} itself)"
+        return MissingBuildTarget(message, pattern)
+
+    def _list_dirs(self, path: Path) -> List[str]:
+        if self.archive is not None:
+            return self.archive.list_dirs(self.archive.to_name(path))
+        try:
+            with os.scandir(path) as entries:
+                return sorted(e.name for e in entries if e.is_dir())
+        except (FileNotFoundError, NotADirectoryError):
+            return []
+
+    def _list_files(self, path: Path) -> List[str]:
+        if self.archive is not None:
+            return self.archive.list_files(self.archive.to_name(path))
+        try:
+            with os.scandir(path) as entries:
+                return sorted(e.name for e in entries if e.is_file())
+        except (FileNotFoundError, NotADirectoryError):
+            return []
@@ -0,0 +1,69 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Optional, Tuple
+
+__all__ = (
+    "DATA_VERSION_PLACEHOLDER",
+    "BlueprintsBuildTarget",
+)
+
+
+# Replaced with the data version of each target, in output paths and prefixes.
+DATA_VERSION_PLACEHOLDER = "{data_version}"
+
+
+@dataclass
+class BlueprintsBuildTarget:
+    """
+    One version of the game to build structures for, and where to put them.
+
+    Attributes
+    ----------
+    data_version
+        The data version to write into generated structures.
+    output_path
+        The path to the data pack to dump the output.
+    generated_prefix
+        A prefix to apply to the locations of generated resources.
+    """
+
+    data_version: int
+    output_path: Path
+    generated_prefix: Optional[str] = None
+
+    generated_prefix_parts: Optional[Tuple[str, ...]] = field(init=False)
+
+    output_is_archive: bool = field(init=False)
+
+    def __str__(self) -> str:
+        return f"{self.output_path.name}@{self.data_version}"
+
+    def __post_init__(self):
+        # Determine whether to stream the output pack into a zip archive.
+        self.output_is_archive = self.output_path.suffix == ".zip"
+
+        # Split output prefix path into parts.
+        self.generated_prefix_parts = (
+            tuple(self.generated_prefix.split("/")) if self.generated_prefix else None
+        )
+
+    @classmethod
+    def from_template(
+        cls,
+        data_version: int,
+        output_path: Path,
+        generated_prefix: Optional[str] = None,
+    ) -> "BlueprintsBuildTarget":
+        """Fill in the data version wherever the output path or prefix asks for it."""
+        placeholder_value = str(data_version)
+        return cls(
+            data_version=data_version,
+            output_path=Path(
+                str(output_path).replace(DATA_VERSION_PLACEHOLDER, placeholder_value)
+            ),
+            generated_prefix=(
+                generated_prefix.replace(DATA_VERSION_PLACEHOLDER, placeholder_value)
+                if generated_prefix
+                else generated_prefix
+            ),
+        )
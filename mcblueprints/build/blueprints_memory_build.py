@@ -0,0 +1,220 @@
+from dataclasses import dataclass, field
+from typing import (
+    Any,
+    AsyncIterator,
+    Dict,
+    Iterable,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+    cast,
+)
+
+from pyckaxe import (
+    ResourceLocation,
+    ResourceResolverSet,
+    Structure,
+    StructureLocation,
+)
+
+from mcblueprints.lib import (
+    Blueprint,
+    BlueprintDeserializer,
+    BlueprintFlattenSettings,
+    BlueprintProcessingContext,
+    BlueprintTransformer,
+    Filter,
+    FilterDeserializer,
+    Material,
+    MaterialDeserializer,
+    MemoryResourceResolver,
+    StructureNbtDecoder,
+    StructureNbtEncoder,
+)
+
+__all__ = ("BlueprintsMemoryBuild",)
+
+
+DEFAULT = cast(Any, ...)
+
+# A resource location, or its string form, e.g. `minecraft:foo/bar`.
+LocationLike = Union[ResourceLocation, str]
+
+
+@dataclass
+class BlueprintsMemoryBuild:
+    """
+    Builds blueprints entirely in memory, without reading or writing a pack.
+
+    Blueprints, filters and materials may be given either as raw data (the same dicts
+    that would otherwise be loaded from JSON or YAML files) or as already-built
+    objects. Structures to include may be given either as the bytes of an NBT file or
+    as already-built structures. Links between them are resolved by location against
+    each other, just like they would be within a pack.
+
+    Attributes
+    ----------
+    data_version
+        The data version to write into serialized structures.
+    blueprints
+        Blueprints to make available, keyed by location.
+    filters
+        Filters to make available, keyed by location.
+    materials
+        Materials to make available, keyed by location.
+    structures
+        Structures to make available for inclusion, keyed by location.
+    generated_namespace
+        A separate namespace to use for generated resources.
+    generated_prefix
+        A prefix to apply to the locations of generated resources.
+    structure_void
+        Whether to leave air out of serialized structures, as structure void, unless a
+        blueprint says otherwise.
+    flatten_settings
+        How to flatten each blueprint.
+    """
+
+    data_version: int
+
+    blueprints: Mapping[LocationLike, Any] = field(default_factory=dict)
+    filters: Mapping[LocationLike, Any] = field(default_factory=dict)
+    materials: Mapping[LocationLike, Any] = field(default_factory=dict)
+    structures: Mapping[LocationLike, Any] = field(default_factory=dict)
+
+    generated_namespace: Optional[str] = None
+    generated_prefix: Optional[str] = None
+
+    structure_void: bool = False
+
+    flatten_settings: BlueprintFlattenSettings = field(
+        default_factory=BlueprintFlattenSettings
+    )
+
+    resolvers: ResourceResolverSet = field(init=False, default=DEFAULT)
+    transformer: BlueprintTransformer = field(init=False, default=DEFAULT)
+    encoder: StructureNbtEncoder = field(init=False, default=DEFAULT)
+
+    blueprint_resolver: MemoryResourceResolver[Blueprint] = field(
+        init=False, default=DEFAULT
+    )
+    filter_resolver: MemoryResourceResolver[Filter] = field(init=False, default=DEFAULT)
+    material_resolver: MemoryResourceResolver[Material] = field(
+        init=False, default=DEFAULT
+    )
+    structure_resolver: MemoryResourceResolver[Structure] = field(
+        init=False, default=DEFAULT
+    )
+
+    def __post_init__(self):
+        # Create serializers.
+        material_deserializer = MaterialDeserializer()
+        filter_deserializer = FilterDeserializer(
+            material_deserializer=material_deserializer,
+        )
+        blueprint_deserializer = BlueprintDeserializer(
+            filter_deserializer=filter_deserializer,
+            material_deserializer=material_deserializer,
+        )
+        self.encoder = StructureNbtEncoder(
+            data_version=self.data_version, structure_void=self.structure_void
+        )
+
+        # Create in-memory resolvers and fill them with the given resources.
+        self.blueprint_resolver = MemoryResourceResolver(blueprint_deserializer)
+        self.blueprint_resolver.update(dict(self.blueprints))
+        self.filter_resolver = MemoryResourceResolver(filter_deserializer)
+        self.filter_resolver.update(dict(self.filters))
+        self.material_resolver = MemoryResourceResolver(material_deserializer)
+        self.material_resolver.update(dict(self.materials))
+        decoder = StructureNbtDecoder(
+            out_of_core_volume=self.flatten_settings.out_of_core_volume
+        )
+        self.structure_resolver = MemoryResourceResolver(decoder)
+        self.structure_resolver.update(dict(self.structures))
+
+        # Register the resolvers.
+        self.resolvers = resolvers = ResourceResolverSet()
+        resolvers[Blueprint] = self.blueprint_resolver
+        resolvers[Filter] = self.filter_resolver
+        resolvers[Material] = self.material_resolver
+        resolvers[Structure] = self.structure_resolver
+
+        # Create the transformer.
+        self.transformer = BlueprintTransformer(
+            generated_namespace=self.generated_namespace,
+            generated_prefix_parts=(
+                tuple(self.generated_prefix.split("/"))
+                if self.generated_prefix
+                else None
+            ),
+            flatten_settings=self.flatten_settings,
+            blueprint_exists=self.blueprint_resolver.__contains__,
+        )
+
+    def _to_locations(
+        self, locations: Optional[Iterable[LocationLike]]
+    ) -> Iterable[ResourceLocation]:
+        # Default to every blueprint that was given.
+        if locations is None:
+            return list(self.blueprint_resolver)
+        return [
+            (
+                ResourceLocation.from_string(location)
+                if isinstance(location, str)
+                else location
+            )
+            for location in locations
+        ]
+
+    async def iter_structures(
+        self, locations: Optional[Iterable[LocationLike]] = None
+    ) -> AsyncIterator[Tuple[StructureLocation, Structure]]:
+        """
+        Build blueprints one at a time, yielding each structure as soon as it's ready.
+
+        Only the blueprints at `locations` are built, if given. Otherwise every
+        blueprint is built.
+        """
+        for location in self._to_locations(locations):
+            blueprint_location = Blueprint @ location
+            blueprint = await self.resolvers(blueprint_location)
+            ctx = BlueprintProcessingContext(
+                resolver_set=self.resolvers,
+                resource=blueprint,
+                location=blueprint_location,
+            )
+            async for resource, resource_location in self.transformer(ctx):
+                yield cast(StructureLocation, resource_location), cast(
+                    Structure, resource
+                )
+
+    async def iter_nbt(
+        self, locations: Optional[Iterable[LocationLike]] = None
+    ) -> AsyncIterator[Tuple[StructureLocation, bytes]]:
+        """Like `iter_structures`, but yield gzipped NBT bytes instead."""
+        async for structure_location, structure in self.iter_structures(locations):
+            yield structure_location, self.to_nbt(structure)
+
+    async def build_structures(
+        self, locations: Optional[Iterable[LocationLike]] = None
+    ) -> Dict[StructureLocation, Structure]:
+        """Build blueprints and collect the resulting structures by location."""
+        return {
+            structure_location: structure
+            async for structure_location, structure in self.iter_structures(locations)
+        }
+
+    async def build_nbt(
+        self, locations: Optional[Iterable[LocationLike]] = None
+    ) -> Dict[StructureLocation, bytes]:
+        """Build blueprints and collect the resulting NBT bytes by location."""
+        return {
+            structure_location: data
+            async for structure_location, data in self.iter_nbt(locations)
+        }
+
+    def to_nbt(self, structure: Structure) -> bytes:
+        """Encode a structure into gzipped NBT bytes."""
+        return self.encoder(structure)
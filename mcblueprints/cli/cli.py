@@ -1,32 +1,94 @@
+from datetime import datetime
+from functools import wraps
 from pathlib import Path
-from typing import Any
+from typing import Any, Optional
 
 import click
-from pyckaxe.cli.utils import asyncify
-from pyckaxe.utils import LOG_LEVELS, setup_logging
 
-from mcblueprints import __version__
-from mcblueprints.build.blueprints_build_context import BlueprintsBuildContext
+# NOTE Only options and their defaults are imported up-front. Everything else (and
+# pyckaxe in particular) is slow to import, so each command imports what it needs when
+# it runs. That keeps `--help`, `--version` and usage errors fast.
 from mcblueprints.build.blueprints_build_options import (
+    BLOCK_ORDERS,
+    DEFAULT_BLOCK_ORDER,
     DEFAULT_BLUEPRINT_CACHE_SIZE,
     DEFAULT_BLUEPRINTS_REGISTRY,
+    DEFAULT_COMPARE_BLOCK_ORDERS,
     DEFAULT_FILTER_CACHE_SIZE,
     DEFAULT_FILTERS_REGISTRY,
+    DEFAULT_FLATTEN_STORE_SIZE,
+    DEFAULT_FLATTEN_THREADS,
     DEFAULT_GENERATED_STRUCTURES_REGISTRY,
+    DEFAULT_MANIFEST_JOBS,
     DEFAULT_MATCH_FILES,
     DEFAULT_MATERIAL_CACHE_SIZE,
     DEFAULT_MATERIALS_REGISTRY,
+    DEFAULT_OUT_OF_CORE_VOLUME,
+    DEFAULT_PARALLEL_FLATTEN_VOLUME,
+    DEFAULT_PREFETCH_CONCURRENCY,
+    DEFAULT_SKIP_UNCHANGED,
+    DEFAULT_STRUCTURE_CACHE_SIZE,
+    DEFAULT_STRUCTURE_VOID,
+    DEFAULT_STRUCTURE_VOID_BLOCKS,
+    DEFAULT_STRUCTURES_REGISTRY,
     BlueprintsBuildOptions,
 )
+from mcblueprints.build.blueprints_build_target import DATA_VERSION_PLACEHOLDER
+from mcblueprints.importer.blueprints_import_options import (
+    DEFAULT_COMPACT_LAYOUT,
+)
+from mcblueprints.importer.blueprints_import_options import (
+    DEFAULT_MATCH_FILES as DEFAULT_IMPORT_MATCH_FILES,
+)
+from mcblueprints.importer.blueprints_import_options import BlueprintsImportOptions
 
 __all__ = ("run",)
 
 
 PROG_NAME = "mcblueprints"
 
+# The same levels as `pyckaxe.utils.LOG_LEVELS`.
+LOG_LEVELS = (
+    "DEBUG",
+    "INFO",
+    "WARNING",
+    "ERROR",
+    "CRITICAL",
+)
+
+
+def asyncify(f: Any) -> Any:
+    """Run an async command to completion."""
+
+    @wraps(f)
+    def wrapper(*args: Any, **kwargs: Any):
+        import asyncio
+
+        return asyncio.run(f(*args, **kwargs))
+
+    return wrapper
+
+
+def print_version(ctx: click.Context, param: click.Parameter, value: bool):
+    # Look the version up only when asked for it.
+    if (not value) or ctx.resilient_parsing:
+        return
+    from mcblueprints import __version__
+
+    click.echo(f"{PROG_NAME}, version {__version__}")
+    ctx.exit()
+
 
 @click.group()
-@click.version_option(__version__, "-v", "--version")
+@click.option(
+    "-v",
+    "--version",
+    is_flag=True,
+    expose_value=False,
+    is_eager=True,
+    callback=print_version,
+    help="Show the version and exit.",
+)
 @click.option(
     "-l",
     "--log",
@@ -41,110 +103,515 @@ PROG_NAME = "mcblueprints"
     help="Whether to use the detailed logging format.",
 )
 def cli(log: str, detailed_logs: bool):
-    setup_logging(level=log.upper(), detailed=detailed_logs)
+    # NOTE This runs before the options of a command (such as `--help`) are parsed, so
+    # logging is set up by each command once it actually starts instead.
+    pass
+
+
+def setup_command_logging():
+    """Set up logging using the options given to the root command."""
+    from pyckaxe.utils import setup_logging
+
+    params = click.get_current_context().find_root().params
+    setup_logging(level=params["log"].upper(), detailed=params["detailed_logs"])
+
+
+# Options for the flatten store, shared with the commands that manage it.
+FLATTEN_STORE_OPTION = click.option(
+    "--flatten_store",
+    "flatten_store_path",
+    type=click.Path(file_okay=False, resolve_path=True),
+    callback=lambda ctx, param, value: Path(value) if value else None,
+    help="The path to a directory to keep blueprints included in others in, once"
+    + " they're flattened and filtered, keyed by a hash of every file they depend"
+    + " on. Later builds load them back instead of flattening them again, so long"
+    + " as none of those files changed. The directory can be shared between builds,"
+    + " and cached between runs on CI.",
+)
+
+FLATTEN_STORE_SIZE_OPTION = click.option(
+    "--flatten_store_size",
+    "flatten_store_size",
+    type=int,
+    help="The most bytes the flatten store may take up. The least recently used"
+    + " entries are pruned at the end of each build until the rest fit."
+    + " Set to -1 to never prune the store."
+    + f" Defaults to: {DEFAULT_FLATTEN_STORE_SIZE}",
+)
+
+
+BUILD_OPTIONS = (
+    click.option(
+        "--input",
+        "input_path",
+        type=click.Path(exists=True, resolve_path=True),
+        callback=lambda ctx, param, value: Path(value) if value else None,
+        help="The path to the data pack to read the input. May be a zip archive.",
+    ),
+    click.option(
+        "--output",
+        "output_path",
+        type=click.Path(resolve_path=True),
+        callback=lambda ctx, param, value: Path(value) if value else None,
+        help="The path to the data pack to dump the output."
+        + " Ending it in .zip will stream the output into a zip archive."
+        + f" Any `{DATA_VERSION_PLACEHOLDER}` is replaced with the data version.",
+    ),
+    click.option(
+        "--data_version",
+        "data_versions",
+        type=int,
+        multiple=True,
+        help="The data version to use in generated structures."
+        + " May be given more than once to build for several versions in one run,"
+        + " in which case `--output` or `--generated_prefix` must contain"
+        + f" `{DATA_VERSION_PLACEHOLDER}` to tell the outputs apart.",
+    ),
+    click.option(
+        "--match_files",
+        "match_files",
+        type=str,
+        help="The glob pattern to match files against."
+        + f" Defaults to: {DEFAULT_MATCH_FILES}",
+    ),
+    click.option(
+        "--target",
+        "target_patterns",
+        type=str,
+        multiple=True,
+        help="The location of a blueprint to build, like `namespace:path`, where any"
+        + " part may be a glob (with `**` matching any number of directories)."
+        + " May be given more than once. Only the matching blueprints (and whatever"
+        + " they include) are loaded and built, instead of every blueprint in the"
+        + " pack.",
+    ),
+    click.option(
+        "--blueprints_registry",
+        "blueprints_registry",
+        type=str,
+        help="The registry where custom blueprints are located."
+        + f" Defaults to: {DEFAULT_BLUEPRINTS_REGISTRY}",
+    ),
+    click.option(
+        "--filters_registry",
+        "filters_registry",
+        type=str,
+        help="The registry where custom filters are located."
+        + f" Defaults to: {DEFAULT_FILTERS_REGISTRY}",
+    ),
+    click.option(
+        "--materials_registry",
+        "materials_registry",
+        type=str,
+        help="The registry where custom materials are located."
+        + f" Defaults to: {DEFAULT_MATERIALS_REGISTRY}",
+    ),
+    click.option(
+        "--structures_registry",
+        "structures_registry",
+        type=str,
+        help="The registry where existing structures to include are located."
+        + f" Defaults to: {DEFAULT_STRUCTURES_REGISTRY}",
+    ),
+    click.option(
+        "--blueprint_cache_size",
+        type=int,
+        help="The maximum number of blueprints to keep cached in memory."
+        + "Set to 0 to disable caching. Set to -1 for an unbounded cache."
+        + f" Defaults to: {DEFAULT_BLUEPRINT_CACHE_SIZE}",
+    ),
+    click.option(
+        "--filter_cache_size",
+        type=int,
+        help="The maximum number of filters to keep cached in memory."
+        + "Set to 0 to disable caching. Set to -1 for an unbounded cache."
+        + f" Defaults to: {DEFAULT_FILTER_CACHE_SIZE}",
+    ),
+    click.option(
+        "--material_cache_size",
+        type=int,
+        help="The maximum number of materials to keep cached in memory."
+        + "Set to 0 to disable caching. Set to -1 for an unbounded cache."
+        + f" Defaults to: {DEFAULT_MATERIAL_CACHE_SIZE}",
+    ),
+    click.option(
+        "--structure_cache_size",
+        type=int,
+        help="The maximum number of included structures to keep cached in memory."
+        + "Set to 0 to disable caching. Set to -1 for an unbounded cache."
+        + f" Defaults to: {DEFAULT_STRUCTURE_CACHE_SIZE}",
+    ),
+    click.option(
+        "--generated_structures_registry",
+        "generated_structures_registry",
+        type=str,
+        help="The registry where vanilla structures are located."
+        + f" Defaults to: {DEFAULT_GENERATED_STRUCTURES_REGISTRY}",
+    ),
+    click.option(
+        "--generated_namespace",
+        "generated_namespace",
+        type=str,
+        help="A separate namespace to use for generated resources.",
+    ),
+    click.option(
+        "--generated_prefix",
+        "generated_prefix",
+        type=str,
+        help="A prefix to apply to the locations of generated resources."
+        + f" Any `{DATA_VERSION_PLACEHOLDER}` is replaced with the data version.",
+    ),
+    click.option(
+        "--skip_unchanged/--no_skip_unchanged",
+        "skip_unchanged",
+        default=DEFAULT_SKIP_UNCHANGED,
+        help="Whether to leave structure files alone if their bytes haven't changed."
+        + " Each file is read back to compare it, unless `--hash_index` is given."
+        + f" Defaults to: {DEFAULT_SKIP_UNCHANGED}",
+    ),
+    click.option(
+        "--hash_index",
+        "hash_index_path",
+        type=click.Path(file_okay=False, resolve_path=True),
+        callback=lambda ctx, param, value: Path(value) if value else None,
+        help="The path to a directory to keep an index of the hashes of structure files"
+        + " in, one for each output pack, so that unchanged files needn't be read back"
+        + " to tell. Keep it out of the output pack, so it isn't shipped along with it.",
+    ),
+    click.option(
+        "--prefetch_concurrency",
+        "prefetch_concurrency",
+        type=click.IntRange(min=0),
+        help="The most resources to load at once when prefetching everything a"
+        + " blueprint depends on, before flattening it. Set to 0 to disable"
+        + " prefetching."
+        + f" Defaults to: {DEFAULT_PREFETCH_CONCURRENCY}",
+    ),
+    click.option(
+        "--out_of_core_volume",
+        "out_of_core_volume",
+        type=click.IntRange(min=0),
+        help="Flatten blueprints with at least this many cells (width times height"
+        + " times length) into memory-mapped temporary files, rather than into memory,"
+        + " and decode structure files that big into them too."
+        + " Files go in the system's temporary directory (`TMPDIR`). Set to 0"
+        + f" to disable. Defaults to: {DEFAULT_OUT_OF_CORE_VOLUME}",
+    ),
+    click.option(
+        "--flatten_threads",
+        "flatten_threads",
+        type=click.IntRange(min=0),
+        help="Flatten the largest blueprints a layer at a time, writing each palette"
+        + " entry to a whole layer at once, with this many threads splitting the layers"
+        + " between them. One thread is already several times faster than flattening"
+        + " as usual, and more only help with cores to spare. The order blocks were"
+        + " set in is lost, so this needs a `--block_order` other than `insertion`."
+        + f" Set to 0 to disable. Defaults to: {DEFAULT_FLATTEN_THREADS}",
+    ),
+    click.option(
+        "--parallel_flatten_volume",
+        "parallel_flatten_volume",
+        type=click.IntRange(min=0),
+        help="Flatten blueprints with at least this many cells (width times height"
+        + " times length) a layer at a time, if `--flatten_threads` allows it."
+        + f" Defaults to: {DEFAULT_PARALLEL_FLATTEN_VOLUME}",
+    ),
+    click.option(
+        "--flatten_stats",
+        "flatten_stats_path",
+        type=click.Path(dir_okay=False, resolve_path=True),
+        callback=lambda ctx, param, value: Path(value) if value else None,
+        help="The path to a JSON file to dump counts of the cells written, overwritten,"
+        + " voided and dropped by filters while flattening each blueprint and each"
+        + " blueprint it includes. The most wasteful are also logged, as a table."
+        + " Blueprints flatten on a single thread while they're being counted.",
+    ),
+    FLATTEN_STORE_OPTION,
+    FLATTEN_STORE_SIZE_OPTION,
+    click.option(
+        "--structure_void/--no_structure_void",
+        "structure_void",
+        default=None,
+        help="Whether to leave the blocks given by `--structure_void_block` out of"
+        + " structures, so that they act as structure void when placed. Blueprints"
+        + " may choose for themselves with `structure_void`."
+        + f" Defaults to: {DEFAULT_STRUCTURE_VOID}",
+    ),
+    click.option(
+        "--structure_void_block",
+        "structure_void_blocks",
+        type=str,
+        multiple=True,
+        help="The name of a block to leave out of structures, whatever its state."
+        + " May be given more than once."
+        + f" Defaults to: {', '.join(DEFAULT_STRUCTURE_VOID_BLOCKS)}",
+    ),
+    click.option(
+        "--block_order",
+        "block_order",
+        type=click.Choice(BLOCK_ORDERS),
+        help="How to order the blocks in each structure: in the order they were set in"
+        + " while flattening (`insertion`), by `position`, so that equal structures"
+        + " always give identical files, or grouped by `palette` entry (with the most"
+        + " used entries first) and then by position. Which is smallest depends on the"
+        + " pack, so use `--compare_block_orders` to measure it."
+        + f" Defaults to: {DEFAULT_BLOCK_ORDER}",
+    ),
+    click.option(
+        "--compare_block_orders/--no_compare_block_orders",
+        "compare_block_orders",
+        default=None,
+        help="Whether to also measure each structure with its blocks in the order they"
+        + " were set in, as they're written by default, and log how many bytes it takes"
+        + " up either way. This encodes every structure twice."
+        + f" Defaults to: {DEFAULT_COMPARE_BLOCK_ORDERS}",
+    ),
+)
+
+
+# Options that every build needs, unless they're given some other way.
+REQUIRED_BUILD_OPTIONS = {
+    "input_path": "--input",
+    "output_path": "--output",
+    "data_versions": "--data_version",
+}
+
+
+def build_options(f: Any) -> Any:
+    """Apply the options shared by every command that builds a pack."""
+    for option in reversed(BUILD_OPTIONS):
+        f = option(f)
+    return f
+
+
+def filter_build_args(kwargs: Any) -> Any:
+    """Drop any build options that weren't given, so that their defaults apply."""
+    return {k: v for k, v in kwargs.items() if (v is not None) and (v != ())}
+
+
+def make_build_options(kwargs: Any) -> BlueprintsBuildOptions:
+    """Create build options from the command line, requiring the usual options."""
+    filtered_args = filter_build_args(kwargs)
+    for key, option_name in REQUIRED_BUILD_OPTIONS.items():
+        if key not in filtered_args:
+            raise click.UsageError(f"Missing option '{option_name}'")
+    try:
+        return BlueprintsBuildOptions(**filtered_args)
+    except ValueError as ex:
+        raise click.UsageError(str(ex)) from ex
 
 
 @cli.command(
     "build",
     help="Build Minecraft structures from mcblueprints.",
 )
+@build_options
+@click.option(
+    "--manifest",
+    "manifest_path",
+    type=click.Path(exists=True, dir_okay=False, resolve_path=True),
+    callback=lambda ctx, param, value: Path(value) if value else None,
+    help="The path to a YAML manifest listing several packs to build in one run,"
+    + " sharing caches between them. Other options apply to every pack, unless the"
+    + " manifest overrides them.",
+)
+@click.option(
+    "--jobs",
+    "jobs",
+    type=click.IntRange(min=1),
+    help="The number of packs in the manifest to build at once."
+    + f" Defaults to: {DEFAULT_MANIFEST_JOBS}",
+)
+@asyncify
+async def cli_build(manifest_path: Optional[Path], jobs: Optional[int], **kwargs: Any):
+    if manifest_path is not None:
+        await build_manifest(manifest_path, jobs, kwargs)
+        return
+    if jobs is not None:
+        raise click.UsageError("Option '--jobs' requires '--manifest'")
+    options = make_build_options(kwargs)
+    setup_command_logging()
+    from mcblueprints.build.blueprints_build_context import BlueprintsBuildContext
+    from mcblueprints.build.blueprints_build_selector import MissingBuildTarget
+
+    ctx = BlueprintsBuildContext(options)
+    try:
+        await ctx.build()
+    except MissingBuildTarget as ex:
+        raise click.UsageError(str(ex)) from ex
+    finally:
+        ctx.close()
+
+
+async def build_manifest(manifest_path: Path, jobs: Optional[int], kwargs: Any):
+    setup_command_logging()
+    from mcblueprints.build.blueprints_batch_build_context import (
+        BlueprintsBatchBuildContext,
+    )
+    from mcblueprints.build.blueprints_build_manifest import (
+        BlueprintsBuildManifest,
+        MalformedBuildManifest,
+    )
+
+    try:
+        manifest = BlueprintsBuildManifest.load(
+            manifest_path, defaults=filter_build_args(kwargs), jobs=jobs
+        )
+    except MalformedBuildManifest as ex:
+        raise click.UsageError(f"Invalid manifest {manifest_path}: {ex}") from ex
+    ctx = BlueprintsBatchBuildContext(manifest)
+    try:
+        await ctx.build()
+    finally:
+        ctx.close()
+    if ctx.failed:
+        raise click.ClickException(f"Failed to build {ctx.failed} packs")
+
+
+@cli.command(
+    "serve",
+    help="Serve build requests over JSON-RPC, keeping caches warm in between.",
+)
+@build_options
+@click.option(
+    "--socket",
+    "socket_path",
+    type=click.Path(resolve_path=True),
+    callback=lambda ctx, param, value: Path(value) if value else None,
+    help="The path of a local socket to listen on. Defaults to using stdin/stdout.",
+)
+@asyncify
+async def cli_serve(socket_path: Optional[Path], **kwargs: Any):
+    options = make_build_options(kwargs)
+    if options.input_is_archive or options.output_is_archive:
+        raise click.UsageError("Cannot serve builds to or from a zip archive")
+    setup_command_logging()
+    from mcblueprints.build.blueprints_build_context import BlueprintsBuildContext
+    from mcblueprints.serve.blueprints_build_server import BlueprintsBuildServer
+
+    ctx = BlueprintsBuildContext(options)
+    try:
+        server = BlueprintsBuildServer(ctx)
+        if socket_path is not None:
+            await server.serve_socket(socket_path)
+        else:
+            await server.serve_stdio()
+    finally:
+        ctx.close()
+
+
+@cli.command(
+    "import",
+    help="Decompile Minecraft structure files into mcblueprints.",
+)
 @click.option(
     "--input",
     "input_path",
-    type=click.Path(exists=True, resolve_path=True),
+    type=click.Path(exists=True, file_okay=False, resolve_path=True),
     required=True,
     callback=lambda ctx, param, value: Path(value),
-    help="The path to the data pack to read the input.",
+    help="The directory of structure files to read, searched recursively.",
 )
 @click.option(
     "--output",
     "output_path",
-    type=click.Path(resolve_path=True),
+    type=click.Path(file_okay=False, resolve_path=True),
     required=True,
     callback=lambda ctx, param, value: Path(value),
-    help="The path to the data pack to dump the output.",
-)
-@click.option(
-    "--data_version",
-    "data_version",
-    type=int,
-    required=True,
-    help="The data version to use in generated structures.",
+    help="The directory to write blueprints into, mirroring the input directory.",
 )
 @click.option(
     "--match_files",
     "match_files",
     type=str,
-    help="The glob pattern to match files against."
-    + f" Defaults to: {DEFAULT_MATCH_FILES}",
+    help="The glob pattern to match structure files against."
+    + f" Defaults to: {DEFAULT_IMPORT_MATCH_FILES}",
 )
 @click.option(
-    "--blueprints_registry",
-    "blueprints_registry",
-    type=str,
-    help="The registry where custom blueprints are located."
-    + f" Defaults to: {DEFAULT_BLUEPRINTS_REGISTRY}",
-)
-@click.option(
-    "--filters_registry",
-    "filters_registry",
-    type=str,
-    help="The registry where custom filters are located."
-    + f" Defaults to: {DEFAULT_FILTERS_REGISTRY}",
-)
-@click.option(
-    "--materials_registry",
-    "materials_registry",
-    type=str,
-    help="The registry where custom materials are located."
-    + f" Defaults to: {DEFAULT_MATERIALS_REGISTRY}",
-)
-@click.option(
-    "--blueprint_cache_size",
-    type=int,
-    help="The maximum number of blueprints to keep cached in memory."
-    + "Set to 0 to disable caching. Set to -1 for an unbounded cache."
-    + f" Defaults to: {DEFAULT_BLUEPRINT_CACHE_SIZE}",
+    "--jobs",
+    "jobs",
+    type=click.IntRange(min=1),
+    help="The number of structures to import in parallel."
+    + " Defaults to the number of CPUs.",
 )
 @click.option(
-    "--filter_cache_size",
-    type=int,
-    help="The maximum number of filters to keep cached in memory."
-    + "Set to 0 to disable caching. Set to -1 for an unbounded cache."
-    + f" Defaults to: {DEFAULT_FILTER_CACHE_SIZE}",
+    "--compact_layout/--no_compact_layout",
+    "compact_layout",
+    default=DEFAULT_COMPACT_LAYOUT,
+    help="Whether to write layout rows as runs of repeated symbols."
+    + f" Defaults to: {DEFAULT_COMPACT_LAYOUT}",
 )
-@click.option(
-    "--material_cache_size",
-    type=int,
-    help="The maximum number of materials to keep cached in memory."
-    + "Set to 0 to disable caching. Set to -1 for an unbounded cache."
-    + f" Defaults to: {DEFAULT_MATERIAL_CACHE_SIZE}",
-)
-@click.option(
-    "--generated_structures_registry",
-    "generated_structures_registry",
-    type=str,
-    help="The registry where vanilla structures are located."
-    + f" Defaults to: {DEFAULT_GENERATED_STRUCTURES_REGISTRY}",
+def cli_import(**kwargs: Any):
+    filtered_args = {k: v for k, v in kwargs.items() if v is not None}
+    options = BlueprintsImportOptions(**filtered_args)
+    setup_command_logging()
+    from mcblueprints.importer.blueprints_import_context import (
+        BlueprintsImportContext,
+    )
+
+    ctx = BlueprintsImportContext(options)
+    ctx.run()
+    if ctx.failed:
+        raise click.ClickException(f"Failed to import {ctx.failed} structures")
+
+
+@cli.group(
+    "cache",
+    help="Inspect or prune the store of flattened blueprints kept by"
+    + " `--flatten_store`.",
 )
-@click.option(
-    "--generated_namespace",
-    "generated_namespace",
-    type=str,
-    help="A separate namespace to use for generated resources.",
+def cli_cache():
+    pass
+
+
+def open_flatten_store(flatten_store_path: Optional[Path]) -> Any:
+    """Open the flatten store at the given path, which is required."""
+    if flatten_store_path is None:
+        raise click.UsageError("Missing option '--flatten_store'")
+    from mcblueprints.lib import BlueprintFlattenStore
+
+    return BlueprintFlattenStore(path=flatten_store_path)
+
+
+def format_timestamp(timestamp: Optional[float]) -> str:
+    if timestamp is None:
+        return "never"
+    return datetime.fromtimestamp(timestamp).isoformat(sep=" ", timespec="seconds")
+
+
+@cli_cache.command(
+    "stats",
+    help="Show how many entries the flatten store holds, and how much space they take.",
 )
-@click.option(
-    "--generated_prefix",
-    "generated_prefix",
-    type=str,
-    help="A prefix to apply to the locations of generated resources.",
+@FLATTEN_STORE_OPTION
+def cli_cache_stats(flatten_store_path: Optional[Path]):
+    store = open_flatten_store(flatten_store_path)
+    stats = store.stats()
+    click.echo(f"Entries: {stats.entries}")
+    click.echo(f"Size: {stats.size} bytes")
+    click.echo(f"Least recently used: {format_timestamp(stats.oldest)}")
+    click.echo(f"Most recently used: {format_timestamp(stats.newest)}")
+
+
+@cli_cache.command(
+    "prune",
+    help="Remove the least recently used entries from the flatten store, until the rest"
+    + " fit within `--flatten_store_size`.",
 )
-@asyncify
-async def cli_build(**kwargs: Any):
-    filtered_args = {k: v for k, v in kwargs.items() if v is not None}
-    options = BlueprintsBuildOptions(**filtered_args)
-    ctx = BlueprintsBuildContext(options)
-    await ctx.build()
+@FLATTEN_STORE_OPTION
+@FLATTEN_STORE_SIZE_OPTION
+def cli_cache_prune(
+    flatten_store_path: Optional[Path], flatten_store_size: Optional[int]
+):
+    store = open_flatten_store(flatten_store_path)
+    if flatten_store_size is None:
+        flatten_store_size = DEFAULT_FLATTEN_STORE_SIZE
+    if flatten_store_size < 0:
+        raise click.UsageError("Expected a non-negative '--flatten_store_size'")
+    removed = store.prune(flatten_store_size)
+    stats = store.stats()
+    click.echo(f"Pruned {removed.entries} entries ({removed.size} bytes)")
+    click.echo(f"Kept {stats.entries} entries ({stats.size} bytes)")
 
 
 def run():
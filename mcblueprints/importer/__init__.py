@@ -0,0 +1,27 @@
+# NOTE Exports are imported lazily, so that the CLI can import the options (and their
+# defaults) without also importing everything needed to run an import.
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from .blueprints_import_context import BlueprintsImportContext
+    from .blueprints_import_options import BlueprintsImportOptions
+
+__all__ = (
+    "BlueprintsImportContext",
+    "BlueprintsImportOptions",
+)
+
+
+# The module that defines each export.
+EXPORTS = {
+    "BlueprintsImportContext": ".blueprints_import_context",
+    "BlueprintsImportOptions": ".blueprints_import_options",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if (module_name := EXPORTS.get(name)) is not None:
+        return getattr(import_module(module_name, __name__), name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -0,0 +1,157 @@
+import mmap
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from dataclasses import dataclass, field
+from logging import Logger, getLogger
+from pathlib import Path
+from typing import Any, Dict, Iterable, Set, Tuple, cast
+
+import yaml
+
+from mcblueprints.importer.blueprints_import_options import (
+    DEFAULT_PENDING_PER_JOB,
+    BlueprintsImportOptions,
+)
+from mcblueprints.lib import BlueprintDecompiler, StructureNbtDecoder
+
+__all__ = ("BlueprintsImportContext",)
+
+
+DEFAULT = cast(Any, ...)
+
+BLUEPRINT_SUFFIX = ".yaml"
+
+# The widest a line of YAML may be, which is as wide as the C dumper allows, so that
+# long layout rows are never wrapped.
+YAML_WIDTH = 2147483647
+
+
+# Use the C dumper if it's available, since it's a lot faster.
+class BlueprintYamlDumper(getattr(yaml, "CSafeDumper", yaml.SafeDumper)):
+    pass
+
+
+class FlowList(list):
+    """A list to be dumped inline, like `[9, 6, 9]`."""
+
+
+BlueprintYamlDumper.add_representer(
+    FlowList,
+    lambda dumper, data: dumper.represent_sequence(
+        "tag:yaml.org,2002:seq", data, flow_style=True
+    ),
+)
+
+
+def dump_blueprint_yaml(raw_blueprint: Any) -> bytes:
+    """Dump raw blueprint data into YAML, the same way every time."""
+    raw_blueprint = dict(raw_blueprint, size=FlowList(raw_blueprint["size"]))
+    return yaml.dump(
+        raw_blueprint,
+        Dumper=BlueprintYamlDumper,
+        sort_keys=False,
+        allow_unicode=True,
+        width=YAML_WIDTH,
+        encoding="utf-8",
+    )
+
+
+def import_structure_file(
+    decoder: StructureNbtDecoder,
+    decompiler: BlueprintDecompiler,
+    input_path: Path,
+    output_path: Path,
+) -> bool:
+    """
+    Decompile the structure at `input_path` into a blueprint at `output_path`.
+
+    Runs in a worker process. Returns whether the blueprint was (re)written, which it
+    isn't if the file is already up-to-date.
+    """
+    with open(input_path, "rb") as fp:
+        with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            structure = decoder(data)
+    data = dump_blueprint_yaml(decompiler(structure))
+    if output_path.is_file() and (output_path.read_bytes() == data):
+        return False
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    output_path.write_bytes(data)
+    return True
+
+
+@dataclass
+class BlueprintsImportContext:
+    options: BlueprintsImportOptions
+
+    log: Logger = field(init=False, default=DEFAULT)
+
+    decoder: StructureNbtDecoder = field(init=False, default=DEFAULT)
+    decompiler: BlueprintDecompiler = field(init=False, default=DEFAULT)
+
+    written: int = field(init=False, default=0)
+    skipped: int = field(init=False, default=0)
+    failed: int = field(init=False, default=0)
+
+    def __str__(self) -> str:
+        return self.options.output_path.name
+
+    def __post_init__(self):
+        # Create a logger.
+        self.log = getLogger(f"{self}")
+
+        # Create the decoder and decompiler, which get sent along to each worker.
+        self.decoder = StructureNbtDecoder()
+        self.decompiler = BlueprintDecompiler(
+            compact_layout=self.options.compact_layout
+        )
+
+    def iter_files(self) -> Iterable[Tuple[Path, Path]]:
+        """Yield the path of each structure to import, along with its blueprint."""
+        input_path = self.options.input_path
+        output_path = self.options.output_path
+        for path in sorted(input_path.rglob(self.options.match_files)):
+            if path.is_file():
+                relative_path = path.relative_to(input_path)
+                yield path, (output_path / relative_path).with_suffix(BLUEPRINT_SUFFIX)
+
+    def _collect(self, done: Set[Future[bool]], input_paths: Dict[Future[bool], Path]):
+        for future in done:
+            input_path = input_paths.pop(future)
+            try:
+                if future.result():
+                    self.written += 1
+                else:
+                    self.skipped += 1
+            except Exception as ex:
+                self.failed += 1
+                self.log.error(f"Failed to import structure {input_path}: {ex}")
+
+    def run(self):
+        """Import every structure in the input directory, in parallel."""
+        self.written = self.skipped = self.failed = 0
+        jobs = self.options.jobs or os.cpu_count() or 1
+        # Only keep a few structures in flight per worker, so that memory stays bounded
+        # no matter how many files there are.
+        max_pending = jobs * DEFAULT_PENDING_PER_JOB
+        pending: Set[Future[bool]] = set()
+        input_paths: Dict[Future[bool], Path] = {}
+        with ProcessPoolExecutor(max_workers=jobs) as executor:
+            for input_path, output_path in self.iter_files():
+                if len(pending) >= max_pending:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    self._collect(done, input_paths)
+                future = executor.submit(
+                    import_structure_file,
+                    self.decoder,
+                    self.decompiler,
+                    input_path,
+                    output_path,
+                )
+                input_paths[future] = input_path
+                pending.add(future)
+            done, _ = wait(pending)
+            self._collect(done, input_paths)
+        self.log.info(
+            f"Imported {self.written} structures, skipped {self.skipped} unchanged,"
+            + f" {self.failed} failed"
+        )
@@ -0,0 +1,39 @@
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+__all__ = ("BlueprintsImportOptions",)
+
+
+DEFAULT_MATCH_FILES = "*.nbt"
+
+DEFAULT_COMPACT_LAYOUT = False
+
+# How many structures to have in flight per worker, to keep workers busy without
+# holding onto more than a few results at once.
+DEFAULT_PENDING_PER_JOB = 2
+
+
+@dataclass
+class BlueprintsImportOptions:
+    input_path: Path
+    output_path: Path
+
+    match_files: str = DEFAULT_MATCH_FILES
+
+    jobs: Optional[int] = None
+
+    compact_layout: bool = DEFAULT_COMPACT_LAYOUT
+
+    def __post_init__(self):
+        # Make sure the paths are absolute.
+        if not self.input_path.is_absolute():
+            raise ValueError(
+                f"Expected absolute input path, but got: {self.input_path}"
+            )
+        if not self.output_path.is_absolute():
+            raise ValueError(
+                f"Expected absolute output path, but got: {self.output_path}"
+            )
+        if (self.jobs is not None) and (self.jobs < 1):
+            raise ValueError(f"Expected at least one job, but got: {self.jobs}")
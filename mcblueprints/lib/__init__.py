@@ -1 +1,34 @@
-from .resource import *
+# NOTE Everything in here depends on pyckaxe, which is slow to import. Subpackages are
+# only imported once one of their names is used, so that importing `mcblueprints` (or
+# running a CLI command that doesn't need them) stays fast.
+
+from importlib import import_module
+from typing import TYPE_CHECKING, Any, List
+
+if TYPE_CHECKING:
+    from .pack import *
+    from .resource import *
+
+
+# The subpackages whose names are exported, in the order they're searched.
+SUBPACKAGES = (".pack", ".resource")
+
+
+def __getattr__(name: str) -> Any:
+    if not name.startswith("_"):
+        for subpackage_name in SUBPACKAGES:
+            subpackage = import_module(subpackage_name, __name__)
+            if name in vars(subpackage):
+                value = getattr(subpackage, name)
+                # Remember it, so that this is only done once per name.
+                globals()[name] = value
+                return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def __dir__() -> List[str]:
+    names = set(globals())
+    for subpackage_name in SUBPACKAGES:
+        subpackage = import_module(subpackage_name, __name__)
+        names.update(n for n in vars(subpackage) if not n.startswith("_"))
+    return sorted(names)
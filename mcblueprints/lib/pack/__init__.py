@@ -0,0 +1,15 @@
+from .coalescing_resource_resolver import *
+from .hashed_nbt_resource_dumper import *
+from .memory_resource_resolver import *
+from .mmap_nbt_resource_loader import *
+from .output_hash_index import *
+from .resource_encoder import *
+from .streaming_resource_dumper import *
+from .writable_pack_group import *
+from .zip_archive import *
+from .zip_archive_writer import *
+from .zip_nbt_resource_dumper import *
+from .zip_nbt_resource_loader import *
+from .zip_pack import *
+from .zip_resource_loader import *
+from .zip_resource_scanner import *
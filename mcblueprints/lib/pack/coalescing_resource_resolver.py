@@ -0,0 +1,47 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Dict, Generic, TypeVar
+
+from pyckaxe import CommonResourceResolver, PhysicalResourceLocation, Resource
+
+__all__ = (
+    "PendingResourceLoads",
+    "CoalescingResourceResolver",
+)
+
+
+ResourceType = TypeVar("ResourceType", bound=Resource)
+
+PendingResourceLoads = Dict[PhysicalResourceLocation, "asyncio.Future[Any]"]
+
+
+# @implements ResourceResolver
+@dataclass
+class CoalescingResourceResolver(
+    CommonResourceResolver[ResourceType], Generic[ResourceType]
+):
+    """
+    Resolves and loads a resource, sharing loads of the same resource that overlap.
+
+    Without this, resolving a resource that's already being loaded (but isn't cached
+    yet) loads it a second time. Resolvers that share a cache can also share `pending`,
+    so that none of them load the same file at once.
+
+    Attributes
+    ----------
+    pending
+        The loads in progress, by absolute location.
+    """
+
+    pending: PendingResourceLoads = field(kw_only=True, default_factory=dict)
+
+    # @overrides CommonResourceResolver
+    async def _reload_resource(
+        self, location: PhysicalResourceLocation
+    ) -> ResourceType:
+        if (pending := self.pending.get(location)) is None:
+            pending = asyncio.ensure_future(super()._reload_resource(location))
+            self.pending[location] = pending
+            pending.add_done_callback(lambda _: self.pending.pop(location, None))
+        # NOTE Shield the load, so that cancelling one caller doesn't fail the others.
+        return await asyncio.shield(pending)
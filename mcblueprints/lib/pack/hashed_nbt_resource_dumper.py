@@ -0,0 +1,104 @@
+import asyncio
+from dataclasses import dataclass, field
+from logging import Logger, getLogger
+from pathlib import Path
+from typing import Generic, Optional, TypeVar
+
+from pyckaxe import PhysicalResourceLocation, Resource
+from pyckaxe.lib.pack.resource_dumper.errors import (
+    FailedToDumpResourceError,
+    NonFileResourceExistsError,
+    ResourceDumperError,
+)
+
+from mcblueprints.lib.pack.output_hash_index import OutputHashIndex
+from mcblueprints.lib.pack.resource_encoder import ResourceEncoder
+
+__all__ = ("HashedNbtResourceDumper",)
+
+
+ResourceType = TypeVar("ResourceType", bound=Resource)
+
+
+# @implements ResourceDumper
+@dataclass
+class HashedNbtResourceDumper(Generic[ResourceType]):
+    """
+    Dumps a resource as a gzipped NBT file, unless the file already has those bytes.
+
+    The freshly-encoded bytes are compared against the existing file, which is only read
+    if it's the same size. Given an `index`, they're hashed and compared against the
+    file's hash instead, taken from the index if it's up-to-date or else by reading the
+    file. Unchanged files are left untouched, so their modification times don't change
+    either.
+
+    Attributes
+    ----------
+    encoder
+        Encodes a resource into the bytes of a gzipped NBT file.
+    index
+        An index of previously-written hashes, if any.
+    suffix
+        The file extension to use.
+    """
+
+    encoder: ResourceEncoder[ResourceType]
+    index: Optional[OutputHashIndex] = None
+    suffix: str = ".nbt"
+
+    written: int = field(init=False, default=0)
+    skipped: int = field(init=False, default=0)
+
+    log: Logger = field(init=False, default_factory=lambda: getLogger(__name__))
+
+    # @implements ResourceDumper
+    async def __call__(
+        self, resource: ResourceType, location: PhysicalResourceLocation
+    ):
+        await self.dump(resource, location)
+
+    def _dump_sync(self, resource: ResourceType, path: Path) -> bool:
+        data = self.encoder(resource)
+        if self.index is None:
+            return self._dump_bytes(data, path)
+        new_hash = self.index.hash_bytes(data)
+        if path.exists():
+            if not path.is_file():
+                raise NonFileResourceExistsError(path)
+            stat = path.stat()
+            old_hash = self.index.get_hash(path, stat)
+            if old_hash is None and stat.st_size == len(data):
+                old_hash = self.index.hash_bytes(path.read_bytes())
+            if old_hash == new_hash:
+                self.index.set_hash(path, stat, new_hash)
+                return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        self.index.set_hash(path, path.stat(), new_hash)
+        return True
+
+    def _dump_bytes(self, data: bytes, path: Path) -> bool:
+        if path.exists():
+            if not path.is_file():
+                raise NonFileResourceExistsError(path)
+            if (path.stat().st_size == len(data)) and (path.read_bytes() == data):
+                return False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return True
+
+    async def dump(self, resource: ResourceType, location: PhysicalResourceLocation):
+        """Dump `resource` to `location`, if its bytes have changed."""
+        path = location.path.with_suffix(self.suffix)
+        try:
+            loop = asyncio.get_running_loop()
+            changed = await loop.run_in_executor(None, self._dump_sync, resource, path)
+        except ResourceDumperError:
+            raise
+        except Exception as ex:
+            raise FailedToDumpResourceError(path) from ex
+        if changed:
+            self.written += 1
+        else:
+            self.skipped += 1
+            self.log.debug(f"Skipped unchanged file: {path}")
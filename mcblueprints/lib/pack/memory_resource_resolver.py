@@ -0,0 +1,86 @@
+from dataclasses import dataclass, field
+from typing import Any, Coroutine, Dict, Generic, Iterator, TypeVar, Union
+
+from pyckaxe import Resource, ResourceDeserializer, ResourceLocation
+
+__all__ = (
+    "MemoryResourceNotFound",
+    "MemoryResourceResolver",
+)
+
+
+ResourceType = TypeVar("ResourceType", bound=Resource)
+
+
+class MemoryResourceNotFound(Exception):
+    def __init__(self, location: ResourceLocation):
+        super().__init__(f"No in-memory resource at: {location}")
+
+
+# @implements ResourceResolver
+@dataclass
+class MemoryResourceResolver(Generic[ResourceType]):
+    """
+    Resolves a resource from a mapping of in-memory resources.
+
+    Resources may be added either as raw data, which is deserialized the first time it
+    is resolved, or as already-built resource objects.
+
+    Attributes
+    ----------
+    deserializer
+        Turns raw data into a resource.
+    """
+
+    deserializer: ResourceDeserializer[ResourceType, Any]
+
+    _raw: Dict[ResourceLocation, Any] = field(init=False, default_factory=dict)
+    _resources: Dict[ResourceLocation, ResourceType] = field(
+        init=False, default_factory=dict
+    )
+
+    # @implements ResourceResolver
+    def __call__(
+        self, location: ResourceLocation
+    ) -> Coroutine[None, None, ResourceType]:
+        return self.resolve(location)
+
+    def __contains__(self, location: ResourceLocation) -> bool:
+        location = ResourceLocation.declassify(location)
+        return (location in self._resources) or (location in self._raw)
+
+    def __iter__(self) -> Iterator[ResourceLocation]:
+        yield from self._resources
+        yield from self._raw
+
+    def add(self, location: Union[ResourceLocation, str], value: Any):
+        """Add a resource, or its raw data, at `location`."""
+        if isinstance(location, str):
+            location = ResourceLocation.from_string(location)
+        location = ResourceLocation.declassify(location)
+        self._resources.pop(location, None)
+        self._raw.pop(location, None)
+        if isinstance(value, Resource):
+            self._resources[location] = value
+        else:
+            self._raw[location] = value
+
+    def update(self, values: Dict[Any, Any]):
+        """Add several resources at once, keyed by location."""
+        for location, value in values.items():
+            self.add(location, value)
+
+    async def resolve(self, location: ResourceLocation) -> ResourceType:
+        """Resolve `location` into a resource."""
+        location = ResourceLocation.declassify(location)
+        if (resource := self._resources.get(location)) is not None:
+            return resource
+        if location not in self._raw:
+            raise MemoryResourceNotFound(location)
+        # Deserialize raw data once, and keep the result around for next time. The raw
+        # data is only dropped once it's deserialized, so that resolving it again
+        # raises the same error, if any.
+        resource = self.deserializer(self._raw[location])
+        self._resources[location] = resource
+        del self._raw[location]
+        return resource
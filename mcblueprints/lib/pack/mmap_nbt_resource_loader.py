@@ -0,0 +1,66 @@
+import asyncio
+import mmap
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Coroutine, Generic, TypeVar
+
+from pyckaxe import PhysicalResourceLocation, Resource, ResourceDeserializer
+from pyckaxe.lib.pack.resource_loader.errors import (
+    FailedToLoadResourceError,
+    NoSuchResourceError,
+    ResourceLoaderError,
+)
+
+__all__ = ("MmapNbtResourceLoader",)
+
+
+ResourceType = TypeVar("ResourceType", bound=Resource)
+
+
+# @implements ResourceLoader
+@dataclass
+class MmapNbtResourceLoader(Generic[ResourceType]):
+    """
+    Loads a resource from an NBT file by memory-mapping it.
+
+    The file is never read into memory as a whole: the deserializer is handed the
+    mapped file as a bytes-like object, and only the pages it touches are read in.
+
+    Attributes
+    ----------
+    deserializer
+        Turns the raw bytes of a file into a resource.
+    suffix
+        The file extension to use.
+    """
+
+    deserializer: ResourceDeserializer[ResourceType, Any]
+    suffix: str = ".nbt"
+
+    # @implements ResourceLoader
+    def __call__(
+        self, location: PhysicalResourceLocation
+    ) -> Coroutine[None, None, ResourceType]:
+        return self.load(location)
+
+    def _exists(self, path: Path) -> bool:
+        return path.is_file()
+
+    def _load_sync(self, path: Path) -> ResourceType:
+        with open(path, "rb") as fp:
+            # NOTE Empty files can't be mapped, but aren't valid NBT either.
+            with mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return self.deserializer(data)
+
+    async def load(self, location: PhysicalResourceLocation) -> ResourceType:
+        """Load a `Resource` from `location`."""
+        path = location.path.with_suffix(self.suffix)
+        if not self._exists(path):
+            raise NoSuchResourceError(location.path)
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self._load_sync, path)
+        except ResourceLoaderError:
+            raise
+        except Exception as ex:
+            raise FailedToLoadResourceError(path) from ex
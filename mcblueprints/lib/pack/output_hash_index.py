@@ -0,0 +1,80 @@
+import json
+from dataclasses import dataclass, field
+from hashlib import sha256
+from os import stat_result
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+__all__ = ("OutputHashIndex",)
+
+
+@dataclass
+class OutputHashIndex:
+    """
+    An index of hashes for files previously written to an output pack.
+
+    Each entry remembers the size and modification time of the file it was recorded
+    for. If either no longer matches, the entry is ignored and the file is re-hashed
+    instead, so files touched by anything else are never trusted.
+
+    Attributes
+    ----------
+    path
+        The path to the index file.
+    root
+        The directory that files are recorded relative to, usually the output pack.
+        Defaults to the directory holding the index file.
+    """
+
+    path: Path
+    root: Optional[Path] = None
+
+    _entries: Dict[str, Dict[str, Any]] = field(init=False, default_factory=dict)
+    _dirty: bool = field(init=False, default=False)
+
+    @staticmethod
+    def hash_bytes(data: bytes) -> str:
+        return sha256(data).hexdigest()
+
+    def load(self):
+        """Load the index from disk, discarding it if it's unreadable."""
+        self._entries = {}
+        self._dirty = False
+        try:
+            with open(self.path) as fp:
+                raw = json.load(fp)
+            if isinstance(raw, dict):
+                self._entries = raw
+        except (OSError, ValueError):
+            pass
+
+    def save(self):
+        """Save the index to disk, if anything changed."""
+        if not self._dirty:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w") as fp:
+            json.dump(self._entries, fp, indent=2, sort_keys=True)
+        self._dirty = False
+
+    def _key(self, path: Path) -> str:
+        return path.relative_to(self.root or self.path.parent).as_posix()
+
+    def get_hash(self, path: Path, stat: stat_result) -> Optional[str]:
+        """Get the recorded hash of `path`, if it's still up-to-date."""
+        entry = self._entries.get(self._key(path))
+        if (
+            entry
+            and entry.get("size") == stat.st_size
+            and entry.get("mtime_ns") == stat.st_mtime_ns
+        ):
+            return entry.get("hash")
+        return None
+
+    def set_hash(self, path: Path, stat: stat_result, hash: str):
+        """Record the hash of `path`, as of `stat`."""
+        entry = dict(hash=hash, size=stat.st_size, mtime_ns=stat.st_mtime_ns)
+        key = self._key(path)
+        if self._entries.get(key) != entry:
+            self._entries[key] = entry
+            self._dirty = True
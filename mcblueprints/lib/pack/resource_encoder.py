@@ -0,0 +1,16 @@
+from typing import BinaryIO, Protocol, TypeVar
+
+from pyckaxe import Resource
+
+__all__ = ("ResourceEncoder",)
+
+
+ResourceType = TypeVar("ResourceType", bound=Resource, contravariant=True)
+
+
+class ResourceEncoder(Protocol[ResourceType]):
+    def __call__(self, resource: ResourceType) -> bytes:
+        """Return the bytes of the file that `resource` is encoded into."""
+
+    def write(self, resource: ResourceType, stream: BinaryIO):
+        """Encode `resource` straight into `stream`."""
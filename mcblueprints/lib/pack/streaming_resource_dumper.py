@@ -0,0 +1,60 @@
+import asyncio
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Generic, TypeVar
+
+from pyckaxe import PhysicalResourceLocation, Resource
+from pyckaxe.lib.pack.resource_dumper.errors import (
+    FailedToDumpResourceError,
+    NonFileResourceExistsError,
+    ResourceDumperError,
+)
+
+from mcblueprints.lib.pack.resource_encoder import ResourceEncoder
+
+__all__ = ("StreamingResourceDumper",)
+
+
+ResourceType = TypeVar("ResourceType", bound=Resource)
+
+
+# @implements ResourceDumper
+@dataclass
+class StreamingResourceDumper(Generic[ResourceType]):
+    """
+    Dumps a resource by encoding it straight into its file, as it goes.
+
+    Attributes
+    ----------
+    encoder
+        Encodes a resource into the bytes of a file.
+    suffix
+        The file extension to use.
+    """
+
+    encoder: ResourceEncoder[ResourceType]
+    suffix: str = ".nbt"
+
+    # @implements ResourceDumper
+    async def __call__(
+        self, resource: ResourceType, location: PhysicalResourceLocation
+    ):
+        await self.dump(resource, location)
+
+    def _dump_sync(self, resource: ResourceType, path: Path):
+        if path.exists() and not path.is_file():
+            raise NonFileResourceExistsError(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as fp:
+            self.encoder.write(resource, fp)
+
+    async def dump(self, resource: ResourceType, location: PhysicalResourceLocation):
+        """Dump `resource` to `location`."""
+        path = location.path.with_suffix(self.suffix)
+        try:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(None, self._dump_sync, resource, path)
+        except ResourceDumperError:
+            raise
+        except Exception as ex:
+            raise FailedToDumpResourceError(path) from ex
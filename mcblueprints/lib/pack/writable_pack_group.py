@@ -0,0 +1,30 @@
+from dataclasses import dataclass
+from typing import List
+
+from pyckaxe import Resource, ResourceLocation
+from pyckaxe.lib.pack.writable_pack import WritablePack
+
+__all__ = ("WritablePackGroup",)
+
+
+@dataclass
+class WritablePackGroup:
+    """
+    Dumps each resource into every one of several packs.
+
+    This stands in for a single `WritablePack`, so that a resource is only generated
+    once no matter how many packs it ends up in. Each pack still encodes and writes it
+    in its own way.
+
+    Attributes
+    ----------
+    packs
+        The packs to dump into, in order.
+    """
+
+    packs: List[WritablePack]
+
+    # @implements WritablePack
+    async def dump(self, resource: Resource, location: ResourceLocation):
+        for pack in self.packs:
+            await pack.dump(resource, location)
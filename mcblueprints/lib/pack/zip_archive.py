@@ -0,0 +1,130 @@
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from threading import Lock
+from typing import Dict, Iterable, List, Set
+from zipfile import ZipFile, ZipInfo
+
+__all__ = ("ZipArchive",)
+
+
+PACK_META_NAME = "pack.mcmeta"
+
+
+@dataclass
+class ZipArchive:
+    """
+    A read-only view of a pack stored in a zip archive.
+
+    The central directory is indexed once, up-front, and every read goes through a
+    single shared handle. Nothing is ever extracted to disk.
+
+    Members are addressed by virtual paths underneath `path`, as if the archive were a
+    directory. This allows the usual location resolvers to be used as-is.
+
+    Attributes
+    ----------
+    path
+        The path to the archive file.
+    root
+        The prefix of the pack within the archive, if it isn't stored at the top level.
+    """
+
+    path: Path
+
+    root: str = field(init=False)
+
+    _zip_file: ZipFile = field(init=False)
+    _lock: Lock = field(init=False)
+    _members: Dict[str, ZipInfo] = field(init=False)
+    _files_by_dir: Dict[str, List[str]] = field(init=False)
+    _dirs_by_dir: Dict[str, Set[str]] = field(init=False)
+
+    def __post_init__(self):
+        self._zip_file = ZipFile(self.path)
+        self._lock = Lock()
+        infos = [info for info in self._zip_file.infolist() if not info.is_dir()]
+        self.root = self._find_root(infos)
+        self._index(infos)
+
+    def __str__(self) -> str:
+        return str(self.path)
+
+    def __enter__(self) -> "ZipArchive":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def _find_root(self, infos: List[ZipInfo]) -> str:
+        # Archives are often created from the pack's parent directory, so allow for the
+        # pack to be nested exactly one level down.
+        names = {info.filename for info in infos}
+        if PACK_META_NAME in names:
+            return ""
+        nested = [
+            name[: -len(PACK_META_NAME)]
+            for name in names
+            if name.endswith(f"/{PACK_META_NAME}") and name.count("/") == 1
+        ]
+        if len(nested) == 1:
+            return nested[0]
+        return ""
+
+    def _index(self, infos: List[ZipInfo]):
+        self._members = {}
+        self._files_by_dir = {}
+        self._dirs_by_dir = {}
+        for info in infos:
+            if not info.filename.startswith(self.root):
+                continue
+            name = info.filename[len(self.root) :]
+            self._members[name] = info
+            member_path = PurePosixPath(name)
+            parent = str(member_path.parent)
+            self._files_by_dir.setdefault(parent, []).append(member_path.name)
+            # Register every ancestor directory, since archives need not contain
+            # explicit entries for them.
+            for ancestor in member_path.parents:
+                if ancestor.name:
+                    self._dirs_by_dir.setdefault(str(ancestor.parent), set()).add(
+                        ancestor.name
+                    )
+        for files in self._files_by_dir.values():
+            files.sort()
+
+    def close(self):
+        self._zip_file.close()
+
+    def to_name(self, path: Path) -> str:
+        """Convert a virtual path underneath the archive into a member name."""
+        return path.relative_to(self.path).as_posix()
+
+    def to_path(self, name: str) -> Path:
+        """Convert a member name into a virtual path underneath the archive."""
+        return self.path.joinpath(*PurePosixPath(name).parts)
+
+    def is_file(self, name: str) -> bool:
+        return name in self._members
+
+    def is_dir(self, name: str) -> bool:
+        return name in self._dirs_by_dir or name in self._files_by_dir
+
+    def list_files(self, name: str) -> List[str]:
+        """List the names of files directly inside of the directory `name`."""
+        return self._files_by_dir.get(name, [])
+
+    def list_dirs(self, name: str) -> List[str]:
+        """List the names of directories directly inside of the directory `name`."""
+        return sorted(self._dirs_by_dir.get(name, ()))
+
+    def walk_files(self, name: str) -> Iterable[str]:
+        """Yield the member names of all files underneath the directory `name`."""
+        prefix = f"{name}/"
+        yield from sorted(m for m in self._members if m.startswith(prefix))
+
+    def read(self, name: str) -> bytes:
+        """Read the entire contents of the file `name`."""
+        info = self._members[name]
+        # The underlying file handle is shared, so reads are serialized.
+        with self._lock:
+            return self._zip_file.read(info)
@@ -0,0 +1,116 @@
+import os
+from dataclasses import dataclass, field
+from pathlib import Path
+from tempfile import mkstemp
+from threading import Lock
+from typing import Optional
+from zipfile import ZIP_STORED, ZipFile, ZipInfo
+
+__all__ = ("ZipArchiveWriter",)
+
+
+# The earliest timestamp representable in a zip archive. Every entry uses it, so that
+# the same contents always produce the same archive.
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+
+# Regular file with `rw-r--r--` permissions.
+FILE_ATTR = 0o100644 << 16
+
+
+@dataclass
+class ZipArchiveWriter:
+    """
+    Streams files into a zip archive as they are produced.
+
+    Entries are stored rather than deflated, and are given fixed timestamps and
+    permissions. They're streamed into a temporary archive next to `path` as they're
+    written, and copied from there into the final archive in order of name when it's
+    closed, so the archive comes out the same byte for byte no matter the order entries
+    were written in. It only replaces `path` once closed successfully.
+
+    Attributes
+    ----------
+    path
+        The path to the archive file.
+    """
+
+    path: Path
+
+    _zip_file: Optional[ZipFile] = field(init=False, default=None)
+    _temp_path: Optional[Path] = field(init=False, default=None)
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def __str__(self) -> str:
+        return str(self.path)
+
+    @property
+    def is_open(self) -> bool:
+        return self._zip_file is not None
+
+    def open(self):
+        """Start writing a new archive."""
+        if self._zip_file is not None:
+            return
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._temp_path = self._make_temp_path()
+        self._zip_file = ZipFile(self._temp_path, mode="w", compression=ZIP_STORED)
+
+    def close(self):
+        """Finish writing the archive and move it into place."""
+        if self._zip_file is None:
+            return
+        with self._lock:
+            self._zip_file.close()
+            self._zip_file = None
+        assert self._temp_path is not None
+        try:
+            sorted_path = self._make_temp_path()
+            try:
+                self._copy_sorted(self._temp_path, sorted_path)
+                os.replace(sorted_path, self.path)
+            except BaseException:
+                sorted_path.unlink(missing_ok=True)
+                raise
+        finally:
+            self._temp_path.unlink(missing_ok=True)
+            self._temp_path = None
+
+    def _make_temp_path(self) -> Path:
+        fd, temp_path = mkstemp(
+            prefix=f".{self.path.name}.", suffix=".tmp", dir=self.path.parent
+        )
+        os.close(fd)
+        return Path(temp_path)
+
+    def _copy_sorted(self, source_path: Path, target_path: Path):
+        # Copy one entry at a time, rather than reading them all into memory at once.
+        with ZipFile(source_path) as source, ZipFile(
+            target_path, mode="w", compression=ZIP_STORED
+        ) as target:
+            for info in sorted(source.infolist(), key=lambda info: info.filename):
+                target.writestr(info, source.read(info))
+
+    def discard(self):
+        """Stop writing the archive and throw away everything written so far."""
+        if self._zip_file is None:
+            return
+        with self._lock:
+            self._zip_file.close()
+            self._zip_file = None
+        assert self._temp_path is not None
+        self._temp_path.unlink(missing_ok=True)
+        self._temp_path = None
+
+    def to_name(self, path: Path) -> str:
+        """Convert a virtual path underneath the archive into a member name."""
+        return path.relative_to(self.path).as_posix()
+
+    def write(self, name: str, data: bytes):
+        """Write `data` into the archive as the file `name`."""
+        if self._zip_file is None:
+            raise ValueError(f"Archive is not open for writing: {self.path}")
+        info = ZipInfo(name, date_time=FIXED_DATE_TIME)
+        info.compress_type = ZIP_STORED
+        info.external_attr = FILE_ATTR
+        with self._lock:
+            self._zip_file.writestr(info, data)
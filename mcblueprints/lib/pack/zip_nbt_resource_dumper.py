@@ -0,0 +1,47 @@
+import asyncio
+from dataclasses import dataclass
+from typing import Generic, TypeVar
+
+from pyckaxe import PhysicalResourceLocation, Resource
+
+from mcblueprints.lib.pack.resource_encoder import ResourceEncoder
+from mcblueprints.lib.pack.zip_archive_writer import ZipArchiveWriter
+
+__all__ = ("ZipNbtResourceDumper",)
+
+
+ResourceType = TypeVar("ResourceType", bound=Resource)
+
+
+# @implements ResourceDumper
+@dataclass
+class ZipNbtResourceDumper(Generic[ResourceType]):
+    """
+    Dumps a resource as a gzipped NBT file inside of a zip archive.
+
+    Attributes
+    ----------
+    encoder
+        Encodes a resource into the bytes of a gzipped NBT file.
+    archive
+        The archive to write into.
+    suffix
+        The file extension to use.
+    """
+
+    encoder: ResourceEncoder[ResourceType]
+    archive: ZipArchiveWriter
+    suffix: str = ".nbt"
+
+    # @implements ResourceDumper
+    async def __call__(
+        self, resource: ResourceType, location: PhysicalResourceLocation
+    ):
+        await self.dump(resource, location)
+
+    async def dump(self, resource: ResourceType, location: PhysicalResourceLocation):
+        """Dump `resource` to `location` inside of the archive."""
+        loop = asyncio.get_running_loop()
+        data = await loop.run_in_executor(None, self.encoder, resource)
+        name = self.archive.to_name(location.path.with_suffix(self.suffix))
+        self.archive.write(name, data)
@@ -0,0 +1,38 @@
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import TypeVar
+
+from pyckaxe import Resource
+
+from mcblueprints.lib.pack.mmap_nbt_resource_loader import MmapNbtResourceLoader
+from mcblueprints.lib.pack.zip_archive import ZipArchive
+
+__all__ = ("ZipNbtResourceLoader",)
+
+
+ResourceType = TypeVar("ResourceType", bound=Resource)
+
+
+# @implements ResourceLoader
+@dataclass
+class ZipNbtResourceLoader(MmapNbtResourceLoader[ResourceType]):
+    """
+    Loads a resource from an NBT file inside of a zip archive.
+
+    Archive members can't be memory-mapped, so the deserializer is handed their bytes.
+
+    Attributes
+    ----------
+    archive
+        The indexed archive to read from.
+    """
+
+    archive: ZipArchive = field(kw_only=True)
+
+    # @overrides MmapNbtResourceLoader
+    def _exists(self, path: Path) -> bool:
+        return self.archive.is_file(self.archive.to_name(path))
+
+    # @overrides MmapNbtResourceLoader
+    def _load_sync(self, path: Path) -> ResourceType:
+        return self.deserializer(self.archive.read(self.archive.to_name(path)))
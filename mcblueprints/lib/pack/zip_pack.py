@@ -0,0 +1,39 @@
+from dataclasses import dataclass, field
+from typing import AsyncIterable
+
+from pyckaxe.lib.pack.physical_namespace import PhysicalNamespace
+from pyckaxe.lib.pack.physical_pack import PhysicalPack
+from pyckaxe.lib.pack.physical_registry_location import PhysicalRegistryLocation
+
+from mcblueprints.lib.pack.zip_archive import ZipArchive
+
+__all__ = ("ZipPack",)
+
+
+@dataclass
+class ZipPack(PhysicalPack):
+    """
+    A pack that is read directly from a zip archive.
+
+    Attributes
+    ----------
+    path
+        The path to the archive file.
+    archive
+        The indexed archive to read from.
+    """
+
+    archive: ZipArchive = field(kw_only=True)
+
+    async def iter_namespaces(self) -> AsyncIterable[PhysicalNamespace]:
+        for section in ("data", "assets"):
+            for namespace_name in self.archive.list_dirs(section):
+                yield PhysicalNamespace(path=self.path / section / namespace_name)
+
+    async def iter_registries(
+        self, *parts: str
+    ) -> AsyncIterable[PhysicalRegistryLocation]:
+        async for namespace in self.iter_namespaces():
+            registry_path = namespace.path.joinpath(*parts)
+            if self.archive.is_dir(self.archive.to_name(registry_path)):
+                yield PhysicalRegistryLocation(namespace=namespace, parts=parts)
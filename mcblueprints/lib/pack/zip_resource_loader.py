@@ -0,0 +1,59 @@
+import asyncio
+import json
+import re
+from dataclasses import dataclass, field
+from pathlib import Path, PurePosixPath
+from typing import Any, List, TypeVar
+
+import yaml
+from pyckaxe import CommonResourceLoader, PhysicalResourceLocation, Resource
+from pyckaxe.lib.pack.resource_loader.errors import UnsupportedResourceExtensionError
+
+from mcblueprints.lib.pack.zip_archive import ZipArchive
+
+__all__ = ("ZipJsonResourceLoader",)
+
+
+ResourceType = TypeVar("ResourceType", bound=Resource)
+
+
+# @implements CommonResourceLoader
+@dataclass
+class ZipJsonResourceLoader(CommonResourceLoader[ResourceType, Any]):
+    """
+    Loads a JSON or YAML resource from inside of a zip archive.
+
+    Attributes
+    ----------
+    archive
+        The indexed archive to read from.
+    """
+
+    archive: ZipArchive = field(kw_only=True)
+
+    # @overrides CommonResourceLoader
+    async def _get_matching_paths(
+        self, location: PhysicalResourceLocation
+    ) -> List[Path]:
+        """Get all file paths matching `location`, using the archive's index."""
+        name = PurePosixPath(self.archive.to_name(location.path))
+        pattern = re.compile(r"^" + re.escape(name.name) + r"(?:\.[^\.]*)?$")
+        return [
+            self.archive.to_path(str(name.parent / file_name))
+            for file_name in self.archive.list_files(str(name.parent))
+            if pattern.match(file_name)
+        ]
+
+    def _parse(self, path: Path) -> Any:
+        raw = self.archive.read(self.archive.to_name(path))
+        if path.suffix == ".json":
+            return json.loads(raw, **self.options)
+        if path.suffix in (".yaml", ".yml"):
+            return yaml.safe_load(raw)
+        raise UnsupportedResourceExtensionError(path)
+
+    # @implements CommonResourceLoader
+    async def _load_raw(self, location: PhysicalResourceLocation) -> Any:
+        path = await self._get_path_to_load(location)
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._parse, path)
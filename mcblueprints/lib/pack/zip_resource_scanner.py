@@ -0,0 +1,49 @@
+from dataclasses import dataclass, field
+from fnmatch import fnmatchcase
+from pathlib import PurePosixPath
+from typing import AsyncIterable, TypeVar
+
+from pyckaxe import ClassifiedResourceLocation, Resource
+from pyckaxe.lib.pack.common_resource_scanner import CommonResourceScanner
+
+from mcblueprints.lib.pack.zip_archive import ZipArchive
+
+__all__ = ("ZipResourceScanner",)
+
+
+ResourceType = TypeVar("ResourceType", bound=Resource)
+
+
+# @implements ResourceScanner
+@dataclass
+class ZipResourceScanner(CommonResourceScanner[ResourceType]):
+    """
+    Scans a registry inside of a zip archive for all matching resources.
+
+    Uses the archive's index instead of walking the file system.
+
+    Attributes
+    ----------
+    archive
+        The indexed archive to scan.
+    """
+
+    archive: ZipArchive = field(kw_only=True)
+
+    async def scan(
+        self,
+        match: str = r"*",
+    ) -> AsyncIterable[ClassifiedResourceLocation[ResourceType]]:
+        """Yield all matching locations in the registry."""
+        registry_name = self.archive.to_name(self.path)
+        for name in self.archive.walk_files(registry_name):
+            rel_path = PurePosixPath(name).relative_to(registry_name)
+            if not fnmatchcase(rel_path.name, match):
+                continue
+            parts_without_ext = (*(rel_path.parts[:-1]), rel_path.stem)
+            location = ClassifiedResourceLocation[ResourceType](
+                namespace=self.namespace,
+                parts=parts_without_ext,
+                resource_class=self.resource_class,
+            )
+            yield location
@@ -1,3 +1,4 @@
 from .blueprint import *
 from .filter import *
 from .material import *
+from .structure import *
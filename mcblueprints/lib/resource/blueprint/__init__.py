@@ -1,4 +1,13 @@
 from .blueprint import *
+from .blueprint_decompiler import *
 from .blueprint_deserializer import *
+from .blueprint_fill import *
+from .blueprint_flatten_context import *
+from .blueprint_flatten_profiler import *
+from .blueprint_flatten_store import *
+from .blueprint_layer_flattener import *
+from .blueprint_orientation import *
+from .blueprint_prefetcher import *
 from .blueprint_transformer import *
+from .compact_layout_row import *
 from .palette_entry import *
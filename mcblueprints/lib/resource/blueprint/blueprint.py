@@ -1,5 +1,15 @@
-from dataclasses import dataclass
-from typing import Iterable, TypeAlias
+from dataclasses import dataclass, field
+from functools import partial
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    TypeAlias,
+    Union,
+)
 
 from pyckaxe import (
     BlockMap,
@@ -11,7 +21,22 @@ from pyckaxe import (
     Structure,
 )
 
-from mcblueprints.lib.resource.blueprint.types import BlueprintLayout, BlueprintPalette
+from mcblueprints.lib.resource.blueprint.blueprint_fill import BlueprintFill
+from mcblueprints.lib.resource.blueprint.blueprint_flatten_context import (
+    get_flatten_settings,
+)
+from mcblueprints.lib.resource.blueprint.blueprint_orientation import (
+    BlueprintOrientation,
+)
+from mcblueprints.lib.resource.blueprint.compact_layout_row import CompactLayoutRow
+from mcblueprints.lib.resource.blueprint.types import (
+    BlueprintLayout,
+    BlueprintPalette,
+    BlueprintVariants,
+)
+from mcblueprints.lib.resource.filter.filter import Filter, FilterLink
+from mcblueprints.lib.resource.structure import FlattenedStructure
+from mcblueprints.utils import MappedBlockMap, count_blocks, make_block_map
 
 __all__ = (
     "Blueprint",
@@ -20,37 +45,210 @@ __all__ = (
 )
 
 
+# Blueprints expected to fill at least this much of their volume are flattened into a
+# dense block map. A dense cell costs a fraction of a sparse one, but it costs the same
+# whether it's filled or not.
+DENSE_FILL_RATIO = 0.25
+
+# Below this volume, the difference isn't worth estimating.
+DENSE_MIN_VOLUME = 512
+
+
 @dataclass
 class Blueprint(Resource):
     size: Position
     anchor: Position
     palette: BlueprintPalette
     layout: BlueprintLayout
+    fill: List[BlueprintFill] = field(default_factory=list)
+    variants: BlueprintVariants = field(default_factory=dict)
+
+    # Which blocks to leave out of the structure as structure void: `True` for the usual
+    # ones, `False` for none at all, or the names of the blocks. Left to the build if
+    # not given.
+    structure_void: Union[bool, Tuple[str, ...], None] = None
+
+    # Flattened block maps for when this blueprint is included in others.
+    _child_cache: Dict[
+        Tuple[BlueprintOrientation, int], Tuple[Optional[Filter], BlockMap]
+    ] = field(init=False, default_factory=dict, repr=False, compare=False)
+
+    # How many times each palette symbol appears in the layout.
+    _symbol_counts: Optional[Dict[str, int]] = field(
+        init=False, default=None, repr=False, compare=False
+    )
+
+    # How many blocks the last flatten held, or was expected to before then.
+    _block_count: Optional[int] = field(
+        init=False, default=None, repr=False, compare=False
+    )
+    _block_estimate: Optional[int] = field(
+        init=False, default=None, repr=False, compare=False
+    )
+
+    @property
+    def volume(self) -> int:
+        size_x, size_y, size_z = self.size.unpack_ints()
+        return size_x * size_y * size_z
 
     def scan(self, symbol: str) -> Iterable[Position]:
         """Scan over the blueprint, looking for a particular symbol."""
         for y, floor in enumerate(self.layout):
             for x, row in enumerate(floor):
-                yield from (
-                    Position.from_xyz(x, y, z) for z, s in enumerate(row) if s == symbol
-                )
+                # Compact rows can skip over whole runs of other symbols at once.
+                if isinstance(row, CompactLayoutRow):
+                    zs = row.scan(symbol)
+                else:
+                    zs = (z for z, s in enumerate(row) if s == symbol)
+                yield from (Position.from_xyz(x, y, z) for z in zs)
+
+    def count_symbols(self) -> Dict[str, int]:
+        """Count how many cells of the layout each palette symbol takes up."""
+        if self._symbol_counts is None:
+            counts = dict.fromkeys(self.palette, 0)
+            for floor in self.layout:
+                for row in floor:
+                    # Compact rows can count whole runs of a symbol at once.
+                    if isinstance(row, CompactLayoutRow):
+                        for symbol, count in row.runs:
+                            if symbol in counts:
+                                counts[symbol] += count
+                    else:
+                        for symbol in row:
+                            if symbol in counts:
+                                counts[symbol] += 1
+            self._symbol_counts = counts
+        return self._symbol_counts
+
+    async def estimate_blocks(self, ctx: ResolutionContext) -> int:
+        """
+        Estimate how many blocks flattening will hold.
+
+        Once the blueprint has been flattened, this is the number of blocks it held.
+        Before then, it's the number of cells set by fills and the layout, counting
+        each included blueprint or structure by its own (estimated) number of blocks.
+        """
+        if self._block_count is not None:
+            return self._block_count
+        if self._block_estimate is None:
+            estimate = sum(fill.estimate_blocks() for fill in self.fill)
+            for symbol, count in self.count_symbols().items():
+                if count:
+                    estimate += count * await self.palette[symbol].estimate_blocks(ctx)
+            self._block_estimate = min(estimate, self.volume)
+        return self._block_estimate
+
+    async def make_block_map(self, ctx: ResolutionContext) -> BlockMap:
+        """Create an empty block map to flatten into, in whichever form suits it."""
+        settings = get_flatten_settings(ctx)
+        storage = settings.storage
+        if (storage == "mapped") or (
+            settings.out_of_core_volume and (self.volume >= settings.out_of_core_volume)
+        ):
+            return MappedBlockMap(size=self.size)
+        if storage == "auto":
+            volume = self.volume
+            dense = (volume >= DENSE_MIN_VOLUME) and (
+                await self.estimate_blocks(ctx) >= DENSE_FILL_RATIO * volume
+            )
+        else:
+            dense = storage == "dense"
+        return make_block_map(self.size, dense=dense)
+
+    def iter_links(self) -> Iterable[ResourceLink[Any]]:
+        """Yield every resource that flattening (or any variant) may need to resolve."""
+        for fill in self.fill:
+            yield from fill.iter_links()
+        for palette_entry in self.palette.values():
+            yield from palette_entry.iter_links()
+        yield from self.variants.values()
 
     async def flatten(self, ctx: ResolutionContext) -> BlockMap:
+        # Count everything that's written along the way, if enabled.
+        settings = get_flatten_settings(ctx)
+        if settings.profiler is not None:
+            profiled_block_map = await settings.profiler.flatten(ctx, self)
+            self._block_count = count_blocks(profiled_block_map)
+            return profiled_block_map
+        # Flatten the largest blueprints a layer at a time, if enabled.
+        flattener = settings.layer_flattener
+        if (flattener is not None) and flattener.accepts(self):
+            if (layered_block_map := await flattener.flatten(ctx, self)) is not None:
+                self._block_count = count_blocks(layered_block_map)
+                return layered_block_map
         # Create a new block map to hold the final state.
-        block_map = BlockMap(size=self.size)
+        block_map = await self.make_block_map(ctx)
+        # Fill regions first, so that the layout can add details on top of them.
+        for fill in self.fill:
+            await fill.apply(ctx, block_map)
         # Traverse palette entries in the order they are defined.
         for palette_key, palette_entry in self.palette.items():
             # Scan over the blueprint once per entry, looking for matching symbols.
             for offset in self.scan(palette_key):
                 # Merge the palette entry into the block map at the offset.
                 await palette_entry.merge(ctx, block_map, offset)
+        # Remember how full the blueprint turned out, for next time.
+        self._block_count = count_blocks(block_map)
         return block_map
 
+    async def flatten_as_child(
+        self,
+        ctx: ResolutionContext,
+        filter: Optional[Filter],
+        orientation: BlueprintOrientation,
+        link: Optional["BlueprintLink"] = None,
+        filter_link: Optional[FilterLink] = None,
+    ) -> BlockMap:
+        """
+        Flatten, filter and reorient the blueprint for inclusion in another.
+
+        The result is cached by filter and orientation, and must not be modified. Given
+        the links the blueprint and filter were resolved from, the filtered block map
+        is also loaded from (or saved into) the flatten store, if there is one.
+        """
+        key = (orientation, id(filter))
+        if (cached := self._child_cache.get(key)) is not None:
+            cached_filter, cached_block_map = cached
+            # Make sure the filter is the same one, and not just at the same address.
+            if cached_filter is filter:
+                return cached_block_map
+        # Load the filtered block map from the store instead of flattening, if it was
+        # saved by an earlier build. A filter without a link can't be keyed at all.
+        settings = get_flatten_settings(ctx)
+        store, store_key, block_map = settings.flatten_store, None, None
+        if (
+            (store is not None)
+            and (link is not None)
+            and ((filter is None) == (filter_link is None))
+        ):
+            if (store_key := await store.make_key(ctx, link, filter_link)) is not None:
+                block_map = await store.load(
+                    store_key, partial(self.make_block_map, ctx)
+                )
+        if block_map is None:
+            block_map = await self.flatten(ctx)
+            if (filter is not None) and (settings.profiler is not None):
+                await settings.profiler.apply_filter(ctx, filter, block_map)
+            elif filter is not None:
+                await filter.apply(ctx, block_map)
+            if (store is not None) and (store_key is not None):
+                await store.save(store_key, block_map)
+        block_map = orientation.apply(block_map)
+        self._child_cache[key] = (filter, block_map)
+        return block_map
+
+    def clear_child_cache(self):
+        """Forget any block maps cached by `flatten_as_child` or by palette entries."""
+        self._child_cache.clear()
+        self._block_estimate = None
+        for palette_entry in self.palette.values():
+            palette_entry.clear_cache()
+
     async def to_structure(self, ctx: ResolutionContext) -> Structure:
-        # Flatten the blueprint into a block map, and turn that into a structure.
+        # Flatten the blueprint into a block map, and wrap that as a structure that can
+        # be encoded straight from the block map.
         block_map = await self.flatten(ctx)
-        structure = Structure.from_block_map(block_map)
-        return structure
+        return FlattenedStructure(block_map, structure_void=self.structure_void)
 
 
 BlueprintLink: TypeAlias = ResourceLink[Blueprint]
@@ -0,0 +1,143 @@
+import string
+from dataclasses import dataclass
+from itertools import groupby
+from typing import Any, Dict, Iterator, List, Tuple
+
+from pyckaxe import Block, Structure
+
+from mcblueprints.lib.resource.structure import FlattenedStructure
+from mcblueprints.utils import iter_block_map_rows
+
+__all__ = (
+    "BLUEPRINT_VOID_SYMBOL",
+    "BlueprintDecompiler",
+)
+
+
+# Marks cells without a block. It's never given a palette entry, so it's skipped.
+BLUEPRINT_VOID_SYMBOL = "."
+
+# Symbols for palette entries, in the order they're handed out. Anything that has a
+# special meaning in (compact) layout rows is left out, so nothing needs escaping.
+ASCII_SYMBOLS = "".join(
+    c
+    for c in string.ascii_uppercase
+    + string.ascii_lowercase
+    + string.digits
+    + string.punctuation
+    if c not in (BLUEPRINT_VOID_SYMBOL, "*", "\\")
+)
+
+# Once those run out, carry on into the CJK block, which has plenty more.
+EXTRA_SYMBOLS_START = 0x4E00
+EXTRA_SYMBOLS_END = 0x9FFF
+
+MAX_SYMBOLS = len(ASCII_SYMBOLS) + EXTRA_SYMBOLS_END - EXTRA_SYMBOLS_START + 1
+
+# Compact runs only pay off once a symbol repeats a few times.
+MIN_COMPACT_RUN = 3
+
+
+def _iter_symbols() -> Iterator[str]:
+    yield from ASCII_SYMBOLS
+    for codepoint in range(EXTRA_SYMBOLS_START, EXTRA_SYMBOLS_END + 1):
+        yield chr(codepoint)
+
+
+def _decompile_block(block: Block) -> Any:
+    # Plain blocks use the short form; anything with a state or data is spelled out.
+    if (not block.state) and (not block.data):
+        return block.name
+    raw_block: Dict[str, Any] = {"type": "block", "name": block.name}
+    if block.state:
+        raw_block["state"] = dict(block.state.items())
+    if block.data:
+        # NOTE Data is written as SNBT, so that every tag keeps its exact type.
+        raw_block["data"] = block.data.snbt()
+    return raw_block
+
+
+def _compact_row(row: str) -> str:
+    parts: List[str] = []
+    for symbol, run in groupby(row):
+        count = sum(1 for _ in run)
+        parts.append(
+            f"{symbol}*{count}" if count >= MIN_COMPACT_RUN else symbol * count
+        )
+    return "".join(parts)
+
+
+@dataclass
+class BlueprintDecompiler:
+    """
+    Turns a structure back into the raw data of an equivalent blueprint.
+
+    Blocks are given palette symbols in order of how often they're used, with ties
+    broken by where they first appear, so the same structure always decompiles into
+    the same blueprint. Entities aren't carried over.
+
+    Attributes
+    ----------
+    compact_layout
+        Whether to write layout rows as runs of repeated symbols.
+    """
+
+    compact_layout: bool = False
+
+    def __call__(self, structure: Structure) -> Dict[str, Any]:
+        return self.decompile(structure)
+
+    def decompile(self, structure: Structure) -> Dict[str, Any]:
+        """Decompile `structure` into raw blueprint data, ready to be dumped."""
+        block_map = FlattenedStructure.from_structure(structure).block_map
+        size_x, size_y, size_z = block_map.size.unpack_ints()
+
+        # Count each distinct block, in order. Blocks are usually shared between cells,
+        # so only turn each block object into a key once.
+        rows_by_yx: Dict[Tuple[int, int], List[Tuple[int, Block]]] = {}
+        keys_by_id: Dict[int, str] = {}
+        blocks_by_key: Dict[str, Block] = {}
+        counts: Dict[str, int] = {}
+        for y, x, row in iter_block_map_rows(block_map):
+            rows_by_yx[y, x] = cells = list(row)
+            for _, block in cells:
+                if (key := keys_by_id.get(id(block))) is None:
+                    key = keys_by_id[id(block)] = str(block)
+                    blocks_by_key.setdefault(key, block)
+                counts[key] = counts.get(key, 0) + 1
+
+        # Hand out symbols by frequency. Sorting is stable, so ties keep their order.
+        ordered_keys = sorted(counts, key=lambda key: -counts[key])
+        if len(ordered_keys) > MAX_SYMBOLS:
+            raise ValueError(
+                f"Too many distinct blocks to decompile: {len(ordered_keys)}"
+            )
+        symbols_by_key = dict(zip(ordered_keys, _iter_symbols()))
+        symbols_by_id = {
+            block_id: symbols_by_key[key] for block_id, key in keys_by_id.items()
+        }
+
+        palette = {
+            symbols_by_key[key]: _decompile_block(blocks_by_key[key])
+            for key in ordered_keys
+        }
+
+        # The layout is written top-down.
+        layout: List[List[str]] = []
+        for y in reversed(range(size_y)):
+            rows: List[str] = []
+            for x in range(size_x):
+                symbols = [BLUEPRINT_VOID_SYMBOL] * size_z
+                for z, block in rows_by_yx.get((y, x), ()):
+                    symbols[z] = symbols_by_id[id(block)]
+                rows.append("".join(symbols))
+            if self.compact_layout:
+                rows = [_compact_row(row) for row in rows]
+            layout.append(rows)
+
+        raw_blueprint: Dict[str, Any] = {"size": [size_x, size_y, size_z]}
+        if self.compact_layout:
+            raw_blueprint["compact_layout"] = True
+        raw_blueprint["palette"] = palette
+        raw_blueprint["layout"] = layout
+        return raw_blueprint
@@ -1,13 +1,24 @@
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, List, Optional, cast
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
 
-from pyckaxe import HERE, Block, Breadcrumb, Position, ResourceLocation
+from pyckaxe import HERE, Block, Breadcrumb, Position, ResourceLocation, Structure
 
 from mcblueprints.lib.resource.blueprint.blueprint import (
     Blueprint,
     BlueprintLayout,
     BlueprintLink,
     BlueprintPalette,
+    BlueprintVariants,
+)
+from mcblueprints.lib.resource.blueprint.blueprint_fill import BlueprintFill
+from mcblueprints.lib.resource.blueprint.blueprint_orientation import (
+    BLUEPRINT_MIRRORS,
+    BLUEPRINT_ROTATIONS,
+    BlueprintOrientation,
+)
+from mcblueprints.lib.resource.blueprint.compact_layout_row import (
+    CompactLayoutRow,
+    MalformedCompactLayoutRow,
 )
 from mcblueprints.lib.resource.blueprint.palette_entry.abc.blueprint_palette_entry import (
     BlueprintPaletteEntry,
@@ -21,15 +32,20 @@ from mcblueprints.lib.resource.blueprint.palette_entry.blueprint_blueprint_palet
 from mcblueprints.lib.resource.blueprint.palette_entry.material_blueprint_palette_entry import (
     MaterialBlueprintPaletteEntry,
 )
+from mcblueprints.lib.resource.blueprint.palette_entry.structure_blueprint_palette_entry import (
+    StructureBlueprintPaletteEntry,
+)
 from mcblueprints.lib.resource.blueprint.palette_entry.void_blueprint_palette_entry import (
     VoidBlueprintPaletteEntry,
 )
+from mcblueprints.lib.resource.blueprint.types import BlueprintLayoutRow
 from mcblueprints.lib.resource.filter.filter import FilterLink
 from mcblueprints.lib.resource.filter.filter_deserializer import FilterDeserializer
 from mcblueprints.lib.resource.material.material import Material, MaterialLink
 from mcblueprints.lib.resource.material.material_deserializer import (
     MaterialDeserializer,
 )
+from mcblueprints.lib.resource.structure import StructureLink
 
 __all__ = ("BlueprintDeserializer",)
 
@@ -67,6 +83,7 @@ class BlueprintDeserializer:
             "block": self.deserialize_block_palette_entry,
             "blueprint": self.deserialize_blueprint_palette_entry,
             "material": self.deserialize_material_palette_entry,
+            "structure": self.deserialize_structure_palette_entry,
             "void": self.deserialize_void_palette_entry,
         }
 
@@ -113,8 +130,13 @@ class BlueprintDeserializer:
         if raw_anchor := raw_blueprint.get("anchor"):
             anchor = self.deserialize_anchor(raw_anchor, breadcrumb.anchor)
 
-        # palette (required, non-nullable)
-        raw_palette = raw_blueprint.get("palette")
+        # fill (optional, non-nullable, defaults to none)
+        fill: List[BlueprintFill] = []
+        if raw_fill := raw_blueprint.get("fill"):
+            fill = self.deserialize_fill(raw_fill, breadcrumb.fill)
+
+        # palette (required unless filling, non-nullable)
+        raw_palette = raw_blueprint.get("palette", {} if fill else None)
         breadcrumb_palette = breadcrumb.palette
         if raw_palette is None:
             raise MalformedBlueprint(
@@ -124,8 +146,8 @@ class BlueprintDeserializer:
             )
         palette = self.deserialize_palette(raw_palette, breadcrumb_palette)
 
-        # layout (required, non-nullable)
-        raw_layout = raw_blueprint.get("layout")
+        # layout (required unless filling, non-nullable)
+        raw_layout = raw_blueprint.get("layout", [] if fill else None)
         breadcrumb_layout = breadcrumb.layout
         if raw_layout is None:
             raise MalformedBlueprint(
@@ -133,13 +155,33 @@ class BlueprintDeserializer:
                 raw_blueprint,
                 breadcrumb_layout,
             )
-        layout = self.deserialize_layout(raw_layout, breadcrumb_layout)
+        # compact_layout (optional, non-nullable, defaults to false)
+        compact_layout = bool(raw_blueprint.get("compact_layout", False))
+
+        layout = self.deserialize_layout(
+            raw_layout, breadcrumb_layout, compact=compact_layout
+        )
+
+        # variants (optional, non-nullable, defaults to none)
+        variants: BlueprintVariants = {}
+        if raw_variants := raw_blueprint.get("variants"):
+            variants = self.deserialize_variants(raw_variants, breadcrumb.variants)
+
+        # structure_void (optional, nullable, defaults to null)
+        structure_void: Union[bool, Tuple[str, ...], None] = None
+        if (raw_structure_void := raw_blueprint.get("structure_void")) is not None:
+            structure_void = self.deserialize_structure_void(
+                raw_structure_void, breadcrumb.structure_void
+            )
 
         blueprint = Blueprint(
             size=size,
             anchor=anchor,
             palette=palette,
             layout=layout,
+            fill=fill,
+            variants=variants,
+            structure_void=structure_void,
         )
 
         return blueprint
@@ -259,6 +301,46 @@ class BlueprintDeserializer:
         blueprint = self.link(raw_blueprint, breadcrumb_blueprint)
 
         # offset (optional, non-nullable, has a default)
+        offset = self.deserialize_offset(raw_palette_entry, breadcrumb)
+
+        # filter (optional, nullable, defaults to null)
+        filter: Optional[FilterLink] = None
+        if raw_filter := raw_palette_entry.get("filter"):
+            filter = self.filter_deserializer.link(raw_filter, breadcrumb.filter)
+
+        # rotate (optional, non-nullable, defaults to 0)
+        rotate = raw_palette_entry.get("rotate", 0)
+        if rotate not in BLUEPRINT_ROTATIONS:
+            raise MalformedPaletteEntry(
+                f"Malformed `rotate`, expected one of {BLUEPRINT_ROTATIONS},"
+                + f" at `{breadcrumb.rotate}`",
+                raw_palette_entry,
+                breadcrumb.rotate,
+            )
+
+        # mirror (optional, nullable, defaults to null)
+        mirror = raw_palette_entry.get("mirror")
+        if (mirror is not None) and (mirror not in BLUEPRINT_MIRRORS):
+            raise MalformedPaletteEntry(
+                f"Malformed `mirror`, expected one of {BLUEPRINT_MIRRORS},"
+                + f" at `{breadcrumb.mirror}`",
+                raw_palette_entry,
+                breadcrumb.mirror,
+            )
+
+        orientation = BlueprintOrientation(rotate=rotate, mirror=mirror)
+
+        return BlueprintBlueprintPaletteEntry(
+            key=palette_key,
+            blueprint=blueprint,
+            offset=offset,
+            filter=filter,
+            orientation=orientation,
+        )
+
+    def deserialize_offset(
+        self, raw_palette_entry: Dict[str, Any], breadcrumb: Breadcrumb
+    ) -> Position:
         offset: Position = HERE
         if raw_offset := raw_palette_entry.get("offset"):
             if not isinstance(raw_offset, list):
@@ -268,15 +350,7 @@ class BlueprintDeserializer:
                     breadcrumb.offset,
                 )
             offset = ~Position.from_list(cast(Any, raw_offset))
-
-        # filter (optional, nullable, defaults to null)
-        filter: Optional[FilterLink] = None
-        if raw_filter := raw_palette_entry.get("filter"):
-            filter = self.filter_deserializer.link(raw_filter, breadcrumb.filter)
-
-        return BlueprintBlueprintPaletteEntry(
-            key=palette_key, blueprint=blueprint, offset=offset, filter=filter
-        )
+        return offset
 
     def deserialize_material_palette_entry(
         self,
@@ -296,6 +370,45 @@ class BlueprintDeserializer:
 
         return MaterialBlueprintPaletteEntry(key=palette_key, material=material)
 
+    def deserialize_structure_palette_entry(
+        self,
+        palette_key: str,
+        raw_palette_entry: Dict[str, Any],
+        breadcrumb: Breadcrumb,
+    ) -> StructureBlueprintPaletteEntry:
+        # structure (required, non-nullable)
+        raw_structure = raw_palette_entry.get("structure")
+        breadcrumb_structure = breadcrumb.structure
+        if raw_structure is None:
+            raise MalformedPaletteEntry(
+                f"Missing `structure`, at `{breadcrumb_structure}`",
+                raw_palette_entry,
+                breadcrumb_structure,
+            )
+        if not isinstance(raw_structure, str):
+            raise MalformedPaletteEntry(
+                f"Malformed `structure`, at `{breadcrumb_structure}`",
+                raw_palette_entry,
+                breadcrumb_structure,
+            )
+        structure_location = Structure @ ResourceLocation.from_string(raw_structure)
+        structure = StructureLink(structure_location)
+
+        # offset (optional, non-nullable, has a default)
+        offset = self.deserialize_offset(raw_palette_entry, breadcrumb)
+
+        # filter (optional, nullable, defaults to null)
+        filter: Optional[FilterLink] = None
+        if raw_filter := raw_palette_entry.get("filter"):
+            filter = self.filter_deserializer.link(raw_filter, breadcrumb.filter)
+
+        return StructureBlueprintPaletteEntry(
+            key=palette_key,
+            structure=structure,
+            offset=offset,
+            filter=filter,
+        )
+
     def deserialize_void_palette_entry(
         self,
         palette_key: str,
@@ -305,7 +418,7 @@ class BlueprintDeserializer:
         return VoidBlueprintPaletteEntry(key=palette_key)
 
     def deserialize_layout(
-        self, raw_layout: Any, breadcrumb: Breadcrumb
+        self, raw_layout: Any, breadcrumb: Breadcrumb, compact: bool = False
     ) -> BlueprintLayout:
         if not isinstance(raw_layout, list):
             raise MalformedBlueprint(
@@ -316,36 +429,201 @@ class BlueprintDeserializer:
 
         # Read the layout upside-down.
         for i, raw_layer in enumerate(reversed(raw_layout)):
-            if raw_layer is None:
-                layout.append([])
-                continue
+            # A repeated layer is the same list of rows, shared rather than copied.
+            raw_layer, count = self.deserialize_repeat(
+                raw_layer, "layer", breadcrumb[i]
+            )
+            layer = self.deserialize_layer(raw_layer, breadcrumb[i], compact)
+            layout.extend([layer] * count)
+
+        return layout
+
+    def deserialize_layer(
+        self, raw_layer: Any, breadcrumb: Breadcrumb, compact: bool
+    ) -> List[BlueprintLayoutRow]:
+        if raw_layer is None:
+            return []
+
+        if isinstance(raw_layer, str):
+            raw_layer = list(raw_layer)
+
+        if not isinstance(raw_layer, list):
+            raise MalformedBlueprint(
+                f"Malformed `layout` layer, at `{breadcrumb}`",
+                raw_layer,
+                breadcrumb,
+            )
+
+        layer: List[BlueprintLayoutRow] = []
+
+        for j, raw_row in enumerate(raw_layer):
+            raw_row, count = self.deserialize_repeat(raw_row, "row", breadcrumb[j])
+            row = self.deserialize_row(raw_row, breadcrumb[j], compact)
+            layer.extend([row] * count)
+
+        return layer
 
-            if isinstance(raw_layer, str):
-                raw_layer = list(raw_layer)
+    def deserialize_row(
+        self, raw_row: Any, breadcrumb: Breadcrumb, compact: bool
+    ) -> BlueprintLayoutRow:
+        if raw_row is None:
+            return ""
 
-            if not isinstance(raw_layer, list):
+        if not isinstance(raw_row, str):
+            raise MalformedBlueprint(
+                f"Malformed `layout` row, at `{breadcrumb}`",
+                raw_row,
+                breadcrumb,
+            )
+
+        if not compact:
+            return raw_row
+
+        try:
+            return CompactLayoutRow.parse(raw_row)
+        except MalformedCompactLayoutRow as ex:
+            raise MalformedBlueprint(
+                f"Malformed compact `layout` row, at `{breadcrumb}`",
+                raw_row,
+                breadcrumb,
+            ) from ex
+
+    def deserialize_repeat(
+        self, raw_value: Any, key: str, breadcrumb: Breadcrumb
+    ) -> Tuple[Any, int]:
+        # Anything other than a mapping like `{<key>: ..., repeat: 3}` appears once.
+        if not isinstance(raw_value, dict):
+            return raw_value, 1
+
+        if key not in raw_value:
+            raise MalformedBlueprint(
+                f"Missing `{key}`, at `{breadcrumb[key]}`", raw_value, breadcrumb[key]
+            )
+
+        raw_repeat = raw_value.get("repeat", 1)
+        if (not isinstance(raw_repeat, int)) or (raw_repeat < 0):
+            raise MalformedBlueprint(
+                f"Malformed `repeat`, at `{breadcrumb.repeat}`",
+                raw_value,
+                breadcrumb.repeat,
+            )
+
+        return raw_value[key], raw_repeat
+
+    def deserialize_fill(
+        self, raw_fill: Any, breadcrumb: Breadcrumb
+    ) -> List[BlueprintFill]:
+        if not isinstance(raw_fill, list):
+            raise MalformedBlueprint(
+                f"Malformed `fill`, at `{breadcrumb}`", raw_fill, breadcrumb
+            )
+        return [
+            self.deserialize_fill_region(raw_region, breadcrumb[i])
+            for i, raw_region in enumerate(raw_fill)
+        ]
+
+    def deserialize_fill_region(
+        self, raw_region: Any, breadcrumb: Breadcrumb
+    ) -> BlueprintFill:
+        if not isinstance(raw_region, dict):
+            raise MalformedBlueprint(
+                f"Malformed fill region, at `{breadcrumb}`", raw_region, breadcrumb
+            )
+
+        # from, to (required, non-nullable)
+        corners: List[Position] = []
+        for key in ("from", "to"):
+            raw_corner = raw_region.get(key)
+            breadcrumb_corner = breadcrumb[key]
+            if raw_corner is None:
+                raise MalformedBlueprint(
+                    f"Missing `{key}`, at `{breadcrumb_corner}`",
+                    raw_region,
+                    breadcrumb_corner,
+                )
+            if not isinstance(raw_corner, list):
                 raise MalformedBlueprint(
-                    f"Malformed `layout` layer, at `{breadcrumb[i]}`",
-                    raw_layer,
-                    breadcrumb[i],
+                    f"Malformed `{key}`, at `{breadcrumb_corner}`",
+                    raw_corner,
+                    breadcrumb_corner,
                 )
+            corners.append(~Position.from_list(cast(Any, raw_corner)))
+        start, end = corners
 
-            layer: List[str] = []
+        # block, material, void (exactly one required)
+        fill_keys = [key for key in ("block", "material", "void") if key in raw_region]
+        if len(fill_keys) != 1:
+            raise MalformedBlueprint(
+                "Expected exactly one of `block`, `material` or `void`,"
+                + f" at `{breadcrumb}`",
+                raw_region,
+                breadcrumb,
+            )
+        material: Optional[MaterialLink] = None
+        if "block" in raw_region:
+            block = self.material_deserializer.deserialize_block(
+                raw_region["block"], breadcrumb.block
+            )
+            material = MaterialLink(Material(block=block))
+        elif "material" in raw_region:
+            material = self.material_deserializer.link(
+                raw_region["material"], breadcrumb.material
+            )
 
-            for j, raw_row in enumerate(raw_layer):
-                if raw_row is None:
-                    layer.append("")
-                    continue
+        # hollow (optional, non-nullable, defaults to false)
+        hollow = bool(raw_region.get("hollow", False))
+
+        return BlueprintFill(start=start, end=end, material=material, hollow=hollow)
+
+    def deserialize_structure_void(
+        self, raw_structure_void: Any, breadcrumb: Breadcrumb
+    ) -> Union[bool, Tuple[str, ...]]:
+        if isinstance(raw_structure_void, bool):
+            return raw_structure_void
+        # A list names the blocks to leave out.
+        if isinstance(raw_structure_void, list) and all(
+            isinstance(name, str) for name in raw_structure_void
+        ):
+            return tuple(raw_structure_void)
+        raise MalformedBlueprint(
+            f"Malformed `structure_void`, at `{breadcrumb}`",
+            raw_structure_void,
+            breadcrumb,
+        )
 
-                if not isinstance(raw_row, str):
+    def deserialize_variants(
+        self, raw_variants: Any, breadcrumb: Breadcrumb
+    ) -> BlueprintVariants:
+        # A list of filter locations names each variant after its filter.
+        if isinstance(raw_variants, list):
+            variants: BlueprintVariants = {}
+            for i, raw_filter in enumerate(raw_variants):
+                if not isinstance(raw_filter, str):
                     raise MalformedBlueprint(
-                        f"Malformed `layout` row, at `{breadcrumb[i][j]}`",
-                        raw_row,
-                        breadcrumb[i][j],
+                        f"Malformed variant, at `{breadcrumb[i]}`",
+                        raw_filter,
+                        breadcrumb[i],
                     )
+                variant_name = ResourceLocation.from_string(raw_filter).parts[-1]
+                if variant_name in variants:
+                    raise MalformedBlueprint(
+                        f"Duplicate variant `{variant_name}`, at `{breadcrumb[i]}`",
+                        raw_filter,
+                        breadcrumb[i],
+                    )
+                variants[variant_name] = self.filter_deserializer.link(
+                    raw_filter, breadcrumb[i]
+                )
+            return variants
 
-                layer.append(raw_row)
-
-            layout.append(layer)
-
-        return layout
+        # Otherwise we ought to have a mapping of variant names to filters.
+        if not isinstance(raw_variants, dict):
+            raise MalformedBlueprint(
+                f"Malformed `variants`, at `{breadcrumb}`", raw_variants, breadcrumb
+            )
+        return {
+            variant_name: self.filter_deserializer.link(
+                raw_filter, breadcrumb[variant_name]
+            )
+            for variant_name, raw_filter in raw_variants.items()
+        }
@@ -0,0 +1,60 @@
+from dataclasses import dataclass
+from typing import Any, Iterable, Optional
+
+from pyckaxe import Block, BlockMap, Position, ResolutionContext, ResourceLink
+
+from mcblueprints.lib.resource.material.material import MaterialLink
+from mcblueprints.utils import fill_block_map
+
+__all__ = ("BlueprintFill",)
+
+
+@dataclass
+class BlueprintFill:
+    """
+    Fills a cuboid region of a blueprint all at once.
+
+    Attributes
+    ----------
+    start
+        One corner of the region.
+    end
+        The opposite corner of the region, inclusive.
+    material
+        The material to fill the region with, or `None` to void it.
+    hollow
+        Whether to fill only the outer shell of the region.
+    """
+
+    start: Position
+    end: Position
+    material: Optional[MaterialLink] = None
+    hollow: bool = False
+
+    async def apply(self, ctx: ResolutionContext, block_map: BlockMap):
+        """Fill the region within `block_map`."""
+        block = await self.resolve_block(ctx)
+        fill_block_map(block_map, self.start, self.end, block, hollow=self.hollow)
+
+    async def resolve_block(self, ctx: ResolutionContext) -> Optional[Block]:
+        """Resolve the block to fill the region with, or `None` to void it."""
+        if self.material is None:
+            return None
+        material = await self.material(ctx)
+        return material.block
+
+    def estimate_blocks(self) -> int:
+        """Count how many blocks filling sets, or none if it voids them instead."""
+        if self.material is None:
+            return 0
+        (x0, y0, z0), (x1, y1, z1) = self.start.unpack_ints(), self.end.unpack_ints()
+        size_x, size_y, size_z = abs(x1 - x0) + 1, abs(y1 - y0) + 1, abs(z1 - z0) + 1
+        volume = size_x * size_y * size_z
+        if self.hollow:
+            volume -= max(size_x - 2, 0) * max(size_y - 2, 0) * max(size_z - 2, 0)
+        return volume
+
+    def iter_links(self) -> Iterable[ResourceLink[Any]]:
+        """Yield every resource that filling may need to resolve."""
+        if self.material is not None:
+            yield self.material
@@ -0,0 +1,98 @@
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Coroutine, Optional
+
+from pyckaxe import ResolutionContext
+
+if TYPE_CHECKING:
+    from mcblueprints.lib.resource.blueprint.blueprint_flatten_profiler import (
+        BlueprintFlattenProfiler,
+    )
+    from mcblueprints.lib.resource.blueprint.blueprint_flatten_store import (
+        BlueprintFlattenStore,
+    )
+    from mcblueprints.lib.resource.blueprint.blueprint_layer_flattener import (
+        BlueprintLayerFlattener,
+    )
+
+__all__ = (
+    "BLUEPRINT_STORAGES",
+    "BlueprintFlattenSettings",
+    "BlueprintFlattenContext",
+    "get_flatten_settings",
+)
+
+
+# How blueprints may store their blocks while flattening: chosen for each blueprint, or
+# always one way or another.
+BLUEPRINT_STORAGES = ("auto", "sparse", "dense", "mapped")
+
+
+@dataclass(frozen=True)
+class BlueprintFlattenSettings:
+    """
+    How a build flattens its blueprints.
+
+    Blueprints are resources, cached and possibly shared between builds, so they don't
+    hold onto anything that belongs to one build in particular. Instead, each build
+    flattens them with a `BlueprintFlattenContext` carrying its own settings.
+
+    Attributes
+    ----------
+    storage
+        How to store blocks while flattening, one of `BLUEPRINT_STORAGES`.
+    out_of_core_volume
+        Blueprints with at least this many cells are flattened into a memory-mapped
+        temporary file rather than into memory, if set.
+    layer_flattener
+        Flattens the largest blueprints a layer at a time, if given.
+    profiler
+        Counts the cells touched while flattening, if given.
+    flatten_store
+        Keeps the block maps of blueprints included in others between builds, if
+        given.
+    """
+
+    storage: str = "auto"
+    out_of_core_volume: Optional[int] = None
+    layer_flattener: Optional["BlueprintLayerFlattener"] = None
+    profiler: Optional["BlueprintFlattenProfiler"] = None
+    flatten_store: Optional["BlueprintFlattenStore"] = None
+
+    def __post_init__(self):
+        if self.storage not in BLUEPRINT_STORAGES:
+            raise ValueError(
+                f"Expected a storage in {BLUEPRINT_STORAGES}, but got: {self.storage}"
+            )
+
+
+# The settings to flatten with, when a context doesn't carry any.
+DEFAULT_FLATTEN_SETTINGS = BlueprintFlattenSettings()
+
+
+# @implements ResolutionContext
+@dataclass(frozen=True)
+class BlueprintFlattenContext:
+    """
+    Resolves resources through another context, carrying the settings to flatten with.
+
+    Attributes
+    ----------
+    resolution_context
+        The context to resolve resources through.
+    settings
+        How to flatten blueprints resolved through this context.
+    """
+
+    resolution_context: ResolutionContext
+    settings: BlueprintFlattenSettings = DEFAULT_FLATTEN_SETTINGS
+
+    # @implements ResolutionContext
+    def __getitem__(self, key: Any) -> Coroutine[None, None, Any]:
+        return self.resolution_context[key]
+
+
+def get_flatten_settings(ctx: ResolutionContext) -> BlueprintFlattenSettings:
+    """Get the settings that `ctx` carries, or the defaults if it doesn't carry any."""
+    if isinstance(ctx, BlueprintFlattenContext):
+        return ctx.settings
+    return DEFAULT_FLATTEN_SETTINGS
@@ -0,0 +1,252 @@
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from pyckaxe import BlockMap, ResolutionContext, ResourceLocation
+
+from mcblueprints.lib.resource.blueprint.blueprint import Blueprint
+from mcblueprints.lib.resource.blueprint.palette_entry.abc.blueprint_palette_entry import (
+    BlueprintPaletteEntry,
+)
+from mcblueprints.lib.resource.blueprint.palette_entry.blueprint_blueprint_palette_entry import (
+    BlueprintBlueprintPaletteEntry,
+)
+from mcblueprints.lib.resource.filter.filter import Filter
+from mcblueprints.utils import count_blocks
+
+__all__ = (
+    "FlattenCounts",
+    "BlueprintFlattenProfiler",
+)
+
+
+# Separates each blueprint from the ones it includes, in the name of an inclusion.
+INCLUSION_SEPARATOR = " > "
+
+# The columns of the table, in order, and how wide each one is.
+TABLE_COLUMNS = (
+    ("overdraw", 8),
+    ("work", 10),
+    ("final", 10),
+    ("written", 10),
+    ("overwritten", 11),
+    ("voided", 8),
+    ("dropped", 8),
+    ("flattens", 8),
+)
+
+
+@dataclass
+class FlattenCounts:
+    """
+    How many cells were touched while flattening one blueprint, and what became of them.
+
+    Attributes
+    ----------
+    flattens
+        How many times the blueprint was flattened.
+    written
+        How many cells were set, by fills and by the palette.
+    overwritten
+        How many of the cells that were set already held a block.
+    voided
+        How many cells were emptied, by fills and by the palette.
+    dropped
+        How many cells were emptied by filters, after flattening.
+    final
+        How many cells held a block at the end.
+    """
+
+    flattens: int = 0
+    written: int = 0
+    overwritten: int = 0
+    voided: int = 0
+    dropped: int = 0
+    final: int = 0
+
+    @property
+    def work(self) -> int:
+        """How many cells were touched in total."""
+        return self.written + self.voided + self.dropped
+
+    @property
+    def overdraw(self) -> Optional[float]:
+        """How many cells were touched for each one left at the end, if any were."""
+        return (self.work / self.final) if self.final else None
+
+    def to_json(self) -> Dict[str, Any]:
+        return {**asdict(self), "work": self.work, "overdraw": self.overdraw}
+
+
+@dataclass
+class BlueprintFlattenProfiler:
+    """
+    Counts the cells touched while flattening blueprints, to find where work is wasted.
+
+    Each root blueprint gets its own counts, named after its location, and so does each
+    blueprint it includes, named after the path of palette entries leading to it (like
+    `ns:root > A=ns:child`). A child that's included more than once is only flattened
+    (and counted) once, the first time, since it's cached after that.
+
+    Blueprints flatten the same way as usual while they're being profiled, except that
+    the largest ones aren't split between threads.
+
+    Attributes
+    ----------
+    counts
+        The counts for each root blueprint and inclusion, in the order they started.
+    """
+
+    counts: Dict[str, FlattenCounts] = field(default_factory=dict)
+
+    # The names of the blueprints being flattened, from the root down.
+    _names: List[str] = field(init=False, default_factory=list)
+
+    # The name to give the next blueprint that's flattened.
+    _next_name: Optional[str] = field(init=False, default=None)
+
+    # The counts of the last blueprint to finish flattening.
+    _last: Optional[FlattenCounts] = field(init=False, default=None)
+
+    def begin_root(self, location: ResourceLocation):
+        """Name the next blueprint to be flattened after `location`."""
+        self._next_name = location.name
+
+    async def flatten(self, ctx: ResolutionContext, blueprint: Blueprint) -> BlockMap:
+        """Flatten `blueprint` the same way it usually would, counting as it goes."""
+        name = self._next_name or "<unknown>"
+        self._next_name = None
+        counts = self.counts.setdefault(name, FlattenCounts())
+        self._names.append(name)
+        try:
+            block_map = await self._flatten(ctx, blueprint, counts)
+        finally:
+            self._names.pop()
+        counts.flattens += 1
+        counts.final = count_blocks(block_map)
+        self._last = counts
+        return block_map
+
+    async def apply_filter(
+        self,
+        ctx: ResolutionContext,
+        filter: Filter,
+        block_map: BlockMap,
+        variant_location: Optional[ResourceLocation] = None,
+    ):
+        """
+        Apply `filter` to the blueprint that was just flattened, counting drops.
+
+        A variant is filtered from its own copy of the block map, and is counted by
+        itself, named after `variant_location`.
+        """
+        before = count_blocks(block_map)
+        await filter.apply(ctx, block_map)
+        after = count_blocks(block_map)
+        if variant_location is not None:
+            counts = self.counts.setdefault(variant_location.name, FlattenCounts())
+        elif (counts := self._last) is None:
+            return
+        counts.dropped += max(before - after, 0)
+        counts.final = after
+
+    async def _flatten(
+        self, ctx: ResolutionContext, blueprint: Blueprint, counts: FlattenCounts
+    ) -> BlockMap:
+        # NOTE This mirrors `Blueprint.flatten`, one step at a time.
+        block_map = await blueprint.make_block_map(ctx)
+
+        for fill in blueprint.fill:
+            before = count_blocks(block_map)
+            await fill.apply(ctx, block_map)
+            after = count_blocks(block_map)
+            if await fill.resolve_block(ctx) is not None:
+                cells = fill.estimate_blocks()
+                counts.written += cells
+                counts.overwritten += cells - (after - before)
+            else:
+                counts.voided += before - after
+
+        symbol_counts = blueprint.count_symbols()
+        for palette_key, palette_entry in blueprint.palette.items():
+            if not (uses := symbol_counts.get(palette_key)):
+                continue
+            # Any child flattened along the way is named after this entry.
+            self._next_name = self._name_inclusion(palette_key, palette_entry)
+            stamp = await palette_entry.resolve_stamp(ctx)
+            self._next_name = None
+            before = count_blocks(block_map)
+            for position in blueprint.scan(palette_key):
+                if stamp is not None:
+                    stamp.merge(block_map, position)
+                else:
+                    await palette_entry.merge(ctx, block_map, position)
+            after = count_blocks(block_map)
+            if stamp is None:
+                # Without a stamp, there's no telling what was overwritten.
+                counts.written += max(after - before, 0)
+                counts.voided += max(before - after, 0)
+            elif stamp.block_map is not None:
+                cells = uses * count_blocks(stamp.block_map)
+                counts.written += cells
+                counts.overwritten += cells - (after - before)
+            elif stamp.block is not None:
+                counts.written += uses
+                counts.overwritten += uses - (after - before)
+            else:
+                counts.voided += before - after
+
+        return block_map
+
+    def _name_inclusion(
+        self, palette_key: str, palette_entry: BlueprintPaletteEntry
+    ) -> str:
+        parent = self._names[-1] if self._names else "<unknown>"
+        child = palette_key
+        if isinstance(palette_entry, BlueprintBlueprintPaletteEntry):
+            value = palette_entry.blueprint.value
+            location = value.name if isinstance(value, ResourceLocation) else "inline"
+            child = f"{palette_key}={location}"
+        return f"{parent}{INCLUSION_SEPARATOR}{child}"
+
+    def to_json(self) -> Dict[str, Any]:
+        """Dump every count, by the name of its root blueprint or inclusion."""
+        return {name: counts.to_json() for name, counts in self.counts.items()}
+
+    def write_json(self, path: Path):
+        """Dump every count into a JSON file at `path`."""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(self.to_json(), indent=2))
+
+    def format_table(self, limit: Optional[int] = None) -> str:
+        """
+        Format the counts as a table, most wasteful first.
+
+        Rows are sorted by overdraw, and then by the total number of cells touched. Only
+        the first `limit` rows are included, if given.
+        """
+        rows = sorted(
+            self.counts.items(),
+            key=lambda item: (item[1].overdraw or 0, item[1].work),
+            reverse=True,
+        )
+        if limit is not None:
+            rows = rows[:limit]
+        header = "  ".join(f"{column:>{width}}" for column, width in TABLE_COLUMNS)
+        lines = [f"{header}  blueprint"]
+        for name, counts in rows:
+            values = counts.to_json()
+            cells = []
+            for column, width in TABLE_COLUMNS:
+                value = values[column]
+                if column == "overdraw":
+                    cells.append(
+                        f"{value:>{width}.2f}"
+                        if value is not None
+                        else f"{'-':>{width}}"
+                    )
+                else:
+                    cells.append(f"{value:>{width}}")
+            lines.append("  ".join(cells) + f"  {name}")
+        return "\n".join(lines)
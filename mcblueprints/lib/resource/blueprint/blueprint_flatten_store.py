@@ -0,0 +1,367 @@
+import asyncio
+import os
+import zlib
+from dataclasses import dataclass, field
+from hashlib import sha256
+from pathlib import Path
+from tempfile import mkstemp
+from typing import Any, Awaitable, Callable, Dict, FrozenSet, List, Optional, Tuple
+from zipfile import BadZipFile
+
+import numpy as np
+from pyckaxe import (
+    Block,
+    BlockMap,
+    Position,
+    ResolutionContext,
+    ResourceLink,
+    ResourceLocation,
+)
+
+from mcblueprints import __version__
+from mcblueprints.lib.resource.blueprint.blueprint import BlueprintLink
+from mcblueprints.lib.resource.filter.filter import FilterLink
+from mcblueprints.lib.resource.structure import (
+    FlattenedStructure,
+    MalformedStructureNbt,
+    StructureNbtDecoder,
+    StructureNbtEncoder,
+)
+from mcblueprints.utils import (
+    get_block_indices,
+    get_block_order,
+    iter_block_map_rows,
+    set_block_indices,
+)
+
+__all__ = (
+    "FlattenStoreStats",
+    "BlueprintFlattenStore",
+)
+
+
+# Bump this whenever flattening changes in a way that would change what's stored, so
+# that nothing stored before is ever used again.
+STORE_FORMAT = "3"
+
+# Entries are compressed numpy archives, named after their key.
+ENTRY_SUFFIX = ".npz"
+
+# Palettes are saved as structures, which need a data version, but nothing ever reads it
+# back out of the store.
+ENTRY_DATA_VERSION = 0
+
+# What an entry loads back as: its grid of indices, the blocks they refer to, and the
+# order that blocks were set in.
+StoreEntry = Tuple[
+    "np.ndarray[Any, Any]", List[Optional[Block]], "np.ndarray[Any, Any]"
+]
+
+
+@dataclass
+class FlattenStoreStats:
+    """
+    How many entries a store holds, and how much space they take up.
+
+    Attributes
+    ----------
+    entries
+        The number of entries.
+    size
+        The total size of every entry, in bytes.
+    oldest
+        When the least recently used entry was last used, if there are any.
+    newest
+        When the most recently used entry was last used, if there are any.
+    """
+
+    entries: int = 0
+    size: int = 0
+    oldest: Optional[float] = None
+    newest: Optional[float] = None
+
+
+@dataclass
+class BlueprintFlattenStore:
+    """
+    A content-addressed store of flattened blueprints, on disk, shared between builds.
+
+    Blueprints included in others are flattened and filtered the same way every time,
+    so long as nothing they depend on changes. The store keeps the result of each one,
+    keyed by a hash of its transitive inputs: the source file of the blueprint itself,
+    and of every resource it refers to (directly or not), and those of the filter it's
+    included with. Resources are hashed by the contents of their source files, rather
+    than by location, so identical blueprints share an entry. Resources written inline
+    are hashed by their value instead. Building again, even from a fresh checkout, loads
+    each block map back instead of flattening it again, and the blueprints it includes
+    aren't flattened either.
+
+    Each entry is a block map, saved as a compressed grid of indices into its palette of
+    blocks, and named after its key (in a subdirectory named after the first two
+    characters of the key, so that no one directory gets too big). The grid loads back
+    in one go, rather than one block at a time like a structure file would, and the
+    palette is saved as a tiny structure of its own, one block per index, so that every
+    block keeps its state and data. Keys are expected to be hashes of whatever went into
+    the block map, so entries never need to be updated: a block map whose inputs change
+    gets a new key instead, and the old entry is eventually pruned. Entries are written
+    to a temporary file and then moved into place, so builds sharing a store never see
+    one that's only partly written. Entries also keep the order their blocks were set
+    in, so they load back just as they were flattened.
+
+    Every time an entry is loaded, its modification time is bumped, so pruning the store
+    removes the least recently used entries first.
+
+    Attributes
+    ----------
+    path
+        The directory holding the store. It's created when the first entry is saved.
+    digest_source
+        Hashes the source file of the resource at a location, or returns `None` if it
+        can't be found. Without it, nothing is ever loaded or saved.
+    loaded
+        How many block maps have been loaded instead of flattened so far.
+    saved
+        How many block maps have been flattened and saved so far.
+    """
+
+    path: Path
+    digest_source: Optional[Callable[[ResourceLocation], Optional[str]]] = None
+
+    loaded: int = field(init=False, default=0)
+    saved: int = field(init=False, default=0)
+
+    # The hash of each located resource and everything it depends on, once known.
+    _digests: Dict[ResourceLocation, Optional[str]] = field(
+        init=False, default_factory=dict, repr=False
+    )
+
+    _encoder: StructureNbtEncoder = field(
+        init=False, default_factory=lambda: StructureNbtEncoder(ENTRY_DATA_VERSION)
+    )
+    _decoder: StructureNbtDecoder = field(
+        init=False, default_factory=StructureNbtDecoder
+    )
+
+    def __str__(self) -> str:
+        return str(self.path)
+
+    def forget(self):
+        """Forget the hash of every resource, in case their source files changed."""
+        self._digests.clear()
+
+    async def make_key(
+        self,
+        ctx: ResolutionContext,
+        blueprint: BlueprintLink,
+        filter: Optional[FilterLink] = None,
+    ) -> Optional[str]:
+        """
+        Hash the transitive inputs of `blueprint`, as filtered by `filter`, if any.
+
+        Returns `None` if anything it depends on can't be traced back to a source file
+        or fails to resolve, in which case it's left to be flattened (or to fail) as
+        usual.
+        """
+        if self.digest_source is None:
+            return None
+        digest = sha256(f"{STORE_FORMAT} {__version__}".encode())
+        for link in (blueprint, filter):
+            link_digest = "-"
+            if link is not None:
+                link_digest = await self._digest_link(ctx, link, frozenset())
+                if link_digest is None:
+                    return None
+            digest.update(f" {link_digest}".encode())
+        return digest.hexdigest()
+
+    async def _digest_link(
+        self,
+        ctx: ResolutionContext,
+        link: ResourceLink[Any],
+        visiting: FrozenSet[ResourceLocation],
+    ) -> Optional[str]:
+        value = link.value
+        if not isinstance(value, ResourceLocation):
+            # Written inline, and so only found in the file of whatever refers to it.
+            return await self._digest_resource(ctx, value, repr(value), visiting)
+        if value in self._digests:
+            return self._digests[value]
+        if value in visiting:
+            return None
+        assert self.digest_source is not None
+        result = None
+        if (source_digest := self.digest_source(value)) is not None:
+            try:
+                resource = await link(ctx)
+            except Exception:
+                # NOTE Leave it to fail during the flatten itself, as it usually would.
+                return None
+            identity = f"{type(resource).__name__} {source_digest}"
+            result = await self._digest_resource(
+                ctx, resource, identity, visiting | {value}
+            )
+        self._digests[value] = result
+        return result
+
+    async def _digest_resource(
+        self,
+        ctx: ResolutionContext,
+        resource: Any,
+        identity: str,
+        visiting: FrozenSet[ResourceLocation],
+    ) -> Optional[str]:
+        digest = sha256(identity.encode())
+        if (iter_links := getattr(resource, "iter_links", None)) is not None:
+            for link in iter_links():
+                if (
+                    link_digest := await self._digest_link(ctx, link, visiting)
+                ) is None:
+                    return None
+                digest.update(f" {link_digest}".encode())
+        return digest.hexdigest()
+
+    def get_entry_path(self, key: str) -> Path:
+        return self.path / key[:2] / f"{key}{ENTRY_SUFFIX}"
+
+    def _encode_palette(self, blocks: List[Optional[Block]]) -> bytes:
+        # Each block goes at its own index along x, leaving the first cell empty.
+        palette_map = BlockMap(size=(len(blocks), 1, 1))
+        for i, block in enumerate(blocks):
+            if block is not None:
+                palette_map[Position.from_xyz(i, 0, 0)] = block
+        # Leave everything in, including air, so every block comes back.
+        structure = FlattenedStructure(palette_map, structure_void=False)
+        return self._encoder.encode(structure, gzipped=False)
+
+    def _decode_palette(self, data: Any) -> List[Optional[Block]]:
+        palette_map = self._decoder.decode(data).block_map
+        size_x, _, _ = palette_map.size.unpack_ints()
+        blocks: List[Optional[Block]] = [None] * size_x
+        for _, x, row in iter_block_map_rows(palette_map):
+            for _, block in row:
+                blocks[x] = block
+        return blocks
+
+    def _load_sync(self, key: str) -> Optional[StoreEntry]:
+        path = self.get_entry_path(key)
+        try:
+            with np.load(path, allow_pickle=False) as entry:
+                cells = entry["cells"]
+                blocks = self._decode_palette(entry["palette"].tobytes())
+                order = entry["order"]
+            if cells.ndim != 3 or (cells.size and int(cells.max()) >= len(blocks)):
+                raise ValueError("Cells refer to blocks beyond the palette")
+            # Mark the entry as recently used.
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        except (
+            OSError,
+            ValueError,
+            KeyError,
+            EOFError,
+            BadZipFile,
+            zlib.error,
+            MalformedStructureNbt,
+        ):
+            # Drop entries that can't be read, so they're saved again.
+            path.unlink(missing_ok=True)
+            return None
+        return cells, blocks, order
+
+    def _save_sync(self, key: str, block_map: BlockMap):
+        path = self.get_entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        cells, blocks = get_block_indices(block_map)
+        palette = np.frombuffer(self._encode_palette(blocks), dtype=np.uint8)
+        # Remember the order that blocks were set in, which is the order they're written
+        # in, unless they're ordered some other way.
+        arrays = dict(cells=cells, palette=palette, order=get_block_order(block_map))
+        fd, temp_path = mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=path.parent)
+        try:
+            with open(fd, "wb") as fp:
+                np.savez_compressed(fp, **arrays)
+            os.replace(temp_path, path)
+        except BaseException:
+            Path(temp_path).unlink(missing_ok=True)
+            raise
+
+    async def load(
+        self, key: str, make_block_map: Callable[[], Awaitable[BlockMap]]
+    ) -> Optional[BlockMap]:
+        """
+        Load the block map saved under `key`, if there is one.
+
+        It's loaded into a new block map from `make_block_map`, so that it's stored the
+        same way it would have been if it were flattened instead. An entry that doesn't
+        fit is left alone, and treated as missing.
+        """
+        loop = asyncio.get_running_loop()
+        if (entry := await loop.run_in_executor(None, self._load_sync, key)) is None:
+            return None
+        cells, blocks, order = entry
+        block_map = await make_block_map()
+        try:
+            set_block_indices(block_map, cells, blocks, order)
+        except ValueError:
+            return None
+        self.loaded += 1
+        return block_map
+
+    async def save(self, key: str, block_map: BlockMap):
+        """Save `block_map` under `key`, replacing anything already saved there."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, self._save_sync, key, block_map)
+        self.saved += 1
+
+    def list_entries(self) -> List[Tuple[Path, os.stat_result]]:
+        """List the path and status of every entry, least recently used first."""
+        entries: List[Tuple[Path, os.stat_result]] = []
+        for path in self.path.glob(f"*/*{ENTRY_SUFFIX}"):
+            try:
+                entries.append((path, path.stat()))
+            except FileNotFoundError:
+                # Pruned by someone else in the meantime.
+                continue
+        entries.sort(key=lambda entry: (entry[1].st_mtime_ns, entry[0]))
+        return entries
+
+    def stats(self) -> FlattenStoreStats:
+        """Count the entries in the store, and how much space they take up."""
+        entries = self.list_entries()
+        return FlattenStoreStats(
+            entries=len(entries),
+            size=sum(stat.st_size for _, stat in entries),
+            oldest=entries[0][1].st_mtime if entries else None,
+            newest=entries[-1][1].st_mtime if entries else None,
+        )
+
+    def prune(self, max_size: int) -> FlattenStoreStats:
+        """
+        Remove the least recently used entries until the rest fit within `max_size`.
+
+        Returns the number and total size of the entries that were removed.
+        """
+        entries = self.list_entries()
+        size = sum(stat.st_size for _, stat in entries)
+        removed = FlattenStoreStats()
+        for path, stat in entries:
+            if size <= max_size:
+                break
+            path.unlink(missing_ok=True)
+            size -= stat.st_size
+            removed.entries += 1
+            removed.size += stat.st_size
+            if removed.oldest is None:
+                removed.oldest = stat.st_mtime
+            removed.newest = stat.st_mtime
+        # Tidy up any directories left empty.
+        if removed.entries:
+            for directory in self.path.iterdir():
+                try:
+                    if directory.is_dir() and not any(directory.iterdir()):
+                        directory.rmdir()
+                except OSError:
+                    # Saved into by someone else in the meantime.
+                    continue
+        return removed
@@ -0,0 +1,294 @@
+from dataclasses import dataclass, field
+from itertools import product
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+from pyckaxe import Block, BlockMap, BlockState, BlockStateValue, Position
+
+from mcblueprints.utils import MappedBlockMap, iter_block_map_rows, make_block_map_like
+
+__all__ = (
+    "BLUEPRINT_ROTATIONS",
+    "BLUEPRINT_MIRRORS",
+    "BlueprintOrientation",
+)
+
+
+# Rotations are clockwise, in degrees, as seen from above.
+BLUEPRINT_ROTATIONS = (0, 90, 180, 270)
+
+# Mirroring flips along either horizontal axis.
+BLUEPRINT_MIRRORS = ("x", "z")
+
+
+# Horizontal directions, in clockwise order.
+DIRECTIONS = ("north", "east", "south", "west")
+
+# The shapes a rail can take, in the order vanilla names them.
+RAIL_SHAPES = (
+    "north_south",
+    "east_west",
+    "ascending_east",
+    "ascending_west",
+    "ascending_north",
+    "ascending_south",
+    "south_east",
+    "south_west",
+    "north_west",
+    "north_east",
+)
+
+# Stair shapes are relative to the stair itself, so only mirroring affects them.
+STAIR_SHAPES = {
+    "inner_left": "inner_right",
+    "inner_right": "inner_left",
+    "outer_left": "outer_right",
+    "outer_right": "outer_left",
+}
+
+# Properties whose `left` and `right` values swap when mirrored.
+HANDED_PROPERTIES = ("hinge", "type")
+
+# Properties that hold a direction, or several joined together, e.g. jigsaw blocks.
+DIRECTIONAL_PROPERTIES = ("facing", "orientation")
+
+# Properties holding one of 16 rotations, where 0 is south and 4 is west.
+ROTATION_PROPERTY = "rotation"
+ROTATION_STEPS = 16
+
+
+def _make_direction_map(rotate: int, mirror: Optional[str]) -> Dict[str, str]:
+    direction_map = {direction: direction for direction in DIRECTIONS}
+    # Mirror first...
+    if mirror == "x":
+        direction_map.update(east="west", west="east")
+    elif mirror == "z":
+        direction_map.update(north="south", south="north")
+    # ... then rotate.
+    steps = rotate // 90
+    return {
+        direction: DIRECTIONS[(DIRECTIONS.index(mirrored) + steps) % len(DIRECTIONS)]
+        for direction, mirrored in direction_map.items()
+    }
+
+
+def _map_joined_directions(value: str, direction_map: Dict[str, str]) -> str:
+    return "_".join(direction_map.get(word, word) for word in value.split("_"))
+
+
+def _map_rotation(value: int, rotate: int, mirror: Optional[str]) -> int:
+    if mirror == "x":
+        value = ROTATION_STEPS - value
+    elif mirror == "z":
+        value = ROTATION_STEPS // 2 - value
+    value += rotate * ROTATION_STEPS // 360
+    return value % ROTATION_STEPS
+
+
+def _make_value_table(rotate: int, mirror: Optional[str]) -> Dict[Tuple[str, str], str]:
+    direction_map = _make_direction_map(rotate, mirror)
+    table: Dict[Tuple[str, str], str] = {}
+
+    # Single directions, and directions joined together (jigsaw orientations).
+    for key in DIRECTIONAL_PROPERTIES:
+        for direction in DIRECTIONS:
+            table[key, direction] = direction_map[direction]
+        for front, top in product((*DIRECTIONS, "up", "down"), repeat=2):
+            value = f"{front}_{top}"
+            table[key, value] = _map_joined_directions(value, direction_map)
+
+    # An axis only changes on a quarter turn.
+    if rotate in (90, 270):
+        table["axis", "x"] = "z"
+        table["axis", "z"] = "x"
+
+    # Rail shapes are unordered pairs, so fix the order back up after mapping them.
+    for shape in RAIL_SHAPES:
+        mapped = _map_joined_directions(shape, direction_map)
+        if mapped not in RAIL_SHAPES:
+            mapped = "_".join(reversed(mapped.split("_")))
+        table["shape", shape] = mapped
+
+    # Left and right only swap when mirrored.
+    if mirror is not None:
+        for key in HANDED_PROPERTIES:
+            table[key, "left"] = "right"
+            table[key, "right"] = "left"
+        for shape, mirrored_shape in STAIR_SHAPES.items():
+            table["shape", shape] = mirrored_shape
+
+    # Sign and banner rotations.
+    for value in range(ROTATION_STEPS):
+        table[ROTATION_PROPERTY, str(value)] = str(_map_rotation(value, rotate, mirror))
+
+    # Leave out anything that doesn't actually change.
+    return {k: v for k, v in table.items() if k[1] != v}
+
+
+def _make_key_table(rotate: int, mirror: Optional[str]) -> Dict[str, str]:
+    # Blocks that connect to their neighbours (fences, walls, vines, redstone...) have a
+    # property per direction, so the properties themselves need to be swapped around.
+    direction_map = _make_direction_map(rotate, mirror)
+    return {k: v for k, v in direction_map.items() if k != v}
+
+
+# Precompute the lookup tables for every possible orientation.
+VALUE_TABLES: Dict[Tuple[int, Optional[str]], Dict[Tuple[str, str], str]] = {
+    (rotate, mirror): _make_value_table(rotate, mirror)
+    for rotate, mirror in product(BLUEPRINT_ROTATIONS, (None, *BLUEPRINT_MIRRORS))
+}
+KEY_TABLES: Dict[Tuple[int, Optional[str]], Dict[str, str]] = {
+    (rotate, mirror): _make_key_table(rotate, mirror)
+    for rotate, mirror in product(BLUEPRINT_ROTATIONS, (None, *BLUEPRINT_MIRRORS))
+}
+
+
+def _stringify_value(value: BlockStateValue) -> str:
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    return str(value)
+
+
+@dataclass(frozen=True)
+class BlueprintOrientation:
+    """
+    Rotates and/or mirrors a flattened blueprint about the vertical axis.
+
+    Mirroring is applied before rotating, which matches how the game itself orients
+    structures. Block states are remapped along with positions, so that stairs keep
+    facing the right way, fences keep connecting to the right neighbours, and so on.
+    Properties like `half` are unaffected by turning about the vertical axis.
+
+    Attributes
+    ----------
+    rotate
+        How far to rotate, clockwise as seen from above: 0, 90, 180 or 270.
+    mirror
+        The axis to flip along, if any: `x` or `z`.
+    """
+
+    rotate: int = 0
+    mirror: Optional[str] = None
+
+    _block_cache: Dict[Block, Block] = field(
+        init=False, default_factory=dict, repr=False, compare=False, hash=False
+    )
+
+    def __post_init__(self):
+        if self.rotate not in BLUEPRINT_ROTATIONS:
+            raise ValueError(f"Invalid rotation: {self.rotate}")
+        if (self.mirror is not None) and (self.mirror not in BLUEPRINT_MIRRORS):
+            raise ValueError(f"Invalid mirror: {self.mirror}")
+
+    @property
+    def is_identity(self) -> bool:
+        return (self.rotate == 0) and (self.mirror is None)
+
+    def transform_size(self, size: Position) -> Position:
+        """Return the size of a block map after it's been reoriented."""
+        if self.rotate in (90, 270):
+            return Position(size.z, size.y, size.x)
+        return size
+
+    def make_xz_transform(
+        self, size: Position
+    ) -> Callable[[int, int], Tuple[int, int]]:
+        """Return a function that reorients (x, z) coordinates within `size`."""
+        size_x, _, size_z = size.unpack_ints()
+        max_x = size_x - 1
+        max_z = size_z - 1
+        mirror_x = self.mirror == "x"
+        mirror_z = self.mirror == "z"
+        rotate = self.rotate
+
+        def transform(x: int, z: int) -> Tuple[int, int]:
+            if mirror_x:
+                x = max_x - x
+            elif mirror_z:
+                z = max_z - z
+            if rotate == 90:
+                return max_z - z, x
+            if rotate == 180:
+                return max_x - x, max_z - z
+            if rotate == 270:
+                return z, max_x - x
+            return x, z
+
+        return transform
+
+    def transform_position(self, position: Position, size: Position) -> Position:
+        """Reorient a position within a block map of the given `size`."""
+        x, y, z = position.unpack_ints()
+        x, z = self.make_xz_transform(size)(x, z)
+        transformed = Position.from_xyz(x, y, z)
+        # Keep relative positions relative.
+        if position.x.is_relative:
+            return transformed.relative()
+        return transformed
+
+    def transform_block(self, block: Block) -> Block:
+        """Return a copy of `block` with its state reoriented."""
+        if (cached := self._block_cache.get(block)) is not None:
+            return cached
+        transformed = block
+        if block.state:
+            key_table = KEY_TABLES[self.rotate, self.mirror]
+            value_table = VALUE_TABLES[self.rotate, self.mirror]
+            state = BlockState()
+            for key, value in block.state.items():
+                new_value: BlockStateValue = value
+                if (
+                    mapped := value_table.get((key, _stringify_value(value)))
+                ) is not None:
+                    new_value = int(mapped) if isinstance(value, int) else mapped
+                state[key_table.get(key, key)] = new_value
+            transformed = Block(name=block.name, state=state, data=block.data)
+        self._block_cache[block] = transformed
+        return transformed
+
+    def apply(self, block_map: BlockMap) -> BlockMap:
+        """Return a reoriented copy of `block_map`, stored the same way."""
+        if self.is_identity:
+            return block_map
+        transform_xz = self.make_xz_transform(block_map.size)
+        transformed = make_block_map_like(
+            block_map, self.transform_size(block_map.size)
+        )
+        if isinstance(block_map, MappedBlockMap):
+            assert isinstance(transformed, MappedBlockMap)
+            self._apply_mapped(block_map, transformed, transform_xz)
+            return transformed
+        for y, x, row in iter_block_map_rows(block_map):
+            for z, block in row:
+                transformed_x, transformed_z = transform_xz(x, z)
+                transformed[transformed_x, y, transformed_z] = self.transform_block(
+                    block
+                )
+        return transformed
+
+    def _apply_mapped(
+        self,
+        block_map: MappedBlockMap,
+        transformed: MappedBlockMap,
+        transform_xz: Callable[[int, int], Tuple[int, int]],
+    ):
+        # Transform each block once, and the coordinates of every column once, and then
+        # move whole layers at a time. Cells are set in order of position, as they are
+        # for any other block map.
+        translate = transformed.index_blocks(
+            [
+                None if block is None else self.transform_block(block)
+                for block in block_map.blocks
+            ]
+        )
+        size_x, _, size_z = block_map.size.unpack_ints()
+        xs, zs = np.indices((size_x, size_z))
+        transformed_xs, transformed_zs = transform_xz(xs, zs)  # type: ignore
+        for y, layer in enumerate(block_map.cells):
+            transformed.cells[y][transformed_xs, transformed_zs] = translate[layer]
+            filled_xs, filled_zs = np.nonzero(layer)
+            transformed.mark_set(
+                y,
+                transformed_xs[filled_xs, filled_zs],
+                transformed_zs[filled_xs, filled_zs],
+            )
@@ -0,0 +1,84 @@
+import asyncio
+from dataclasses import dataclass, field
+from typing import Any, Set
+
+from pyckaxe import ResolutionContext, Resource, ResourceLink
+
+from mcblueprints.lib.resource.blueprint.blueprint import Blueprint
+
+__all__ = ("BlueprintPrefetcher",)
+
+
+DEFAULT_PREFETCH_CONCURRENCY = 32
+
+
+@dataclass
+class _Prefetch:
+    ctx: ResolutionContext
+    semaphore: asyncio.Semaphore
+    visited: Set[int] = field(default_factory=set)
+    resolved: int = 0
+
+    async def visit(self, resource: Any):
+        # Resources can be reached more than once, but only need to be walked once.
+        if id(resource) in self.visited:
+            return
+        self.visited.add(id(resource))
+        if (iter_links := getattr(resource, "iter_links", None)) is not None:
+            await asyncio.gather(*(self.follow(link) for link in iter_links()))
+
+    async def follow(self, link: ResourceLink[Any]):
+        # Hold the semaphore only while resolving, and not while following the links
+        # of the result, so that deep dependencies can't starve each other.
+        async with self.semaphore:
+            try:
+                resource = await link(self.ctx)
+            except Exception:
+                # NOTE Leave it to be resolved (and fail) again in order, during the
+                # flatten itself, so that errors are raised the same way as without.
+                return
+        self.resolved += 1
+        await self.visit(resource)
+
+
+@dataclass
+class BlueprintPrefetcher:
+    """
+    Resolves every resource a blueprint depends on, all at once.
+
+    Flattening resolves palette entries, fills and filter rules one at a time, in
+    order, so each resource that isn't cached yet holds up the whole flatten while it's
+    loaded. Prefetching walks the blueprint ahead of time instead, resolving everything
+    it refers to concurrently, and then everything those refer to, and so on. Flattening
+    afterwards finds every resource already cached.
+
+    Loads are blocking reads on the event loop's (bounded) default executor, so limiting
+    how many resources are resolved at once also limits how many threads are reading.
+
+    Attributes
+    ----------
+    concurrency
+        The most resources to resolve at once.
+    """
+
+    concurrency: int = DEFAULT_PREFETCH_CONCURRENCY
+
+    def __post_init__(self):
+        if self.concurrency < 1:
+            raise ValueError(
+                f"Expected a concurrency of at least 1: {self.concurrency}"
+            )
+
+    async def __call__(self, ctx: ResolutionContext, blueprint: Blueprint) -> int:
+        return await self.prefetch(ctx, blueprint)
+
+    async def prefetch(self, ctx: ResolutionContext, resource: Resource) -> int:
+        """
+        Resolve everything that `resource` depends on, directly or not.
+
+        Resources that fail to resolve are skipped over. Returns the number of links
+        that were resolved.
+        """
+        prefetch = _Prefetch(ctx=ctx, semaphore=asyncio.Semaphore(self.concurrency))
+        await prefetch.visit(resource)
+        return prefetch.resolved
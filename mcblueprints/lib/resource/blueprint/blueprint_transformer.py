@@ -1,12 +1,21 @@
-from dataclasses import dataclass
-from typing import AsyncIterable, Optional, Tuple, TypeVar
+from dataclasses import dataclass, field
+from typing import AsyncIterable, Callable, Optional, Tuple, TypeVar
 
 from pyckaxe import Namespace, Resource, ResourceLocation, Structure, StructureLocation
 
 from mcblueprints.lib.resource.blueprint.blueprint import BlueprintProcessingContext
+from mcblueprints.lib.resource.blueprint.blueprint_flatten_context import (
+    BlueprintFlattenContext,
+    BlueprintFlattenSettings,
+)
+from mcblueprints.lib.resource.blueprint.blueprint_prefetcher import (
+    BlueprintPrefetcher,
+)
 from mcblueprints.lib.resource.blueprint.palette_entry.abc.blueprint_palette_entry import (
     BlueprintPaletteEntry,
 )
+from mcblueprints.lib.resource.structure import FlattenedStructure
+from mcblueprints.utils import copy_block_map
 
 __all__ = ("BlueprintTransformer",)
 
@@ -27,10 +36,23 @@ class BlueprintTransformer:
         A separate namespace to use for generated resources.
     generated_prefix_parts
         A prefix to apply to the locations of generated resources.
+    prefetcher
+        Resolves everything the blueprint depends on before flattening it, if given.
+    flatten_settings
+        How to flatten each blueprint, including whether to count the cells touched
+        along the way.
+    blueprint_exists
+        Tells whether there's a blueprint at a location, so that no variant is written
+        over the structure of another blueprint. Without it, variants aren't checked.
     """
 
     generated_namespace: Optional[str] = None
     generated_prefix_parts: Optional[Tuple[str, ...]] = None
+    prefetcher: Optional[BlueprintPrefetcher] = None
+    flatten_settings: BlueprintFlattenSettings = field(
+        default_factory=BlueprintFlattenSettings
+    )
+    blueprint_exists: Optional[Callable[[ResourceLocation], bool]] = None
 
     # @implements ResourceTransformer
     def __call__(
@@ -41,10 +63,68 @@ class BlueprintTransformer:
     async def transform(
         self, ctx: BlueprintProcessingContext
     ) -> AsyncIterable[Tuple[Resource, ResourceLocation]]:
-        """Turn the blueprint into a structure NBT file."""
-        structure = await ctx.resource.to_structure(ctx)
-        structure_location = self.to_structure_location(ctx.location)
-        yield structure, structure_location
+        """Turn the blueprint into a structure NBT file, plus one per variant."""
+        blueprint = ctx.resource
+
+        # Load everything the blueprint needs at once, rather than one at a time.
+        if self.prefetcher is not None:
+            await self.prefetcher(ctx, blueprint)
+
+        # Flatten with the settings of this build, whichever build loaded the blueprint.
+        flatten_ctx = BlueprintFlattenContext(ctx, self.flatten_settings)
+
+        # Name the blueprint after its location, if counting the cells it touches.
+        profiler = self.flatten_settings.profiler
+        if profiler is not None:
+            profiler.begin_root(ctx.location)
+
+        # Without variants, there's no need to hold onto the block map.
+        if not blueprint.variants:
+            structure = await blueprint.to_structure(flatten_ctx)
+            if isinstance(structure, FlattenedStructure):
+                structure.name = ctx.location.name
+            yield structure, self.to_structure_location(ctx.location)
+            return
+
+        # Variants are named after the blueprint, so they mustn't clash with another.
+        if self.blueprint_exists is not None:
+            for variant_name in blueprint.variants:
+                variant_location = ctx.location / variant_name
+                if self.blueprint_exists(variant_location):
+                    raise ValueError(
+                        f"Variant `{variant_name}` of {ctx.location} clashes with"
+                        + f" the blueprint at {variant_location}"
+                    )
+
+        # Flatten the blueprint once, and share that across every variant.
+        block_map = await blueprint.flatten(flatten_ctx)
+        structure = FlattenedStructure(
+            block_map,
+            structure_void=blueprint.structure_void,
+            name=ctx.location.name,
+        )
+        yield structure, self.to_structure_location(ctx.location)
+
+        # Apply each filter to its own copy of the block map.
+        for variant_name, filter_link in blueprint.variants.items():
+            variant_block_map = copy_block_map(block_map)
+            filter = await filter_link(flatten_ctx)
+            variant_location = ctx.location / variant_name
+            if profiler is not None:
+                await profiler.apply_filter(
+                    flatten_ctx,
+                    filter,
+                    variant_block_map,
+                    variant_location=variant_location,
+                )
+            else:
+                await filter.apply(flatten_ctx, variant_block_map)
+            variant_structure = FlattenedStructure(
+                variant_block_map,
+                structure_void=blueprint.structure_void,
+                name=variant_location.name,
+            )
+            yield variant_structure, self.to_structure_location(variant_location)
 
     def to_structure_location(self, location: ResourceLocation) -> StructureLocation:
         # Map the blueprint location to a structure location.
@@ -0,0 +1,89 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+from itertools import repeat
+from typing import Iterable, Iterator, List, Tuple
+
+__all__ = (
+    "MalformedCompactLayoutRow",
+    "CompactLayoutRow",
+)
+
+
+# Repeats the preceding symbol, e.g. `M*96`.
+REPEAT_OPERATOR = "*"
+
+# Makes the next character a plain symbol, e.g. `\*` for a literal `*`.
+ESCAPE_CHARACTER = "\\"
+
+
+class MalformedCompactLayoutRow(Exception):
+    def __init__(self, message: str, raw_row: str):
+        self.raw_row: str = raw_row
+        super().__init__(f"{message}: {raw_row!r}")
+
+
+@dataclass(frozen=True)
+class CompactLayoutRow:
+    """
+    A layout row stored as runs of repeated symbols, rather than one symbol per cell.
+
+    Attributes
+    ----------
+    runs
+        Pairs of symbols and how many times in a row they repeat.
+    """
+
+    runs: Tuple[Tuple[str, int], ...]
+
+    @classmethod
+    def parse(cls, raw_row: str) -> CompactLayoutRow:
+        """
+        Decode a row like `B*3s*3B*3` into runs, without expanding it.
+
+        Each symbol may be followed by `*` and a count to repeat it. A `\\` makes the
+        next character a plain symbol, so `\\*` and `\\\\` stand for `*` and `\\`.
+        """
+        runs: List[Tuple[str, int]] = []
+        i = 0
+        end = len(raw_row)
+        while i < end:
+            symbol = raw_row[i]
+            i += 1
+            if symbol == ESCAPE_CHARACTER:
+                if i == end:
+                    raise MalformedCompactLayoutRow("Nothing left to escape", raw_row)
+                symbol = raw_row[i]
+                i += 1
+            elif symbol == REPEAT_OPERATOR:
+                raise MalformedCompactLayoutRow("Nothing to repeat", raw_row)
+            count = 1
+            if (i < end) and (raw_row[i] == REPEAT_OPERATOR):
+                i += 1
+                start = i
+                while (i < end) and raw_row[i].isdigit():
+                    i += 1
+                if i == start:
+                    raise MalformedCompactLayoutRow("Missing repeat count", raw_row)
+                count = int(raw_row[start:i])
+            # Merge consecutive runs of the same symbol.
+            if runs and (runs[-1][0] == symbol):
+                runs[-1] = (symbol, runs[-1][1] + count)
+            elif count > 0:
+                runs.append((symbol, count))
+        return cls(runs=tuple(runs))
+
+    def __len__(self) -> int:
+        return sum(count for _, count in self.runs)
+
+    def __iter__(self) -> Iterator[str]:
+        for symbol, count in self.runs:
+            yield from repeat(symbol, count)
+
+    def scan(self, symbol: str) -> Iterable[int]:
+        """Yield the index of every cell holding `symbol`."""
+        start = 0
+        for run_symbol, count in self.runs:
+            if run_symbol == symbol:
+                yield from range(start, start + count)
+            start += count
@@ -2,4 +2,5 @@ from .abc import *
 from .block_blueprint_palette_entry import *
 from .blueprint_blueprint_palette_entry import *
 from .material_blueprint_palette_entry import *
+from .structure_blueprint_palette_entry import *
 from .void_blueprint_palette_entry import *
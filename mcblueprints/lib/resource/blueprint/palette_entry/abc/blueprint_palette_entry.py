@@ -1,9 +1,49 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from typing import Any, Iterable, Optional
 
-from pyckaxe import BlockMap, Position, ResolutionContext
+from pyckaxe import Block, BlockMap, Position, ResolutionContext, ResourceLink
 
-__all__ = ("BlueprintPaletteEntry",)
+from mcblueprints.utils import merge_block_map
+
+__all__ = (
+    "BlueprintPaletteEntry",
+    "BlueprintStamp",
+)
+
+
+@dataclass
+class BlueprintStamp:
+    """
+    What a palette entry puts down wherever it's used, already resolved.
+
+    A stamp is either a single cell (a block, or void if there's no block) at each
+    position, or a whole block map merged with its origin at `position - offset`.
+    Putting a stamp down doesn't need to resolve anything, so it can be done outside of
+    the event loop.
+
+    Attributes
+    ----------
+    block
+        The block to set at each position, unless there's a block map.
+    block_map
+        The block map to merge at each position, if any.
+    offset
+        How far the position is from the origin of the block map.
+    """
+
+    block: Optional[Block] = None
+    block_map: Optional[BlockMap] = None
+    offset: Position = Position.from_xyz(0, 0, 0)
+
+    def merge(self, block_map: BlockMap, position: Position):
+        """Put the stamp down into `block_map` at `position`."""
+        if self.block_map is not None:
+            merge_block_map(block_map, self.block_map, position - self.offset)
+        elif self.block is not None:
+            block_map[position] = self.block
+        else:
+            del block_map[position]
 
 
 @dataclass
@@ -15,3 +55,23 @@ class BlueprintPaletteEntry(ABC):
         self, ctx: ResolutionContext, block_map: BlockMap, position: Position
     ):
         """Merge into `block_map` at `position`."""
+
+    async def resolve_stamp(self, ctx: ResolutionContext) -> Optional[BlueprintStamp]:
+        """
+        Resolve what merging puts down, so that it can be put down many times over.
+
+        Returns `None` if the entry can't be turned into a stamp, and must be merged one
+        position at a time instead.
+        """
+        return None
+
+    async def estimate_blocks(self, ctx: ResolutionContext) -> int:
+        """Estimate how many blocks merging sets, to help choose how to store them."""
+        return 1
+
+    def iter_links(self) -> Iterable[ResourceLink[Any]]:
+        """Yield every resource that merging may need to resolve."""
+        return ()
+
+    def clear_cache(self):
+        """Forget anything cached between merges."""
@@ -4,6 +4,7 @@ from pyckaxe import Block, BlockMap, Position, ResolutionContext
 
 from mcblueprints.lib.resource.blueprint.palette_entry.abc.blueprint_palette_entry import (
     BlueprintPaletteEntry,
+    BlueprintStamp,
 )
 
 __all__ = ("BlockBlueprintPaletteEntry",)
@@ -18,3 +19,7 @@ class BlockBlueprintPaletteEntry(BlueprintPaletteEntry):
     ):
         # Set the corresponding block in the block map.
         block_map[position] = self.block
+
+    # @overrides BlueprintPaletteEntry
+    async def resolve_stamp(self, ctx: ResolutionContext) -> BlueprintStamp:
+        return BlueprintStamp(block=self.block)
@@ -1,11 +1,15 @@
-from dataclasses import dataclass
-from typing import Optional
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
 
-from pyckaxe import BlockMap, Position, ResolutionContext
+from pyckaxe import BlockMap, Position, ResolutionContext, ResourceLink
 
 from mcblueprints.lib.resource.blueprint.blueprint import BlueprintLink
+from mcblueprints.lib.resource.blueprint.blueprint_orientation import (
+    BlueprintOrientation,
+)
 from mcblueprints.lib.resource.blueprint.palette_entry.abc.blueprint_palette_entry import (
     BlueprintPaletteEntry,
+    BlueprintStamp,
 )
 from mcblueprints.lib.resource.filter.filter import FilterLink
 
@@ -17,21 +21,43 @@ class BlueprintBlueprintPaletteEntry(BlueprintPaletteEntry):
     blueprint: BlueprintLink
     offset: Position
     filter: Optional[FilterLink] = None
+    orientation: BlueprintOrientation = field(default_factory=BlueprintOrientation)
 
     async def merge(
         self, ctx: ResolutionContext, block_map: BlockMap, position: Position
     ):
-        # Resolve the child blueprint.
-        child_blueprint = await self.blueprint(ctx)
+        # Merge the converted child block map into the parent block map.
+        stamp = await self.resolve_stamp(ctx)
+        stamp.merge(block_map, position)
 
-        # Flatten the child blueprint into its own block map independently.
-        child_block_map = await child_blueprint.flatten(ctx)
+    # @overrides BlueprintPaletteEntry
+    async def resolve_stamp(self, ctx: ResolutionContext) -> BlueprintStamp:
+        # Resolve the child blueprint, and its filter if present.
+        child_blueprint = await self.blueprint(ctx)
+        filter = await self.filter(ctx) if self.filter is not None else None
+
+        # Flatten, filter and reorient the child blueprint into its own block map. The
+        # result is cached on the child, so repeated uses of it are cheap. It may also
+        # be loaded from the flatten store, instead of being flattened at all.
+        child_block_map = await child_blueprint.flatten_as_child(
+            ctx, filter, self.orientation, link=self.blueprint, filter_link=self.filter
+        )
+
+        # The child is placed relative to its own (reoriented) anchor.
+        child_anchor = self.orientation.transform_position(
+            child_blueprint.anchor, child_blueprint.size
+        )
+        return BlueprintStamp(
+            block_map=child_block_map, offset=self.offset + child_anchor
+        )
+
+    # @overrides BlueprintPaletteEntry
+    async def estimate_blocks(self, ctx: ResolutionContext) -> int:
+        child_blueprint = await self.blueprint(ctx)
+        return await child_blueprint.estimate_blocks(ctx)
 
-        # If a filter is present, apply it to the child block map before merging it.
+    # @overrides BlueprintPaletteEntry
+    def iter_links(self) -> Iterable[ResourceLink[Any]]:
+        yield self.blueprint
         if self.filter is not None:
-            filter = await self.filter(ctx)
-            await filter.apply(ctx, child_block_map)
-
-        # Merge the converted child block map into the parent block map.
-        child_offset = position - self.offset - child_blueprint.anchor
-        block_map.merge(child_block_map, child_offset)
+            yield self.filter
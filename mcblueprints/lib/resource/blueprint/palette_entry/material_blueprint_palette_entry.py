@@ -1,9 +1,11 @@
 from dataclasses import dataclass
+from typing import Any, Iterable
 
-from pyckaxe import BlockMap, Position, ResolutionContext
+from pyckaxe import BlockMap, Position, ResolutionContext, ResourceLink
 
 from mcblueprints.lib.resource.blueprint.palette_entry.abc.blueprint_palette_entry import (
     BlueprintPaletteEntry,
+    BlueprintStamp,
 )
 from mcblueprints.lib.resource.material.material import MaterialLink
 
@@ -21,3 +23,12 @@ class MaterialBlueprintPaletteEntry(BlueprintPaletteEntry):
         material = await self.material(ctx)
         # Set the corresponding block in the block map.
         block_map[position] = material.block
+
+    # @overrides BlueprintPaletteEntry
+    async def resolve_stamp(self, ctx: ResolutionContext) -> BlueprintStamp:
+        material = await self.material(ctx)
+        return BlueprintStamp(block=material.block)
+
+    # @overrides BlueprintPaletteEntry
+    def iter_links(self) -> Iterable[ResourceLink[Any]]:
+        yield self.material
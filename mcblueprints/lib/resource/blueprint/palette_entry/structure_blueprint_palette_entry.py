@@ -0,0 +1,75 @@
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional, Tuple
+
+from pyckaxe import BlockMap, Position, ResolutionContext, ResourceLink, Structure
+
+from mcblueprints.lib.resource.blueprint.palette_entry.abc.blueprint_palette_entry import (
+    BlueprintPaletteEntry,
+    BlueprintStamp,
+)
+from mcblueprints.lib.resource.filter.filter import Filter, FilterLink
+from mcblueprints.lib.resource.structure import FlattenedStructure, StructureLink
+from mcblueprints.utils import copy_block_map, count_blocks
+
+__all__ = ("StructureBlueprintPaletteEntry",)
+
+
+@dataclass
+class StructureBlueprintPaletteEntry(BlueprintPaletteEntry):
+    structure: StructureLink
+    offset: Position
+    filter: Optional[FilterLink] = None
+
+    # The last block map merged, along with the structure and filter it came from.
+    _cached: Optional[Tuple[Structure, Optional[Filter], BlockMap]] = field(
+        init=False, default=None, repr=False, compare=False
+    )
+
+    async def _get_block_map(
+        self, ctx: ResolutionContext, structure: Structure
+    ) -> BlockMap:
+        filter = await self.filter(ctx) if self.filter is not None else None
+        # Reuse the last block map, as long as neither the structure nor filter changed.
+        if self._cached is not None:
+            cached_structure, cached_filter, cached_block_map = self._cached
+            if (cached_structure is structure) and (cached_filter is filter):
+                return cached_block_map
+        block_map = FlattenedStructure.from_structure(structure).block_map
+        # Filter a copy, so that the cached structure itself is left alone.
+        if filter is not None:
+            block_map = copy_block_map(block_map)
+            await filter.apply(ctx, block_map)
+        self._cached = (structure, filter, block_map)
+        return block_map
+
+    async def merge(
+        self, ctx: ResolutionContext, block_map: BlockMap, position: Position
+    ):
+        # Merge the structure's block map into the blueprint's block map.
+        stamp = await self.resolve_stamp(ctx)
+        stamp.merge(block_map, position)
+
+    # @overrides BlueprintPaletteEntry
+    async def resolve_stamp(self, ctx: ResolutionContext) -> BlueprintStamp:
+        # Resolve the structure, which is decoded once and then cached.
+        structure = await self.structure(ctx)
+
+        # Get the blocks of the structure, filtered if need be.
+        structure_block_map = await self._get_block_map(ctx, structure)
+
+        return BlueprintStamp(block_map=structure_block_map, offset=self.offset)
+
+    # @overrides BlueprintPaletteEntry
+    async def estimate_blocks(self, ctx: ResolutionContext) -> int:
+        structure = await self.structure(ctx)
+        return count_blocks(FlattenedStructure.from_structure(structure).block_map)
+
+    # @overrides BlueprintPaletteEntry
+    def iter_links(self) -> Iterable[ResourceLink[Any]]:
+        yield self.structure
+        if self.filter is not None:
+            yield self.filter
+
+    # @overrides BlueprintPaletteEntry
+    def clear_cache(self):
+        self._cached = None
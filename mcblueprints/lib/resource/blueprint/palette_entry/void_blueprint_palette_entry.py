@@ -4,6 +4,7 @@ from pyckaxe import BlockMap, Position, ResolutionContext
 
 from mcblueprints.lib.resource.blueprint.palette_entry.abc.blueprint_palette_entry import (
     BlueprintPaletteEntry,
+    BlueprintStamp,
 )
 
 __all__ = ("VoidBlueprintPaletteEntry",)
@@ -16,3 +17,11 @@ class VoidBlueprintPaletteEntry(BlueprintPaletteEntry):
     ):
         # Void the block in the block map.
         del block_map[position]
+
+    # @overrides BlueprintPaletteEntry
+    async def resolve_stamp(self, ctx: ResolutionContext) -> BlueprintStamp:
+        return BlueprintStamp()
+
+    # @overrides BlueprintPaletteEntry
+    async def estimate_blocks(self, ctx: ResolutionContext) -> int:
+        return 0
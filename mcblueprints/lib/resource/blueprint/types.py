@@ -1,4 +1,6 @@
 from typing import TypeAlias
 
 BlueprintPalette = TypeAlias
+BlueprintLayoutRow = TypeAlias
 BlueprintLayout = TypeAlias
+BlueprintVariants = TypeAlias
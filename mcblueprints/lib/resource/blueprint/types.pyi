@@ -1,8 +1,12 @@
-from typing import Dict, List, TypeAlias
+from typing import Dict, List, TypeAlias, Union
 
+from mcblueprints.lib.resource.blueprint.compact_layout_row import CompactLayoutRow
 from mcblueprints.lib.resource.blueprint.palette_entry.abc.blueprint_palette_entry import (
     BlueprintPaletteEntry,
 )
+from mcblueprints.lib.resource.filter.filter import FilterLink
 
 BlueprintPalette: TypeAlias = Dict[str, BlueprintPaletteEntry]
-BlueprintLayout: TypeAlias = List[List[str]]
+BlueprintLayoutRow: TypeAlias = Union[str, CompactLayoutRow]
+BlueprintLayout: TypeAlias = List[List[BlueprintLayoutRow]]
+BlueprintVariants: TypeAlias = Dict[str, FilterLink]
@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from typing import List, TypeAlias
+from typing import Any, Iterable, List, TypeAlias
 
 from pyckaxe import BlockMap, ResolutionContext, Resource, ResourceLink
 
@@ -20,5 +20,10 @@ class Filter(Resource):
         for rule in self.rules:
             await rule.apply(ctx, block_map)
 
+    def iter_links(self) -> Iterable[ResourceLink[Any]]:
+        """Yield every resource that applying the filter may need to resolve."""
+        for rule in self.rules:
+            yield from rule.iter_links()
+
 
 FilterLink: TypeAlias = ResourceLink[Filter]
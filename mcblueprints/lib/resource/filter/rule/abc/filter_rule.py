@@ -1,7 +1,8 @@
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
+from typing import Any, Iterable
 
-from pyckaxe import BlockMap, ResolutionContext
+from pyckaxe import BlockMap, ResolutionContext, ResourceLink
 
 __all__ = ("FilterRule",)
 
@@ -11,3 +12,7 @@ class FilterRule(ABC):
     @abstractmethod
     async def apply(self, ctx: ResolutionContext, block_map: BlockMap):
         """Apply the filter rule to `block_map`."""
+
+    def iter_links(self) -> Iterable[ResourceLink[Any]]:
+        """Yield every resource that applying the rule may need to resolve."""
+        return ()
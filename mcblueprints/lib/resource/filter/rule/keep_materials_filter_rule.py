@@ -1,7 +1,7 @@
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Iterable, List
 
-from pyckaxe import BlockMap, ResolutionContext
+from pyckaxe import BlockMap, ResolutionContext, ResourceLink
 
 from mcblueprints.lib.resource.filter.rule.abc.filter_rule import FilterRule
 from mcblueprints.lib.resource.material.material import MaterialLink
@@ -17,3 +17,7 @@ class KeepMaterialsFilterRule(FilterRule):
         materials = [await material(ctx) for material in self.materials]
         blocks = [material.block for material in materials]
         block_map.keep_blocks(blocks)
+
+    # @overrides FilterRule
+    def iter_links(self) -> Iterable[ResourceLink[Any]]:
+        return self.materials
@@ -1,7 +1,7 @@
 from dataclasses import dataclass
-from typing import List
+from typing import Any, Iterable, List
 
-from pyckaxe import BlockMap, ResolutionContext
+from pyckaxe import BlockMap, ResolutionContext, ResourceLink
 
 from mcblueprints.lib.resource.filter.rule.abc.filter_rule import FilterRule
 from mcblueprints.lib.resource.material.material import MaterialLink
@@ -20,3 +20,8 @@ class ReplaceMaterialsFilterRule(FilterRule):
         replacement_material = await self.replacement(ctx)
         replacement_block = replacement_material.block
         block_map.replace_blocks(blocks, replacement_block)
+
+    # @overrides FilterRule
+    def iter_links(self) -> Iterable[ResourceLink[Any]]:
+        yield from self.materials
+        yield self.replacement
@@ -1,2 +1,3 @@
+from .block_data import *
 from .material import *
 from .material_deserializer import *
@@ -0,0 +1,195 @@
+from __future__ import annotations
+
+from dataclasses import dataclass, field
+from io import BytesIO
+from threading import Lock
+from typing import Any, Dict, Optional, Type
+from weakref import WeakValueDictionary
+
+from nbtlib.tag import Array as NbtArray
+from pyckaxe import NbtBase, NbtCompound, NbtList
+
+__all__ = (
+    "FrozenNbtError",
+    "FrozenNbtCompound",
+    "BlockDataPool",
+    "freeze_block_data",
+)
+
+
+class FrozenNbtError(TypeError):
+    pass
+
+
+def _raise_frozen(self: Any, *args, **kwargs):
+    raise FrozenNbtError(
+        f"Block data is shared and can't be changed in place, thaw it first: {self!r}"
+    )
+
+
+# Every method of `dict` and `list` (and their nbtlib counterparts) that changes them.
+COMPOUND_MUTATORS = (
+    "__setitem__",
+    "__delitem__",
+    "__ior__",
+    "clear",
+    "merge",
+    "pop",
+    "popitem",
+    "setdefault",
+    "update",
+)
+LIST_MUTATORS = (
+    "__setitem__",
+    "__delitem__",
+    "__iadd__",
+    "__imul__",
+    "append",
+    "clear",
+    "extend",
+    "insert",
+    "merge",
+    "pop",
+    "remove",
+    "reverse",
+    "sort",
+)
+
+
+class FrozenNbtCompound(NbtCompound):
+    """
+    A compound tag that can't be changed, nor can any of the tags inside of it.
+
+    Frozen data can be shared by reference between any number of blocks, without
+    worrying about one of them changing it for the others. Anything that needs to change
+    the data should `thaw` it into a copy first, and freeze the result again.
+    """
+
+    _nbt_key: Optional[bytes] = None
+
+    def __reduce__(self):
+        # NOTE Rebuild from a plain dict, rather than setting items one by one.
+        return (type(self), (dict(self),))
+
+    def __copy__(self) -> FrozenNbtCompound:
+        # Nothing inside can change, so a copy may as well be the same compound.
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> FrozenNbtCompound:
+        return self
+
+    @property
+    def nbt_key(self) -> bytes:
+        """The encoded form of this compound, which equal compounds share."""
+        if self._nbt_key is None:
+            buff = BytesIO()
+            self.write(buff)
+            self._nbt_key = buff.getvalue()
+        return self._nbt_key
+
+    def thaw(self) -> NbtCompound:
+        """Return a deep copy of this compound that can be changed freely."""
+        return _thaw(self)
+
+
+for _name in COMPOUND_MUTATORS:
+    setattr(FrozenNbtCompound, _name, _raise_frozen)
+
+
+class _FrozenNbtList:
+    __slots__ = ()
+
+    def __new__(cls, iterable=()):
+        # NOTE Skip subtype inference, which would hand back an unfrozen class.
+        return list.__new__(cls, iterable)
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo: Dict[int, Any]):
+        return self
+
+
+for _name in LIST_MUTATORS:
+    setattr(_FrozenNbtList, _name, _raise_frozen)
+
+
+# One frozen variant of each kind of list, such as `List[Compound]`.
+_frozen_list_types: Dict[Type[NbtList], Type[NbtList]] = {}
+
+
+def _frozen_list_type(list_type: Type[NbtList]) -> Type[NbtList]:
+    frozen_type = _frozen_list_types.get(list_type)
+    if frozen_type is None:
+        frozen_type = type(
+            f"Frozen{list_type.__name__}",
+            (_FrozenNbtList, list_type),
+            {"__slots__": ()},
+        )
+        _frozen_list_types[list_type] = frozen_type
+    return frozen_type
+
+
+def _freeze(tag: NbtBase) -> NbtBase:
+    if isinstance(tag, (FrozenNbtCompound, _FrozenNbtList)):
+        return tag
+    if isinstance(tag, NbtCompound):
+        return FrozenNbtCompound({key: _freeze(value) for key, value in tag.items()})
+    if isinstance(tag, NbtList):
+        return _frozen_list_type(type(tag))([_freeze(item) for item in tag])
+    if isinstance(tag, NbtArray):
+        # A read-only view of the same memory, leaving the original as it was.
+        view = tag.view(type(tag))
+        view.flags.writeable = False
+        return view
+    # Everything else (numbers and strings) can't be changed anyway.
+    return tag
+
+
+def _thaw(tag: NbtBase) -> NbtBase:
+    if isinstance(tag, NbtCompound):
+        return NbtCompound({key: _thaw(value) for key, value in tag.items()})
+    if isinstance(tag, NbtList):
+        list_type = type(tag)
+        if isinstance(tag, _FrozenNbtList):
+            list_type = list_type.__mro__[2]
+        return list_type([_thaw(item) for item in tag])
+    if isinstance(tag, NbtArray):
+        return tag.copy()
+    return tag
+
+
+@dataclass
+class BlockDataPool:
+    """
+    Freezes block data, handing back the same object for every equal compound.
+
+    Compounds are told apart by their encoded form, so that two compounds written
+    differently in different places, but that encode the same, end up as one. Entries
+    only live for as long as something refers to them.
+    """
+
+    _entries: WeakValueDictionary[bytes, FrozenNbtCompound] = field(
+        init=False, default_factory=WeakValueDictionary
+    )
+    _lock: Lock = field(init=False, default_factory=Lock)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def freeze(self, data: NbtCompound) -> FrozenNbtCompound:
+        """Return a frozen compound equal to `data`, shared with any others."""
+        frozen = data if isinstance(data, FrozenNbtCompound) else _freeze(data)
+        assert isinstance(frozen, FrozenNbtCompound)
+        key = frozen.nbt_key
+        with self._lock:
+            return self._entries.setdefault(key, frozen)
+
+
+# The pool that block data is frozen into by default, shared by the whole process.
+DEFAULT_BLOCK_DATA_POOL = BlockDataPool()
+
+
+def freeze_block_data(data: NbtCompound) -> FrozenNbtCompound:
+    """Freeze `data` into the default pool, sharing it with any equal block data."""
+    return DEFAULT_BLOCK_DATA_POOL.freeze(data)
@@ -1,6 +1,7 @@
 from dataclasses import dataclass
 from typing import Any, Optional
 
+from nbtlib import InvalidLiteral, parse_nbt
 from pyckaxe import (
     Block,
     BlockState,
@@ -10,6 +11,7 @@ from pyckaxe import (
     to_nbt_compound,
 )
 
+from mcblueprints.lib.resource.material.block_data import freeze_block_data
 from mcblueprints.lib.resource.material.material import Material, MaterialLink
 
 __all__ = ("MaterialDeserializer",)
@@ -103,6 +105,27 @@ class MaterialDeserializer:
         return BlockState(**raw_state)
 
     def deserialize_data(self, raw_data: Any, breadcrumb: Breadcrumb) -> NbtCompound:
+        # NOTE Freeze the data, so that every block with the same data shares it.
+        return freeze_block_data(self.deserialize_raw_data(raw_data, breadcrumb))
+
+    def deserialize_raw_data(
+        self, raw_data: Any, breadcrumb: Breadcrumb
+    ) -> NbtCompound:
+        # A string is assumed to be SNBT, which keeps the exact type of every tag.
+        if isinstance(raw_data, str):
+            try:
+                data = parse_nbt(raw_data)
+            except InvalidLiteral as ex:
+                raise MalformedMaterial(
+                    f"Malformed SNBT `data`, at `{breadcrumb}`", raw_data, breadcrumb
+                ) from ex
+            if not isinstance(data, NbtCompound):
+                raise MalformedMaterial(
+                    f"Malformed `data`, expected a compound, at `{breadcrumb}`",
+                    raw_data,
+                    breadcrumb,
+                )
+            return data
         if not isinstance(raw_data, dict):
             raise MalformedMaterial(
                 f"Malformed `data`, at `{breadcrumb}`", raw_data, breadcrumb
@@ -0,0 +1,4 @@
+from .flattened_structure import *
+from .structure_link import *
+from .structure_nbt_decoder import *
+from .structure_nbt_encoder import *
@@ -0,0 +1,91 @@
+from __future__ import annotations
+
+from typing import Dict, List, Optional, Tuple, Union
+
+from pyckaxe import Block, BlockMap, Position, Structure
+from pyckaxe.lib.resource.structure.structure import (
+    StructureBlockEntry,
+    StructureEntityEntry,
+    StructurePaletteEntry,
+)
+
+from mcblueprints.lib.resource.material.block_data import freeze_block_data
+
+__all__ = ("FlattenedStructure",)
+
+
+class FlattenedStructure(Structure):
+    """
+    A structure that's still in the form of the block map it was flattened into.
+
+    The palette and block list are only built the first time they're accessed. Encoders
+    that know about this class can skip them entirely, and write the structure straight
+    from its block map instead.
+
+    The structure may also choose which blocks encoders leave out as structure void:
+    `True` to leave out the encoder's usual blocks, `False` to leave out none at all, or
+    the names of the blocks to leave out. By default, the encoder decides.
+
+    It may also be given a name, like that of its location, to report it by.
+    """
+
+    def __init__(
+        self,
+        block_map: BlockMap,
+        structure_void: Union[bool, Tuple[str, ...], None] = None,
+        name: Optional[str] = None,
+    ):
+        self.block_map: BlockMap = block_map
+        self.structure_void: Union[bool, Tuple[str, ...], None] = structure_void
+        self.name: Optional[str] = name
+        self._structure: Optional[Structure] = None
+
+    @classmethod
+    def from_structure(cls, structure: Structure) -> FlattenedStructure:
+        """Return `structure` in flattened form, converting it if need be."""
+        if isinstance(structure, cls):
+            return structure
+        block_map = BlockMap(size=structure.size)
+        palette = [palette_entry.block for palette_entry in structure.palette]
+        # Blocks with the same state and (frozen, so shared) data are the same block.
+        blocks_with_data: Dict[Tuple[int, int], Block] = {}
+        for block_entry in structure.blocks:
+            block = palette[block_entry.state]
+            if block_entry.nbt:
+                data = freeze_block_data(block_entry.nbt)
+                key = (block_entry.state, id(data))
+                if (block_with_data := blocks_with_data.get(key)) is None:
+                    block_with_data = blocks_with_data[key] = Block(
+                        name=block.name, state=block.state, data=data
+                    )
+                block = block_with_data
+            block_map[block_entry.pos] = block
+        return cls(block_map)
+
+    def __repr__(self) -> str:
+        # NOTE Don't build the palette and block list just to show them.
+        return f"{type(self).__name__}(size={self.size!r})"
+
+    def _get_structure(self) -> Structure:
+        if self._structure is None:
+            self._structure = Structure.from_block_map(self.block_map)
+        return self._structure
+
+    @property
+    def size(self) -> Position:
+        return self.block_map.size
+
+    @property
+    def palette(self) -> List[StructurePaletteEntry]:
+        return self._get_structure().palette
+
+    @property
+    def blocks(self) -> List[StructureBlockEntry]:
+        return self._get_structure().blocks
+
+    @property
+    def entities(self) -> List[StructureEntityEntry]:
+        # Block maps don't hold entities, so there's nothing to build to find them.
+        if self._structure is None:
+            return []
+        return self._structure.entities
@@ -0,0 +1,8 @@
+from typing import TypeAlias
+
+from pyckaxe import ResourceLink, Structure
+
+__all__ = ("StructureLink",)
+
+
+StructureLink: TypeAlias = ResourceLink[Structure]
@@ -0,0 +1,350 @@
+import zlib
+from array import array
+from dataclasses import dataclass
+from struct import Struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+from nbtlib.tag import Base as NbtBase
+from pyckaxe import Block, BlockMap, BlockState, BlockStateValue, NbtCompound
+
+from mcblueprints.lib.resource.material.block_data import freeze_block_data
+from mcblueprints.lib.resource.structure.flattened_structure import (
+    FlattenedStructure,
+)
+from mcblueprints.utils import DenseBlockMap, MappedBlockMap, set_block_indices
+from mcblueprints.utils.block_map import MAPPED_CELL_DTYPE
+
+__all__ = (
+    "MalformedStructureNbt",
+    "StructureNbtDecoder",
+)
+
+
+BYTE = Struct(">b")
+SHORT = Struct(">H")
+INT = Struct(">i")
+XYZ = Struct(">iii")
+
+TAG_END = 0
+TAG_INT = 3
+TAG_STRING = 8
+TAG_LIST = 9
+TAG_COMPOUND = 10
+
+GZIP_MAGIC = b"\x1f\x8b"
+
+# Tells zlib to expect a gzip header and trailer.
+GZIP_WBITS = 31
+
+# How much of the (compressed) input to take on at once.
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class MalformedStructureNbt(Exception):
+    pass
+
+
+def _iter_chunks(data: Any, chunk_size: int) -> Iterator[bytes]:
+    # Decompress a slice of the input at a time, rather than all of it up-front.
+    with memoryview(data) as view:
+        if view[:2] == GZIP_MAGIC:
+            decompressor = zlib.decompressobj(GZIP_WBITS)
+            for i in range(0, len(view), chunk_size):
+                yield decompressor.decompress(view[i : i + chunk_size])
+            yield decompressor.flush()
+        else:
+            for i in range(0, len(view), chunk_size):
+                yield bytes(view[i : i + chunk_size])
+
+
+def _parse_state_value(value: str) -> BlockStateValue:
+    # NOTE Block states are always strings in NBT, so convert them back into the same
+    # types that they would have been written as in a blueprint or material.
+    if value == "true":
+        return True
+    if value == "false":
+        return False
+    if value.isdigit():
+        return int(value)
+    return value
+
+
+class _NbtReader:
+    """
+    Reads NBT from a series of chunks, holding onto no more than it needs at once.
+
+    Also works as a file-like object for `nbtlib`, which is used for the occasional
+    tag that isn't worth decoding by hand.
+    """
+
+    def __init__(self, chunks: Iterator[bytes]):
+        self._chunks: Iterator[bytes] = chunks
+        self._buffer: bytes = b""
+        self._pos: int = 0
+
+    def _fill(self, size: int):
+        parts = [self._buffer[self._pos :]]
+        available = len(parts[0])
+        while available < size:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                raise MalformedStructureNbt("Unexpected end of data")
+            parts.append(chunk)
+            available += len(chunk)
+        self._buffer = b"".join(parts)
+        self._pos = 0
+
+    def read(self, size: int) -> bytes:
+        if self._pos + size > len(self._buffer):
+            self._fill(size)
+        start = self._pos
+        self._pos += size
+        return self._buffer[start : self._pos]
+
+    def unpack(self, fmt: Struct) -> Tuple[Any, ...]:
+        if self._pos + fmt.size > len(self._buffer):
+            self._fill(fmt.size)
+        values = fmt.unpack_from(self._buffer, self._pos)
+        self._pos += fmt.size
+        return values
+
+    def read_tag_id(self) -> int:
+        return self.read(1)[0]
+
+    def read_int(self) -> int:
+        return self.unpack(INT)[0]
+
+    def read_string(self) -> str:
+        (length,) = self.unpack(SHORT)
+        return self.read(length).decode("utf-8")
+
+    def read_list_header(self) -> Tuple[int, int]:
+        return self.read_tag_id(), self.read_int()
+
+    def parse_tag(self, tag_id: int) -> NbtBase:
+        return NbtBase.all_tags[tag_id].parse(self)
+
+    def skip_tag(self, tag_id: int):
+        self.parse_tag(tag_id)
+
+    def iter_compound(self) -> Iterator[Tuple[int, str]]:
+        """Yield the ID and name of each tag in a compound, until its end."""
+        while (tag_id := self.read_tag_id()) != TAG_END:
+            yield tag_id, self.read_string()
+
+
+@dataclass
+class StructureNbtDecoder:
+    """
+    Decodes a (possibly gzipped) structure NBT file straight into a block map.
+
+    The input is decompressed and read a chunk at a time, so it can be memory-mapped
+    rather than read into memory up-front. Only the blocks are kept: the resulting
+    `FlattenedStructure` holds one shared block per palette entry, the same way a
+    flattened blueprint does. Entities are skipped over.
+
+    Blocks are decoded into a `DenseBlockMap`, or into a `MappedBlockMap` for the
+    largest structures, set all at once from a grid of palette indices. They're set in
+    the same order as in the file, so encoding the structure again writes them in that
+    order too.
+
+    Attributes
+    ----------
+    chunk_size
+        How many bytes of input to decompress at a time.
+    out_of_core_volume
+        Structures with at least this many cells are decoded into a memory-mapped
+        temporary file rather than into memory, if set.
+    """
+
+    chunk_size: int = DEFAULT_CHUNK_SIZE
+    out_of_core_volume: Optional[int] = None
+
+    # @implements ResourceDeserializer
+    def __call__(self, raw: Any, **kwargs) -> FlattenedStructure:
+        return self.decode(raw)
+
+    def decode(self, data: Any) -> FlattenedStructure:
+        """Decode a structure from any bytes-like object, such as an `mmap`."""
+        chunks = _iter_chunks(data, self.chunk_size)
+        try:
+            return self._read(_NbtReader(chunks))
+        finally:
+            # Let go of the input, so that it can be closed.
+            chunks.close()
+
+    def _read(self, reader: _NbtReader) -> FlattenedStructure:
+        if reader.read_tag_id() != TAG_COMPOUND:
+            raise MalformedStructureNbt("Expected a compound at the root")
+        reader.read_string()
+
+        size: Optional[Tuple[int, int, int]] = None
+        palette: Optional[List[Block]] = None
+        # Blocks may come before the palette, so hold them compactly until the end.
+        blocks = array("i")
+        block_data: Dict[int, NbtCompound] = {}
+
+        for tag_id, name in reader.iter_compound():
+            if (name == "size") and (tag_id == TAG_LIST):
+                size = self._read_size(reader)
+            elif (name == "palette") and (tag_id == TAG_LIST):
+                palette = self._read_palette(reader)
+            elif (name == "palettes") and (tag_id == TAG_LIST):
+                palette = self._read_first_palette(reader)
+            elif (name == "blocks") and (tag_id == TAG_LIST):
+                self._read_blocks(reader, blocks, block_data)
+            else:
+                reader.skip_tag(tag_id)
+
+        if size is None:
+            raise MalformedStructureNbt("Missing `size`")
+        if palette is None:
+            raise MalformedStructureNbt("Missing `palette`")
+
+        return FlattenedStructure(self._to_block_map(size, palette, blocks, block_data))
+
+    def _read_size(self, reader: _NbtReader) -> Tuple[int, int, int]:
+        element_id, length = reader.read_list_header()
+        if (element_id != TAG_INT) or (length != 3):
+            raise MalformedStructureNbt("Malformed `size`")
+        return reader.unpack(XYZ)
+
+    def _read_first_palette(self, reader: _NbtReader) -> List[Block]:
+        # Structures with several palettes pick one at random; use the first one.
+        element_id, length = reader.read_list_header()
+        if (element_id not in (TAG_LIST, TAG_END)) or (length < 1):
+            raise MalformedStructureNbt("Malformed `palettes`")
+        palette = self._read_palette(reader)
+        for _ in range(length - 1):
+            reader.skip_tag(TAG_LIST)
+        return palette
+
+    def _read_palette(self, reader: _NbtReader) -> List[Block]:
+        element_id, length = reader.read_list_header()
+        if length and (element_id != TAG_COMPOUND):
+            raise MalformedStructureNbt("Malformed `palette`")
+        return [self._read_palette_entry(reader) for _ in range(length)]
+
+    def _read_palette_entry(self, reader: _NbtReader) -> Block:
+        block_name: Optional[str] = None
+        state: Optional[BlockState] = None
+        for tag_id, name in reader.iter_compound():
+            if (name == "Name") and (tag_id == TAG_STRING):
+                block_name = reader.read_string()
+            elif (name == "Properties") and (tag_id == TAG_COMPOUND):
+                state = BlockState()
+                for property_id, key in reader.iter_compound():
+                    if property_id != TAG_STRING:
+                        raise MalformedStructureNbt(f"Malformed property `{key}`")
+                    state[key] = _parse_state_value(reader.read_string())
+            else:
+                reader.skip_tag(tag_id)
+        if block_name is None:
+            raise MalformedStructureNbt("Palette entry is missing `Name`")
+        return Block(name=block_name, state=state or None)
+
+    def _read_blocks(
+        self,
+        reader: _NbtReader,
+        blocks: "array[int]",
+        block_data: Dict[int, NbtCompound],
+    ):
+        element_id, length = reader.read_list_header()
+        if length and (element_id != TAG_COMPOUND):
+            raise MalformedStructureNbt("Malformed `blocks`")
+        for _ in range(length):
+            state = -1
+            pos: Optional[Tuple[int, int, int]] = None
+            for tag_id, name in reader.iter_compound():
+                if (name == "state") and (tag_id == TAG_INT):
+                    state = reader.read_int()
+                elif (name == "pos") and (tag_id == TAG_LIST):
+                    element_id, pos_length = reader.read_list_header()
+                    if (element_id != TAG_INT) or (pos_length != 3):
+                        raise MalformedStructureNbt("Malformed block `pos`")
+                    pos = reader.unpack(XYZ)
+                elif (name == "nbt") and (tag_id == TAG_COMPOUND):
+                    block_data[len(blocks) // 4] = freeze_block_data(
+                        reader.parse_tag(tag_id)
+                    )
+                else:
+                    reader.skip_tag(tag_id)
+            if (state < 0) or (pos is None):
+                raise MalformedStructureNbt("Block is missing `state` or `pos`")
+            blocks.extend((state, *pos))
+
+    def _to_block_map(
+        self,
+        size: Tuple[int, int, int],
+        palette: List[Block],
+        blocks: "array[int]",
+        block_data: Dict[int, NbtCompound],
+    ) -> BlockMap:
+        size_x, size_y, size_z = size
+        shape = (size_y, size_x, size_z)
+        states, xs, ys, zs = np.array(blocks, dtype=np.int64).reshape(-1, 4).T
+        out_of_bounds = np.zeros(len(states), dtype=bool)
+        for axis, axis_size in ((xs, size_x), (ys, size_y), (zs, size_z)):
+            out_of_bounds |= (axis < 0) | (axis >= axis_size)
+        unknown = states >= len(palette)
+        if (malformed := np.flatnonzero(out_of_bounds | unknown)).size:
+            i = int(malformed[0])
+            if out_of_bounds[i]:
+                raise MalformedStructureNbt(
+                    f"Block ({xs[i]}, {ys[i]}, {zs[i]}) is out of bounds"
+                )
+            raise MalformedStructureNbt(f"Unknown block state: {states[i]}")
+
+        # Index each block into a list of them, with 0 left for empty cells.
+        block_list: List[Optional[Block]] = [None, *palette]
+        indices = (states + 1).astype(MAPPED_CELL_DTYPE)
+        # Blocks with the same state and (frozen, so shared) data are the same block.
+        blocks_with_data: Dict[Tuple[int, int], int] = {}
+        for i, data in block_data.items():
+            state = int(states[i])
+            key = (state, id(data))
+            if (index := blocks_with_data.get(key)) is None:
+                index = blocks_with_data[key] = len(block_list)
+                block = palette[state]
+                block_list.append(Block(name=block.name, state=block.state, data=data))
+            indices[i] = index
+
+        # A cell given more than once keeps the last block, but the place of the first.
+        flat = (ys * size_x + xs) * size_z + zs
+        _, first = np.unique(flat, return_index=True)
+        order = flat[np.sort(first)]
+
+        volume = size_x * size_y * size_z
+        if self.out_of_core_volume and (volume >= self.out_of_core_volume):
+            return self._to_mapped_block_map(shape, block_list, indices, flat, order)
+        cells = np.zeros(shape, dtype=MAPPED_CELL_DTYPE)
+        cells.reshape(-1)[flat] = indices
+        block_map = DenseBlockMap(size=size)
+        set_block_indices(block_map, cells, block_list, order)
+        return block_map
+
+    def _to_mapped_block_map(
+        self,
+        shape: Tuple[int, int, int],
+        block_list: List[Optional[Block]],
+        indices: "np.ndarray[Any, Any]",
+        flat: "np.ndarray[Any, Any]",
+        order: "np.ndarray[Any, Any]",
+    ) -> BlockMap:
+        size_y, size_x, size_z = shape
+        block_map = MappedBlockMap(size=(size_x, size_y, size_z))
+        # NOTE Write into the mapped grid directly, rather than holding another whole
+        # grid in memory to set it from.
+        block_map.cells.reshape(-1)[flat] = block_map.index_blocks(block_list)[indices]
+        # Mark each layer as set in the order its first block appears in, and the
+        # cells within it in the order they appear in. Sorting by layer is stable, so
+        # each layer starts with its first block.
+        ys, xs, zs = np.unravel_index(order, shape)
+        by_layer = np.argsort(ys, kind="stable")
+        layers, starts = np.unique(ys[by_layer], return_index=True)
+        ends = np.append(starts[1:], len(by_layer))
+        for i in np.argsort(by_layer[starts]).tolist():
+            in_layer = by_layer[starts[i] : ends[i]]
+            block_map.mark_set(int(layers[i]), xs[in_layer], zs[in_layer])
+        return block_map
@@ -0,0 +1,634 @@
+from array import array
+from dataclasses import dataclass, field
+from io import BytesIO
+from struct import Struct
+from threading import Lock
+from typing import (
+    AbstractSet,
+    BinaryIO,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    cast,
+)
+
+import numpy as np
+from nbtlib.contrib.minecraft.structure import StructureFileData
+from pyckaxe import Block, BlockMap, Structure, StructureSerializer
+from pyckaxe.lib.resource.structure.structure import StructureBlockEntry
+
+from mcblueprints.lib.resource.structure.flattened_structure import (
+    FlattenedStructure,
+)
+from mcblueprints.utils import (
+    GzipStreamWriter,
+    MappedBlockMap,
+    iter_block_map_layers,
+    iter_block_map_rows,
+)
+
+__all__ = ("StructureNbtEncoder",)
+
+
+# The blocks left out of structures by default, when leaving any out at all.
+DEFAULT_STRUCTURE_VOID_BLOCKS = ("minecraft:air",)
+
+# Block names without a namespace are in this one.
+DEFAULT_BLOCK_NAMESPACE = "minecraft"
+
+# How blocks may be ordered within a structure: in the order they were set in, by
+# position, or grouped by palette entry (most used first) and then by position.
+BLOCK_ORDERS = ("insertion", "position", "palette")
+
+
+INT = Struct(">i")
+XYZ = Struct(">iii")
+
+TAG_END = b"\x00"
+TAG_INT = b"\x03"
+TAG_STRING = b"\x08"
+TAG_LIST = b"\x09"
+TAG_COMPOUND = b"\x0a"
+
+
+def _encode_string(value: str) -> bytes:
+    data = value.encode("utf-8")
+    return len(data).to_bytes(2, "big") + data
+
+
+def _qualify_block_name(name: str) -> str:
+    return name if ":" in name else f"{DEFAULT_BLOCK_NAMESPACE}:{name}"
+
+
+def _encode_tag_header(tag: bytes, name: str) -> bytes:
+    return tag + _encode_string(name)
+
+
+# The root compound, with an empty name.
+ROOT_HEADER = _encode_tag_header(TAG_COMPOUND, "")
+
+# Headers for the top-level structure fields, in the order they're written.
+DATA_VERSION_HEADER = _encode_tag_header(TAG_INT, "DataVersion")
+SIZE_HEADER = _encode_tag_header(TAG_LIST, "size") + TAG_INT + INT.pack(3)
+PALETTE_HEADER = _encode_tag_header(TAG_LIST, "palette") + TAG_COMPOUND
+BLOCKS_HEADER = _encode_tag_header(TAG_LIST, "blocks") + TAG_COMPOUND
+ENTITIES_HEADER = _encode_tag_header(TAG_LIST, "entities")
+
+# Headers for the fields of each palette entry.
+PALETTE_NAME_HEADER = _encode_tag_header(TAG_STRING, "Name")
+PALETTE_PROPERTIES_HEADER = _encode_tag_header(TAG_COMPOUND, "Properties")
+
+# Stands in for the encoding of a block that's left out as structure void.
+VOID_PARTS = (b"", b"")
+
+# Headers for the fields of each block entry.
+BLOCK_STATE_HEADER = _encode_tag_header(TAG_INT, "state")
+BLOCK_POS_HEADER = _encode_tag_header(TAG_LIST, "pos") + TAG_INT + INT.pack(3)
+BLOCK_NBT_HEADER = _encode_tag_header(TAG_COMPOUND, "nbt")
+
+
+def _encode_block_prefix(index: int) -> bytes:
+    return BLOCK_STATE_HEADER + INT.pack(index) + BLOCK_POS_HEADER
+
+
+class _CountingStream:
+    """Counts the bytes written, passing them on to another stream if given."""
+
+    def __init__(self, stream: Optional[BinaryIO] = None):
+        self.stream: Optional[BinaryIO] = stream
+        self.count: int = 0
+
+    def write(self, data: bytes) -> int:
+        self.count += len(data)
+        if self.stream is not None:
+            self.stream.write(data)
+        return len(data)
+
+
+@dataclass
+class StructureNbtEncoder:
+    """
+    Encodes a structure straight into the bytes of a gzipped NBT file.
+
+    By default, this writes the same bytes as `StructureSerializer` followed by
+    `dump_nbt_bytes`, but without building a tree of NBT tags in between. A
+    `FlattenedStructure` is written straight from its block map, without building its
+    palette and block list as objects either: its blocks are written in the order they
+    were set in (the order that iterating a sparse block map gives, however the block
+    map is stored), and its palette in order of first use. A block map that's mapped
+    out of memory is encoded a layer at a time as it's written, rather than all
+    up-front.
+
+    Blocks may instead be ordered by position (by y, then x, then z), so that equal
+    block maps always produce identical files, no matter how they were put together or
+    stored. Or they may be grouped by palette entry: the palette is sorted by how many
+    blocks use each entry (most first, and then in order of first use), and blocks are
+    grouped by palette entry, each group in order of position (by y, then z, then x).
+    This is just as deterministic, but it isn't necessarily any smaller: position order
+    already keeps neighbouring blocks together. Measure it with `compare_block_orders`,
+    which compares each structure with how it would be written by default.
+
+    Blocks can also be left out of the structure entirely, so that they act as structure
+    void when it's placed: anything already in the world is left as it is, and there are
+    fewer blocks to store and to place. A `FlattenedStructure` may choose for itself
+    whether to leave them out, and which ones.
+
+    Attributes
+    ----------
+    data_version
+        The data version to write into the structure.
+    structure_void
+        Whether to leave out the `void_blocks`, unless a structure says otherwise.
+    void_blocks
+        The names of the blocks to leave out, whatever their state.
+    block_order
+        How to order blocks, one of `BLOCK_ORDERS`.
+    compare_block_orders
+        Whether to also measure each structure with its blocks in the order they were
+        set in, for comparison.
+    voided
+        How many blocks have been left out so far, across every structure.
+    block_order_sizes
+        The name of each structure compared so far, and how many bytes it takes up with
+        its blocks in the order they were set in and in `block_order`.
+    """
+
+    data_version: int
+    structure_void: bool = False
+    void_blocks: FrozenSet[str] = frozenset(DEFAULT_STRUCTURE_VOID_BLOCKS)
+    block_order: str = "insertion"
+    compare_block_orders: bool = False
+
+    voided: int = field(init=False, default=0)
+    block_order_sizes: List[Tuple[str, int, int]] = field(
+        init=False, default_factory=list
+    )
+
+    # Structures may be encoded from several threads at once.
+    _lock: Lock = field(init=False, default_factory=Lock, repr=False, compare=False)
+
+    def __post_init__(self):
+        if self.block_order not in BLOCK_ORDERS:
+            raise ValueError(
+                f"Expected a block order in {BLOCK_ORDERS}: {self.block_order}"
+            )
+
+    def __call__(self, structure: Structure) -> bytes:
+        return self.encode(structure)
+
+    def encode(self, structure: Structure, gzipped: bool = True) -> bytes:
+        """Encode `structure` in memory."""
+        buff = BytesIO()
+        self.write(structure, buff, gzipped=gzipped)
+        return buff.getvalue()
+
+    def write(self, structure: Structure, stream: BinaryIO, gzipped: bool = True):
+        """Encode `structure` into `stream`, as it goes."""
+        if not self.compare_block_orders:
+            self._write_maybe_gzipped(structure, stream, gzipped, self.block_order)
+            return
+        after = _CountingStream(stream)
+        self._write_maybe_gzipped(
+            structure, cast(BinaryIO, after), gzipped, self.block_order
+        )
+        # Measure the structure as it would be written by default too, without keeping
+        # the bytes.
+        before = after
+        if self.block_order != "insertion":
+            before = _CountingStream()
+            self._write_maybe_gzipped(
+                structure, cast(BinaryIO, before), gzipped, "insertion", count=False
+            )
+        name = getattr(structure, "name", None) or "<unnamed>"
+        with self._lock:
+            self.block_order_sizes.append((name, before.count, after.count))
+
+    def get_void_blocks(self, structure: Structure) -> AbstractSet[str]:
+        """Get the names of the blocks to leave out of `structure`."""
+        structure_void = self.structure_void
+        if isinstance(structure, FlattenedStructure) and (
+            structure.structure_void is not None
+        ):
+            structure_void = structure.structure_void
+        if structure_void is False:
+            return frozenset()
+        names = self.void_blocks if structure_void is True else structure_void
+        return frozenset(_qualify_block_name(name) for name in names)
+
+    def _write_maybe_gzipped(
+        self,
+        structure: Structure,
+        stream: BinaryIO,
+        gzipped: bool,
+        block_order: str,
+        count: bool = True,
+    ):
+        if gzipped:
+            with GzipStreamWriter(stream) as gzip_stream:
+                self._write(structure, gzip_stream, block_order, count)
+        else:
+            self._write(structure, stream, block_order, count)
+
+    def _write(
+        self, structure: Structure, stream: BinaryIO, block_order: str, count: bool
+    ):
+        void_blocks = self.get_void_blocks(structure)
+        by_palette = block_order == "palette"
+        ordered = block_order != "insertion"
+        blocks: Iterable[bytes]
+        if isinstance(structure, FlattenedStructure) and isinstance(
+            structure.block_map, MappedBlockMap
+        ):
+            palette, block_count, blocks, voided = self._encode_mapped_block_map(
+                structure.block_map, void_blocks, by_palette, ordered
+            )
+        elif isinstance(structure, FlattenedStructure):
+            palette, block_count, blocks, voided = self._encode_block_map(
+                structure.block_map, void_blocks, by_palette, ordered
+            )
+        else:
+            palette, block_count, blocks, voided = self._encode_blocks(
+                structure, void_blocks, by_palette
+            )
+        if count and voided:
+            with self._lock:
+                self.voided += voided
+
+        stream.write(ROOT_HEADER)
+
+        stream.write(DATA_VERSION_HEADER)
+        stream.write(INT.pack(self.data_version))
+
+        stream.write(SIZE_HEADER)
+        stream.write(XYZ.pack(*structure.size.unpack_ints()))
+
+        stream.write(PALETTE_HEADER)
+        stream.write(INT.pack(len(palette)))
+        for block in palette:
+            stream.write(self._encode_palette_entry(block))
+
+        stream.write(BLOCKS_HEADER)
+        stream.write(INT.pack(block_count))
+        for chunk in blocks:
+            stream.write(chunk)
+
+        # Entities are rare enough to not be worth encoding by hand.
+        stream.write(ENTITIES_HEADER)
+        entities = StructureSerializer(self.data_version).serialize_entities(
+            structure.entities
+        )
+        StructureFileData.schema["entities"](entities).write(stream)
+
+        stream.write(TAG_END)
+
+    def _encode_palette_entry(self, block: Block) -> bytes:
+        parts: List[bytes] = [PALETTE_NAME_HEADER, _encode_string(block.name)]
+        if block.state:
+            parts.append(PALETTE_PROPERTIES_HEADER)
+            for key, value in block.state.to_nbt().items():
+                parts.append(_encode_tag_header(TAG_STRING, key))
+                parts.append(_encode_string(str(value)))
+            parts.append(TAG_END)
+        parts.append(TAG_END)
+        return b"".join(parts)
+
+    def _encode_block_nbt(self, block: Block) -> bytes:
+        if not block.data:
+            return TAG_END
+        buff = BytesIO()
+        buff.write(BLOCK_NBT_HEADER)
+        block.data.write(buff)
+        buff.write(TAG_END)
+        return buff.getvalue()
+
+    def _add_to_palette(
+        self, block: Block, palette: List[Block], palette_indices: Dict[str, int]
+    ) -> int:
+        # Add the block to the palette if it's new, keyed the same way as in
+        # `Structure`, and return the index of its entry.
+        key = block.name if block.state is None else f"{block.name}{block.state}"
+        index = palette_indices.get(key)
+        if index is None:
+            index = palette_indices[key] = len(palette)
+            palette.append(block)
+        return index
+
+    def _encode_block_parts(
+        self, block: Block, palette: List[Block], palette_indices: Dict[str, int]
+    ) -> Tuple[bytes, bytes]:
+        # Encode everything before the block's position and after it.
+        index = self._add_to_palette(block, palette, palette_indices)
+        return _encode_block_prefix(index), self._encode_block_nbt(block)
+
+    def _sort_palette(
+        self, palette: List[Block], counts: np.ndarray
+    ) -> Tuple[List[Block], np.ndarray]:
+        # Sort the palette by how many blocks use each entry, most first, and then in
+        # order of first use. Return the new index of each old one, too.
+        order = np.argsort(-counts, kind="stable")
+        new_indices = np.empty(len(palette), dtype=np.int64)
+        new_indices[order] = np.arange(len(palette))
+        return [palette[i] for i in order.tolist()], new_indices
+
+    def _encode_block_map(
+        self,
+        block_map: BlockMap,
+        void_blocks: AbstractSet[str],
+        by_palette: bool,
+        ordered: bool,
+    ) -> Tuple[List[Block], int, Iterable[bytes], int]:
+        if by_palette:
+            return self._encode_block_map_by_palette(block_map, void_blocks)
+
+        # Build a minimal palette as we go.
+        palette: List[Block] = []
+        palette_indices: Dict[str, int] = {}
+
+        # Most blocks are shared between many cells, so remember the encoding of each
+        # block object: everything before its position, and everything after it.
+        block_parts: Dict[int, Tuple[bytes, bytes]] = {}
+
+        blocks = bytearray()
+        block_count = 0
+        voided = 0
+        pack_xyz = XYZ.pack
+
+        # NOTE Iterate row by row, without creating a position for every cell. In order
+        # of position, the same blocks always encode into the same bytes, no matter how
+        # they were put together (or whether the block map is dense or sparse).
+        for y, x, row in iter_block_map_rows(block_map, ordered=ordered):
+            for z, block in row:
+                parts = block_parts.get(id(block))
+                if parts is None:
+                    if _qualify_block_name(block.name) in void_blocks:
+                        parts = VOID_PARTS
+                    else:
+                        parts = self._encode_block_parts(
+                            block, palette, palette_indices
+                        )
+                    block_parts[id(block)] = parts
+                if parts is VOID_PARTS:
+                    voided += 1
+                    continue
+                prefix, suffix = parts
+                blocks += prefix
+                blocks += pack_xyz(x, y, z)
+                blocks += suffix
+                block_count += 1
+
+        return palette, block_count, (blocks,), voided
+
+    def _encode_block_map_by_palette(
+        self, block_map: BlockMap, void_blocks: AbstractSet[str]
+    ) -> Tuple[List[Block], int, Iterable[bytes], int]:
+        palette: List[Block] = []
+        palette_indices: Dict[str, int] = {}
+
+        # Number each distinct block object as it's first seen, remembering the index of
+        # its palette entry and the encoding of everything after its position. Void
+        # blocks are numbered -1.
+        block_numbers: Dict[int, int] = {}
+        block_indices: List[int] = []
+        block_suffixes: List[bytes] = []
+
+        # The block number and position of every cell that's written.
+        numbers, ys, xs, zs = array("q"), array("q"), array("q"), array("q")
+        voided = 0
+
+        for y, x, row in iter_block_map_rows(block_map):
+            for z, block in row:
+                number = block_numbers.get(id(block))
+                if number is None:
+                    if _qualify_block_name(block.name) in void_blocks:
+                        number = -1
+                    else:
+                        number = len(block_indices)
+                        block_indices.append(
+                            self._add_to_palette(block, palette, palette_indices)
+                        )
+                        block_suffixes.append(self._encode_block_nbt(block))
+                    block_numbers[id(block)] = number
+                if number < 0:
+                    voided += 1
+                    continue
+                numbers.append(number)
+                ys.append(y)
+                xs.append(x)
+                zs.append(z)
+
+        indices = np.array(block_indices, dtype=np.int64)[
+            np.frombuffer(numbers, dtype=np.int64)
+        ]
+        palette, new_indices = self._sort_palette(
+            palette, np.bincount(indices, minlength=len(palette))
+        )
+        indices = new_indices[indices]
+        ys_, xs_, zs_ = (np.frombuffer(a, dtype=np.int64) for a in (ys, xs, zs))
+
+        # NOTE `lexsort` sorts by its last key first.
+        order = np.lexsort((xs_, zs_, ys_, indices))
+        prefixes = [_encode_block_prefix(index) for index in range(len(palette))]
+        pack_xyz = XYZ.pack
+        blocks = bytearray()
+        for number, index, x, y, z in zip(
+            np.frombuffer(numbers, dtype=np.int64)[order].tolist(),
+            indices[order].tolist(),
+            xs_[order].tolist(),
+            ys_[order].tolist(),
+            zs_[order].tolist(),
+        ):
+            blocks += prefixes[index]
+            blocks += pack_xyz(x, y, z)
+            blocks += block_suffixes[number]
+
+        return palette, len(numbers), (blocks,), voided
+
+    def _encode_mapped_block_map(
+        self,
+        block_map: MappedBlockMap,
+        void_blocks: AbstractSet[str],
+        by_palette: bool,
+        ordered: bool,
+    ) -> Tuple[List[Block], int, Iterator[bytes], int]:
+        palette: List[Block] = []
+        palette_indices: Dict[str, int] = {}
+
+        # The encoding of each of the block map's own blocks, by index.
+        block_parts: Dict[int, Tuple[bytes, bytes]] = {}
+
+        # The index of the palette entry of each of the block map's own blocks, or -1
+        # for those that aren't written, and which layers each one appears in.
+        blocks = block_map.blocks
+        block_indices = np.full(len(blocks), -1, dtype=np.int64)
+        block_layers: Dict[int, List[int]] = {}
+
+        # NOTE The palette and the number of blocks are written before the blocks, so
+        # find them in a first pass over the cells. Blocks are added to the palette in
+        # order of first use, the same as for any other block map, which is the order
+        # they first appear in within each layer, layer by layer.
+        ordered = ordered or by_palette
+        block_count = 0
+        voided = 0
+        counts = np.zeros(len(blocks), dtype=np.int64)
+        for y, xs, zs in iter_block_map_layers(block_map, ordered=ordered):
+            indices, first_cells, layer_counts = np.unique(
+                np.asarray(block_map.cells[y])[xs, zs],
+                return_index=True,
+                return_counts=True,
+            )
+            order = np.argsort(first_cells)
+            for index, count in zip(
+                indices[order].tolist(), layer_counts[order].tolist()
+            ):
+                if index not in block_parts:
+                    block = blocks[index]
+                    assert block is not None
+                    if _qualify_block_name(block.name) in void_blocks:
+                        block_parts[index] = VOID_PARTS
+                    else:
+                        palette_index = self._add_to_palette(
+                            block, palette, palette_indices
+                        )
+                        block_parts[index] = (
+                            _encode_block_prefix(palette_index),
+                            self._encode_block_nbt(block),
+                        )
+                        block_indices[index] = palette_index
+                if block_indices[index] >= 0:
+                    block_count += count
+                    counts[index] += count
+                    block_layers.setdefault(index, []).append(y)
+                else:
+                    voided += count
+
+        written = block_indices >= 0
+        if not by_palette:
+            return (
+                palette,
+                block_count,
+                self._iter_mapped_blocks(block_map, block_parts, written, ordered),
+                voided,
+            )
+
+        palette, new_indices = self._sort_palette(
+            palette,
+            np.bincount(
+                block_indices[written],
+                weights=counts[written],
+                minlength=len(palette),
+            ).astype(np.int64),
+        )
+        block_indices[written] = new_indices[block_indices[written]]
+        return (
+            palette,
+            block_count,
+            self._iter_mapped_blocks_by_palette(
+                block_map, block_parts, block_indices, block_layers, len(palette)
+            ),
+            voided,
+        )
+
+    def _iter_mapped_blocks(
+        self,
+        block_map: MappedBlockMap,
+        block_parts: Dict[int, Tuple[bytes, bytes]],
+        written: np.ndarray,
+        ordered: bool,
+    ) -> Iterator[bytes]:
+        # Encode the blocks a layer at a time, so that only one layer's worth of bytes
+        # is ever held at once.
+        pack_xyz = XYZ.pack
+        for y, xs, zs in iter_block_map_layers(block_map, ordered=ordered):
+            indices = np.asarray(block_map.cells[y])[xs, zs]
+            cells = written[indices]
+            chunk = bytearray()
+            for x, z, index in zip(
+                xs[cells].tolist(), zs[cells].tolist(), indices[cells].tolist()
+            ):
+                prefix, suffix = block_parts[index]
+                chunk += prefix
+                chunk += pack_xyz(x, y, z)
+                chunk += suffix
+            if chunk:
+                yield chunk
+
+    def _iter_mapped_blocks_by_palette(
+        self,
+        block_map: MappedBlockMap,
+        block_parts: Dict[int, Tuple[bytes, bytes]],
+        block_indices: np.ndarray,
+        block_layers: Dict[int, List[int]],
+        palette_size: int,
+    ) -> Iterator[bytes]:
+        # Encode the blocks of one palette entry and one layer at a time, only looking
+        # at the layers that each palette entry appears in.
+        layers_by_index: List[Set[int]] = [set() for _ in range(palette_size)]
+        for block_index, ys in block_layers.items():
+            layers_by_index[int(block_indices[block_index])].update(ys)
+        pack_xyz = XYZ.pack
+        for index, ys in enumerate(layers_by_index):
+            prefix = _encode_block_prefix(index)
+            for y in sorted(ys):
+                layer = np.array(block_map.cells[y])
+                # NOTE Transposed, so that cells come out by z and then x.
+                zs, xs = np.nonzero((block_indices[layer] == index).T)
+                chunk = bytearray()
+                for x, z, block_index in zip(
+                    xs.tolist(), zs.tolist(), layer[xs, zs].tolist()
+                ):
+                    chunk += prefix
+                    chunk += pack_xyz(x, y, z)
+                    chunk += block_parts[block_index][1]
+                yield chunk
+
+    def _encode_blocks(
+        self, structure: Structure, void_blocks: AbstractSet[str], by_palette: bool
+    ) -> Tuple[List[Block], int, Iterable[bytes], int]:
+        palette = [palette_entry.block for palette_entry in structure.palette]
+        # NOTE Blocks left out are still in the palette, which is written as-is.
+        void_states = [
+            _qualify_block_name(block.name) in void_blocks for block in palette
+        ]
+        block_entries = [
+            block_entry
+            for block_entry in structure.blocks
+            if not void_states[block_entry.state]
+        ]
+        voided = len(structure.blocks) - len(block_entries)
+
+        # Reorder the palette, and then the blocks, if need be.
+        states = list(range(len(palette)))
+        if by_palette:
+            palette, new_indices = self._sort_palette(
+                palette,
+                np.bincount(
+                    [block_entry.state for block_entry in block_entries],
+                    minlength=len(palette),
+                ).astype(np.int64),
+            )
+            states = new_indices.tolist()
+
+            def sort_key(block_entry: StructureBlockEntry) -> Tuple[int, int, int, int]:
+                x, y, z = block_entry.pos.unpack_ints()
+                return (states[block_entry.state], y, z, x)
+
+            block_entries.sort(key=sort_key)
+
+        blocks = bytearray()
+        for block_entry in block_entries:
+            blocks += BLOCK_STATE_HEADER
+            blocks += INT.pack(states[block_entry.state])
+            blocks += BLOCK_POS_HEADER
+            blocks += XYZ.pack(*block_entry.pos.unpack_ints())
+            if block_entry.nbt:
+                buff = BytesIO()
+                block_entry.nbt.write(buff)
+                blocks += BLOCK_NBT_HEADER
+                blocks += buff.getvalue()
+            blocks += TAG_END
+        return palette, len(block_entries), (blocks,), voided
@@ -0,0 +1,3 @@
+from .blueprints_build_server import BlueprintsBuildServer
+
+__all__ = ("BlueprintsBuildServer",)
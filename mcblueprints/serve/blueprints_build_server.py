@@ -0,0 +1,245 @@
+import asyncio
+import json
+import sys
+from dataclasses import dataclass, field
+from logging import Logger, getLogger
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Dict, Iterable, List, Optional
+
+from pyckaxe import (
+    PhysicalResourceLocation,
+    ResourceDumper,
+    ResourceLocation,
+    Structure,
+)
+
+from mcblueprints.build.blueprints_build_context import BlueprintsBuildContext
+
+__all__ = ("BlueprintsBuildServer",)
+
+
+STRUCTURE_SUFFIX = ".nbt"
+
+# https://www.jsonrpc.org/specification#error_object
+PARSE_ERROR = -32700
+INVALID_REQUEST = -32600
+METHOD_NOT_FOUND = -32601
+INVALID_PARAMS = -32602
+BUILD_FAILED = -32000
+
+
+class JsonRpcError(Exception):
+    def __init__(self, code: int, message: str):
+        self.code: int = code
+        super().__init__(message)
+
+
+# @implements ResourceDumper
+@dataclass
+class RecordingResourceDumper:
+    """Delegates to another dumper, remembering the path of everything dumped."""
+
+    dumper: ResourceDumper[Any]
+    paths: List[Path] = field(default_factory=list)
+
+    # @implements ResourceDumper
+    async def __call__(self, resource: Any, location: PhysicalResourceLocation):
+        await self.dumper(resource, location)
+        self.paths.append(location.path.with_suffix(STRUCTURE_SUFFIX))
+
+
+@dataclass
+class BlueprintsBuildServer:
+    """
+    Serves build requests over line-delimited JSON-RPC.
+
+    The same build context is kept alive between requests, so that resolvers and caches
+    stay warm. Before each build, the registries of the input pack are checked for
+    source files that have changed since the last build, and any corresponding cache
+    entries are evicted.
+
+    Attributes
+    ----------
+    context
+        The build context to keep alive.
+    """
+
+    context: BlueprintsBuildContext
+
+    log: Logger = field(init=False)
+
+    _outputs: List[Path] = field(init=False)
+    _mtimes: Dict[Path, int] = field(init=False)
+    _lock: asyncio.Lock = field(init=False)
+    _shutdown: asyncio.Event = field(init=False)
+
+    def __post_init__(self):
+        if (
+            self.context.options.input_is_archive
+            or self.context.options.output_is_archive
+        ):
+            raise ValueError("Cannot serve builds to or from a zip archive")
+        self.log = getLogger(f"{self.context}.server")
+        # Record the output of every target in one list.
+        self._outputs = []
+        for output_pack in self.context.output_pack.packs:
+            dumpers = output_pack.dumpers
+            dumpers[Structure] = RecordingResourceDumper(
+                dumpers[Structure], paths=self._outputs
+            )
+        self._mtimes = self._scan_sources()
+        self._lock = asyncio.Lock()
+        self._shutdown = asyncio.Event()
+
+    def _iter_source_dirs(self) -> Iterable[Path]:
+        options = self.context.options
+        data_path = options.input_path / "data"
+        if not data_path.is_dir():
+            return
+        for namespace_path in sorted(data_path.iterdir()):
+            for parts in (
+                options.blueprints_registry_parts,
+                options.filters_registry_parts,
+                options.materials_registry_parts,
+                options.structures_registry_parts,
+            ):
+                registry_path = namespace_path.joinpath(*parts)
+                if registry_path.is_dir():
+                    yield registry_path
+
+    def _scan_sources(self) -> Dict[Path, int]:
+        mtimes: Dict[Path, int] = {}
+        for source_dir in self._iter_source_dirs():
+            for path in source_dir.rglob("*"):
+                if path.is_file():
+                    mtimes[path] = path.stat().st_mtime_ns
+        return mtimes
+
+    def refresh(self) -> Dict[str, int]:
+        """Evict cached resources whose source files have changed since last time."""
+        old_mtimes = self._mtimes
+        new_mtimes = self._scan_sources()
+        changed = [
+            path
+            for path in old_mtimes.keys() | new_mtimes.keys()
+            if old_mtimes.get(path) != new_mtimes.get(path)
+        ]
+        evicted = self.context.invalidate(changed)
+        self._mtimes = new_mtimes
+        if changed:
+            self.log.info(f"Detected {len(changed)} changed source files")
+        return dict(changed=len(changed), evicted=evicted)
+
+    async def build(self, blueprints: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Build the whole pack, or only the given blueprints."""
+        async with self._lock:
+            t_start = perf_counter()
+            refreshed = self.refresh()
+            t_refreshed = perf_counter()
+            self._outputs.clear()
+            if blueprints is None:
+                await self.context.build()
+            else:
+                locations = [ResourceLocation.from_string(b) for b in blueprints]
+                await self.context.build_blueprints(locations)
+            t_built = perf_counter()
+            return dict(
+                outputs=[str(path) for path in self._outputs],
+                **refreshed,
+                timings=dict(
+                    refresh=t_refreshed - t_start,
+                    build=t_built - t_refreshed,
+                    total=t_built - t_start,
+                ),
+            )
+
+    async def call(self, method: Any, params: Any) -> Any:
+        """Dispatch a single method call."""
+        if method == "build":
+            if params is None:
+                params = {}
+            if not isinstance(params, dict):
+                raise JsonRpcError(INVALID_PARAMS, "Expected `params` to be an object")
+            blueprints = params.get("blueprints")
+            if (blueprint := params.get("blueprint")) is not None:
+                blueprints = [*(blueprints or []), blueprint]
+            if blueprints is not None and not (
+                isinstance(blueprints, list)
+                and all(isinstance(b, str) for b in blueprints)
+            ):
+                raise JsonRpcError(INVALID_PARAMS, "Malformed `blueprints`")
+            try:
+                return await self.build(blueprints)
+            except Exception as ex:
+                self.log.exception("Build failed")
+                raise JsonRpcError(BUILD_FAILED, f"Build failed: {ex}") from ex
+        if method == "shutdown":
+            self._shutdown.set()
+            return None
+        raise JsonRpcError(METHOD_NOT_FOUND, f"Unknown method: {method}")
+
+    async def handle(self, line: str) -> Optional[str]:
+        """Handle one line of JSON-RPC, returning the response (if any)."""
+        request: Any = None
+        request_id: Any = None
+        try:
+            try:
+                request = json.loads(line)
+            except ValueError as ex:
+                raise JsonRpcError(PARSE_ERROR, f"Parse error: {ex}") from ex
+            if not isinstance(request, dict):
+                raise JsonRpcError(INVALID_REQUEST, "Expected request to be an object")
+            request_id = request.get("id")
+            result = await self.call(request.get("method"), request.get("params"))
+            response: Dict[str, Any] = dict(jsonrpc="2.0", id=request_id, result=result)
+        except JsonRpcError as ex:
+            response = dict(
+                jsonrpc="2.0",
+                id=request_id,
+                error=dict(code=ex.code, message=str(ex)),
+            )
+        # Requests without an ID are notifications, which get no response.
+        if isinstance(request, dict) and "id" not in request:
+            return None
+        return json.dumps(response)
+
+    async def serve_stdio(self):
+        """Serve requests from stdin, writing responses to stdout, until EOF."""
+        loop = asyncio.get_running_loop()
+        self.log.info("Serving builds over stdio")
+        while not self._shutdown.is_set():
+            line = await loop.run_in_executor(None, sys.stdin.readline)
+            if not line:
+                break
+            if not line.strip():
+                continue
+            if (response := await self.handle(line)) is not None:
+                sys.stdout.write(response + "\n")
+                sys.stdout.flush()
+
+    async def _serve_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        try:
+            while not self._shutdown.is_set():
+                line = await reader.readline()
+                if not line:
+                    break
+                if not line.strip():
+                    continue
+                if (response := await self.handle(line.decode())) is not None:
+                    writer.write(response.encode() + b"\n")
+                    await writer.drain()
+        finally:
+            writer.close()
+
+    async def serve_socket(self, path: Path):
+        """Serve requests over a local (unix) socket at `path`, until shut down."""
+        server = await asyncio.start_unix_server(self._serve_connection, path=path)
+        self.log.info(f"Serving builds on {path}")
+        try:
+            async with server:
+                await self._shutdown.wait()
+        finally:
+            path.unlink(missing_ok=True)
@@ -0,0 +1,4 @@
+"""General utilities not specific to blueprints."""
+
+from .block_map import *
+from .io import *
@@ -0,0 +1,982 @@
+from itertools import compress, zip_longest
+from tempfile import TemporaryFile
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+from pyckaxe import Block, BlockMap, Position, PositionConvertible
+
+__all__ = (
+    "DenseBlockMap",
+    "MappedBlockMap",
+    "make_block_map",
+    "make_block_map_like",
+    "copy_block_map",
+    "count_blocks",
+    "iter_block_map_rows",
+    "iter_block_map_layers",
+    "get_block_indices",
+    "get_block_order",
+    "set_block_indices",
+    "merge_block_map",
+    "fill_block_map",
+)
+
+
+def _out_of_bounds(x: int, y: int, z: int, size: Position) -> ValueError:
+    return ValueError(f"Position ({x}, {y}, {z}) exceeds block map size ({size})")
+
+
+# Cells are numbered in the order they were set in, from 1, with 0 for empty cells.
+ORDER_DTYPE = np.uint32
+
+# Cell numbers only ever need to be told apart within a row, so once they run out, the
+# cells of each row are numbered from 1 again.
+MAX_CELL_NUMBER = int(np.iinfo(ORDER_DTYPE).max)
+
+
+class _BlockOrder:
+    """
+    Remembers the order that the cells of a dense or mapped block map were set in.
+
+    A sparse `BlockMap` holds its cells by layer and then by row, so iterating it gives
+    layers in the order they were first set in, then the rows of each layer in the
+    order they were first set in, and then the cells of each row in the order they
+    were set in. Setting a cell that's already filled leaves it where it is, whereas
+    emptying it and setting it again moves it to the end of its row. Layers and rows
+    stay where they are, even once they're empty.
+
+    This numbers layers, rows and cells as they're first set, so that dense and mapped
+    block maps can be iterated in exactly the same order. Cells are numbered in a grid
+    (by y, then x, then z) like those of a `MappedBlockMap`, and only filled cells have
+    a number.
+    """
+
+    def __init__(self, cells: Any):
+        size_y, size_x, _ = cells.shape
+        self.layers: Any = np.zeros(size_y, dtype=np.int64)
+        self.rows: Any = np.zeros((size_y, size_x), dtype=np.int64)
+        self.cells: Any = cells
+        self.count: int = 0
+        self.cell_count: int = 0
+
+    def _number(self, count: int) -> Any:
+        numbers = np.arange(self.count + 1, self.count + count + 1, dtype=np.int64)
+        self.count += count
+        return numbers
+
+    def _number_cells(self, count: int) -> Any:
+        if self.cell_count + count > MAX_CELL_NUMBER:
+            self._renumber_cells()
+        start = self.cell_count + 1
+        self.cell_count += count
+        return np.arange(start, self.cell_count + 1, dtype=ORDER_DTYPE)
+
+    def _renumber_cells(self):
+        # Number the cells of each row from 1 again, keeping them in the same order.
+        self.cell_count = 0
+        for y, layer in enumerate(self.cells):
+            layer = np.asarray(layer)
+            xs, zs = np.nonzero(layer)
+            if not xs.size:
+                continue
+            # NOTE `lexsort` sorts by its last key first.
+            order = np.lexsort((layer[xs, zs], xs))
+            row_xs = xs[order]
+            starts = np.flatnonzero(np.diff(row_xs, prepend=-1))
+            lengths = np.diff(starts, append=len(row_xs))
+            numbers = np.empty(len(row_xs), dtype=ORDER_DTYPE)
+            numbers[order] = np.arange(1, len(row_xs) + 1) - np.repeat(starts, lengths)
+            self.cells[y][xs, zs] = numbers
+            self.cell_count = max(self.cell_count, int(lengths.max()))
+
+    def set_cell(self, x: int, y: int, z: int):
+        """Note that a cell was set."""
+        if self.cells[y, x, z]:
+            return
+        if not self.layers[y]:
+            self.count += 1
+            self.layers[y] = self.count
+        if not self.rows[y, x]:
+            self.count += 1
+            self.rows[y, x] = self.count
+        if self.cell_count >= MAX_CELL_NUMBER:
+            self._renumber_cells()
+        self.cell_count += 1
+        self.cells[y, x, z] = self.cell_count
+
+    def clear_cell(self, x: int, y: int, z: int):
+        """Note that a cell was emptied."""
+        self.cells[y, x, z] = 0
+
+    def touch_rows(self, y: int, xs: Any):
+        """Note that rows of layer `y` were written to, in the order given."""
+        if not self.layers[y]:
+            self.layers[y] = self._number(1)[0]
+        unique_xs, first = np.unique(xs, return_index=True)
+        new_xs = unique_xs[np.argsort(first)]
+        new_xs = new_xs[self.rows[y, new_xs] == 0]
+        self.rows[y, new_xs] = self._number(len(new_xs))
+
+    def set_cells(self, y: int, xs: Any, zs: Any):
+        """Note that (distinct) cells of layer `y` were set, in the order given."""
+        if not len(xs):
+            return
+        self.touch_rows(y, xs)
+        new = self.cells[y][xs, zs] == 0
+        numbers = self._number_cells(int(np.count_nonzero(new)))
+        self.cells[y][xs[new], zs[new]] = numbers
+
+    def set_positions(self, cells: Any):
+        """Note that the filled cells of a grid were set, in order of position."""
+        for y, layer in enumerate(cells):
+            xs, zs = np.nonzero(np.asarray(layer))
+            self.set_cells(y, xs, zs)
+
+    def set_flat(self, order: Any):
+        """Note that cells were set in the order given, by index into the grid."""
+        ys, xs, zs = np.unravel_index(order, self.cells.shape)
+        if not len(ys):
+            return
+        # Set the cells of each run of the same layer together.
+        starts = [0, *(np.flatnonzero(np.diff(ys)) + 1).tolist(), len(ys)]
+        for start, end in zip(starts, starts[1:]):
+            self.set_cells(int(ys[start]), xs[start:end], zs[start:end])
+
+    def copy_to(self, other: "_BlockOrder"):
+        """Copy everything over to an empty order of the same size."""
+        other.layers[...] = self.layers
+        other.rows[...] = self.rows
+        for y, layer in enumerate(self.cells):
+            other.cells[y] = layer
+        other.count = self.count
+        other.cell_count = self.cell_count
+
+    def iter_layers(self) -> Iterator[Tuple[int, Any, Any]]:
+        """Yield each layer with anything in it and its filled cells, in order."""
+        ys = np.flatnonzero(self.layers)
+        for y in ys[np.argsort(self.layers[ys])].tolist():
+            # Read the layer in once, rather than going back to the file for each cell.
+            layer = np.asarray(self.cells[y])
+            xs, zs = np.nonzero(layer)
+            if not xs.size:
+                continue
+            # NOTE `lexsort` sorts by its last key first.
+            order = np.lexsort((layer[xs, zs], self.rows[y, xs]))
+            yield y, xs[order], zs[order]
+
+
+class DenseBlockMap(BlockMap):
+    """
+    A block map that holds every cell in one flat list, rather than only filled ones.
+
+    Cells are stored in order of position (by y, then x, then z), with `None` for empty
+    cells. This costs a slot per cell of the whole volume, but no more than that, which
+    suits block maps that are mostly filled: a sparse `BlockMap` costs several times as
+    much per filled cell. Whole rows can also be copied in and out at once.
+
+    The order that cells were set in is remembered too, in a grid of numbers alongside
+    the cells, so that they can still be iterated in the same order as a sparse
+    `BlockMap` would give.
+
+    Unlike a sparse `BlockMap`, positions outside of the volume can't be held at all,
+    including negative ones.
+    """
+
+    def __init__(self, size: PositionConvertible):
+        # NOTE Skip the sparse mapping entirely, so that nothing can use it by mistake.
+        self.size = Position.convert(size)
+        size_x, size_y, size_z = self.size.unpack_ints()
+        self.cells: List[Optional[Block]] = [None] * (size_x * size_y * size_z)
+        self._order = _BlockOrder(np.zeros((size_y, size_x, size_z), dtype=ORDER_DTYPE))
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DenseBlockMap):
+            return NotImplemented
+        return (self.size == other.size) and (self.cells == other.cells)
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(size={self.size!r})"
+
+    def __setitem__(self, key, value: Block):
+        x, y, z = self._unpack_xyz(key)
+        self.cells[self._index(x, y, z)] = value
+        self._order.set_cell(x, y, z)
+
+    def __getitem__(self, key) -> Block:
+        block = self.cells[self._index(*self._unpack_xyz(key))]
+        if block is None:
+            raise KeyError(key)
+        return block
+
+    def __delitem__(self, key):
+        x, y, z = self._unpack_xyz(key)
+        index = self._index(x, y, z)
+        if self.cells[index] is None:
+            raise KeyError(key)
+        self.cells[index] = None
+        self._order.clear_cell(x, y, z)
+
+    def __iter__(self) -> Iterator[Tuple[Position, Block]]:
+        for y, x, row in iter_block_map_rows(self):
+            for z, block in row:
+                yield Position.from_xyz(x, y, z), block
+
+    def _index(self, x: int, y: int, z: int) -> int:
+        size_x, size_y, size_z = self.size.unpack_ints()
+        if not ((0 <= x < size_x) and (0 <= y < size_y) and (0 <= z < size_z)):
+            raise _out_of_bounds(x, y, z, self.size)
+        return (y * size_x + x) * size_z + z
+
+    def get(self, key) -> Optional[Block]:
+        x, y, z = self._unpack_xyz(key)
+        size_x, size_y, size_z = self.size.unpack_ints()
+        if not ((0 <= x < size_x) and (0 <= y < size_y) and (0 <= z < size_z)):
+            return None
+        return self.cells[(y * size_x + x) * size_z + z]
+
+    def _map_blocks(self, convert: Callable[[Block], Optional[Block]]):
+        # Most cells share a handful of block objects, so only convert each one once.
+        converted: Dict[int, Optional[Block]] = {}
+        cells = self.cells
+        emptied: List[int] = []
+        for i, block in enumerate(cells):
+            if block is None:
+                continue
+            if (key := id(block)) not in converted:
+                converted[key] = convert(block)
+            cells[i] = block = converted[key]
+            if block is None:
+                emptied.append(i)
+        if emptied:
+            self._order.cells.reshape(-1)[emptied] = 0
+
+    def remove_blocks(self, blocks: List[Block]):
+        self._map_blocks(lambda block: None if block in blocks else block)
+
+    def keep_blocks(self, blocks: List[Block]):
+        self._map_blocks(lambda block: block if block in blocks else None)
+
+    def replace_blocks(self, blocks: List[Block], replacement: Block):
+        self._map_blocks(lambda block: replacement if block in blocks else block)
+
+    def merge(self, other: BlockMap, position: Position = Position.from_xyz(0, 0, 0)):
+        merge_block_map(self, other, position)
+
+    def to_sparse(self) -> BlockMap:
+        """Return a sparse copy of this block map."""
+        block_map = BlockMap(size=self.size)
+        merge_block_map(block_map, self)
+        return block_map
+
+    @classmethod
+    def from_block_map(cls, block_map: BlockMap) -> "DenseBlockMap":
+        """Return `block_map` in dense form, copying it if need be."""
+        if isinstance(block_map, cls):
+            return block_map
+        dense_block_map = cls(size=block_map.size)
+        merge_block_map(dense_block_map, block_map)
+        return dense_block_map
+
+
+# Cells of a `MappedBlockMap` hold an index into its list of blocks.
+MAPPED_CELL_DTYPE = np.uint32
+
+
+class MappedBlockMap(BlockMap):
+    """
+    A block map that keeps its cells out of memory, in a memory-mapped temporary file.
+
+    Each cell holds an index into `blocks`, the list of every block set so far, with 0
+    for empty cells. Cells are stored as a grid of integers (by y, then x, then z) in an
+    unnamed temporary file that goes away along with the block map, and the operating
+    system pages them in and out as they're used. Only `blocks` is held as Python
+    objects, so the size of a block map is limited by disk space rather than memory.
+
+    Bulk operations (merging, filling, filtering, copying and iterating) work through
+    the grid one layer at a time, so that only a layer needs to be in memory at once.
+
+    As with a `DenseBlockMap`, the order that cells were set in is remembered too, in a
+    second grid in its own temporary file. Anything that writes to `cells` directly
+    calls `mark_set` as well, to keep it up to date.
+
+    As with a `DenseBlockMap`, positions outside of the volume can't be held at all.
+    """
+
+    def __init__(self, size: PositionConvertible, directory: Optional[str] = None):
+        # NOTE Skip the sparse mapping entirely, so that nothing can use it by mistake.
+        self.size = Position.convert(size)
+        self.directory: Optional[str] = directory
+        size_x, size_y, size_z = self.size.unpack_ints()
+        shape = (size_y, size_x, size_z)
+        self.cells: Any
+        order_cells: Any
+        if size_x * size_y * size_z:
+            self._file = TemporaryFile(dir=directory)
+            self.cells = np.memmap(
+                self._file, dtype=MAPPED_CELL_DTYPE, mode="w+", shape=shape
+            )
+            self._order_file = TemporaryFile(dir=directory)
+            order_cells = np.memmap(
+                self._order_file, dtype=ORDER_DTYPE, mode="w+", shape=shape
+            )
+        else:
+            # An empty file can't be mapped, but there's nothing to store anyway.
+            self.cells = np.zeros(shape, dtype=MAPPED_CELL_DTYPE)
+            order_cells = np.zeros(shape, dtype=ORDER_DTYPE)
+        self._order = _BlockOrder(order_cells)
+        self.blocks: List[Optional[Block]] = [None]
+        self._block_indices: Dict[int, int] = {}
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, MappedBlockMap):
+            return NotImplemented
+        return (self.size == other.size) and all(
+            a == b for a, b in zip_longest(self, other)
+        )
+
+    __hash__ = None  # type: ignore
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}(size={self.size!r})"
+
+    def __setitem__(self, key, value: Block):
+        x, y, z = self._unpack_xyz(key)
+        self._check_bounds(x, y, z)
+        self.cells[y, x, z] = self.index_block(value)
+        self._order.set_cell(x, y, z)
+
+    def __getitem__(self, key) -> Block:
+        x, y, z = self._unpack_xyz(key)
+        self._check_bounds(x, y, z)
+        block = self.blocks[self.cells[y, x, z]]
+        if block is None:
+            raise KeyError(key)
+        return block
+
+    def __delitem__(self, key):
+        x, y, z = self._unpack_xyz(key)
+        self._check_bounds(x, y, z)
+        if not self.cells[y, x, z]:
+            raise KeyError(key)
+        self.cells[y, x, z] = 0
+        self._order.clear_cell(x, y, z)
+
+    def __iter__(self) -> Iterator[Tuple[Position, Block]]:
+        for y, x, row in iter_block_map_rows(self):
+            for z, block in row:
+                yield Position.from_xyz(x, y, z), block
+
+    def _check_bounds(self, x: int, y: int, z: int):
+        size_x, size_y, size_z = self.size.unpack_ints()
+        if not ((0 <= x < size_x) and (0 <= y < size_y) and (0 <= z < size_z)):
+            raise _out_of_bounds(x, y, z, self.size)
+
+    def get(self, key) -> Optional[Block]:
+        x, y, z = self._unpack_xyz(key)
+        size_x, size_y, size_z = self.size.unpack_ints()
+        if not ((0 <= x < size_x) and (0 <= y < size_y) and (0 <= z < size_z)):
+            return None
+        return self.blocks[self.cells[y, x, z]]
+
+    def index_block(self, block: Optional[Block]) -> int:
+        """Return the index that cells holding `block` are set to, adding it if new."""
+        if block is None:
+            return 0
+        index = self._block_indices.get(id(block))
+        if index is None:
+            index = self._block_indices[id(block)] = len(self.blocks)
+            self.blocks.append(block)
+        return index
+
+    def mark_set(self, y: int, xs: Any, zs: Any):
+        """
+        Note that the given cells of layer `y` were just set in `cells`, in that order.
+
+        Cells that were already filled keep their place, as with setting them one by
+        one.
+        """
+        self._order.set_cells(y, np.asarray(xs), np.asarray(zs))
+
+    def index_blocks(self, blocks: List[Optional[Block]]) -> Any:
+        """Return an array that translates indices into `blocks` into this one's."""
+        return np.fromiter(
+            (self.index_block(block) for block in blocks),
+            dtype=MAPPED_CELL_DTYPE,
+            count=len(blocks),
+        )
+
+    def _map_blocks(self, convert: Callable[[Block], Optional[Block]]):
+        # Convert each block once, and then translate the cells a layer at a time.
+        converted = self.index_blocks(
+            [None if block is None else convert(block) for block in self.blocks]
+        )
+        if np.array_equal(converted, np.arange(len(converted))):
+            return
+        emptying = not converted[1:].all()
+        for y, layer in enumerate(self.cells):
+            layer[...] = converted[layer]
+            if emptying:
+                self._order.cells[y][layer == 0] = 0
+
+    def remove_blocks(self, blocks: List[Block]):
+        self._map_blocks(lambda block: None if block in blocks else block)
+
+    def keep_blocks(self, blocks: List[Block]):
+        self._map_blocks(lambda block: block if block in blocks else None)
+
+    def replace_blocks(self, blocks: List[Block], replacement: Block):
+        self._map_blocks(lambda block: replacement if block in blocks else block)
+
+    def merge(self, other: BlockMap, position: Position = Position.from_xyz(0, 0, 0)):
+        merge_block_map(self, other, position)
+
+    def copy(self) -> "MappedBlockMap":
+        """Return a copy of this block map in a new temporary file."""
+        mapped_copy = MappedBlockMap(size=self.size, directory=self.directory)
+        for y, layer in enumerate(self.cells):
+            mapped_copy.cells[y] = layer
+        self._order.copy_to(mapped_copy._order)
+        mapped_copy.blocks = list(self.blocks)
+        mapped_copy._block_indices = dict(self._block_indices)
+        return mapped_copy
+
+
+def make_block_map(size: PositionConvertible, dense: bool = False) -> BlockMap:
+    """Create an empty block map, either dense or sparse."""
+    return DenseBlockMap(size=size) if dense else BlockMap(size=size)
+
+
+def make_block_map_like(block_map: BlockMap, size: PositionConvertible) -> BlockMap:
+    """Create an empty block map of `size`, stored the same way as `block_map`."""
+    if isinstance(block_map, MappedBlockMap):
+        return MappedBlockMap(size=size, directory=block_map.directory)
+    return make_block_map(size, dense=isinstance(block_map, DenseBlockMap))
+
+
+def copy_block_map(block_map: BlockMap) -> BlockMap:
+    """
+    Make a copy of a block map that can be modified independently.
+
+    The copy is stored the same way as the original, dense, sparse or mapped. Blocks
+    themselves are shared between the two, not copied.
+    """
+    if isinstance(block_map, MappedBlockMap):
+        return block_map.copy()
+    if isinstance(block_map, DenseBlockMap):
+        dense_copy = DenseBlockMap(size=block_map.size)
+        dense_copy.cells = list(block_map.cells)
+        block_map._order.copy_to(dense_copy._order)
+        return dense_copy
+    block_map_copy = BlockMap(size=block_map.size)
+    merge_block_map(block_map_copy, block_map)
+    return block_map_copy
+
+
+def count_blocks(block_map: BlockMap) -> int:
+    """Count the cells of a block map that hold a block."""
+    if isinstance(block_map, DenseBlockMap):
+        # Only filled cells are numbered, and numbers are quicker to count than blocks.
+        return int(np.count_nonzero(block_map._order.cells))
+    if isinstance(block_map, MappedBlockMap):
+        return sum(int(np.count_nonzero(layer)) for layer in block_map.cells)
+    return sum(
+        len(row) for layer in block_map._block_map.values() for row in layer.values()
+    )
+
+
+def iter_block_map_rows(
+    block_map: BlockMap, ordered: bool = True
+) -> Iterator[Tuple[int, int, Iterable[Tuple[int, Block]]]]:
+    """
+    Yield the `y`, `x` and filled cells `(z, block)` of every row, in order of position.
+
+    Works the same whether the block map is dense, sparse or mapped, without creating a
+    position for every cell. Unless `ordered`, cells are yielded in the order they were
+    set in instead, the same as iterating a sparse block map would.
+    """
+    return _iter_rows(block_map, ordered=ordered)
+
+
+def iter_block_map_layers(
+    block_map: BlockMap, ordered: bool = True
+) -> Iterator[Tuple[int, Any, Any]]:
+    """
+    Yield the `y` of every layer with anything in it, and its filled cells as arrays.
+
+    The arrays hold the `x` and `z` of each filled cell, in order of position. Unless
+    `ordered`, layers and cells are yielded in the order they were set in instead, the
+    same as `iter_block_map_rows`.
+    """
+    if isinstance(block_map, (DenseBlockMap, MappedBlockMap)):
+        if not ordered:
+            yield from block_map._order.iter_layers()
+            return
+        # Only filled cells are numbered, so either grid will do.
+        grid = block_map.cells
+        if isinstance(block_map, DenseBlockMap):
+            grid = block_map._order.cells
+        for y, layer in enumerate(grid):
+            xs, zs = np.nonzero(np.asarray(layer))
+            if xs.size:
+                yield y, xs, zs
+        return
+    # NOTE Go straight to the y -> x -> z mapping, sorting as we go if need be.
+    layers = block_map._block_map.items()
+    for y, layer in sorted(layers) if ordered else layers:
+        rows = sorted(layer.items()) if ordered else layer.items()
+        xs: List[int] = []
+        zs: List[int] = []
+        for x, sparse_row in rows:
+            xs.extend([x] * len(sparse_row))
+            zs.extend(sorted(sparse_row) if ordered else sparse_row)
+        if xs:
+            yield y, np.array(xs, dtype=np.int64), np.array(zs, dtype=np.int64)
+
+
+def _iter_rows(
+    block_map: BlockMap, ordered: bool
+) -> Iterator[Tuple[int, int, Iterable[Tuple[int, Block]]]]:
+    if isinstance(block_map, (DenseBlockMap, MappedBlockMap)) and not ordered:
+        yield from _iter_rows_in_order(block_map)
+        return
+    if isinstance(block_map, DenseBlockMap):
+        size_x, size_y, size_z = block_map.size.unpack_ints()
+        cells = block_map.cells
+        # Skip empty rows by how many of their cells are numbered.
+        filled = iter(np.count_nonzero(block_map._order.cells, axis=2).ravel().tolist())
+        i = 0
+        for y in range(size_y):
+            for x in range(size_x):
+                row_start = i
+                i += size_z
+                if next(filled):
+                    row = cells[row_start:i]
+                    yield y, x, compress(enumerate(row), row)
+        return
+    if isinstance(block_map, MappedBlockMap):
+        blocks = block_map.blocks
+        for y, layer in enumerate(block_map.cells):
+            # Read the layer in once, rather than going back to the file for each row.
+            layer = np.array(layer)
+            for x in np.flatnonzero(layer.any(axis=1)).tolist():
+                row = layer[x]
+                zs = np.flatnonzero(row)
+                yield y, x, zip(zs.tolist(), map(blocks.__getitem__, row[zs].tolist()))
+        return
+    # NOTE Go straight to the y -> x -> z mapping, sorting as we go if need be.
+    if not ordered:
+        for y, layer in block_map._block_map.items():
+            for x, sparse_row in layer.items():
+                if sparse_row:
+                    yield y, x, sparse_row.items()
+        return
+    for y, layer in sorted(block_map._block_map.items()):
+        for x, sparse_row in sorted(layer.items()):
+            if sparse_row:
+                yield y, x, sorted(sparse_row.items())
+
+
+def _iter_rows_in_order(
+    block_map: BlockMap,
+) -> Iterator[Tuple[int, int, Iterable[Tuple[int, Block]]]]:
+    # Look up the blocks of a whole layer at once, and then split it into rows, which
+    # are always kept together.
+    size_x, _, size_z = block_map.size.unpack_ints()
+    for y, xs, zs in iter_block_map_layers(block_map, ordered=False):
+        if isinstance(block_map, MappedBlockMap):
+            indices = np.asarray(block_map.cells[y])[xs, zs].tolist()
+            blocks = list(map(block_map.blocks.__getitem__, indices))
+        else:
+            flat = (y * size_x + xs) * size_z + zs
+            blocks = list(map(block_map.cells.__getitem__, flat.tolist()))
+        row_xs, row_zs = xs.tolist(), zs.tolist()
+        starts = [0, *(np.flatnonzero(np.diff(xs)) + 1).tolist(), len(row_xs)]
+        for start, end in zip(starts, starts[1:]):
+            yield y, row_xs[start], zip(row_zs[start:end], blocks[start:end])
+
+
+def get_block_indices(block_map: BlockMap) -> Tuple[Any, List[Optional[Block]]]:
+    """
+    Return the cells of a block map as a grid of indices into a list of its blocks.
+
+    The grid is indexed by y, then x, then z, with 0 for empty cells, the same as the
+    cells of a `MappedBlockMap`. The list of blocks starts with `None`, for 0.
+    """
+    if isinstance(block_map, MappedBlockMap):
+        return np.array(block_map.cells), list(block_map.blocks)
+    size_x, size_y, size_z = block_map.size.unpack_ints()
+    blocks: List[Optional[Block]] = [None]
+    block_indices: Dict[int, int] = {id(None): 0}
+
+    def index_block(block: Optional[Block]) -> int:
+        if (index := block_indices.get(id(block))) is None:
+            index = block_indices[id(block)] = len(blocks)
+            blocks.append(block)
+        return index
+
+    if isinstance(block_map, DenseBlockMap):
+        # NOTE Map the whole flat list at once, rather than indexing one cell at a time.
+        flat = np.fromiter(
+            map(index_block, block_map.cells),
+            dtype=MAPPED_CELL_DTYPE,
+            count=len(block_map.cells),
+        )
+        return flat.reshape(size_y, size_x, size_z), blocks
+    cells = np.zeros((size_y, size_x, size_z), dtype=MAPPED_CELL_DTYPE)
+    for y, x, row in _iter_rows(block_map, ordered=False):
+        zs, row_blocks = zip(*row)
+        cells[y, x, list(zs)] = [index_block(block) for block in row_blocks]
+    return cells, blocks
+
+
+def get_block_order(block_map: BlockMap) -> Any:
+    """
+    Return the order that the filled cells of a block map were set in.
+
+    Cells are given by their index into the flattened grid from `get_block_indices`, in
+    the same order as iterating the block map with `iter_block_map_rows` (unordered).
+    """
+    size_x, _, size_z = block_map.size.unpack_ints()
+    order = [
+        (y * size_x + xs) * size_z + zs
+        for y, xs, zs in iter_block_map_layers(block_map, ordered=False)
+    ]
+    if not order:
+        return np.zeros(0, dtype=np.int64)
+    return np.concatenate(order)
+
+
+def set_block_indices(
+    block_map: BlockMap,
+    cells: Any,
+    blocks: List[Optional[Block]],
+    order: Optional[Any] = None,
+):
+    """
+    Set every cell of an empty block map from a grid of indices into a list of blocks.
+
+    This is the opposite of `get_block_indices`, into a block map of the same size,
+    which may be stored any way at all. Cells are set in order of position, or in the
+    `order` from `get_block_order`, if given.
+    """
+    size_x, size_y, size_z = block_map.size.unpack_ints()
+    if cells.shape != (size_y, size_x, size_z):
+        raise ValueError(
+            f"Cells of shape {cells.shape} don't fit block map size ({block_map.size})"
+        )
+    if (order is not None) and not np.array_equal(
+        np.sort(order), np.flatnonzero(cells)
+    ):
+        raise ValueError("Order doesn't match the filled cells")
+    if isinstance(block_map, (DenseBlockMap, MappedBlockMap)):
+        if isinstance(block_map, MappedBlockMap):
+            translate = block_map.index_blocks(blocks)
+            for y, layer in enumerate(cells):
+                block_map.cells[y] = translate[layer]
+        else:
+            block_map.cells = list(map(blocks.__getitem__, cells.ravel().tolist()))
+        if order is None:
+            block_map._order.set_positions(cells)
+        else:
+            block_map._order.set_flat(order)
+        return
+    # NOTE Go straight to the y -> x -> z mapping, one filled row at a time.
+    layers = block_map._block_map
+    if order is not None:
+        flat = cells.ravel()
+        ys, xs, zs = np.unravel_index(order, cells.shape)
+        for y, x, z, index in zip(
+            ys.tolist(), xs.tolist(), zs.tolist(), flat[order].tolist()
+        ):
+            layers[y][x][z] = blocks[index]
+        return
+    for y, layer in enumerate(cells):
+        for x in np.flatnonzero(layer.any(axis=1)).tolist():
+            row = layer[x]
+            zs = np.flatnonzero(row)
+            layers[y][x].update(
+                zip(zs.tolist(), map(blocks.__getitem__, row[zs].tolist()))
+            )
+
+
+def merge_block_map(
+    block_map: BlockMap,
+    other: BlockMap,
+    position: Position = Position.from_xyz(0, 0, 0),
+):
+    """
+    Merge `other` into `block_map`, with its origin at `position`.
+
+    Either block map may be dense, sparse or mapped. Rows are copied in bulk, rather
+    than cell by cell, wherever that's possible. As with `BlockMap.merge`, empty cells
+    of `other` are left alone, and any block that would land outside of `block_map` is
+    an error. Either way, cells are set in the order they were set in `other`.
+    """
+    offset_x, offset_y, offset_z = position.unpack_ints()
+    size = block_map.size
+    size_x, size_y, size_z = size.unpack_ints()
+
+    if isinstance(block_map, MappedBlockMap):
+        _merge_into_mapped(block_map, other, offset_x, offset_y, offset_z)
+        _merge_order(block_map._order, other, offset_x, offset_y, offset_z)
+        return
+
+    if not isinstance(block_map, DenseBlockMap):
+        # Sparse block maps only check their upper bounds, and keep blocks in the order
+        # they were set, so there's no need to sort rows.
+        layers = block_map._block_map
+        for y, x, row in _iter_rows(other, ordered=False):
+            target_y, target_x = y + offset_y, x + offset_x
+            blocks = [(z + offset_z, block) for z, block in row]
+            if (
+                (target_y >= size_y)
+                or (target_x >= size_x)
+                or (max(z for z, _ in blocks) >= size_z)
+            ):
+                z = next((z for z, _ in blocks if z >= size_z), blocks[0][0])
+                raise _out_of_bounds(target_x, target_y, z, size)
+            layers[target_y][target_x].update(blocks)
+        return
+
+    # Dense block maps can only be written to within their volume. Their cells can be
+    # copied in any order, and then numbered in the order they were set in `other`.
+    cells = block_map.cells
+    if isinstance(other, DenseBlockMap):
+        _merge_dense_rows(block_map, other, offset_x, offset_y, offset_z)
+        _merge_order(block_map._order, other, offset_x, offset_y, offset_z)
+        return
+    for y, x, row in _iter_rows(other, ordered=True):
+        target_y, target_x = y + offset_y, x + offset_x
+        blocks = [(z + offset_z, block) for z, block in row]
+        first_z, last_z = blocks[0][0], blocks[-1][0]
+        if not (
+            (0 <= target_y < size_y)
+            and (0 <= target_x < size_x)
+            and (0 <= first_z)
+            and (last_z < size_z)
+        ):
+            z = first_z if (first_z < 0) or (last_z < size_z) else last_z
+            raise _out_of_bounds(target_x, target_y, z, size)
+        row_start = (target_y * size_x + target_x) * size_z
+        # A row with no gaps can be copied over in one go.
+        if last_z - first_z + 1 == len(blocks):
+            cells[row_start + first_z : row_start + last_z + 1] = [b for _, b in blocks]
+        else:
+            for z, block in blocks:
+                cells[row_start + z] = block
+    _merge_order(block_map._order, other, offset_x, offset_y, offset_z)
+
+
+def _merge_order(
+    order: _BlockOrder, other: BlockMap, offset_x: int, offset_y: int, offset_z: int
+):
+    # Number the cells merged in from `other` in the order they were set in there, a
+    # layer at a time. Bounds have already been checked while copying them.
+    for y, xs, zs in iter_block_map_layers(other, ordered=False):
+        order.set_cells(y + offset_y, xs + offset_x, zs + offset_z)
+
+
+def _merge_dense_rows(
+    block_map: DenseBlockMap,
+    other: DenseBlockMap,
+    offset_x: int,
+    offset_y: int,
+    offset_z: int,
+):
+    # Copy whole rows from one flat list to the other, falling back to cell by cell only
+    # for rows with gaps in them.
+    size = block_map.size
+    size_x, size_y, size_z = size.unpack_ints()
+    other_size_x, other_size_y, other_size_z = other.size.unpack_ints()
+    cells, other_cells = block_map.cells, other.cells
+    z_in_bounds = (0 <= offset_z) and (offset_z + other_size_z <= size_z)
+    # Find the gaps in each row by how many of its cells are numbered.
+    filled = iter(np.count_nonzero(other._order.cells, axis=2).ravel().tolist())
+    i = 0
+    for y in range(other_size_y):
+        target_y = y + offset_y
+        for x in range(other_size_x):
+            row_start = i
+            i += other_size_z
+            gaps = other_size_z - next(filled)
+            if gaps == other_size_z:
+                continue
+            row = other_cells[row_start:i]
+            target_x = x + offset_x
+            if not (
+                (0 <= target_y < size_y) and (0 <= target_x < size_x) and z_in_bounds
+            ):
+                for z, _ in compress(enumerate(row), row):
+                    if not (
+                        (0 <= target_y < size_y)
+                        and (0 <= target_x < size_x)
+                        and (0 <= z + offset_z < size_z)
+                    ):
+                        raise _out_of_bounds(target_x, target_y, z + offset_z, size)
+            start = (target_y * size_x + target_x) * size_z + offset_z
+            if not gaps:
+                cells[start : start + other_size_z] = row
+            else:
+                for z, block in compress(enumerate(row), row):
+                    cells[start + z] = block
+
+
+def _merge_into_mapped(
+    block_map: MappedBlockMap,
+    other: BlockMap,
+    offset_x: int,
+    offset_y: int,
+    offset_z: int,
+):
+    size = block_map.size
+    size_x, size_y, size_z = size.unpack_ints()
+    cells = block_map.cells
+
+    def check_bounds(xs: Iterable[int], y: int, zs: Iterable[int]):
+        for x, z in zip(xs, zs):
+            if not (
+                (0 <= y + offset_y < size_y)
+                and (0 <= x + offset_x < size_x)
+                and (0 <= z + offset_z < size_z)
+            ):
+                raise _out_of_bounds(x + offset_x, y + offset_y, z + offset_z, size)
+
+    if not isinstance(other, MappedBlockMap):
+        # Set each row of the other block map in one go.
+        for y, x, row in _iter_rows(other, ordered=False):
+            zs, blocks = zip(*row)
+            check_bounds([x] * len(zs), y, zs)
+            cells[y + offset_y, x + offset_x, np.add(zs, offset_z)] = [
+                block_map.index_block(block) for block in blocks
+            ]
+        return
+
+    # Translate the other block map's indices into this one's, and then copy over the
+    # part of each layer that has anything in it, a layer at a time.
+    translate = block_map.index_blocks(other.blocks)
+    for y, layer in enumerate(other.cells):
+        filled = layer != 0
+        xs = np.flatnonzero(filled.any(axis=1))
+        if not xs.size:
+            continue
+        zs = np.flatnonzero(filled.any(axis=0))
+        x0, x1, z0, z1 = int(xs[0]), int(xs[-1]) + 1, int(zs[0]), int(zs[-1]) + 1
+        if not (
+            (0 <= y + offset_y < size_y)
+            and (0 <= x0 + offset_x)
+            and (x1 + offset_x <= size_x)
+            and (0 <= z0 + offset_z)
+            and (z1 + offset_z <= size_z)
+        ):
+            filled_xs, filled_zs = np.nonzero(filled)
+            check_bounds(filled_xs.tolist(), y, filled_zs.tolist())
+        window = filled[x0:x1, z0:z1]
+        np.copyto(
+            cells[
+                y + offset_y,
+                x0 + offset_x : x1 + offset_x,
+                z0 + offset_z : z1 + offset_z,
+            ],
+            translate[layer[x0:x1, z0:z1]],
+            where=window,
+        )
+
+
+def fill_block_map(
+    block_map: BlockMap,
+    start: Position,
+    end: Position,
+    block: Optional[Block],
+    hollow: bool = False,
+):
+    """
+    Fill the cuboid between two corners (inclusive) with `block`, or void it if `None`.
+
+    If `hollow` is set, only the outer shell of the cuboid is filled. Bounds are
+    checked once for the whole region, and rows are written in bulk rather than cell by
+    cell.
+    """
+    (x0, y0, z0), (x1, y1, z1) = start.unpack_ints(), end.unpack_ints()
+    x0, x1 = sorted((x0, x1))
+    y0, y1 = sorted((y0, y1))
+    z0, z1 = sorted((z0, z1))
+
+    size_x, size_y, size_z = block_map.size.unpack_ints()
+    if (min(x0, y0, z0) < 0) or (x1 >= size_x) or (y1 >= size_y) or (z1 >= size_z):
+        raise ValueError(
+            f"Region ({x0}, {y0}, {z0}) to ({x1}, {y1}, {z1}) exceeds block map size"
+            + f" ({block_map.size})"
+        )
+
+    full_row = range(z0, z1 + 1)
+    # Inside of a hollow cuboid, rows only have their two ends filled.
+    shell_row = sorted({z0, z1})
+
+    if isinstance(block_map, MappedBlockMap):
+        index = block_map.index_block(block)
+        layers = block_map.cells
+        for y in range(y0, y1 + 1):
+            if hollow and (y not in (y0, y1)):
+                layers[y, [x0, x1], z0 : z1 + 1] = index
+                layers[y, x0 : x1 + 1, [z0, z1]] = index
+            else:
+                layers[y, x0 : x1 + 1, z0 : z1 + 1] = index
+        _fill_order(block_map._order, x0, y0, z0, x1, y1, z1, block, hollow)
+        return
+
+    if isinstance(block_map, DenseBlockMap):
+        cells = block_map.cells
+        full_cells = [block] * len(full_row)
+        for y in range(y0, y1 + 1):
+            for x in range(x0, x1 + 1):
+                row_start = (y * size_x + x) * size_z
+                if hollow and not ((y in (y0, y1)) or (x in (x0, x1))):
+                    for z in shell_row:
+                        cells[row_start + z] = block
+                else:
+                    cells[row_start + z0 : row_start + z1 + 1] = full_cells
+        _fill_order(block_map._order, x0, y0, z0, x1, y1, z1, block, hollow)
+        return
+
+    # NOTE `BlockMap` has no range writes, so go straight to its y -> x -> z mapping.
+    layers = block_map._block_map
+    for y in range(y0, y1 + 1):
+        layer = layers[y]
+        for x in range(x0, x1 + 1):
+            row = layer[x]
+            on_shell = (y in (y0, y1)) or (x in (x0, x1))
+            zs = full_row if (on_shell or not hollow) else shell_row
+            if block is None:
+                for z in zs:
+                    row.pop(z, None)
+            else:
+                row.update(dict.fromkeys(zs, block))
+
+
+def _fill_order(
+    order: _BlockOrder,
+    x0: int,
+    y0: int,
+    z0: int,
+    x1: int,
+    y1: int,
+    z1: int,
+    block: Optional[Block],
+    hollow: bool,
+):
+    # Number the cells of a filled region a layer at a time, row by row, the same as a
+    # sparse block map fills them. Voiding still counts as writing to every row.
+    window = np.ones((x1 - x0 + 1, z1 - z0 + 1), dtype=bool)
+    shell = window.copy()
+    shell[1:-1, 1:-1] = False
+    for y in range(y0, y1 + 1):
+        xs, zs = np.nonzero(shell if hollow and (y not in (y0, y1)) else window)
+        xs += x0
+        zs += z0
+        if block is None:
+            order.touch_rows(y, xs)
+            order.cells[y, xs, zs] = 0
+        else:
+            order.set_cells(y, xs, zs)
@@ -0,0 +1 @@
+from .nbt import *
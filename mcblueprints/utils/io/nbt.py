@@ -0,0 +1,69 @@
+import zlib
+from io import BytesIO
+from typing import BinaryIO
+
+from pyckaxe import NbtCompound
+
+__all__ = (
+    "GzipStreamWriter",
+    "dump_nbt_bytes",
+)
+
+
+# The tag ID of a compound, followed by an empty (zero-length) root name.
+ROOT_COMPOUND_HEADER = b"\x0a\x00\x00"
+
+GZIP_COMPRESS_LEVEL = 9
+
+# Tells zlib to wrap the stream in a gzip header and trailer, which it does without a
+# file name and with a zero timestamp.
+GZIP_WBITS = 31
+
+
+class GzipStreamWriter:
+    """
+    Gzip data as it's written, and pass it on to another stream.
+
+    The output is deterministic, and the same no matter how the data is split up
+    between writes. Closing the writer finishes the gzip stream but leaves the
+    underlying stream open.
+    """
+
+    def __init__(self, stream: BinaryIO):
+        self.stream: BinaryIO = stream
+        self._compressor = zlib.compressobj(
+            GZIP_COMPRESS_LEVEL, zlib.DEFLATED, GZIP_WBITS
+        )
+
+    def __enter__(self) -> "GzipStreamWriter":
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write(self, data: bytes) -> int:
+        if compressed := self._compressor.compress(data):
+            self.stream.write(compressed)
+        return len(data)
+
+    def close(self):
+        self.stream.write(self._compressor.flush())
+
+
+def dump_nbt_bytes(root: NbtCompound, gzipped: bool = True) -> bytes:
+    """
+    Encode a NBT file in memory.
+
+    The output is deterministic: no file name or timestamp is written into the gzip
+    header, so that identical NBT always produces identical bytes.
+    """
+    buff = BytesIO()
+    buff.write(ROOT_COMPOUND_HEADER)
+    root.write(buff)
+    data = buff.getvalue()
+    if gzipped:
+        gzipped_buff = BytesIO()
+        with GzipStreamWriter(gzipped_buff) as writer:
+            writer.write(data)
+        return gzipped_buff.getvalue()
+    return data
@@ -0,0 +1,123 @@
+import copy
+import gc
+from typing import Any, Callable
+
+import pytest
+from nbtlib import Compound, Int, IntArray
+from nbtlib import List as NbtList
+from nbtlib import String, parse_nbt
+from pyckaxe import Breadcrumb
+
+from mcblueprints.lib import (
+    BlockDataPool,
+    FrozenNbtCompound,
+    FrozenNbtError,
+    MaterialDeserializer,
+    freeze_block_data,
+)
+
+SNBT = '{Items:[{Slot:0b,id:"minecraft:apple"}],Lock:"key",Colors:[I;1,2,3]}'
+
+
+def make_data() -> Compound:
+    return parse_nbt(SNBT)
+
+
+def test_freeze():
+    data = make_data()
+    frozen = BlockDataPool().freeze(data)
+    assert isinstance(frozen, FrozenNbtCompound)
+    assert frozen == data
+    # The original can still be changed, without changing the frozen copy.
+    data["Lock"] = String("other")
+    data["Items"].append(Compound({"Slot": Int(1)}))
+    assert frozen["Lock"] == "key"
+    assert len(frozen["Items"]) == 1
+
+
+@pytest.mark.parametrize(
+    "mutate",
+    [
+        lambda data: data.__setitem__("Lock", String("other")),
+        lambda data: data.pop("Lock"),
+        lambda data: data.update({"Lock": String("other")}),
+        lambda data: data["Items"].append(Compound()),
+        lambda data: data["Items"].__setitem__(0, Compound()),
+        lambda data: data["Items"][0].__delitem__("Slot"),
+        lambda data: data["Items"].sort(),
+    ],
+)
+def test_frozen(mutate: Callable[[Any], Any]):
+    # Frozen all the way down, so that sharing it is safe.
+    with pytest.raises(FrozenNbtError):
+        mutate(freeze_block_data(make_data()))
+
+
+def test_frozen_array():
+    frozen = freeze_block_data(make_data())
+    with pytest.raises(ValueError):
+        frozen["Colors"][0] = 4
+
+
+def test_shared():
+    # Equal compounds are the same object, however they were written.
+    pool = BlockDataPool()
+    frozen = pool.freeze(make_data())
+    built = Compound(
+        {
+            "Items": NbtList[Compound](
+                [Compound({"Slot": parse_nbt("0b"), "id": String("minecraft:apple")})]
+            ),
+            "Lock": String("key"),
+            "Colors": IntArray([1, 2, 3]),
+        }
+    )
+    assert pool.freeze(built) is frozen
+    assert pool.freeze(frozen) is frozen
+    other = pool.freeze(parse_nbt('{Lock:"other"}'))
+    assert other is not frozen
+    assert len(pool) == 2
+
+
+def test_pool_weak():
+    # Entries only last as long as something else refers to them.
+    pool = BlockDataPool()
+    frozen = pool.freeze(make_data())
+    assert len(pool) == 1
+    del frozen
+    gc.collect()
+    assert len(pool) == 0
+
+
+def test_thaw():
+    frozen = freeze_block_data(make_data())
+    thawed = frozen.thaw()
+    assert not isinstance(thawed, FrozenNbtCompound)
+    assert thawed == make_data()
+    assert type(thawed["Items"]) is type(make_data()["Items"])
+    thawed["Items"][0]["Slot"] = Int(1)
+    thawed["Colors"][0] = 4
+    assert frozen == make_data()
+
+
+@pytest.mark.parametrize("copy_tag", [copy.copy, copy.deepcopy])
+def test_copy(copy_tag: Callable[[Any], Any]):
+    # Copies of frozen data may as well be the data itself.
+    frozen = freeze_block_data(make_data())
+    assert copy_tag(frozen) is frozen
+    assert copy_tag(frozen["Items"]) is frozen["Items"]
+
+
+def test_material_data():
+    # Blocks with the same data share it, whether it's written as SNBT or not.
+    deserializer = MaterialDeserializer()
+    snbt_block = deserializer.deserialize_block(
+        {"name": "minecraft:chest", "data": '{LootTable:"minecraft:a"}'},
+        Breadcrumb(),
+    )
+    dict_block = deserializer.deserialize_block(
+        {"name": "minecraft:chest", "data": {"LootTable": "minecraft:a"}},
+        Breadcrumb(),
+    )
+    assert isinstance(snbt_block.data, FrozenNbtCompound)
+    assert dict_block.data is snbt_block.data
@@ -0,0 +1,211 @@
+from typing import Any, Callable, List, Tuple
+
+import pytest
+from pyckaxe import Block, BlockMap, Position
+
+import mcblueprints.utils.block_map
+from mcblueprints.utils import (
+    DenseBlockMap,
+    MappedBlockMap,
+    copy_block_map,
+    fill_block_map,
+    get_block_indices,
+    get_block_order,
+    iter_block_map_layers,
+    iter_block_map_rows,
+    merge_block_map,
+    set_block_indices,
+)
+
+STONE = Block(name="minecraft:stone")
+BRICKS = Block(name="minecraft:stone_bricks")
+DIRT = Block(name="minecraft:dirt")
+
+STORAGES = [BlockMap, DenseBlockMap, MappedBlockMap]
+
+SIZE = (4, 3, 4)
+
+Cells = List[Tuple[Tuple[int, int, int], str]]
+
+
+def cells_of(block_map: BlockMap, ordered: bool = False) -> Cells:
+    # Every filled cell and the name of its block, in the order they were set in.
+    return [
+        ((x, y, z), block.name)
+        for y, x, row in iter_block_map_rows(block_map, ordered=ordered)
+        for z, block in row
+    ]
+
+
+def set_cells(block_map: BlockMap):
+    # Out of order, so that there's an order of their own to keep.
+    block_map[2, 1, 3] = STONE
+    block_map[0, 0, 0] = BRICKS
+    block_map[2, 1, 0] = DIRT
+    block_map[0, 1, 1] = STONE
+
+
+def set_cells_again(block_map: BlockMap):
+    # A cell that's set again keeps its place, unless it's emptied first.
+    block_map[2, 1, 3] = BRICKS
+    del block_map[0, 0, 0]
+    block_map[0, 0, 0] = STONE
+
+
+def fill_hollow(block_map: BlockMap):
+    start, end = Position.from_xyz(3, 0, 3), Position.from_xyz(1, 2, 1)
+    fill_block_map(block_map, start, end, DIRT, hollow=True)
+
+
+def void_row(block_map: BlockMap):
+    start, end = Position.from_xyz(1, 1, 1), Position.from_xyz(3, 1, 1)
+    fill_block_map(block_map, start, end, None)
+
+
+def make_merge(other_class: Any) -> Callable[[BlockMap], None]:
+    def merge(block_map: BlockMap):
+        other = other_class(size=(2, 2, 3))
+        for x, y, z, block in [
+            (1, 1, 2, DIRT),
+            (0, 0, 1, STONE),
+            (1, 0, 0, BRICKS),
+            (0, 0, 0, DIRT),
+        ]:
+            other[x, y, z] = block
+        merge_block_map(block_map, other, Position.from_xyz(1, 1, 0))
+
+    return merge
+
+
+def filter_blocks(block_map: BlockMap):
+    block_map.keep_blocks([STONE, DIRT])
+    block_map.replace_blocks([DIRT], BRICKS)
+
+
+STEPS = [set_cells, set_cells_again, fill_hollow, void_row, filter_blocks] + [
+    make_merge(other_class) for other_class in STORAGES
+]
+
+
+def make_steps(block_map_class: Any, steps: List[Callable[[BlockMap], None]]):
+    block_map = block_map_class(size=SIZE)
+    for step in steps:
+        step(block_map)
+    return block_map
+
+
+@pytest.mark.parametrize("block_map_class", STORAGES)
+@pytest.mark.parametrize("stop", range(1, len(STEPS) + 1))
+def test_order(block_map_class: Any, stop: int):
+    # However blocks are stored, they're set in the same order as in a sparse block map.
+    expected = cells_of(make_steps(BlockMap, STEPS[:stop]))
+    block_map = make_steps(block_map_class, STEPS[:stop])
+    assert cells_of(block_map) == expected
+    assert sorted(cells_of(block_map, ordered=True)) == sorted(expected)
+    assert cells_of(copy_block_map(block_map)) == expected
+
+
+@pytest.mark.parametrize("block_map_class", [DenseBlockMap, MappedBlockMap])
+def test_order_renumbered(monkeypatch: Any, block_map_class: Any):
+    # Cells are numbered again whenever the numbers run out, keeping them in order.
+    monkeypatch.setattr(mcblueprints.utils.block_map, "MAX_CELL_NUMBER", 8)
+    expected = cells_of(make_steps(BlockMap, STEPS))
+    assert cells_of(make_steps(block_map_class, STEPS)) == expected
+
+
+@pytest.mark.parametrize("block_map_class", STORAGES)
+def test_iter_layers(block_map_class: Any):
+    block_map = make_steps(block_map_class, STEPS)
+    for ordered in (True, False):
+        assert [
+            ((x, y, z), block_map[x, y, z].name)
+            for y, xs, zs in iter_block_map_layers(block_map, ordered=ordered)
+            for x, z in zip(xs.tolist(), zs.tolist())
+        ] == cells_of(block_map, ordered=ordered)
+
+
+@pytest.mark.parametrize("block_map_class", STORAGES)
+@pytest.mark.parametrize("other_class", STORAGES)
+def test_set_block_indices(block_map_class: Any, other_class: Any):
+    block_map = make_steps(block_map_class, STEPS)
+    cells, blocks = get_block_indices(block_map)
+    other = other_class(size=SIZE)
+    set_block_indices(other, cells, blocks, get_block_order(block_map))
+    assert cells_of(other) == cells_of(block_map)
+    # Without an order, blocks are set in order of position.
+    other = other_class(size=SIZE)
+    set_block_indices(other, cells, blocks)
+    assert cells_of(other) == cells_of(block_map, ordered=True)
+
+
+@pytest.mark.parametrize("block_map_class", STORAGES)
+def test_set_block_indices_empty(block_map_class: Any):
+    cells, blocks = get_block_indices(BlockMap(size=SIZE))
+    block_map = block_map_class(size=SIZE)
+    set_block_indices(block_map, cells, blocks, get_block_order(block_map))
+    assert cells_of(block_map) == []
+
+
+@pytest.mark.parametrize("block_map_class", STORAGES)
+def test_set_block_indices_wrong_order(block_map_class: Any):
+    block_map = make_steps(BlockMap, STEPS)
+    cells, blocks = get_block_indices(block_map)
+    with pytest.raises(ValueError):
+        set_block_indices(
+            block_map_class(size=SIZE), cells, blocks, get_block_order(block_map)[1:]
+        )
+
+
+def make_other(other_class: Any) -> BlockMap:
+    # Some full rows, which are copied in one go, and some rows with gaps in them.
+    other = other_class(size=(2, 2, 3))
+    for x, y, z, block in [
+        (1, 1, 2, DIRT),
+        (0, 0, 1, STONE),
+        (1, 0, 0, BRICKS),
+        (0, 0, 0, DIRT),
+        (0, 0, 2, BRICKS),
+        (1, 1, 0, STONE),
+    ]:
+        other[x, y, z] = block
+    return other
+
+
+@pytest.mark.parametrize("block_map_class", STORAGES)
+@pytest.mark.parametrize("other_class", STORAGES)
+@pytest.mark.parametrize("position", [(0, 0, 0), (2, 1, 1), (1, 0, 0), (2, 1, 0)])
+def test_merge(block_map_class: Any, other_class: Any, position: Tuple[int, ...]):
+    # Merging gives the same cells as merging into a sparse block map, and in the
+    # same order, over whatever was there already.
+    expected = make_steps(BlockMap, [set_cells])
+    merge_block_map(expected, make_other(BlockMap), Position.from_xyz(*position))
+    block_map = make_steps(block_map_class, [set_cells])
+    merge_block_map(block_map, make_other(other_class), Position.from_xyz(*position))
+    assert cells_of(block_map) == cells_of(expected)
+
+
+@pytest.mark.parametrize("block_map_class", STORAGES)
+@pytest.mark.parametrize("other_class", STORAGES)
+@pytest.mark.parametrize("position", [(3, 0, 0), (0, 2, 0), (0, 0, 2)])
+def test_merge_out_of_bounds(
+    block_map_class: Any, other_class: Any, position: Tuple[int, ...]
+):
+    block_map = block_map_class(size=SIZE)
+    with pytest.raises(ValueError):
+        merge_block_map(
+            block_map, make_other(other_class), Position.from_xyz(*position)
+        )
+
+
+@pytest.mark.parametrize("block_map_class", [DenseBlockMap, MappedBlockMap])
+@pytest.mark.parametrize("other_class", STORAGES)
+@pytest.mark.parametrize("position", [(-1, 0, 0), (0, -1, 0), (0, 0, -1)])
+def test_merge_below_bounds(
+    block_map_class: Any, other_class: Any, position: Tuple[int, ...]
+):
+    # Block maps that are stored by volume can't be written below their origin either.
+    block_map = block_map_class(size=SIZE)
+    with pytest.raises(ValueError):
+        merge_block_map(
+            block_map, make_other(other_class), Position.from_xyz(*position)
+        )
@@ -0,0 +1,156 @@
+from itertools import product
+from typing import Any, Dict, Iterable, List, Tuple
+
+import pytest
+
+from mcblueprints.lib import BlueprintFlattenSettings, BlueprintLayerFlattener
+from tests.utils import Blocks, flatten_blueprint
+
+STONE = "minecraft:stone"
+BRICKS = "minecraft:stone_bricks"
+
+MATERIALS = {"test:brick": {"name": BRICKS}}
+
+# Fills come out the same however blocks are stored, and whether or not they're
+# flattened a layer at a time.
+FLATTEN_SETTINGS = {
+    "sparse": BlueprintFlattenSettings(storage="sparse"),
+    "dense": BlueprintFlattenSettings(storage="dense"),
+    "mapped": BlueprintFlattenSettings(storage="mapped"),
+    "layers": BlueprintFlattenSettings(
+        storage="mapped",
+        layer_flattener=BlueprintLayerFlattener(threads=1, min_volume=0),
+    ),
+}
+
+Cell = Tuple[int, int, int]
+
+
+def region(start: Cell, end: Cell, **fill: Any) -> Dict[str, Any]:
+    return {"from": list(start), "to": list(end), **fill}
+
+
+def cuboid(start: Cell, end: Cell, block: str) -> Blocks:
+    return {
+        cell: block for cell in product(*(range(a, b + 1) for a, b in zip(start, end)))
+    }
+
+
+def without(blocks: Blocks, cells: Iterable[Cell]) -> Blocks:
+    removed = set(cells)
+    return {cell: block for cell, block in blocks.items() if cell not in removed}
+
+
+@pytest.mark.parametrize("settings", FLATTEN_SETTINGS)
+@pytest.mark.parametrize(
+    "fill, expected",
+    [
+        # A single cell.
+        (
+            [region((1, 1, 1), (1, 1, 1), block=STONE)],
+            {(1, 1, 1): STONE},
+        ),
+        # The whole blueprint.
+        (
+            [region((0, 0, 0), (2, 2, 2), block=STONE)],
+            cuboid((0, 0, 0), (2, 2, 2), STONE),
+        ),
+        # Corners may be given either way round.
+        (
+            [region((2, 1, 2), (0, 0, 1), block=STONE)],
+            cuboid((0, 0, 1), (2, 1, 2), STONE),
+        ),
+        # A material rather than a block.
+        (
+            [region((0, 0, 0), (2, 0, 0), material="test:brick")],
+            cuboid((0, 0, 0), (2, 0, 0), BRICKS),
+        ),
+        # A hollow cuboid leaves out everything but its outer shell.
+        (
+            [region((0, 0, 0), (2, 2, 2), block=STONE, hollow=True)],
+            without(cuboid((0, 0, 0), (2, 2, 2), STONE), [(1, 1, 1)]),
+        ),
+        # Top and bottom layers are full, and the ones between only have walls.
+        (
+            [region((0, 0, 0), (3, 3, 3), block=STONE, hollow=True)],
+            without(
+                cuboid((0, 0, 0), (3, 3, 3), STONE),
+                cuboid((1, 1, 1), (2, 2, 2), STONE),
+            ),
+        ),
+        # A region too thin to have an inside is filled as usual.
+        (
+            [region((0, 0, 0), (2, 2, 1), block=STONE, hollow=True)],
+            cuboid((0, 0, 0), (2, 2, 1), STONE),
+        ),
+        # Later regions go over earlier ones.
+        (
+            [
+                region((0, 0, 0), (2, 0, 2), block=STONE),
+                region((1, 0, 0), (1, 0, 2), material="test:brick"),
+            ],
+            {
+                **cuboid((0, 0, 0), (2, 0, 2), STONE),
+                **cuboid((1, 0, 0), (1, 0, 2), BRICKS),
+            },
+        ),
+        # Voiding carves out whatever was filled before.
+        (
+            [
+                region((0, 0, 0), (2, 2, 2), block=STONE),
+                region((1, 0, 1), (1, 2, 1), void=True),
+            ],
+            without(
+                cuboid((0, 0, 0), (2, 2, 2), STONE),
+                cuboid((1, 0, 1), (1, 2, 1), STONE),
+            ),
+        ),
+    ],
+)
+def test_fill(settings: str, fill: List[Any], expected: Blocks):
+    blocks = flatten_blueprint(
+        dict(size=[4, 4, 4], fill=fill),
+        materials=MATERIALS,
+        flatten_settings=FLATTEN_SETTINGS[settings],
+    )
+    assert blocks == expected
+
+
+@pytest.mark.parametrize("settings", FLATTEN_SETTINGS)
+def test_fill_under_layout(settings: str):
+    # Regions are filled first, so the layout is drawn over them.
+    raw_blueprint = dict(
+        size=[3, 1, 3],
+        fill=[region((0, 0, 0), (2, 0, 2), block=STONE)],
+        palette={
+            "B": {"type": "material", "material": "test:brick"},
+            "_": {"type": "void"},
+        },
+        layout=[["B..", ".._"]],
+    )
+    expected = without(cuboid((0, 0, 0), (2, 0, 2), STONE), [(1, 0, 2)])
+    expected[0, 0, 0] = BRICKS
+    blocks = flatten_blueprint(
+        raw_blueprint,
+        materials=MATERIALS,
+        flatten_settings=FLATTEN_SETTINGS[settings],
+    )
+    assert blocks == expected
+
+
+@pytest.mark.parametrize("settings", FLATTEN_SETTINGS)
+@pytest.mark.parametrize(
+    "start, end",
+    [
+        ((0, 0, 0), (3, 0, 0)),
+        ((0, 0, 0), (0, 3, 0)),
+        ((0, 0, 0), (0, 0, 3)),
+        ((-1, 0, 0), (0, 0, 0)),
+    ],
+)
+def test_fill_out_of_bounds(settings: str, start: Cell, end: Cell):
+    with pytest.raises(ValueError):
+        flatten_blueprint(
+            dict(size=[3, 3, 3], fill=[region(start, end, block=STONE)]),
+            flatten_settings=FLATTEN_SETTINGS[settings],
+        )
@@ -0,0 +1,150 @@
+import asyncio
+import json
+from pathlib import Path
+from typing import Any, Dict
+
+from mcblueprints.build.blueprints_memory_build import BlueprintsMemoryBuild
+from mcblueprints.lib import (
+    BlueprintFlattenProfiler,
+    BlueprintFlattenSettings,
+    FlattenCounts,
+)
+from tests.utils import DEMO_PACK, build_pack
+
+STONE = {"type": "block", "name": "minecraft:stone"}
+DIRT = {"type": "block", "name": "minecraft:dirt"}
+
+FILTERS = {"test:stone": [{"type": "keep_blocks", "blocks": ["minecraft:stone"]}]}
+
+
+def profile(
+    raw_blueprint: Any, blueprints: Dict[str, Any] = {}
+) -> BlueprintFlattenProfiler:
+    profiler = BlueprintFlattenProfiler()
+    build = BlueprintsMemoryBuild(
+        data_version=0,
+        blueprints={"test:blueprint": raw_blueprint, **blueprints},
+        filters=FILTERS,
+        flatten_settings=BlueprintFlattenSettings(profiler=profiler),
+    )
+    asyncio.run(build.build_structures(["test:blueprint"]))
+    return profiler
+
+
+def test_counts():
+    profiler = profile(
+        dict(
+            size=[3, 1, 3],
+            fill=[
+                # Every cell is written...
+                {"from": [0, 0, 0], "to": [2, 0, 2], "block": "minecraft:stone"},
+                # ...and then one row is voided again.
+                {"from": [0, 0, 0], "to": [0, 0, 2], "void": True},
+            ],
+            palette={"S": DIRT, "V": {"type": "void"}},
+            # The voided row is written again, along with one cell that isn't empty,
+            # and then one more cell is voided.
+            layout=[["SSS", "S..", "..V"]],
+        )
+    )
+    assert profiler.counts == {
+        "test:blueprint": FlattenCounts(
+            flattens=1, written=13, overwritten=1, voided=4, dropped=0, final=8
+        )
+    }
+    counts = profiler.counts["test:blueprint"]
+    assert counts.work == 17
+    assert counts.overdraw == 17 / 8
+
+
+def test_inclusions():
+    # Each inclusion is counted by itself, named after the entries leading to it, and
+    # is only flattened once however many times it's used.
+    profiler = profile(
+        dict(
+            size=[3, 1, 2],
+            palette={
+                "C": {"type": "blueprint", "blueprint": "test:child"},
+                "F": {
+                    "type": "blueprint",
+                    "blueprint": "test:child",
+                    "filter": "test:stone",
+                },
+            },
+            layout=[["C.", "C.", "F."]],
+        ),
+        blueprints={
+            "test:child": dict(
+                size=[1, 1, 2], palette={"A": STONE, "D": DIRT}, layout=[["AD"]]
+            )
+        },
+    )
+    assert profiler.counts == {
+        "test:blueprint": FlattenCounts(flattens=1, written=5, final=5),
+        "test:blueprint > C=test:child": FlattenCounts(flattens=1, written=2, final=2),
+        "test:blueprint > F=test:child": FlattenCounts(
+            flattens=1, written=2, dropped=1, final=1
+        ),
+    }
+
+
+def test_variants():
+    # Variants are filtered from a copy, and counted by themselves.
+    profiler = profile(
+        dict(
+            size=[1, 1, 2],
+            palette={"A": STONE, "D": DIRT},
+            layout=[["AD"]],
+            variants=["test:stone"],
+        )
+    )
+    assert profiler.counts == {
+        "test:blueprint": FlattenCounts(flattens=1, written=2, final=2),
+        "test:blueprint/stone": FlattenCounts(dropped=1, final=1),
+    }
+
+
+def test_format_table():
+    # The most wasteful blueprints come first, and those with nothing left come last.
+    profiler = BlueprintFlattenProfiler(
+        counts={
+            "test:empty": FlattenCounts(flattens=1, written=4, voided=4),
+            "test:tidy": FlattenCounts(flattens=1, written=4, final=4),
+            "test:wasteful": FlattenCounts(
+                flattens=1, written=8, overwritten=4, final=4
+            ),
+        }
+    )
+    lines = profiler.format_table().splitlines()
+    assert lines[0].split() == [
+        "overdraw",
+        "work",
+        "final",
+        "written",
+        "overwritten",
+        "voided",
+        "dropped",
+        "flattens",
+        "blueprint",
+    ]
+    assert [line.split()[-1] for line in lines[1:]] == [
+        "test:wasteful",
+        "test:tidy",
+        "test:empty",
+    ]
+    assert lines[1].split()[0] == "2.00"
+    assert lines[3].split()[0] == "-"
+    assert len(profiler.format_table(limit=1).splitlines()) == 2
+
+
+def test_build(tmp_path: Path):
+    # Builds write the counts of every blueprint they flatten.
+    stats_path = tmp_path / "stats" / "flatten.json"
+    build_pack(DEMO_PACK, tmp_path / "output", flatten_stats_path=stats_path)
+    stats = json.loads(stats_path.read_text())
+    assert "box_dungeon:empty" in stats
+    assert "box_dungeon:zombie > B=box_dungeon:empty > F=box_dungeon:floor" in stats
+    for counts in stats.values():
+        assert (
+            counts["work"] == counts["written"] + counts["voided"] + counts["dropped"]
+        )
@@ -0,0 +1,209 @@
+import asyncio
+import json
+from hashlib import sha256
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
+
+import pytest
+from pyckaxe import Block, BlockMap, Position, ResourceLocation
+
+from mcblueprints.build import BlueprintsMemoryBuild
+from mcblueprints.lib import (
+    Blueprint,
+    BlueprintFlattenStore,
+    BlueprintLink,
+    BlueprintProcessingContext,
+    Filter,
+    FilterDeserializer,
+    FilterLink,
+    MaterialDeserializer,
+)
+from mcblueprints.utils import (
+    DenseBlockMap,
+    MappedBlockMap,
+    get_block_order,
+    iter_block_map_rows,
+)
+
+STONE = "minecraft:stone"
+BRICKS = "minecraft:stone_bricks"
+
+CHILD = dict(size=[2, 1, 2], palette={"S": STONE}, layout=[["S.", ".S"]])
+
+BLUEPRINTS = {
+    "test:parent": dict(
+        size=[2, 1, 2],
+        palette={"C": {"type": "blueprint", "blueprint": "test:child"}},
+        layout=[["C.", ".."]],
+    ),
+    "test:child": CHILD,
+    "test:copy": CHILD,
+}
+
+FILTERS = {
+    "test:bricks": [
+        {"type": "replace_blocks", "blocks": [STONE], "replacement": BRICKS}
+    ]
+}
+
+
+def make_key(
+    tmp_path: Path,
+    blueprint: str,
+    filter: Union[str, Filter, None] = None,
+    blueprints: Optional[Dict[str, Any]] = None,
+    filters: Optional[Dict[str, Any]] = None,
+    digest: bool = True,
+) -> Optional[str]:
+    blueprints = {**BLUEPRINTS, **(blueprints or {})}
+    filters = {**FILTERS, **(filters or {})}
+    sources = {**blueprints, **filters}
+
+    # Hash each resource as if its raw data were the contents of its source file.
+    def digest_source(location: ResourceLocation) -> Optional[str]:
+        if (raw := sources.get(str(location))) is None:
+            return None
+        return sha256(json.dumps(raw, sort_keys=True).encode()).hexdigest()
+
+    store = BlueprintFlattenStore(
+        path=tmp_path, digest_source=digest_source if digest else None
+    )
+    build = BlueprintsMemoryBuild(
+        data_version=0, blueprints=blueprints, filters=filters
+    )
+    blueprint_link = BlueprintLink(Blueprint @ ResourceLocation.from_string(blueprint))
+    filter_link = None
+    if isinstance(filter, str):
+        filter_link = FilterLink(Filter @ ResourceLocation.from_string(filter))
+    elif filter is not None:
+        filter_link = FilterLink(filter)
+
+    async def make_key() -> Optional[str]:
+        resource = await build.resolvers(blueprint_link.value)
+        ctx = BlueprintProcessingContext(
+            resolver_set=build.resolvers,
+            resource=resource,
+            location=blueprint_link.value,
+        )
+        return await store.make_key(ctx, blueprint_link, filter_link)
+
+    return asyncio.run(make_key())
+
+
+def make_filter(raw_filter: Any) -> Filter:
+    return FilterDeserializer(material_deserializer=MaterialDeserializer())(raw_filter)
+
+
+def test_make_key(tmp_path: Path):
+    key = make_key(tmp_path, "test:parent")
+    assert key is not None
+    # The same sources always give the same key.
+    assert make_key(tmp_path, "test:parent") == key
+
+
+def test_make_key_without_digest_source(tmp_path: Path):
+    assert make_key(tmp_path, "test:parent", digest=False) is None
+
+
+def test_make_key_dependency_changed(tmp_path: Path):
+    # Changing anything a blueprint includes changes its key, but not the other way.
+    key = make_key(tmp_path, "test:parent")
+    child_key = make_key(tmp_path, "test:child")
+    changed = dict(CHILD, layout=[["SS", ".S"]])
+    assert make_key(tmp_path, "test:parent", blueprints={"test:child": changed}) != key
+    parent = dict(BLUEPRINTS["test:parent"], layout=[[".C", ".."]])
+    assert (
+        make_key(tmp_path, "test:child", blueprints={"test:parent": parent})
+        == child_key
+    )
+
+
+def test_make_key_missing_source(tmp_path: Path):
+    # Anything that can't be traced back to a source file can't be keyed at all.
+    parent = dict(
+        size=[1, 1, 1],
+        palette={"C": {"type": "blueprint", "blueprint": "test:nowhere"}},
+        layout=[["C"]],
+    )
+    assert make_key(tmp_path, "test:parent", blueprints={"test:parent": parent}) is None
+
+
+def test_make_key_filter(tmp_path: Path):
+    key = make_key(tmp_path, "test:child")
+    filtered_key = make_key(tmp_path, "test:child", "test:bricks")
+    assert filtered_key not in (None, key)
+    # Changing the filter changes the key.
+    changed = [{"type": "keep_blocks", "blocks": [STONE]}]
+    assert (
+        make_key(
+            tmp_path, "test:child", "test:bricks", filters={"test:bricks": changed}
+        )
+        != filtered_key
+    )
+
+
+def test_make_key_same_content(tmp_path: Path):
+    # Identical blueprints at different locations share a key.
+    assert make_key(tmp_path, "test:copy") == make_key(tmp_path, "test:child")
+
+
+def test_make_key_inline(tmp_path: Path):
+    # Resources written inline are hashed by value.
+    raw_filter = FILTERS["test:bricks"]
+    key = make_key(tmp_path, "test:child", make_filter(raw_filter))
+    assert key is not None
+    assert make_key(tmp_path, "test:child", make_filter(raw_filter)) == key
+    changed = [{"type": "keep_blocks", "blocks": [STONE]}]
+    assert make_key(tmp_path, "test:child", make_filter(changed)) != key
+
+
+def make_empty(block_map_class: Any) -> Callable[[], Any]:
+    async def make_block_map() -> BlockMap:
+        return block_map_class(size=(2, 2, 2))
+
+    return make_block_map
+
+
+def fill(block_map: BlockMap, cells: Dict[tuple, str]) -> BlockMap:
+    for (x, y, z), name in cells.items():
+        block_map[Position.from_xyz(x, y, z)] = Block(name=name)
+    return block_map
+
+
+def blocks_of(block_map: BlockMap) -> List[tuple]:
+    # Every filled cell and its block, in the order the block map iterates them.
+    return [
+        ((x, y, z), str(block))
+        for y, x, row in iter_block_map_rows(block_map, ordered=False)
+        for z, block in row
+    ]
+
+
+@pytest.mark.parametrize("block_map_class", [BlockMap, DenseBlockMap, MappedBlockMap])
+def test_save_load(tmp_path: Path, block_map_class: Any):
+    # Set out of order, so that there's an order of its own to keep.
+    cells = {(1, 1, 1): STONE, (0, 0, 1): BRICKS, (1, 0, 0): STONE, (0, 1, 0): BRICKS}
+    block_map = fill(block_map_class(size=(2, 2, 2)), cells)
+    store = BlueprintFlattenStore(path=tmp_path)
+
+    async def save_load() -> Optional[BlockMap]:
+        await store.save("ab12", block_map)
+        return await store.load("ab12", make_empty(block_map_class))
+
+    loaded = asyncio.run(save_load())
+    assert loaded is not None
+    assert blocks_of(loaded) == blocks_of(block_map)
+    assert sorted(blocks_of(loaded)) == sorted(cells.items())
+    assert list(get_block_order(loaded)) == list(get_block_order(block_map))
+    assert store.get_entry_path("ab12").is_file()
+    assert (store.saved, store.loaded) == (1, 1)
+
+
+def test_load_missing(tmp_path: Path):
+    store = BlueprintFlattenStore(path=tmp_path)
+
+    async def load() -> Optional[BlockMap]:
+        return await store.load("cd34", make_empty(BlockMap))
+
+    assert asyncio.run(load()) is None
+    assert store.loaded == 0
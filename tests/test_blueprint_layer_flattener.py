@@ -0,0 +1,151 @@
+import asyncio
+import re
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import pytest
+from pyckaxe import BlockMap
+
+from mcblueprints.build.blueprints_memory_build import BlueprintsMemoryBuild
+from mcblueprints.lib import (
+    BlueprintFlattenSettings,
+    BlueprintLayerFlattener,
+    FlattenedStructure,
+)
+from mcblueprints.utils import MappedBlockMap, iter_block_map_rows
+from tests.utils import DEMO_PACK, Blocks, build_pack, read_pack
+
+STAIRS = {"name": "minecraft:oak_stairs", "state": {"facing": "east"}}
+
+CHILD = dict(
+    size=[2, 2, 3],
+    palette={
+        "A": {"type": "block", **STAIRS},
+        "D": {"type": "block", "name": "minecraft:dirt"},
+    },
+    layout=[["A.D", "D.."], ["ADD", ".A."]],
+)
+
+FILTERS = {
+    "test:gravel": [
+        {
+            "type": "replace_blocks",
+            "blocks": ["minecraft:dirt"],
+            "replacement": "minecraft:gravel",
+        }
+    ],
+}
+
+# Fills under a layout of single blocks, void, and children placed every which way,
+# overlapping one another so that the order of every write matters.
+BLUEPRINT = dict(
+    size=[6, 3, 7],
+    fill=[
+        {"from": [0, 0, 0], "to": [5, 1, 6], "block": "minecraft:stone"},
+        {
+            "from": [1, 0, 1],
+            "to": [4, 2, 5],
+            "block": "minecraft:bricks",
+            "hollow": True,
+        },
+    ],
+    palette={
+        "S": {"type": "block", "name": "minecraft:sand"},
+        "V": {"type": "void"},
+        "C": {"type": "blueprint", "blueprint": "test:child"},
+        "R": {"type": "blueprint", "blueprint": "test:child", "rotate": 90},
+        "M": {"type": "blueprint", "blueprint": "test:child", "mirror": "z"},
+        "F": {"type": "blueprint", "blueprint": "test:child", "filter": "test:gravel"},
+    },
+    layout=[
+        ["SS", ".V", "", "", "", "..S"],
+        ["S.....S", "..C....", ".......", "....F..", ".......", "S.....S"],
+        ["V.....V", ".......", ".R.....", ".......", "..M....", "V.....V"],
+    ],
+)
+
+
+def flatten(
+    raw_blueprint: Any, layer_flattener: Optional[BlueprintLayerFlattener] = None
+) -> BlockMap:
+    build = BlueprintsMemoryBuild(
+        data_version=0,
+        blueprints={"test:blueprint": raw_blueprint, "test:child": CHILD},
+        filters=FILTERS,
+        flatten_settings=BlueprintFlattenSettings(layer_flattener=layer_flattener),
+    )
+    structures = asyncio.run(build.build_structures(["test:blueprint"]))
+    (structure,) = structures.values()
+    assert isinstance(structure, FlattenedStructure)
+    return structure.block_map
+
+
+def blocks_of(block_map: BlockMap) -> Blocks:
+    return {
+        (x, y, z): str(block)
+        for y, x, row in iter_block_map_rows(block_map)
+        for z, block in row
+    }
+
+
+@pytest.mark.parametrize("threads", [1, 3])
+def test_same_as_flatten(threads: int):
+    # Every cell sees the same writes in the same order, on however many threads.
+    expected = blocks_of(flatten(BLUEPRINT))
+    assert len(set(expected.values())) > 5
+    block_map = flatten(BLUEPRINT, BlueprintLayerFlattener(threads, min_volume=0))
+    assert isinstance(block_map, MappedBlockMap)
+    assert blocks_of(block_map) == expected
+
+
+def test_min_volume():
+    # Smaller blueprints are flattened as usual.
+    volume = 6 * 3 * 7
+    flattener = BlueprintLayerFlattener(threads=1, min_volume=volume + 1)
+    assert not isinstance(flatten(BLUEPRINT, flattener), MappedBlockMap)
+    flattener = BlueprintLayerFlattener(threads=1, min_volume=volume)
+    assert isinstance(flatten(BLUEPRINT, flattener), MappedBlockMap)
+
+
+@pytest.mark.parametrize(
+    "changes",
+    [
+        # Voiding a cell that's already empty.
+        dict(fill=[], layout=[["V"]]),
+        # A child that lands partly out of bounds.
+        dict(layout=[[], ["......C"]]),
+        # A symbol outside of the layout.
+        dict(layout=[["S......S"]]),
+    ],
+)
+@pytest.mark.parametrize("threads", [1, 3])
+def test_fall_back(changes: Dict[str, Any], threads: int):
+    # Blueprints that can't be flattened a layer at a time raise the usual errors.
+    raw_blueprint = dict(BLUEPRINT, **changes)
+    with pytest.raises(Exception) as expected:
+        flatten(raw_blueprint)
+    flattener = BlueprintLayerFlattener(threads, min_volume=0)
+    with pytest.raises(type(expected.value), match=re.escape(str(expected.value))):
+        flatten(raw_blueprint, flattener)
+
+
+def test_threads_invalid():
+    with pytest.raises(ValueError):
+        BlueprintLayerFlattener(threads=0)
+
+
+@pytest.mark.parametrize("flatten_threads", [1, 2])
+def test_build(tmp_path: Path, flatten_threads: int):
+    # Blocks are taken to have been set in order of position, so they're written that
+    # way either way round.
+    build_pack(DEMO_PACK, tmp_path / "expected", block_order="position")
+    build_pack(
+        DEMO_PACK,
+        tmp_path / "actual",
+        block_order="position",
+        flatten_threads=flatten_threads,
+        parallel_flatten_volume=0,
+    )
+    expected = read_pack(tmp_path / "expected")
+    assert expected
+    assert read_pack(tmp_path / "actual") == expected
@@ -0,0 +1,209 @@
+from itertools import product
+from typing import Any, Dict, Optional
+
+import pytest
+from pyckaxe import Block, BlockState
+
+from mcblueprints.lib.resource.blueprint.blueprint_orientation import (
+    BLUEPRINT_MIRRORS,
+    BLUEPRINT_ROTATIONS,
+    DIRECTIONS,
+    RAIL_SHAPES,
+    BlueprintOrientation,
+)
+
+ORIENTATIONS = list(product(BLUEPRINT_ROTATIONS, (None, *BLUEPRINT_MIRRORS)))
+
+
+def orient(rotate: int, mirror: Optional[str], **state: Any) -> Dict[str, Any]:
+    block = Block(name="minecraft:test", state=BlockState(**state))
+    transformed = BlueprintOrientation(rotate=rotate, mirror=mirror).transform_block(
+        block
+    )
+    assert transformed.state is not None
+    return dict(transformed.state.items())
+
+
+@pytest.mark.parametrize(
+    "rotate, mirror, value, expected",
+    [
+        (0, None, "north", "north"),
+        (90, None, "north", "east"),
+        (90, None, "east", "south"),
+        (90, None, "south", "west"),
+        (90, None, "west", "north"),
+        (180, None, "north", "south"),
+        (180, None, "east", "west"),
+        (270, None, "north", "west"),
+        (270, None, "east", "north"),
+        (0, "x", "east", "west"),
+        (0, "x", "north", "north"),
+        (0, "z", "north", "south"),
+        (0, "z", "east", "east"),
+        # Mirrored first, and then rotated.
+        (90, "x", "east", "north"),
+        (90, "z", "north", "west"),
+        (270, "x", "west", "north"),
+        (180, "z", "south", "south"),
+        # Vertical directions never change.
+        (90, "x", "up", "up"),
+        (270, "z", "down", "down"),
+    ],
+)
+def test_facing(rotate: int, mirror: Optional[str], value: str, expected: str):
+    assert orient(rotate, mirror, facing=value) == {"facing": expected}
+
+
+@pytest.mark.parametrize(
+    "rotate, mirror, value, expected",
+    [
+        (90, None, "north_up", "east_up"),
+        (90, None, "up_north", "up_east"),
+        (180, None, "down_west", "down_east"),
+        (270, None, "east_up", "north_up"),
+        (0, "x", "down_east", "down_west"),
+        (0, "z", "up_south", "up_north"),
+        (90, "x", "west_up", "south_up"),
+        (0, None, "up_north", "up_north"),
+    ],
+)
+def test_jigsaw_orientation(
+    rotate: int, mirror: Optional[str], value: str, expected: str
+):
+    assert orient(rotate, mirror, orientation=value) == {"orientation": expected}
+
+
+@pytest.mark.parametrize(
+    "rotate, mirror, value, expected",
+    [
+        (90, None, "x", "z"),
+        (90, None, "z", "x"),
+        (90, None, "y", "y"),
+        (180, None, "x", "x"),
+        (270, None, "z", "x"),
+        (0, "x", "x", "x"),
+        (0, "z", "z", "z"),
+        (90, "z", "x", "z"),
+    ],
+)
+def test_axis(rotate: int, mirror: Optional[str], value: str, expected: str):
+    assert orient(rotate, mirror, axis=value) == {"axis": expected}
+
+
+@pytest.mark.parametrize(
+    "rotate, mirror, value, expected",
+    [
+        (90, None, "north_south", "east_west"),
+        (90, None, "east_west", "north_south"),
+        (180, None, "north_south", "north_south"),
+        (90, None, "ascending_east", "ascending_south"),
+        (90, None, "ascending_north", "ascending_east"),
+        (180, None, "ascending_west", "ascending_east"),
+        (90, None, "south_east", "south_west"),
+        (90, None, "north_west", "north_east"),
+        (180, None, "north_east", "south_west"),
+        (270, None, "south_west", "south_east"),
+        (0, "x", "south_east", "south_west"),
+        (0, "x", "ascending_east", "ascending_west"),
+        (0, "z", "north_east", "south_east"),
+        (0, "z", "ascending_north", "ascending_south"),
+        (0, "z", "east_west", "east_west"),
+    ],
+)
+def test_rail_shape(rotate: int, mirror: Optional[str], value: str, expected: str):
+    assert orient(rotate, mirror, shape=value) == {"shape": expected}
+
+
+@pytest.mark.parametrize(
+    "rotate, mirror, value, expected",
+    [
+        (90, None, "inner_left", "inner_left"),
+        (180, None, "outer_right", "outer_right"),
+        (0, "x", "inner_left", "inner_right"),
+        (0, "z", "outer_right", "outer_left"),
+        (90, "x", "outer_left", "outer_right"),
+        (0, "x", "straight", "straight"),
+    ],
+)
+def test_stair_shape(rotate: int, mirror: Optional[str], value: str, expected: str):
+    assert orient(rotate, mirror, facing="north", shape=value)["shape"] == expected
+
+
+@pytest.mark.parametrize("key", ["hinge", "type"])
+@pytest.mark.parametrize(
+    "rotate, mirror, value, expected",
+    [
+        (90, None, "left", "left"),
+        (270, None, "right", "right"),
+        (0, "x", "left", "right"),
+        (0, "z", "right", "left"),
+        (180, "x", "right", "left"),
+        (0, "x", "single", "single"),
+        (0, "z", "bottom", "bottom"),
+    ],
+)
+def test_handedness(
+    key: str, rotate: int, mirror: Optional[str], value: str, expected: str
+):
+    assert orient(rotate, mirror, **{key: value}) == {key: expected}
+
+
+@pytest.mark.parametrize(
+    "rotate, mirror, value, expected",
+    [
+        (90, None, 0, 4),
+        (90, None, 12, 0),
+        (180, None, 3, 11),
+        (270, None, 0, 12),
+        # Mirroring across x swaps east (12) and west (4), and z swaps north and south.
+        (0, "x", 4, 12),
+        (0, "x", 0, 0),
+        (0, "x", 1, 15),
+        (0, "z", 0, 8),
+        (0, "z", 4, 4),
+        (0, "z", 3, 5),
+        (90, "x", 1, 3),
+        (90, "z", 0, 12),
+    ],
+)
+def test_rotation(rotate: int, mirror: Optional[str], value: int, expected: int):
+    assert orient(rotate, mirror, rotation=value) == {"rotation": expected}
+
+
+@pytest.mark.parametrize(
+    "rotate, mirror, expected",
+    [
+        (0, None, dict(north=1, east=2, south=3, west=4)),
+        (90, None, dict(east=1, south=2, west=3, north=4)),
+        (180, None, dict(south=1, west=2, north=3, east=4)),
+        (270, None, dict(west=1, north=2, east=3, south=4)),
+        (0, "x", dict(north=1, west=2, south=3, east=4)),
+        (0, "z", dict(south=1, east=2, north=3, west=4)),
+        (90, "x", dict(east=1, north=2, west=3, south=4)),
+    ],
+)
+def test_connections(rotate: int, mirror: Optional[str], expected: Dict[str, int]):
+    # Each direction gets its own value, so that it's clear where each one ends up.
+    state = orient(rotate, mirror, north=1, east=2, south=3, west=4)
+    assert state == expected
+
+
+@pytest.mark.parametrize("rotate, mirror", ORIENTATIONS)
+def test_undo(rotate: int, mirror: Optional[str]):
+    # Rotating the rest of the way round, and then mirroring again, undoes everything.
+    values = dict(
+        facing=list(DIRECTIONS),
+        orientation=[f"{a}_{b}" for a, b in product((*DIRECTIONS, "up"), repeat=2)],
+        axis=["x", "y", "z"],
+        shape=[*RAIL_SHAPES, "inner_left", "outer_right"],
+        hinge=["left", "right"],
+        rotation=list(range(16)),
+    )
+    undo_rotate = (360 - rotate) % 360
+    for key, key_values in values.items():
+        for value in key_values:
+            state = orient(rotate, mirror, **{key: value})
+            undone = orient(undo_rotate, None, **state)
+            if mirror is not None:
+                undone = orient(0, mirror, **undone)
+            assert undone == {key: value}, (rotate, mirror, key, value)
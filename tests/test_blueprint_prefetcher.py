@@ -0,0 +1,110 @@
+import asyncio
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, List, Optional
+
+import pytest
+
+from mcblueprints.lib import BlueprintPrefetcher
+from tests.utils import DEMO_PACK, build_pack, read_pack
+
+
+@dataclass
+class Node:
+    links: List["Link"] = field(default_factory=list)
+
+    def iter_links(self) -> List["Link"]:
+        return self.links
+
+
+@dataclass
+class Loads:
+    # How many links are being resolved right now, and the most there's been at once.
+    active: int = 0
+    most: int = 0
+    resolved: List[str] = field(default_factory=list)
+
+
+@dataclass
+class Link:
+    name: str
+    loads: Loads
+    node: Optional[Node] = None
+
+    async def __call__(self, ctx: Any) -> Node:
+        self.loads.active += 1
+        self.loads.most = max(self.loads.most, self.loads.active)
+        # Give every other link the chance to start resolving too.
+        for _ in range(3):
+            await asyncio.sleep(0)
+        self.loads.active -= 1
+        if self.node is None:
+            raise LookupError(self.name)
+        self.loads.resolved.append(self.name)
+        return self.node
+
+
+def make_tree(loads: Loads, width: int, depth: int) -> Node:
+    # A root linking to `width` nodes, each of which links to `width` more, and so on.
+    def make_links(prefix: str, depth: int) -> List[Link]:
+        if not depth:
+            return []
+        return [
+            Link(f"{prefix}{i}", loads, Node(make_links(f"{prefix}{i}/", depth - 1)))
+            for i in range(width)
+        ]
+
+    return Node(make_links("", depth))
+
+
+def prefetch(resource: Any, concurrency: int = 32) -> int:
+    return asyncio.run(BlueprintPrefetcher(concurrency=concurrency)(None, resource))
+
+
+def test_resolve_all():
+    loads = Loads()
+    assert prefetch(make_tree(loads, width=3, depth=3)) == 3 + 9 + 27
+    assert len(set(loads.resolved)) == 3 + 9 + 27
+
+
+@pytest.mark.parametrize("concurrency", [1, 2, 5])
+def test_concurrency(concurrency: int):
+    # Resources are resolved at once, but never more than the concurrency allows, and
+    # deep dependencies can't starve each other, even one at a time.
+    loads = Loads()
+    assert prefetch(make_tree(loads, width=4, depth=3), concurrency) == 4 + 16 + 64
+    assert loads.most == concurrency
+
+
+def test_visit_once():
+    # Resources reached by several links are only walked the once.
+    loads = Loads()
+    shared = Node([Link("leaf", loads, Node())])
+    root = Node([Link("a", loads, shared), Link("b", loads, shared)])
+    assert prefetch(root) == 3
+    assert sorted(loads.resolved) == ["a", "b", "leaf"]
+
+
+def test_skip_failed():
+    # Links that fail are left to fail again during the flatten itself.
+    loads = Loads()
+    root = Node([Link("missing", loads), Link("found", loads, Node())])
+    assert prefetch(root) == 1
+    assert loads.resolved == ["found"]
+
+
+def test_concurrency_invalid():
+    with pytest.raises(ValueError):
+        BlueprintPrefetcher(concurrency=0)
+
+
+@pytest.mark.parametrize("prefetch_concurrency", [1, 32])
+def test_build(tmp_path: Path, prefetch_concurrency: int):
+    # Prefetching only changes when resources are loaded, and not what's built.
+    build_pack(DEMO_PACK, tmp_path / "expected", prefetch_concurrency=0)
+    build_pack(
+        DEMO_PACK, tmp_path / "actual", prefetch_concurrency=prefetch_concurrency
+    )
+    expected = read_pack(tmp_path / "expected")
+    assert expected
+    assert read_pack(tmp_path / "actual") == expected
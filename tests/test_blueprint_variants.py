@@ -0,0 +1,117 @@
+import asyncio
+from typing import Any, Dict, Mapping, Optional
+
+import pytest
+from pyckaxe import FailedToResolveResourceError
+
+from mcblueprints.build.blueprints_memory_build import BlueprintsMemoryBuild
+from mcblueprints.lib import FlattenedStructure
+from mcblueprints.lib.resource.blueprint.blueprint_deserializer import (
+    MalformedBlueprint,
+)
+from mcblueprints.utils import iter_block_map_rows
+from tests.utils import Blocks, flatten_blueprint
+
+BASE = dict(
+    size=[2, 2, 2],
+    palette={
+        "S": {"type": "block", "name": "minecraft:stone"},
+        "D": {"type": "block", "name": "minecraft:dirt"},
+    },
+    layout=[["SD", "DS"], ["S.", ".D"]],
+)
+
+FILTERS = {
+    "test:stone": [{"type": "keep_blocks", "blocks": ["minecraft:stone"]}],
+    "test:mossy/stone": [
+        {
+            "type": "replace_blocks",
+            "blocks": ["minecraft:stone"],
+            "replacement": "minecraft:mossy_cobblestone",
+        }
+    ],
+    "test:gravel": [
+        {
+            "type": "replace_blocks",
+            "blocks": ["minecraft:dirt"],
+            "replacement": "minecraft:gravel",
+        }
+    ],
+}
+
+
+def blocks_of(structure: Any) -> Blocks:
+    assert isinstance(structure, FlattenedStructure)
+    return {
+        (x, y, z): str(block)
+        for y, x, row in iter_block_map_rows(structure.block_map)
+        for z, block in row
+    }
+
+
+def build(variants: Any, blueprints: Mapping[str, Any] = {}) -> Dict[str, Blocks]:
+    memory_build = BlueprintsMemoryBuild(
+        data_version=0,
+        blueprints={"test:blueprint": dict(BASE, variants=variants), **blueprints},
+        filters=FILTERS,
+    )
+    structures = asyncio.run(memory_build.build_structures(["test:blueprint"]))
+    return {
+        str(location): blocks_of(structure)
+        for location, structure in structures.items()
+    }
+
+
+def flatten_base(filter: Optional[str] = None) -> Blocks:
+    # The base blueprint on its own, or filtered by including it from another.
+    entry = {"type": "blueprint", "blueprint": "test:base"}
+    if filter is not None:
+        entry["filter"] = filter
+    return flatten_blueprint(
+        dict(size=[2, 2, 2], palette={"B": entry}, layout=[["B"]]),
+        blueprints={"test:base": BASE},
+        filters=FILTERS,
+    )
+
+
+def test_list():
+    # Variants listed by filter are named after the last part of the filter.
+    structures = build(["test:stone", "test:gravel"])
+    assert list(structures) == [
+        "test:blueprint",
+        "test:blueprint/stone",
+        "test:blueprint/gravel",
+    ]
+    assert structures["test:blueprint/stone"] == flatten_base("test:stone")
+    assert structures["test:blueprint/gravel"] == flatten_base("test:gravel")
+
+
+def test_mapping():
+    structures = build({"plain": "test:stone", "mossy": "test:mossy/stone"})
+    assert list(structures) == [
+        "test:blueprint",
+        "test:blueprint/plain",
+        "test:blueprint/mossy",
+    ]
+    assert structures["test:blueprint/plain"] == flatten_base("test:stone")
+    assert structures["test:blueprint/mossy"] == flatten_base("test:mossy/stone")
+
+
+def test_base_unfiltered():
+    # Each variant is filtered from its own copy, leaving the base as it was.
+    structures = build({"plain": "test:stone", "mossy": "test:mossy/stone"})
+    assert structures["test:blueprint"] == flatten_base()
+
+
+def test_duplicate_name():
+    # Both filters are called `stone`, so their variants would be written over.
+    with pytest.raises(FailedToResolveResourceError) as exc_info:
+        build(["test:stone", "test:mossy/stone"])
+    assert isinstance(exc_info.value.__cause__, MalformedBlueprint)
+    assert "Duplicate variant `stone`" in str(exc_info.value.__cause__)
+
+
+def test_clash():
+    # A variant can't be written over the structure of another blueprint.
+    with pytest.raises(ValueError, match="clashes with the blueprint"):
+        build(["test:stone"], blueprints={"test:blueprint/stone": BASE})
@@ -0,0 +1,55 @@
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from mcblueprints.build.blueprints_build_options import BlueprintsBuildOptions
+
+
+def make_options(tmp_path: Path, **options: Any) -> BlueprintsBuildOptions:
+    return BlueprintsBuildOptions(
+        input_path=tmp_path / "input",
+        output_path=tmp_path / "output",
+        data_versions=(2586,),
+        **options,
+    )
+
+
+@pytest.mark.parametrize("block_order", ["position", "palette"])
+def test_flatten_threads(tmp_path: Path, block_order: str):
+    options = make_options(tmp_path, flatten_threads=2, block_order=block_order)
+    assert options.flatten_threads == 2
+
+
+def test_flatten_threads_insertion(tmp_path: Path):
+    # Flattening a layer at a time loses the order that blocks were set in.
+    with pytest.raises(ValueError):
+        make_options(tmp_path, flatten_threads=1, block_order="insertion")
+
+
+def test_data_version(tmp_path: Path):
+    # A single data version is still accepted, the way it used to be given.
+    with pytest.deprecated_call():
+        options = BlueprintsBuildOptions(
+            input_path=tmp_path / "input",
+            output_path=tmp_path / "output",
+            data_version=2586,
+        )
+    assert options.data_versions == (2586,)
+    assert [target.data_version for target in options.targets] == [2586]
+
+
+def test_data_version_positional(tmp_path: Path):
+    with pytest.deprecated_call():
+        options = BlueprintsBuildOptions(tmp_path / "input", tmp_path / "output", 2586)
+    assert options.data_versions == (2586,)
+
+
+def test_data_version_conflict(tmp_path: Path):
+    with pytest.deprecated_call(), pytest.raises(ValueError):
+        BlueprintsBuildOptions(
+            input_path=tmp_path / "input",
+            output_path=tmp_path / "output",
+            data_versions=(2586, 2730),
+            data_version=2586,
+        )
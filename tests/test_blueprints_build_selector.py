@@ -0,0 +1,149 @@
+from pathlib import Path
+from typing import Iterable, List
+from zipfile import ZipFile
+
+import pytest
+
+from mcblueprints.build.blueprints_build_options import DEFAULT_BLUEPRINTS_REGISTRY
+from mcblueprints.build.blueprints_build_selector import (
+    BlueprintsBuildSelector,
+    MissingBuildTarget,
+)
+from mcblueprints.lib import ZipArchive
+
+REGISTRY_PARTS = tuple(DEFAULT_BLUEPRINTS_REGISTRY.split("/"))
+
+BLUEPRINT_FILES = [
+    "alpha:base.json",
+    "alpha:room/small.json",
+    "alpha:room/large.yaml",
+    "alpha:room/notes.txt",
+    "alpha:room/deep/cellar.json",
+    "alpha:room/deep/deeper/vault.json",
+    "beta:base.json",
+    "beta:prop/arch.json",
+    "gamma:tower.json",
+]
+
+
+def write_pack(path: Path, files: Iterable[str]):
+    (path / "pack.mcmeta").write_text("{}")
+    for file in files:
+        namespace, _, name = file.partition(":")
+        file_path = path.joinpath("data", namespace, *REGISTRY_PARTS, name)
+        file_path.parent.mkdir(parents=True, exist_ok=True)
+        file_path.write_text("{}")
+
+
+@pytest.fixture(params=["directory", "archive"])
+def make_selector(request, tmp_path: Path):
+    # The same pack, read straight from a directory or from an archive of it.
+    pack_path = tmp_path / "pack"
+    pack_path.mkdir()
+    write_pack(pack_path, BLUEPRINT_FILES)
+    archive = None
+    if request.param == "archive":
+        archive_path = tmp_path / "pack.zip"
+        with ZipFile(archive_path, "w") as zip_file:
+            for file_path in sorted(pack_path.rglob("*")):
+                if file_path.is_file():
+                    zip_file.write(file_path, file_path.relative_to(pack_path))
+        archive = ZipArchive(archive_path)
+        request.addfinalizer(archive.close)
+        pack_path = archive_path
+
+    def make_selector(match_files: str = "*.json") -> BlueprintsBuildSelector:
+        return BlueprintsBuildSelector(
+            data_path=pack_path / "data",
+            registry_parts=REGISTRY_PARTS,
+            match_files=match_files,
+            archive=archive,
+        )
+
+    return make_selector
+
+
+@pytest.mark.parametrize(
+    "patterns, expected",
+    [
+        (["alpha:base"], ["alpha:base"]),
+        (["alpha:room/small"], ["alpha:room/small"]),
+        # A `*` stays within its own segment.
+        (["alpha:*"], ["alpha:base"]),
+        (["alpha:room/*"], ["alpha:room/small"]),
+        (["alpha:room/s*"], ["alpha:room/small"]),
+        (["alpha:*/small"], ["alpha:room/small"]),
+        # A `**` goes into any number of directories, including none.
+        (
+            ["alpha:**"],
+            [
+                "alpha:base",
+                "alpha:room/small",
+                "alpha:room/deep/cellar",
+                "alpha:room/deep/deeper/vault",
+            ],
+        ),
+        (
+            ["alpha:room/**"],
+            [
+                "alpha:room/small",
+                "alpha:room/deep/cellar",
+                "alpha:room/deep/deeper/vault",
+            ],
+        ),
+        (["alpha:**/vault"], ["alpha:room/deep/deeper/vault"]),
+        (["alpha:room/**/cellar"], ["alpha:room/deep/cellar"]),
+        # Namespaces may be globs too.
+        (["*:base"], ["alpha:base", "beta:base"]),
+        (["[bg]*:*"], ["beta:base", "gamma:tower"]),
+        (["*:**/arch"], ["beta:prop/arch"]),
+        # Globs may match nothing at all.
+        (["alpha:nothing*"], []),
+        (["delta*:**"], []),
+        # Each blueprint is only selected once, in the order it's first matched.
+        (
+            ["beta:*", "*:base", "alpha:base"],
+            ["beta:base", "alpha:base"],
+        ),
+    ],
+)
+def test_select(make_selector, patterns: List[str], expected: List[str]):
+    selected = make_selector().select(patterns)
+    assert [str(location) for location in selected] == expected
+
+
+@pytest.mark.parametrize(
+    "match_files, expected",
+    [
+        ("*.json", ["alpha:room/small"]),
+        ("*.yaml", ["alpha:room/large"]),
+        ("*", ["alpha:room/large", "alpha:room/notes", "alpha:room/small"]),
+    ],
+)
+def test_select_match_files(make_selector, match_files: str, expected: List[str]):
+    selected = make_selector(match_files).select(["alpha:room/*"])
+    assert sorted(str(location) for location in selected) == expected
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "alpha:nothing",
+        "delta:base",
+        "alpha:room/deep",
+        # Filtered out by `match_files`.
+        "alpha:room/large",
+    ],
+)
+def test_select_missing(make_selector, pattern: str):
+    with pytest.raises(MissingBuildTarget) as exc_info:
+        make_selector().select([pattern])
+    assert exc_info.value.pattern == pattern
+    assert "to build a variant" not in str(exc_info.value)
+
+
+def test_select_missing_variant(make_selector):
+    # Variants aren't files of their own, so targeting one points to its blueprint.
+    with pytest.raises(MissingBuildTarget) as exc_info:
+        make_selector().select(["beta:prop/arch/mossy"])
+    assert "target beta:prop/arch itself" in str(exc_info.value)
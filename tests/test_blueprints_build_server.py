@@ -0,0 +1,141 @@
+import asyncio
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, List, Optional
+
+import pytest
+
+from mcblueprints.build.blueprints_build_context import BlueprintsBuildContext
+from mcblueprints.build.blueprints_build_options import BlueprintsBuildOptions
+from mcblueprints.serve import BlueprintsBuildServer
+from tests.utils import DATA_VERSION, DEMO_PACK, zip_pack
+
+COPPER = Path("data", "fleecy_box", "blueprints", "copper.yaml")
+
+
+def make_context(input_path: Path, output_path: Path) -> BlueprintsBuildContext:
+    return BlueprintsBuildContext(
+        BlueprintsBuildOptions(
+            input_path=input_path,
+            output_path=output_path,
+            data_versions=(DATA_VERSION,),
+        )
+    )
+
+
+def serve(tmp_path: Path, lines: List[str]) -> List[Optional[Any]]:
+    # Handle every line with the same server, returning the decoded responses.
+    input_path = tmp_path / "input"
+    shutil.copytree(DEMO_PACK, input_path)
+    ctx = make_context(input_path, tmp_path / "output")
+
+    async def handle_all() -> List[Optional[Any]]:
+        server = BlueprintsBuildServer(ctx)
+        responses: List[Optional[Any]] = []
+        for line in lines:
+            response = await server.handle(line)
+            responses.append(None if response is None else json.loads(response))
+        return responses
+
+    try:
+        return asyncio.run(handle_all())
+    finally:
+        ctx.close()
+
+
+def request(request_id: int, method: str, **params: Any) -> str:
+    return json.dumps(dict(jsonrpc="2.0", id=request_id, method=method, params=params))
+
+
+def test_build(tmp_path: Path):
+    (response,) = serve(tmp_path, [request(1, "build")])
+    assert response["id"] == 1
+    result = response["result"]
+    assert result["outputs"]
+    assert all(Path(path).is_file() for path in result["outputs"])
+    assert (result["changed"], result["evicted"]) == (0, 0)
+    assert set(result["timings"]) == {"refresh", "build", "total"}
+
+
+def test_build_blueprint(tmp_path: Path):
+    (response,) = serve(tmp_path, [request(1, "build", blueprint="box_dungeon:floor")])
+    (output,) = response["result"]["outputs"]
+    assert Path(output).name == "floor.nbt"
+
+
+def test_rebuild_changed(tmp_path: Path):
+    # Source files changed between builds evict whatever was loaded from them.
+    input_path = tmp_path / "input"
+    shutil.copytree(DEMO_PACK, input_path)
+    ctx = make_context(input_path, tmp_path / "output")
+
+    async def rebuild():
+        server = BlueprintsBuildServer(ctx)
+        first = await server.build()
+        unchanged = await server.build()
+        source_path = input_path / COPPER
+        source_path.write_text(source_path.read_text() + "\n")
+        stat = source_path.stat()
+        os.utime(source_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1))
+        changed = await server.build()
+        return first, unchanged, changed
+
+    try:
+        first, unchanged, changed = asyncio.run(rebuild())
+    finally:
+        ctx.close()
+    assert (unchanged["changed"], unchanged["evicted"]) == (0, 0)
+    assert changed["changed"] == 1
+    assert changed["evicted"] >= 1
+    assert sorted(changed["outputs"]) == sorted(first["outputs"])
+
+
+@pytest.mark.parametrize(
+    "line, code",
+    [
+        ("{", -32700),
+        ("[]", -32600),
+        (request(1, "destroy"), -32601),
+        (json.dumps(dict(id=1, method="build", params=[])), -32602),
+        (request(1, "build", blueprints="box_dungeon:floor"), -32602),
+        (request(1, "build", blueprint="box_dungeon:missing"), -32000),
+    ],
+)
+def test_error(tmp_path: Path, line: str, code: int):
+    (response,) = serve(tmp_path, [line])
+    assert response["error"]["code"] == code
+    assert "result" not in response
+
+
+def test_notification(tmp_path: Path):
+    # Requests without an ID get no response, even when they fail.
+    lines = [
+        json.dumps(dict(jsonrpc="2.0", method="destroy")),
+        json.dumps(dict(jsonrpc="2.0", method="shutdown")),
+    ]
+    assert serve(tmp_path, lines) == [None, None]
+
+
+def test_shutdown(tmp_path: Path):
+    (response,) = serve(tmp_path, [request(1, "shutdown")])
+    assert response == dict(jsonrpc="2.0", id=1, result=None)
+
+
+@pytest.mark.parametrize("archive", ["input", "output"])
+def test_archive(tmp_path: Path, archive: str):
+    # Zip archives are built all at once, so there's nothing to keep alive.
+    input_path = DEMO_PACK
+    output_path = tmp_path / "output"
+    if archive == "input":
+        input_path = tmp_path / "demo.zip"
+        zip_pack(DEMO_PACK, input_path)
+    else:
+        output_path = tmp_path / "output.zip"
+    ctx = make_context(input_path, output_path)
+    try:
+        with pytest.raises(ValueError):
+            BlueprintsBuildServer(ctx)
+    finally:
+        ctx.close()
@@ -0,0 +1,104 @@
+from typing import Any, List, Tuple
+
+import pytest
+
+from mcblueprints.lib.resource.blueprint.compact_layout_row import (
+    CompactLayoutRow,
+    MalformedCompactLayoutRow,
+)
+from tests.utils import flatten_blueprint
+
+MATERIALS = {
+    "test:brick": {"name": "minecraft:stone_bricks"},
+    "test:stone": {"name": "minecraft:stone"},
+}
+
+PALETTE = {
+    "B": {"type": "material", "material": "test:brick"},
+    "s": {"type": "material", "material": "test:stone"},
+    "*": {"type": "material", "material": "test:stone"},
+}
+
+
+@pytest.mark.parametrize(
+    "raw_row, runs",
+    [
+        ("", ()),
+        ("B", (("B", 1),)),
+        ("BBs", (("B", 2), ("s", 1))),
+        ("B*3s*3B*3", (("B", 3), ("s", 3), ("B", 3))),
+        ("M*96", (("M", 96),)),
+        # Counts may be more than one digit, or zero.
+        ("B*12s", (("B", 12), ("s", 1))),
+        ("B*0s", (("s", 1),)),
+        # Consecutive runs of the same symbol are merged.
+        ("B*2B*3B", (("B", 6),)),
+        # Escaped characters are plain symbols, and can be repeated too.
+        ("\\**3", (("*", 3),)),
+        ("\\\\B", (("\\", 1), ("B", 1))),
+        ("\\B*2", (("B", 2),)),
+    ],
+)
+def test_parse(raw_row: str, runs: Tuple[Tuple[str, int], ...]):
+    assert CompactLayoutRow.parse(raw_row).runs == runs
+
+
+@pytest.mark.parametrize("raw_row", ["*", "*3", "B**", "B*", "B*s", "B\\"])
+def test_parse_malformed(raw_row: str):
+    with pytest.raises(MalformedCompactLayoutRow):
+        CompactLayoutRow.parse(raw_row)
+
+
+@pytest.mark.parametrize(
+    "raw_row, symbols",
+    [
+        ("B*3s*2", ["B", "B", "B", "s", "s"]),
+        ("B*2 *2B", ["B", "B", " ", " ", "B"]),
+    ],
+)
+def test_expand(raw_row: str, symbols: List[str]):
+    row = CompactLayoutRow.parse(raw_row)
+    assert list(row) == symbols
+    assert len(row) == len(symbols)
+
+
+@pytest.mark.parametrize(
+    "raw_row, symbol, indices",
+    [
+        ("B*3s*2B", "B", [0, 1, 2, 5]),
+        ("B*3s*2B", "s", [3, 4]),
+        ("B*3s*2B", "x", []),
+    ],
+)
+def test_scan(raw_row: str, symbol: str, indices: List[int]):
+    assert list(CompactLayoutRow.parse(raw_row).scan(symbol)) == indices
+
+
+@pytest.mark.parametrize(
+    "compact_layout, layout",
+    [
+        (
+            ["B*3s*2B", "s\\*B*2 s"],
+            ["BBBssB", "s*BB s"],
+        ),
+        (
+            [{"row": "B*2s*4", "repeat": 3}],
+            ["BBssss", "BBssss", "BBssss"],
+        ),
+    ],
+)
+def test_flatten(compact_layout: List[Any], layout: List[str]):
+    # A compact layout flattens into the same blocks as the layout it stands for.
+    size = [len(layout), 2, len(layout[0])]
+
+    def make_blueprint(raw_layer: List[Any], **extra: Any) -> Any:
+        return dict(size=size, palette=PALETTE, layout=[raw_layer, raw_layer], **extra)
+
+    expected = flatten_blueprint(make_blueprint(layout), materials=MATERIALS)
+    assert expected
+    assert (
+        flatten_blueprint(
+            make_blueprint(compact_layout, compact_layout=True), materials=MATERIALS
+        )
+        == expected
+    )
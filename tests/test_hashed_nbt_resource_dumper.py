@@ -0,0 +1,81 @@
+import asyncio
+import os
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Any, Optional
+
+import pytest
+
+from mcblueprints.lib import HashedNbtResourceDumper, OutputHashIndex
+
+
+def dump(dumper: HashedNbtResourceDumper[Any], resource: bytes, path: Path):
+    # Resources are their own bytes, and only the path of a location is needed.
+    location: Any = SimpleNamespace(path=path.with_suffix(""))
+    asyncio.run(dumper.dump(resource, location))
+
+
+def make_dumper(index: Optional[OutputHashIndex]) -> HashedNbtResourceDumper[Any]:
+    return HashedNbtResourceDumper(encoder=lambda resource: resource, index=index)
+
+
+def age(path: Path):
+    # Push the modification time back, so that any rewrite shows.
+    os.utime(path, ns=(0, 0))
+
+
+@pytest.fixture(params=["without_index", "with_index"])
+def index(request, tmp_path: Path) -> Optional[OutputHashIndex]:
+    if request.param == "without_index":
+        return None
+    return OutputHashIndex(tmp_path / "hashes" / "pack.json", root=tmp_path / "pack")
+
+
+def test_skip_unchanged(tmp_path: Path, index: Optional[OutputHashIndex]):
+    path = tmp_path / "pack" / "structure.nbt"
+    dumper = make_dumper(index)
+    dump(dumper, b"first", path)
+    age(path)
+    dump(dumper, b"first", path)
+    assert path.stat().st_mtime_ns == 0
+    assert (dumper.written, dumper.skipped) == (1, 1)
+
+
+@pytest.mark.parametrize("changed", [b"other", b"longer"])
+def test_write_changed(
+    tmp_path: Path, index: Optional[OutputHashIndex], changed: bytes
+):
+    # Changed files are rewritten, whether or not their size changed too.
+    path = tmp_path / "pack" / "structure.nbt"
+    dumper = make_dumper(index)
+    dump(dumper, b"first", path)
+    age(path)
+    dump(dumper, changed, path)
+    assert path.read_bytes() == changed
+    assert path.stat().st_mtime_ns != 0
+    assert (dumper.written, dumper.skipped) == (2, 0)
+
+
+def test_index_saved_apart(tmp_path: Path):
+    # The index is kept wherever it's asked to be, and never in the output pack.
+    index = OutputHashIndex(tmp_path / "hashes" / "pack.json", root=tmp_path / "pack")
+    index.load()
+    dump(make_dumper(index), b"first", tmp_path / "pack" / "structure.nbt")
+    index.save()
+    assert index.path.is_file()
+    assert sorted(path.name for path in (tmp_path / "pack").iterdir()) == [
+        "structure.nbt"
+    ]
+
+
+def test_index_out_of_date(tmp_path: Path):
+    # Files changed by anything else are read again, rather than trusting the index.
+    path = tmp_path / "pack" / "structure.nbt"
+    index = OutputHashIndex(tmp_path / "hashes" / "pack.json", root=tmp_path / "pack")
+    dumper = make_dumper(index)
+    dump(dumper, b"first", path)
+    path.write_bytes(b"other")
+    age(path)
+    dump(dumper, b"first", path)
+    assert path.read_bytes() == b"first"
+    assert (dumper.written, dumper.skipped) == (2, 0)
@@ -0,0 +1,59 @@
+import asyncio
+from typing import Any
+
+import pytest
+from pyckaxe import ResourceLocation
+
+from mcblueprints.lib import (
+    BlueprintDeserializer,
+    FilterDeserializer,
+    MaterialDeserializer,
+    MemoryResourceNotFound,
+    MemoryResourceResolver,
+)
+from mcblueprints.lib.resource.blueprint.blueprint_deserializer import (
+    MalformedBlueprint,
+)
+
+BLUEPRINT = dict(size=[1, 1, 1], palette={"S": "minecraft:stone"}, layout=[["S"]])
+
+LOCATION = ResourceLocation.from_string("test:blueprint")
+
+
+def make_resolver() -> MemoryResourceResolver[Any]:
+    material_deserializer = MaterialDeserializer()
+    return MemoryResourceResolver(
+        BlueprintDeserializer(
+            filter_deserializer=FilterDeserializer(
+                material_deserializer=material_deserializer
+            ),
+            material_deserializer=material_deserializer,
+        )
+    )
+
+
+def test_resolve_raw():
+    resolver = make_resolver()
+    resolver.add("test:blueprint", BLUEPRINT)
+    blueprint = asyncio.run(resolver(LOCATION))
+    # Raw data is only deserialized once.
+    assert asyncio.run(resolver(LOCATION)) is blueprint
+    assert list(resolver) == [LOCATION]
+
+
+def test_resolve_missing():
+    with pytest.raises(MemoryResourceNotFound):
+        asyncio.run(make_resolver()(LOCATION))
+
+
+def test_resolve_malformed():
+    resolver = make_resolver()
+    resolver.add("test:blueprint", dict(BLUEPRINT, size="big"))
+    # Resolving again raises the same error, rather than losing the raw data.
+    for _ in range(2):
+        with pytest.raises(MalformedBlueprint):
+            asyncio.run(resolver(LOCATION))
+    assert LOCATION in resolver
+    # Replacing the raw data fixes it.
+    resolver.add("test:blueprint", BLUEPRINT)
+    assert asyncio.run(resolver(LOCATION)).size.unpack_ints() == (1, 1, 1)
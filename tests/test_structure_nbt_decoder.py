@@ -0,0 +1,154 @@
+import gzip
+from io import BytesIO
+from typing import Any, List, Optional, Tuple
+
+import pytest
+from nbtlib import Compound, Int
+from nbtlib import List as NbtList
+from nbtlib import String, parse_nbt
+from pyckaxe import Block, BlockMap, BlockState
+
+from mcblueprints.lib import (
+    FlattenedStructure,
+    MalformedStructureNbt,
+    StructureNbtDecoder,
+    StructureNbtEncoder,
+)
+from mcblueprints.utils import DenseBlockMap, MappedBlockMap, iter_block_map_rows
+from tests.utils import flatten_blueprint
+
+STONE = Block(name="minecraft:stone")
+STAIRS = Block(name="minecraft:oak_stairs", state=BlockState(facing="east", half=0))
+CHEST = Block(name="minecraft:chest", data=parse_nbt('{LootTable:"minecraft:a"}'))
+OTHER_CHEST = Block(name="minecraft:chest", data=parse_nbt('{LootTable:"minecraft:b"}'))
+
+# Decode into memory, or into a memory-mapped file.
+OUT_OF_CORE_VOLUMES = {"dense": None, "mapped": 1}
+BLOCK_MAP_CLASSES = {"dense": DenseBlockMap, "mapped": MappedBlockMap}
+
+Cells = List[Tuple[Tuple[int, int, int], str]]
+
+
+def cells_of(block_map: BlockMap, ordered: bool = False) -> Cells:
+    # Every filled cell and its block, in the order they were set in.
+    return [
+        ((x, y, z), str(block))
+        for y, x, row in iter_block_map_rows(block_map, ordered=ordered)
+        for z, block in row
+    ]
+
+
+def make_structure() -> FlattenedStructure:
+    # Set out of order, so that there's an order of their own to keep.
+    block_map = BlockMap(size=(3, 3, 2))
+    for x, y, z, block in [
+        (2, 2, 1, STONE),
+        (0, 1, 0, CHEST),
+        (1, 0, 1, STAIRS),
+        (0, 2, 0, OTHER_CHEST),
+        (2, 1, 1, CHEST),
+        (0, 0, 0, STONE),
+    ]:
+        block_map[x, y, z] = block
+    return FlattenedStructure(block_map)
+
+
+def encode(structure: FlattenedStructure) -> bytes:
+    return StructureNbtEncoder(data_version=2586)(structure)
+
+
+def decode(data: bytes, storage: str) -> BlockMap:
+    decoder = StructureNbtDecoder(out_of_core_volume=OUT_OF_CORE_VOLUMES[storage])
+    return decoder.decode(data).block_map
+
+
+@pytest.mark.parametrize("storage", OUT_OF_CORE_VOLUMES)
+def test_round_trip(storage: str):
+    structure = make_structure()
+    data = encode(structure)
+    block_map = decode(data, storage)
+    assert isinstance(block_map, BLOCK_MAP_CLASSES[storage])
+    # Blocks come back in the order of the file, so they're written the same way again.
+    assert cells_of(block_map) == cells_of(structure.block_map)
+    assert encode(FlattenedStructure(block_map)) == data
+
+
+@pytest.mark.parametrize("storage", OUT_OF_CORE_VOLUMES)
+def test_shared_blocks(storage: str):
+    # Blocks with the same state and data are the same block.
+    block_map = decode(encode(make_structure()), storage)
+    assert block_map[0, 1, 0] is block_map[2, 1, 1]
+    assert block_map[0, 1, 0] is not block_map[0, 2, 0]
+    assert block_map[2, 2, 1] is block_map[0, 0, 0]
+
+
+def make_nbt(blocks: List[Tuple[int, Tuple[int, int, int]]], size: Any = (2, 2, 2)):
+    root = Compound(
+        {
+            "size": NbtList[Int](size),
+            "palette": NbtList[Compound](
+                [Compound({"Name": String(name)}) for name in ("stone", "dirt")]
+            ),
+            "blocks": NbtList[Compound](
+                [
+                    Compound({"state": Int(state), "pos": NbtList[Int](pos)})
+                    for state, pos in blocks
+                ]
+            ),
+        }
+    )
+    # An unnamed compound at the root.
+    buff = BytesIO(b"\x0a\x00\x00")
+    buff.seek(0, 2)
+    root.write(buff)
+    return gzip.compress(buff.getvalue())
+
+
+@pytest.mark.parametrize("storage", OUT_OF_CORE_VOLUMES)
+def test_repeated_cell(storage: str):
+    # A cell given more than once keeps the last block, but the place of the first.
+    block_map = decode(
+        make_nbt([(0, (1, 1, 1)), (0, (0, 0, 0)), (1, (1, 1, 1))]), storage
+    )
+    assert cells_of(block_map) == [((1, 1, 1), "dirt"), ((0, 0, 0), "stone")]
+
+
+@pytest.mark.parametrize("storage", OUT_OF_CORE_VOLUMES)
+@pytest.mark.parametrize(
+    "blocks, message",
+    [
+        ([(0, (0, 0, 0)), (0, (2, 0, 0))], "out of bounds"),
+        ([(0, (0, -1, 0))], "out of bounds"),
+        ([(0, (0, 0, 0)), (2, (1, 0, 0))], "Unknown block state"),
+    ],
+)
+def test_malformed(storage: str, blocks: Any, message: str):
+    with pytest.raises(MalformedStructureNbt, match=message):
+        decode(make_nbt(blocks), storage)
+
+
+@pytest.mark.parametrize("storage", OUT_OF_CORE_VOLUMES)
+def test_empty(storage: str):
+    assert cells_of(decode(make_nbt([]), storage)) == []
+
+
+@pytest.mark.parametrize("filter", [None, "test:stone"])
+def test_include(filter: Optional[str]):
+    # Structures included in a blueprint keep their blocks, and may be filtered.
+    structure = make_structure()
+    entry = {"type": "structure", "structure": "test:structure"}
+    if filter is not None:
+        entry["filter"] = filter
+    blocks = flatten_blueprint(
+        dict(size=[4, 3, 2], palette={"S": entry}, layout=[[], [], ["..", "S."]]),
+        filters={
+            "test:stone": [{"type": "keep_blocks", "blocks": ["minecraft:stone"]}]
+        },
+        structures={"test:structure": encode(structure)},
+    )
+    expected = {
+        (x + 1, y, z): block
+        for (x, y, z), block in cells_of(structure.block_map)
+        if (filter is None) or (block == "minecraft:stone")
+    }
+    assert blocks == expected
@@ -0,0 +1,83 @@
+from typing import Any
+
+import pytest
+from nbtlib import parse_nbt
+from pyckaxe import Block, BlockMap, BlockState, Structure, StructureSerializer
+
+from mcblueprints.lib import FlattenedStructure, StructureNbtEncoder
+from mcblueprints.utils import DenseBlockMap, MappedBlockMap, dump_nbt_bytes
+
+STONE = Block(name="minecraft:stone")
+BRICKS = Block(name="minecraft:stone_bricks")
+DIRT = Block(name="minecraft:dirt")
+STAIRS = Block(name="minecraft:oak_stairs", state=BlockState(facing="east", half=0))
+CHEST = Block(name="minecraft:chest", data=parse_nbt('{LootTable:"minecraft:a"}'))
+
+STORAGES = [BlockMap, DenseBlockMap, MappedBlockMap]
+
+# Set out of order, so that every block order comes out differently.
+CELLS = [
+    (2, 1, 2, STONE),
+    (0, 0, 1, BRICKS),
+    (1, 1, 0, DIRT),
+    (0, 0, 0, STONE),
+    (2, 0, 2, DIRT),
+    (1, 0, 1, STONE),
+    (2, 0, 0, STAIRS),
+    (0, 1, 2, CHEST),
+]
+
+
+def make_block_map(block_map_class: Any = BlockMap, cells: Any = CELLS) -> BlockMap:
+    block_map = block_map_class(size=(3, 2, 3))
+    for x, y, z, block in cells:
+        block_map[x, y, z] = block
+    return block_map
+
+
+def serialize(structure: Structure, gzipped: bool = True) -> bytes:
+    # The long way round, through a tree of NBT tags.
+    return dump_nbt_bytes(StructureSerializer(2586)(structure), gzipped=gzipped)
+
+
+@pytest.mark.parametrize("block_map_class", STORAGES)
+@pytest.mark.parametrize("gzipped", [True, False])
+def test_same_as_serializer(block_map_class: Any, gzipped: bool):
+    # However the block map is stored, the bytes are the same as serializing it.
+    expected = serialize(Structure.from_block_map(make_block_map()), gzipped)
+    structure = FlattenedStructure(make_block_map(block_map_class))
+    encoder = StructureNbtEncoder(data_version=2586)
+    assert encoder.encode(structure, gzipped=gzipped) == expected
+
+
+def test_same_as_serializer_structure():
+    # Structures that aren't flattened are written from their palette and blocks.
+    structure = Structure.from_block_map(make_block_map())
+    assert StructureNbtEncoder(data_version=2586)(structure) == serialize(structure)
+
+
+@pytest.mark.parametrize("block_order", ["position", "palette"])
+def test_deterministic(block_order: str):
+    # Equal block maps give identical files, however they were put together or stored.
+    encoder = StructureNbtEncoder(data_version=2586, block_order=block_order)
+    expected = encoder(FlattenedStructure(make_block_map()))
+    reversed_block_map = make_block_map(cells=CELLS[::-1])
+    assert encoder(FlattenedStructure(reversed_block_map)) == expected
+    for block_map_class in STORAGES:
+        structure = FlattenedStructure(make_block_map(block_map_class))
+        assert encoder(structure) == expected
+
+
+@pytest.mark.parametrize("block_order", ["insertion", "position", "palette"])
+def test_compare_block_orders(block_order: str):
+    # Each structure is compared with how it would be written by default.
+    structure = FlattenedStructure(make_block_map(), name="test:structure")
+    encoder = StructureNbtEncoder(
+        data_version=2586, block_order=block_order, compare_block_orders=True
+    )
+    data = encoder(structure)
+    default = StructureNbtEncoder(data_version=2586)(structure)
+    assert encoder.block_order_sizes == [("test:structure", len(default), len(data))]
+    assert data == StructureNbtEncoder(data_version=2586, block_order=block_order)(
+        structure
+    )
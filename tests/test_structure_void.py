@@ -0,0 +1,158 @@
+import asyncio
+import logging
+from pathlib import Path
+from typing import Any, List
+
+import pytest
+from pyckaxe import Block, BlockMap, Structure
+
+from mcblueprints.build.blueprints_memory_build import BlueprintsMemoryBuild
+from mcblueprints.lib import (
+    FlattenedStructure,
+    StructureNbtDecoder,
+    StructureNbtEncoder,
+)
+from mcblueprints.utils import DenseBlockMap, MappedBlockMap, iter_block_map_rows
+from tests.utils import DEMO_PACK, build_pack, read_pack
+
+AIR = Block(name="minecraft:air")
+SHORT_AIR = Block(name="air")
+CAVE_AIR = Block(name="minecraft:cave_air")
+STONE = Block(name="minecraft:stone")
+
+STORAGES = [BlockMap, DenseBlockMap, MappedBlockMap]
+BLOCK_ORDERS = ["insertion", "position", "palette"]
+
+
+def make_block_map(block_map_class: Any = BlockMap) -> BlockMap:
+    block_map = block_map_class(size=(2, 2, 2))
+    for x, y, z, block in [
+        (0, 0, 0, STONE),
+        (1, 0, 0, AIR),
+        (0, 1, 0, CAVE_AIR),
+        (1, 1, 1, SHORT_AIR),
+        (0, 0, 1, STONE),
+        (1, 0, 1, AIR),
+    ]:
+        block_map[x, y, z] = block
+    return block_map
+
+
+def names_of(data: bytes) -> List[str]:
+    block_map = StructureNbtDecoder().decode(data).block_map
+    return sorted(
+        block.name for _, _, row in iter_block_map_rows(block_map) for _, block in row
+    )
+
+
+@pytest.mark.parametrize("block_map_class", STORAGES)
+@pytest.mark.parametrize("block_order", BLOCK_ORDERS)
+def test_leave_out_air(block_map_class: Any, block_order: str):
+    # Air is left out however it's named, but other kinds of air are kept.
+    encoder = StructureNbtEncoder(
+        data_version=2586, structure_void=True, block_order=block_order
+    )
+    data = encoder(FlattenedStructure(make_block_map(block_map_class)))
+    assert names_of(data) == [
+        "minecraft:cave_air",
+        "minecraft:stone",
+        "minecraft:stone",
+    ]
+    assert encoder.voided == 3
+
+
+def test_leave_out_nothing():
+    encoder = StructureNbtEncoder(data_version=2586)
+    data = encoder(FlattenedStructure(make_block_map()))
+    assert len(names_of(data)) == 6
+    assert encoder.voided == 0
+
+
+def test_count():
+    # Blocks left out are counted across structures, but not when only comparing.
+    encoder = StructureNbtEncoder(
+        data_version=2586,
+        structure_void=True,
+        block_order="position",
+        compare_block_orders=True,
+    )
+    encoder(FlattenedStructure(make_block_map()))
+    encoder(FlattenedStructure(make_block_map(DenseBlockMap)))
+    assert encoder.voided == 6
+
+
+@pytest.mark.parametrize(
+    "structure_void, expected",
+    [
+        # Nothing is left out, whatever the encoder would do.
+        (False, 6),
+        # The encoder's usual blocks are left out, even if it wouldn't otherwise.
+        (True, 3),
+        # Only the blocks named are left out, by their full names or not.
+        (("stone", "minecraft:cave_air"), 3),
+    ],
+)
+@pytest.mark.parametrize("encoder_structure_void", [True, False])
+def test_structure_chooses(
+    structure_void: Any, expected: int, encoder_structure_void: bool
+):
+    encoder = StructureNbtEncoder(
+        data_version=2586, structure_void=encoder_structure_void
+    )
+    structure = FlattenedStructure(make_block_map(), structure_void=structure_void)
+    assert len(names_of(encoder(structure))) == expected
+    assert encoder.voided == 6 - expected
+
+
+def test_unflattened_structure():
+    # Blocks are left out of structures that aren't flattened too.
+    encoder = StructureNbtEncoder(data_version=2586, structure_void=True)
+    data = encoder(Structure.from_block_map(make_block_map()))
+    assert names_of(data) == [
+        "minecraft:cave_air",
+        "minecraft:stone",
+        "minecraft:stone",
+    ]
+    assert encoder.voided == 3
+
+
+def test_blueprint_chooses():
+    # Blueprints choose for themselves, and so do their variants.
+    build = BlueprintsMemoryBuild(
+        data_version=2586,
+        blueprints={
+            "test:blueprint": dict(
+                size=[1, 1, 3],
+                palette={
+                    "S": {"type": "block", "name": "minecraft:stone"},
+                    "A": {"type": "block", "name": "minecraft:air"},
+                },
+                layout=[["SAA"]],
+                structure_void=["stone"],
+                variants={"copy": "test:nothing"},
+            )
+        },
+        filters={"test:nothing": []},
+        structure_void=True,
+    )
+    structures = asyncio.run(build.build_nbt(["test:blueprint"]))
+    assert [names_of(data) for data in structures.values()] == [
+        ["minecraft:air", "minecraft:air"],
+        ["minecraft:air", "minecraft:air"],
+    ]
+
+
+def test_build(tmp_path: Path, caplog: pytest.LogCaptureFixture):
+    # Builds report how many blocks they left out.
+    build_pack(DEMO_PACK, tmp_path / "expected")
+    air = sum(
+        names_of(data).count("minecraft:air")
+        for name, data in read_pack(tmp_path / "expected").items()
+        if name.endswith(".nbt")
+    )
+    assert air
+    with caplog.at_level(logging.INFO):
+        build_pack(DEMO_PACK, tmp_path / "actual", structure_void=True)
+    assert f"Left out {air} blocks as structure void" in caplog.messages
+    for name, data in read_pack(tmp_path / "actual").items():
+        assert "minecraft:air" not in names_of(data), name
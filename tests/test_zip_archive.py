@@ -0,0 +1,55 @@
+from pathlib import Path
+from zipfile import ZipFile
+
+import pytest
+
+from mcblueprints.lib import ZipArchive
+from tests.utils import DEMO_PACK, build_pack, read_pack, zip_pack
+
+FILES = {
+    "pack.mcmeta": b"{}",
+    "data/alpha/blueprints/base.json": b"{}",
+    "data/alpha/blueprints/room/small.json": b"{}",
+    "data/alpha/materials/brick.json": b"{}",
+}
+
+
+def write_archive(path: Path, prefix: str = "") -> ZipArchive:
+    with ZipFile(path, "w") as zip_file:
+        for name, data in FILES.items():
+            zip_file.writestr(f"{prefix}{name}", data)
+    return ZipArchive(path)
+
+
+@pytest.mark.parametrize("prefix", ["", "pack/"])
+def test_index(tmp_path: Path, prefix: str):
+    # Packs zipped from their parent directory are found one level down.
+    with write_archive(tmp_path / "pack.zip", prefix) as archive:
+        assert archive.root == prefix
+        assert archive.is_file("pack.mcmeta")
+        assert archive.is_dir("data/alpha")
+        assert not archive.is_file("data/alpha")
+        assert archive.list_dirs("data/alpha") == ["blueprints", "materials"]
+        assert archive.list_files("data/alpha/blueprints") == ["base.json"]
+        assert list(archive.walk_files("data/alpha/blueprints")) == [
+            "data/alpha/blueprints/base.json",
+            "data/alpha/blueprints/room/small.json",
+        ]
+        assert archive.read("data/alpha/materials/brick.json") == b"{}"
+
+
+def test_paths(tmp_path: Path):
+    with write_archive(tmp_path / "pack.zip") as archive:
+        path = archive.to_path("data/alpha/blueprints/base.json")
+        assert path == tmp_path.joinpath("pack.zip", "data/alpha/blueprints/base.json")
+        assert archive.to_name(path) == "data/alpha/blueprints/base.json"
+
+
+def test_build(tmp_path: Path):
+    # Building from an archive gives the same pack as building from a directory.
+    build_pack(DEMO_PACK, tmp_path / "from_directory")
+    zip_pack(DEMO_PACK, tmp_path / "demo.zip")
+    build_pack(tmp_path / "demo.zip", tmp_path / "from_archive")
+    expected = read_pack(tmp_path / "from_directory")
+    assert expected
+    assert read_pack(tmp_path / "from_archive") == expected
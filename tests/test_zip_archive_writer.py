@@ -0,0 +1,68 @@
+from pathlib import Path
+from typing import Iterable
+from zipfile import ZipFile
+
+import pytest
+
+from mcblueprints.lib import ZipArchiveWriter
+from tests.utils import DEMO_PACK, build_pack, read_pack
+
+ENTRIES = {
+    "data/beta/structures/tower.nbt": b"tower",
+    "pack.mcmeta": b"{}",
+    "data/alpha/structures/room/small.nbt": b"small",
+    "data/alpha/structures/base.nbt": b"base",
+}
+
+
+def write(path: Path, names: Iterable[str]) -> bytes:
+    writer = ZipArchiveWriter(path)
+    writer.open()
+    for name in names:
+        writer.write(name, ENTRIES[name])
+    writer.close()
+    return path.read_bytes()
+
+
+def test_round_trip(tmp_path: Path):
+    path = tmp_path / "pack.zip"
+    write(path, ENTRIES)
+    assert read_pack(path) == ENTRIES
+    # Nothing is left behind next to the archive.
+    assert [child.name for child in tmp_path.iterdir()] == ["pack.zip"]
+
+
+def test_sorted(tmp_path: Path):
+    # Entries come out in order of name, whatever order they were written in.
+    data = write(tmp_path / "a.zip", ENTRIES)
+    assert write(tmp_path / "b.zip", reversed(list(ENTRIES))) == data
+    with ZipFile(tmp_path / "a.zip") as zip_file:
+        assert zip_file.namelist() == sorted(ENTRIES)
+
+
+def test_discard(tmp_path: Path):
+    # An archive is only replaced once it's finished.
+    path = tmp_path / "pack.zip"
+    data = write(path, ["pack.mcmeta"])
+    writer = ZipArchiveWriter(path)
+    writer.open()
+    writer.write("pack.mcmeta", b"changed")
+    writer.discard()
+    assert path.read_bytes() == data
+    assert [child.name for child in tmp_path.iterdir()] == ["pack.zip"]
+
+
+def test_write_closed(tmp_path: Path):
+    with pytest.raises(ValueError):
+        ZipArchiveWriter(tmp_path / "pack.zip").write("pack.mcmeta", b"{}")
+
+
+def test_build(tmp_path: Path):
+    # Building into an archive gives the same files as building into a directory,
+    # along with the pack metadata, so that the archive is a usable pack by itself.
+    build_pack(DEMO_PACK, tmp_path / "directory")
+    build_pack(DEMO_PACK, tmp_path / "archive.zip")
+    expected = read_pack(tmp_path / "directory")
+    assert expected
+    expected["pack.mcmeta"] = (DEMO_PACK / "pack.mcmeta").read_bytes()
+    assert read_pack(tmp_path / "archive.zip") == expected
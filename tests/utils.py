@@ -0,0 +1,80 @@
+import asyncio
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Tuple
+from zipfile import ZipFile
+
+from mcblueprints.build.blueprints_build_context import BlueprintsBuildContext
+from mcblueprints.build.blueprints_build_options import BlueprintsBuildOptions
+from mcblueprints.build.blueprints_memory_build import BlueprintsMemoryBuild
+from mcblueprints.lib import BlueprintFlattenSettings, FlattenedStructure
+from mcblueprints.utils import iter_block_map_rows
+
+# The name (and state) of the block in each filled cell, keyed by `(x, y, z)`.
+Blocks = Dict[Tuple[int, int, int], str]
+
+DEMO_PACK = Path(__file__).parent / "datapacks" / "demo-datapack"
+
+DATA_VERSION = 2586
+
+
+def build_pack(input_path: Path, output_path: Path, **options: Any):
+    """Build a pack on disk, the same way that the CLI does."""
+    ctx = BlueprintsBuildContext(
+        BlueprintsBuildOptions(
+            input_path=input_path,
+            output_path=output_path,
+            data_versions=(DATA_VERSION,),
+            **options,
+        )
+    )
+    try:
+        asyncio.run(ctx.build())
+    finally:
+        ctx.close()
+
+
+def zip_pack(pack_path: Path, archive_path: Path):
+    """Zip up the pack at `pack_path`, with its files at the top level."""
+    with ZipFile(archive_path, "w") as zip_file:
+        for file_path in sorted(pack_path.rglob("*")):
+            if file_path.is_file():
+                zip_file.write(file_path, file_path.relative_to(pack_path).as_posix())
+
+
+def read_pack(path: Path) -> Dict[str, bytes]:
+    """Read every file in a pack, either a directory or a zip archive, by name."""
+    if path.is_file():
+        with ZipFile(path) as zip_file:
+            return {name: zip_file.read(name) for name in zip_file.namelist()}
+    return {
+        file_path.relative_to(path).as_posix(): file_path.read_bytes()
+        for file_path in sorted(path.rglob("*"))
+        if file_path.is_file()
+    }
+
+
+def flatten_blueprint(
+    raw_blueprint: Any,
+    blueprints: Optional[Mapping[str, Any]] = None,
+    materials: Optional[Mapping[str, Any]] = None,
+    filters: Optional[Mapping[str, Any]] = None,
+    structures: Optional[Mapping[str, Any]] = None,
+    flatten_settings: Optional[BlueprintFlattenSettings] = None,
+) -> Blocks:
+    """Flatten a raw blueprint in memory, and return the block in every filled cell."""
+    build = BlueprintsMemoryBuild(
+        data_version=0,
+        blueprints={"test:blueprint": raw_blueprint, **(blueprints or {})},
+        materials=materials or {},
+        filters=filters or {},
+        structures=structures or {},
+        flatten_settings=flatten_settings or BlueprintFlattenSettings(),
+    )
+    structures = asyncio.run(build.build_structures(["test:blueprint"]))
+    (structure,) = structures.values()
+    assert isinstance(structure, FlattenedStructure)
+    return {
+        (x, y, z): str(block)
+        for y, x, row in iter_block_map_rows(structure.block_map)
+        for z, block in row
+    }